@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 import json
 from typing import Dict, Any, List
 
+from shared_core.codec import get_codec
 
 class ReviewRunner:
     def __init__(
@@ -14,6 +15,7 @@ class ReviewRunner:
     ):
         self.attempts_dir = Path(attempts_dir)
         self.reports_dir = Path(reports_dir)
+        self.codec = get_codec()
         self.reports_dir.mkdir(parents=True, exist_ok=True)
 
     def _today_attempts_path(self) -> Path:
@@ -29,7 +31,7 @@ class ReviewRunner:
             for line in f:
                 line = line.strip()
                 if line:
-                    rows.append(json.loads(line))
+                    rows.append(self.codec.loads(line))
         return rows
 
     def build_metrics(self, attempts: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -57,7 +57,8 @@ class DecisionLibraryWriter:
         """
 
         event = self._build_record(decision)
-        self._writer.write_event(event)
+        # 治理決策是稽核紀錄：不進 write_event 的 buffer，回傳前就落盤
+        self._writer.write_many([event])
 
 
     # -----------------------------
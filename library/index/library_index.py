@@ -1,132 +1,327 @@
 from pathlib import Path
 import json
+import os
+import threading
 from collections import defaultdict
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, iter_text_lines, record_ts
+from library.index.posting_index import PostingIndex, hour_of
+from library.library_scan import _is_line_start, _iter_day_files
+
 
 class LibraryIndex:
     """
-    LibraryIndex v2
+    LibraryIndex v3（增量）
     - 只讀 Library events（jsonl）
     - 不修改事件
     - 不依賴 PBEvent / EventBus
     - 提供學習 / replay / 分析用索引
+
+    v3：
+    - stats.json 的每個檔案記 checkpoint（size_bytes / mtime_ns / offset = 已索引到的 byte）
+    - build() 只解析 checkpoint 之後 append 的完整行；沒變的檔案不開
+      檔案變小 / 被換掉（例如封存成 .jsonl.gz）/ 同大小但 mtime 變了 → 該日重建
+    - postings：index/postings.sqlite（PostingIndex），每筆事件記 (file, offset, length, type, source, hour_of_day)
+      → LibraryReader.iter_events 依條件直接 seek 到符合的行
+    - 成本與新事件數成正比；watch() 持續增量更新
+    - hourly：同一個 postings.sqlite 內的每小時彙總（type × source × UTC 整點 epoch_hour → count / first / last）
+      → LibraryReader.aggregate 不碰 events/；舊版索引沒有 hourly → 第一次 build() 整庫重建
+    - by_type.json / by_source.json / by_day.json（v1 event_id 清單）改為 legacy_postings=True 才寫
     """
 
-    def __init__(self, library_root: Path):
+    def __init__(self, library_root: Path, *, legacy_postings: bool = False):
         self.library_root = Path(library_root)
         self.events_root = self.library_root / "events"
         self.index_root = self.library_root / "index"
+        self.codec = get_codec()
+        self.legacy_postings = legacy_postings
         self.index_root.mkdir(parents=True, exist_ok=True)
 
-        # v1 indexes（保留）
-        self.by_type = defaultdict(list)
-        self.by_source = defaultdict(list)
-        self.by_day = defaultdict(list)
+        # v2 stats（含 v3 checkpoint）
+        self.stats = self._load_stats()
+
+        # offset postings（尚未 commit 的部分在 flush 時 commit）
+        self.postings = PostingIndex(self.index_root)
+        self._dirty = False
 
-        # v2 stats（新增）
-        self.stats = {
-            "files": {},        # per-file stats
-            "summary": {        # overall stats
-                "total_events": 0,
-                "total_files": 0,
-            }
-        }
     # --------------------------------------------------
     # 主入口
     # --------------------------------------------------
-    def build(self):
+    def build(self, *, full: bool = False) -> int:
         """
-        全量掃描 events 目錄，重建 index
+        增量掃描 events 目錄（full=True → 全部重建）
+        回傳：這次新索引的事件數
         """
-        for path in self._iter_event_files():
-            self._index_file(path)
+        if self.postings.needs_rebuild:
+            print("[LibraryIndex] ♻ postings.sqlite schema is outdated (hourly / file identity / hour columns) → full rebuild")
+            full = True
+            self.postings.needs_rebuild = False
+        if full:
+            for day in list(self.stats["files"]):
+                self._drop_day(day)
 
-    # --------------------------------------------------
-    # 掃描 events
-    # --------------------------------------------------
-    def _iter_event_files(self):
-        """
-        events/YYYY/MM/YYYY-MM-DD.jsonl
-        """
-        if not self.events_root.exists():
-            return
+        indexed = 0
+        seen = set()
+        self._posted_days = self.postings.files()      # day → (file_id, path, indexed_end, ino, size, mtime_ns)
+        for day, path in self._iter_event_files():
+            seen.add(day)
+            indexed += self._index_file(day, path)
 
-        for year_dir in self.events_root.iterdir():
-            if not year_dir.is_dir():
-                continue
+        # 檔案被刪掉 → 該日索引一起移除
+        for day in list(self.stats["files"]):
+            if day not in seen:
+                self._drop_day(day)
 
-            for month_dir in year_dir.iterdir():
-                if not month_dir.is_dir():
-                    continue
+        if self._dirty:
+            self._update_summary()
+        return indexed
 
-                for file in month_dir.glob("*.jsonl"):
-                    yield file
+    def watch(
+        self,
+        interval_sec: float = 5.0,
+        *,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        """持續增量更新：每 interval_sec 秒 build()，有變化才 flush()"""
+        stop_event = stop_event or threading.Event()
+        print(f"[LibraryIndex] 👀 watching {self.events_root} (every {interval_sec}s)")
+        while not stop_event.is_set():
+            try:
+                n = self.build()
+                if self._dirty:
+                    self.flush()
+                    if n:
+                        print(f"[LibraryIndex] ➕ indexed {n} new events")
+            except Exception as e:
+                print(f"[LibraryIndex] ❌ watch error: {e}")
+            stop_event.wait(interval_sec)
 
     # --------------------------------------------------
-    # 索引單一檔案
+    # 掃描 events
     # --------------------------------------------------
-    def _index_file(self, path: Path):
-        day = path.stem  # YYYY-MM-DD
+    def _iter_event_files(self) -> Iterator[tuple]:
+        """events/YYYY/MM/YYYY-MM-DD.jsonl（.jsonl.zst / .jsonl.gz 同樣索引；同一天只取一個檔）"""
+        return _iter_day_files(self.events_root)
+
+    # --------------------------------------------------
+    # 索引單一檔案（增量）
+    # --------------------------------------------------
+    def _index_file(self, day: str, path: Path) -> int:
+        st = path.stat()
+        cp = self.stats["files"].get(day)
+
+        if cp is not None and "offset" in cp and cp.get("path") == str(path):
+            posted = day in self._posted_days or compression_of(path) is not None
+            if posted and cp.get("size_bytes") == st.st_size and cp.get("mtime_ns") == st.st_mtime_ns:
+                return 0    # 沒變
 
-        file_stat = {
+            offset = cp.get("offset", 0)
+            if (
+                compression_of(path) is None
+                and posted
+                and st.st_size > cp.get("size_bytes", 0)
+                and _is_line_start(path, offset)
+            ):
+                return self._index_range(day, path, st, cp, offset)
+
+        # 新檔 / 被截斷 / 被換掉 → 該日重建（沒有 checkpoint 也清掉 DB 裡的舊彙總，避免重複累加）
+        self._drop_day(day)
+        cp = self.stats["files"][day] = {
             "path": str(path),
             "count": 0,
-            "size_bytes": path.stat().st_size,
+            "size_bytes": 0,
             "first_ts": None,
             "last_ts": None,
+            "offset": 0,
+            "mtime_ns": 0,
+            "types": {},
+            "sources": {},
         }
+        return self._index_range(day, path, st, cp, 0)
+
+    def _iter_new_lines(self, path: Path, offset: int, cp: dict) -> Iterator[tuple]:
+        """checkpoint 之後的完整行 (offset, line)；順便推進 cp["offset"]"""
+        if compression_of(path):
+            # 壓縮檔是封存後的完整檔，一次讀完（沒有可 seek 的 offset）
+            for line in iter_text_lines(path):
+                yield None, line.encode("utf-8")
+            cp["offset"] = path.stat().st_size
+            return
 
-        with open(path, "r", encoding="utf-8") as f:
+        with open(path, "rb") as f:
+            f.seek(offset)
             for line in f:
-                try:
-                    record = json.loads(line)
-                except Exception:
-                    continue
-
-                eid = record.get("event_id")
-                etype = record.get("event_type")
-                source = record.get("source")
-
-                # ✅ v2：支援多種時間欄位
-                ts = None
-                for key in ("timestamp", "ts", "time"):
-                    if key in record and record[key]:
-                        ts = record[key]
-                        break
-
-                # ---- v1 行為（保留）----
-                if eid:
-                    self.by_day[day].append(eid)
-                if etype:
-                    self.by_type[etype].append(eid)
-                if source:
-                    self.by_source[source].append(eid)
-
-                # ---- v2 stats ----
-                file_stat["count"] += 1
-                self.stats["summary"]["total_events"] += 1
-
-                if ts:
-                    if file_stat["first_ts"] is None:
-                        file_stat["first_ts"] = ts
-                    file_stat["last_ts"] = ts
-
-        self.stats["files"][day] = file_stat
-        self.stats["summary"]["total_files"] += 1
+                if not line.endswith(b"\n"):
+                    break       # writer 寫到一半的最後一行 → 下次再讀
+                yield offset, line
+                offset += len(line)
+                cp["offset"] = offset
+
+    def _index_range(self, day: str, path: Path, st: os.stat_result, cp: dict, offset: int) -> int:
+        types = cp.setdefault("types", {})
+        sources = cp.setdefault("sources", {})
+        loads = self.codec.loads
+        add_postings = self.postings.add
+        postings = []
+        hourly: Dict[tuple, list] = {}
+        # stats.json 的 checkpoint 落後 DB（上次 commit 之後、寫 stats 之前當機）→ 重讀的行不再累加彙總
+        hourly_from = self._posted_days[day][2] if offset and day in self._posted_days else 0
+        n = 0
+
+        if compression_of(path):
+            self.postings.drop_day(day)     # 壓縮檔 → 讀取端整檔掃
+
+        for off, line in self._iter_new_lines(path, offset, cp):
+            try:
+                record = loads(line)
+            except Exception:
+                continue
+            if not isinstance(record, dict):
+                continue
+
+            etype = record.get("event_type") or record.get("type")
+            source = record.get("source")
+
+            # ✅ v2：支援多種時間欄位
+            ts = None
+            for key in ("timestamp", "ts", "time"):
+                if key in record and record[key]:
+                    ts = record[key]
+                    break
+
+            if etype:
+                types[etype] = types.get(etype, 0) + 1
+            if source:
+                sources[source] = sources.get(source, 0) + 1
+
+            # ---- 每小時彙總 ----
+            if off is None or off >= hourly_from:
+                epoch = record_ts(record)
+                key = (int(epoch // 3600 * 3600) if epoch is not None else -1, etype, source)
+                c = hourly.get(key)
+                if c is None:
+                    hourly[key] = [1, epoch, epoch]
+                else:
+                    c[0] += 1
+                    if epoch is not None:
+                        if c[1] is None or epoch < c[1]:
+                            c[1] = epoch
+                        if c[2] is None or epoch > c[2]:
+                            c[2] = epoch
+
+            # ---- v3 offset postings ----
+            if off is not None:
+                postings.append((off, len(line), etype, source, hour_of(ts)))
+                if len(postings) >= 50_000:
+                    add_postings(day, str(path), postings, off + len(line), st)
+                    postings = []
+
+            # ---- v2 stats ----
+            n += 1
+            if ts:
+                if cp["first_ts"] is None:
+                    cp["first_ts"] = ts
+                cp["last_ts"] = ts
+
+        if compression_of(path) is None:
+            add_postings(day, str(path), postings, cp["offset"], st)
+        if hourly:
+            self.postings.add_hourly(day, hourly)
+
+        cp["count"] += n
+        cp["size_bytes"] = st.st_size
+        cp["mtime_ns"] = st.st_mtime_ns
+        self._dirty = True
+        return n
+
+    def _drop_day(self, day: str) -> None:
+        self.stats["files"].pop(day, None)
+        self.postings.drop_day(day)
+        self._dirty = True
+
+    def _update_summary(self) -> None:
+        files = self.stats["files"]
+        types: Dict[str, int] = defaultdict(int)
+        sources: Dict[str, int] = defaultdict(int)
+        for info in files.values():
+            for k, v in info.get("types", {}).items():
+                types[k] += v
+            for k, v in info.get("sources", {}).items():
+                sources[k] += v
+        self.stats["summary"] = {
+            "total_events": sum(info.get("count", 0) for info in files.values()),
+            "total_files": len(files),
+            "types": dict(types),
+            "sources": dict(sources),
+        }
 
     # --------------------------------------------------
     # 寫出 index
     # --------------------------------------------------
     def flush(self):
-        self._write("by_type.json", self.by_type)
-        self._write("by_source.json", self.by_source)
-        self._write("by_day.json", self.by_day)
+        if not self._dirty and (self.index_root / "stats.json").exists():
+            return
+
+        # 1) postings 先 commit、stats（含 checkpoint）後寫：中途當機 → 下次從舊 checkpoint 重讀，
+        #    同一個 offset 的 posting 會被覆蓋（主鍵），不會重複
+        self.postings.commit()
         self._write("stats.json", self.stats)
 
+        # 2) v1 event_id 清單（需要時才寫，成本與全庫大小成正比）
+        if self.legacy_postings:
+            by_type, by_source, by_day = defaultdict(list), defaultdict(list), defaultdict(list)
+            for day, path in self._iter_event_files():
+                for line in iter_text_lines(path):
+                    try:
+                        record = self.codec.loads(line)
+                    except Exception:
+                        continue
+                    if not isinstance(record, dict):
+                        continue
+                    eid = record.get("event_id")
+                    if eid:
+                        by_day[day].append(eid)
+                    if record.get("event_type"):
+                        by_type[record["event_type"]].append(eid)
+                    if record.get("source"):
+                        by_source[record["source"]].append(eid)
+            self._write("by_type.json", by_type)
+            self._write("by_source.json", by_source)
+            self._write("by_day.json", by_day)
+
+        self._dirty = False
+
     def _write(self, name: str, data: Dict[str, Any]):
         path = self.index_root / name
-        with open(path, "w", encoding="utf-8") as f:
+        tmp = path.with_name(name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
 
         print(f"[LibraryIndex] 🧭 wrote {path}")
+
+    # --------------------------------------------------
+    # 讀取
+    # --------------------------------------------------
+    def _load_stats(self) -> Dict[str, Any]:
+        path = self.index_root / "stats.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stats = json.load(f)
+            if isinstance(stats.get("files"), dict):
+                stats.setdefault("summary", {"total_events": 0, "total_files": 0})
+                return stats
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[LibraryIndex] ⚠ stats.json unreadable, rebuilding: {e}")
+
+        return {
+            "files": {},        # per-file stats + checkpoint
+            "summary": {        # overall stats
+                "total_events": 0,
+                "total_files": 0,
+            }
+        }
@@ -0,0 +1,342 @@
+# library/index/posting_index.py
+"""
+PostingIndex — Library 的 offset postings（SQLite，index/postings.sqlite）
+
+    postings(file_id, offset, length, type_id, source_id, hour_of_day)   ← 一筆事件一列
+
+- type / source 存成 terms 表的整數 id；hour_of_day = 事件時間的小時（0-23，依字串本身時區）
+- (file_id, offset) 是主鍵：同一段被重複索引（flush 中途當機）→ INSERT OR REPLACE，不會重複
+- files.indexed_end：該檔已索引到的 byte；之後 append 的尾巴由讀取端自己掃
+- files.ino / size / mtime_ns：索引時的檔案身分；讀取端開檔後比對，檔案被換掉 / 原地改寫 → 整檔掃
+- 只索引未壓縮的 .jsonl（壓縮檔沒有可 seek 的 byte offset → 讀取端整檔掃）
+
+    hourly(day, epoch_hour, type_id, source_id, count, first_ts, last_ts)  ← 每小時預先彙總
+
+- epoch_hour = 事件時間（epoch）所在的 UTC 整點（epoch 秒）；沒有時間 → -1；沒有 type / source → id 0
+- 壓縮的日也有 hourly（只是沒有 postings）→ LibraryReader.aggregate 完全不碰 events/
+- 舊版索引（沒有 hourly 表 / files 沒有檔案身分欄位）→ needs_rebuild，LibraryIndex.build() 會整庫重建一次
+- hour 欄位改名前的索引（postings.hour / hourly.hour 同名不同義）→ 寫入端丟掉重建；唯讀端當作沒有索引
+
+寫入端：LibraryIndex（單一 writer）；讀取端：LibraryReader（唯讀連線，WAL 下可同時讀）
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+POSTINGS_DB = "postings.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id          INTEGER PRIMARY KEY,
+    day         TEXT UNIQUE NOT NULL,
+    path        TEXT NOT NULL,
+    indexed_end INTEGER NOT NULL DEFAULT 0,
+    ino         INTEGER,
+    size        INTEGER,
+    mtime_ns    INTEGER
+);
+CREATE TABLE IF NOT EXISTS terms (
+    id   INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (kind, name)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    file_id   INTEGER NOT NULL,
+    offset    INTEGER NOT NULL,
+    length    INTEGER NOT NULL,
+    type_id   INTEGER,
+    source_id INTEGER,
+    hour_of_day INTEGER,
+    PRIMARY KEY (file_id, offset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_type   ON postings (type_id, file_id, offset);
+CREATE INDEX IF NOT EXISTS postings_source ON postings (source_id, file_id, offset);
+CREATE TABLE IF NOT EXISTS hourly (
+    day        TEXT    NOT NULL,
+    epoch_hour INTEGER NOT NULL,
+    type_id    INTEGER NOT NULL,
+    source_id  INTEGER NOT NULL,
+    count      INTEGER NOT NULL,
+    first_ts   REAL,
+    last_ts    REAL,
+    PRIMARY KEY (day, epoch_hour, type_id, source_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hourly_epoch_hour ON hourly (epoch_hour);
+"""
+
+# group_by 名稱 → SQL 欄位
+AGG_COLUMNS = {"day": "h.day", "hour": "h.epoch_hour", "type": "t.name", "source": "s.name"}
+
+# files 表後來加上的欄位（舊 DB 用 ALTER TABLE 補）
+_FILE_IDENTITY = ("ino", "size", "mtime_ns")
+
+# (file_id, path, indexed_end, ino, size, mtime_ns)
+FileEntry = Tuple[int, str, int, Optional[int], Optional[int], Optional[int]]
+
+# (offset, length, type, source, hour_of_day)
+Posting = Tuple[int, int, Optional[str], Optional[str], Optional[int]]
+
+# (UTC 整點 epoch 或 -1, type, source) → [count, first_ts, last_ts]
+HourKey = Tuple[int, Optional[str], Optional[str]]
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _legacy_hour_columns(conn: sqlite3.Connection) -> bool:
+    """postings / hourly 還是舊的 hour 欄位（改名為 hour_of_day / epoch_hour 之前）"""
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return (
+        ("postings" in tables and "hour_of_day" not in _columns(conn, "postings"))
+        or ("hourly" in tables and "epoch_hour" not in _columns(conn, "hourly"))
+    )
+
+
+def hour_of(ts) -> Optional[int]:
+    """ISO 字串取小時（不建 datetime）；格式不符 → None"""
+    if isinstance(ts, str) and len(ts) >= 13 and ts[10] in "T " and ts[11:13].isdigit():
+        return int(ts[11:13])
+    return None
+
+
+class PostingIndex:
+    def __init__(self, index_root: Path | str, *, readonly: bool = False):
+        self.path = Path(index_root) / POSTINGS_DB
+        self.readonly = readonly
+        self.needs_rebuild = False
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{self.path.as_posix()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            tables = {r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            # 舊版索引有 postings、沒有 hourly → 彙總缺資料，要整庫重建
+            self.needs_rebuild = "files" in tables and "hourly" not in tables
+            # hour 欄位改名前的索引 → 兩張表丟掉重建（files 由整庫重建的 drop_day 清掉）
+            if _legacy_hour_columns(self.conn):
+                self.conn.executescript("DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS hourly;")
+                self.needs_rebuild = True
+            self.conn.executescript(_SCHEMA)
+            # 舊版 files 沒有檔案身分 → 補欄位；既有的日沒有身分可比對，整庫重建一次
+            columns = _columns(self.conn, "files")
+            for col in _FILE_IDENTITY:
+                if col not in columns:
+                    self.conn.execute(f"ALTER TABLE files ADD COLUMN {col} INTEGER")
+                    self.needs_rebuild = True
+        self._terms: Dict[Tuple[str, str], int] = {}
+
+    @classmethod
+    def open_readonly(cls, index_root: Path | str) -> Optional["PostingIndex"]:
+        """沒有索引檔 → None"""
+        if not (Path(index_root) / POSTINGS_DB).exists():
+            return None
+        try:
+            index = cls(index_root, readonly=True)
+            if _legacy_hour_columns(index.conn):
+                index.close()
+                print("[PostingIndex] ⚠ index predates hour_of_day / epoch_hour columns → run LibraryIndex.build()")
+                return None
+            return index
+        except sqlite3.Error as e:
+            print(f"[PostingIndex] ⚠ cannot open index: {e}")
+            return None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # -------------------------------------------------
+    # 寫入（LibraryIndex）
+    # -------------------------------------------------
+    def _term_id(self, kind: str, name: Optional[str]) -> Optional[int]:
+        if name is None:
+            return None
+        key = (kind, name)
+        tid = self._terms.get(key)
+        if tid is None:
+            self.conn.execute("INSERT OR IGNORE INTO terms (kind, name) VALUES (?, ?)", key)
+            tid = self.conn.execute(
+                "SELECT id FROM terms WHERE kind = ? AND name = ?", key
+            ).fetchone()[0]
+            self._terms[key] = tid
+        return tid
+
+    def _file_id(self, day: str, path: str) -> int:
+        row = self.conn.execute("SELECT id, path FROM files WHERE day = ?", (day,)).fetchone()
+        if row is None:
+            return self.conn.execute(
+                "INSERT INTO files (day, path) VALUES (?, ?)", (day, path)
+            ).lastrowid
+        if row[1] != path:
+            self.conn.execute("UPDATE files SET path = ? WHERE id = ?", (path, row[0]))
+        return row[0]
+
+    def add(
+        self,
+        day: str,
+        path: str,
+        postings: Iterable[Posting],
+        indexed_end: int,
+        st: Optional[os.stat_result] = None,
+    ) -> None:
+        """st：索引時的檔案 stat（讀取端用來確認 postings 還屬於同一個檔案）"""
+        fid = self._file_id(day, path)
+        term = self._term_id
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (fid, off, length, term("type", t), term("source", s), hour_of_day)
+                for off, length, t, s, hour_of_day in postings
+            ),
+        )
+        if st is None:
+            self.conn.execute("UPDATE files SET indexed_end = ? WHERE id = ?", (indexed_end, fid))
+        else:
+            self.conn.execute(
+                "UPDATE files SET indexed_end = ?, ino = ?, size = ?, mtime_ns = ? WHERE id = ?",
+                (indexed_end, st.st_ino, st.st_size, st.st_mtime_ns, fid),
+            )
+
+    def add_hourly(self, day: str, counters: Dict[HourKey, list]) -> None:
+        """累加該日的每小時彙總（與 add() 同一個 transaction，flush 時一起 commit）"""
+        term = self._term_id
+        self.conn.executemany(
+            """
+            INSERT INTO hourly VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, epoch_hour, type_id, source_id) DO UPDATE SET
+                count    = count + excluded.count,
+                first_ts = min(coalesce(first_ts, excluded.first_ts), coalesce(excluded.first_ts, first_ts)),
+                last_ts  = max(coalesce(last_ts, excluded.last_ts), coalesce(excluded.last_ts, last_ts))
+            """,
+            (
+                (day, epoch_hour, term("type", t) or 0, term("source", s) or 0, c, lo, hi)
+                for (epoch_hour, t, s), (c, lo, hi) in counters.items()
+            ),
+        )
+
+    def drop_day(self, day: str) -> None:
+        self.conn.execute("DELETE FROM hourly WHERE day = ?", (day,))
+        self.drop_postings(day)
+
+    def drop_postings(self, day: str) -> None:
+        """只丟 offset postings（hourly 保留）：檔案要被換掉時，讀取端先退回整檔掃"""
+        row = self.conn.execute("SELECT id FROM files WHERE day = ?", (day,)).fetchone()
+        if row is not None:
+            self.conn.execute("DELETE FROM postings WHERE file_id = ?", (row[0],))
+            self.conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    # -------------------------------------------------
+    # 查詢（LibraryReader）
+    # -------------------------------------------------
+    def files(self) -> Dict[str, FileEntry]:
+        """day → (file_id, path, indexed_end, ino, size, mtime_ns)；舊版 DB（還沒補欄位）→ {}（整檔掃）"""
+        try:
+            rows = self.conn.execute(
+                "SELECT id, day, path, indexed_end, ino, size, mtime_ns FROM files"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return {}
+        return {day: (fid, path, end, ino, size, mtime) for fid, day, path, end, ino, size, mtime in rows}
+
+    def term_ids(self, kind: str, names: Sequence[str]) -> List[int]:
+        if not names:
+            return []
+        marks = ",".join("?" * len(names))
+        return [
+            r[0] for r in self.conn.execute(
+                f"SELECT id FROM terms WHERE kind = ? AND name IN ({marks})", (kind, *names)
+            )
+        ]
+
+    def iter_offsets(
+        self,
+        file_id: int,
+        *,
+        types: Optional[Sequence[str]] = None,
+        sources: Optional[Sequence[str]] = None,
+        hours: Optional[Sequence[int]] = None,
+    ) -> Optional[Tuple[int, Iterator[Tuple[int, int]]]]:
+        """
+        一個檔案內符合條件的 (offset, length)，依 offset 排序 → (indexed_end, offsets)
+        files 列與 postings 在同一個 SELECT（同一個 snapshot）：
+            該檔的 postings 已被丟掉（compaction 換檔中）→ None；indexed_end 與 offsets 一致（尾巴不會重複讀）
+        """
+        where = ["file_id = ?"]
+        args: list = [file_id]
+        for col, kind, names in (("type_id", "type", types), ("source_id", "source", sources)):
+            if names is None:
+                continue
+            ids = self.term_ids(kind, list(names))
+            if not ids:
+                where.append("0")       # 這個 type / source 從沒出現過
+                break
+            where.append(f"{col} IN ({','.join('?' * len(ids))})")
+            args.extend(ids)
+        if hours is not None:
+            hours = list(hours)
+            where.append(f"hour_of_day IN ({','.join('?' * len(hours))})")
+            args.extend(hours)
+
+        cur = self.conn.execute(
+            "SELECT -1, indexed_end FROM files WHERE id = ?"
+            f" UNION ALL SELECT offset, length FROM postings WHERE {' AND '.join(where)} ORDER BY 1",
+            [file_id, *args],
+        )
+        head = cur.fetchone()
+        if head is None or head[0] != -1:
+            cur.close()
+            return None
+        return head[1], cur
+
+    def aggregate(
+        self,
+        group_by: Sequence[str],
+        *,
+        types: Optional[Sequence[str]] = None,
+        sources: Optional[Sequence[str]] = None,
+        days: Optional[Sequence[str]] = None,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+    ) -> List[tuple]:
+        """
+        hourly 表上的 GROUP BY → [(*group 值, count, first_ts, last_ts)]，依 group 排序
+        時間條件以小時為單位：與 [start_ts, end_ts] 重疊的整點都算進來；有時間條件時排除沒有時間的事件
+        """
+        cols = [AGG_COLUMNS[g] for g in group_by]
+        where: List[str] = []
+        args: list = []
+        for col, values in (("t.name", types), ("s.name", sources), ("h.day", days)):
+            if values is None:
+                continue
+            values = list(values)
+            if not values:
+                return []
+            where.append(f"{col} IN ({','.join('?' * len(values))})")
+            args.extend(values)
+        if start_ts is not None:
+            where.append("h.epoch_hour >= ?")
+            args.append(int(start_ts // 3600 * 3600))
+        if end_ts is not None:
+            where.append("h.epoch_hour >= 0 AND h.epoch_hour <= ?")
+            args.append(end_ts)
+
+        sql = (
+            f"SELECT {', '.join(cols + ['SUM(h.count)', 'MIN(h.first_ts)', 'MAX(h.last_ts)'])} "
+            "FROM hourly h "
+            "LEFT JOIN terms t ON t.id = h.type_id "
+            "LEFT JOIN terms s ON s.id = h.source_id"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if cols:
+            sql += f" GROUP BY {', '.join(cols)} ORDER BY {', '.join(cols)}"
+        return self.conn.execute(sql, args).fetchall()
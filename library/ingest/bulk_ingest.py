@@ -0,0 +1,165 @@
+# library/ingest/bulk_ingest.py
+"""
+Bulk ingest — event_raw 檔 → Library（reader → 平行 decode / 轉換 → 去重 → 批次寫入）
+
+    n = ingest_files([warm_file], ingestor, workers=4)
+
+- reader：分段 log 依序讀每個 segment；大檔依換行切段（mmap split）；壓縮檔整檔一個 task
+- worker：decode + raw → PBEvent → LibraryEvent（與 ReplayEngine 同一份轉換，top-level → 可 pickle）
+- 主 process：依 task 順序收結果 → LibraryIngestor.ingest_library_events（去重 + write_many）
+  同時最多 2 × workers 個 task 在跑 → 寫入與 decode 重疊，記憶體不會整檔堆起來
+- 沒有 "type" 的 raw（要走 PerceptionGateway）→ 原樣送回主 process 交給 convert_raw；沒給就記 errors
+- 資料量小（< inline_bytes）或 workers=1 → 在目前 process 直接做，不開 pool
+"""
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from library.library_event import LibraryEvent
+from library.library_scan import _run_pool
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, iter_text_lines
+from shared_core.event_raw.segment_log import segment_paths
+from shared_core.mmap_jsonl import MmapJsonlReader
+from shared_core.replay.replay_engine import record_to_pbevent
+
+# (path, start, end)；start/end = None → 整檔
+Task = Tuple[str, Optional[int], Optional[int]]
+
+# worker 回傳：(依原順序的 LibraryEvent 或待 gateway 的 raw dict, decode / 轉換失敗筆數)
+Converted = Tuple[List[Union[LibraryEvent, dict]], int]
+
+
+def plan_ingest_tasks(paths: Iterable[Union[str, Path]], *, chunk_bytes: int = 16 << 20) -> List[Task]:
+    tasks: List[Task] = []
+    for path in paths:
+        for seg in segment_paths(Path(path)):
+            if not seg.exists():
+                continue
+            size = seg.stat().st_size
+            if compression_of(seg) or size <= chunk_bytes:
+                tasks.append((str(seg), None, None))
+                continue
+            with MmapJsonlReader(seg) as r:
+                for a, b in r.split(-(-size // chunk_bytes)):
+                    tasks.append((str(seg), a, b))
+    return tasks
+
+
+def convert_task(task: Task) -> Converted:
+    """在 worker 內：decode + 轉成 LibraryEvent"""
+    path, a, b = task
+    loads = get_codec().loads
+    if compression_of(path):
+        lines: Iterator[Any] = iter_text_lines(path)
+    else:
+        lines = _iter_range(path, a, b)
+
+    out: List[Union[LibraryEvent, dict]] = []
+    errors = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            raw = loads(line)
+        except Exception:
+            errors += 1
+            continue
+        if not isinstance(raw, dict):
+            errors += 1
+            continue
+        if "type" not in raw:
+            out.append(raw)
+            continue
+        try:
+            out.append(LibraryEvent.from_pbevent(record_to_pbevent(raw)))
+        except Exception:
+            errors += 1
+    return out, errors
+
+
+def _iter_range(path: str, a: Optional[int], b: Optional[int]) -> Iterator[bytes]:
+    with MmapJsonlReader(path) as r:
+        yield from r.iter_lines(a or 0, b)
+
+
+def ingest_files(
+    paths: Iterable[Union[str, Path]],
+    ingestor,
+    *,
+    workers: Optional[int] = None,
+    chunk_bytes: int = 16 << 20,
+    inline_bytes: int = 32 << 20,
+    limit: Optional[int] = None,
+    convert_raw: Optional[Callable[[dict], Any]] = None,
+) -> int:
+    """
+    ingestor：LibraryIngestor（去重 / 批次寫入 / 統計都在它身上）
+    convert_raw：沒有 "type" 的 raw → PBEvent（通常是 ReplayEngine 的 gateway 轉換）；回 None = 丟棄
+    回傳：讀到並轉換成功的事件數（含重複而跳過的）
+    """
+    t0 = time.perf_counter()
+    stats = ingestor.stats
+    seconds = stats.seconds     # ingest_library_events 自己也計時 → 結束時以整段 wall time 為準（不重複算）
+    tasks = plan_ingest_tasks(paths, chunk_bytes=chunk_bytes)
+    if not tasks:
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    total = sum(os.path.getsize(t[0]) for t in {t[0]: t for t in tasks}.values())
+
+    count = 0
+    try:
+        if workers <= 1 or len(tasks) == 1 or total < inline_bytes:
+            count = _consume((convert_task(t) for t in tasks), ingestor, limit, convert_raw)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                results = _run_pool(pool, tasks, (), True, window=workers * 2, fn=convert_task)
+                try:
+                    count = _consume(results, ingestor, limit, convert_raw)
+                finally:
+                    results.close()
+        ingestor.flush()
+    finally:
+        stats.seconds = seconds + time.perf_counter() - t0
+    return count
+
+
+def _consume(results: Iterable[Converted], ingestor, limit: Optional[int], convert_raw) -> int:
+    stats = ingestor.stats
+    count = 0
+    for items, errors in results:
+        stats.total += errors
+        stats.errors += errors
+        if limit is not None and count + len(items) > limit:
+            items = items[:limit - count]
+
+        events: List[LibraryEvent] = []
+        for item in items:
+            if isinstance(item, dict):
+                item = _from_raw(item, convert_raw)
+                if item is None:
+                    stats.total += 1
+                    stats.errors += 1
+                    continue
+            events.append(item)
+        ingestor.ingest_library_events(events)
+        count += len(events)
+
+        if limit is not None and count >= limit:
+            break
+    return count
+
+
+def _from_raw(raw: dict, convert_raw) -> Optional[LibraryEvent]:
+    if convert_raw is None:
+        return None
+    try:
+        ev = convert_raw(raw)
+        return LibraryEvent.from_pbevent(ev) if ev is not None else None
+    except Exception:
+        return None
@@ -0,0 +1,357 @@
+# library/ingest/dedup.py
+"""
+EventIdFilter — 灌庫去重：每天一個 event_id Bloom filter + 精確確認
+
+    dedup = EventIdFilter(library_root, on_scan=ingestor.flush)
+    if dedup.check_and_add(day, event_id):   # 已在庫內 → 跳過
+        ...
+
+- Bloom 說「沒有」→ 一定沒有（新資料只付一次 hash 的成本）
+- Bloom 說「可能有」→ 讀該日檔案的 event_id 集合精確確認（每天只讀一次，LRU 保留幾天）
+- 已收下但還沒落盤的 id 記在 unflushed；要讀檔確認前先呼叫 on_scan（= ingestor 的 flush）
+- 持久化：index/dedup/<day>.bloom + _state.json（Bloom 已涵蓋到的各日檔案 size / mtime）
+    * 涵蓋範圍在載入 / 重建時記下，之後只依自己寫入的 bytes 推進（wrote）；別的 writer 的 append 不算
+    * 檔案只變大（其他 writer append）→ 只把尾巴的 id 補進 Bloom
+    * 變小 / 被改寫 / 壓縮 → 整天重建
+- Bloom 滿了（count > capacity）→ 依檔案重建成 4 倍容量（誤判率維持 ~1%）
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import COMPRESSION_SUFFIX, compression_of, iter_text_lines
+
+STATE_FILE = "_state.json"
+MIN_CAPACITY = 1 << 14
+FP_RATE = 0.01
+
+# LibraryEvent.to_json() 第一個欄位就是 event_id（stdlib / orjson 兩種分隔）
+_ID_RE = re.compile(rb'\{"event_id": ?"([^"\\]*)"')
+
+
+class BloomFilter:
+    """bytearray 位元陣列；k 個位置由 blake2b 的兩個 64-bit 值 double hashing 產生"""
+
+    def __init__(self, capacity: int, *, fp_rate: float = FP_RATE, bits: Optional[bytearray] = None,
+                 m: Optional[int] = None, k: Optional[int] = None, count: int = 0):
+        self.capacity = max(1, int(capacity))
+        self.m = m or max(64, int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.k = k or max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.m + 7) // 8)
+        self.count = count
+
+    def positions(self, key: str) -> List[int]:
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def add(self, key: str, positions: Optional[List[int]] = None) -> None:
+        bits = self.bits
+        for p in positions or self.positions(key):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def has(self, positions: List[int]) -> bool:
+        bits = self.bits
+        for p in positions:
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return self.has(self.positions(key))
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+    def params(self) -> Dict[str, int]:
+        return {"capacity": self.capacity, "m": self.m, "k": self.k, "count": self.count}
+
+
+# ------------------------------------------------------------------
+# 讀日檔的 event_id
+# ------------------------------------------------------------------
+def day_files(events_root: Path, day: str) -> List[Path]:
+    """該日所有檔案（寫入中的 .jsonl + 封存後的壓縮檔）"""
+    base = events_root / day[:4] / day[5:7] / f"{day}.jsonl"
+    out = [base] if base.exists() else []
+    for suffix in COMPRESSION_SUFFIX.values():
+        p = base.with_name(base.name + suffix)
+        if p.exists():
+            out.append(p)
+    return out
+
+
+def iter_event_ids(path: Path, start: int = 0) -> Iterator[str]:
+    """檔案內每行的 event_id（未壓縮檔可從 start byte 開始）"""
+    loads = get_codec().loads
+    if compression_of(path):
+        for line in iter_text_lines(path):
+            event_id = _line_id(line.encode("utf-8"), loads)
+            if event_id is not None:
+                yield event_id
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        for line in f:
+            event_id = _line_id(line, loads)
+            if event_id is not None:
+                yield event_id
+
+
+def _line_id(line: bytes, loads) -> Optional[str]:
+    """前綴抓不到（有 escape / 舊格式）才整行 decode"""
+    m = _ID_RE.match(line)
+    if m is not None:
+        return m.group(1).decode("utf-8")
+    if not line.strip():
+        return None
+    try:
+        rec = loads(line)
+    except Exception:
+        return None
+    if isinstance(rec, dict) and rec.get("event_id"):
+        return str(rec["event_id"])
+    return None
+
+
+# ------------------------------------------------------------------
+# 每日 event_id 過濾器
+# ------------------------------------------------------------------
+class EventIdFilter:
+    def __init__(
+        self,
+        library_root: Path | str,
+        *,
+        on_scan: Optional[Callable[[], None]] = None,
+        max_exact_days: int = 4,
+    ):
+        self.library_root = Path(library_root)
+        self.events_root = self.library_root / "events"
+        self.root = self.library_root / "index" / "dedup"
+        self.on_scan = on_scan
+        self.max_exact_days = max(1, max_exact_days)
+
+        self._blooms: Dict[str, BloomFilter] = {}
+        self._dirty: Set[str] = set()
+        self._exact: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._unflushed: Dict[str, Set[str]] = {}
+        self._marks: Dict[str, Dict[str, List[int]]] = {}     # day → Bloom 已涵蓋到的檔案 (size, mtime)
+        self._state: Dict[str, dict] = self._load_state()
+
+        self.false_positives = 0
+
+    # -------------------------------------------------
+    # 查詢 / 加入
+    # -------------------------------------------------
+    def contains(self, day: str, event_id: str) -> bool:
+        return self._confirm(day, event_id, self._bloom(day).positions(event_id))
+
+    def add(self, day: str, event_id: str, positions: Optional[List[int]] = None) -> None:
+        bloom = self._bloom(day)
+        if bloom.full:
+            bloom = self._rebuild(day, grow=True)
+            positions = None
+        bloom.add(event_id, positions)
+        self._dirty.add(day)
+        self._unflushed.setdefault(day, set()).add(event_id)
+        exact = self._exact.get(day)
+        if exact is not None:
+            exact.add(event_id)
+
+    def check_and_add(self, day: str, event_id: str) -> bool:
+        """已存在 → True（不加入）；否則加入並回 False。hash 只算一次（灌庫的熱路徑）"""
+        positions = self._bloom(day).positions(event_id)
+        if self._confirm(day, event_id, positions):
+            return True
+        self.add(day, event_id, positions)
+        return False
+
+    def _confirm(self, day: str, event_id: str, positions: List[int]) -> bool:
+        if not self._bloom(day).has(positions):
+            return False
+        if event_id in self._unflushed.get(day, ()):
+            return True
+        if event_id in self._exact_ids(day):
+            return True
+        self.false_positives += 1
+        return False
+
+    def flushed(self) -> None:
+        """呼叫端已把收下的事件寫進檔案"""
+        self._unflushed.clear()
+
+    def wrote(self, day: str, name: str, end: int, nbytes: int) -> None:
+        """
+        呼叫端自己 append 了 [end - nbytes, end)（LibraryWriter.append_many）→ Bloom 涵蓋範圍跟著推進
+        前面夾了別人寫的資料（或檔案不是 Bloom 看過的那個）→ 不推進，下次載入時從舊位置補讀
+        """
+        marks = self._marks.get(day)
+        if marks is None:
+            return
+        prev = marks.get(name)
+        start = end - nbytes
+        if (prev[0] if prev is not None else 0) != start:
+            return
+        try:
+            st = (self._day_dir(day) / name).stat()
+        except FileNotFoundError:
+            return
+        # 之後又有別人 append → mtime 記 0：下次載入一定會從 end 補讀
+        marks[name] = [end, st.st_mtime_ns if st.st_size == end else 0]
+
+    def discard(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """寫入失敗：這些 (day, event_id) 沒有落盤（Bloom 不能刪 → 之後靠精確確認放行）"""
+        for day, event_id in pairs:
+            self._unflushed.get(day, set()).discard(event_id)
+            exact = self._exact.get(day)
+            if exact is not None:
+                exact.discard(event_id)
+
+    # -------------------------------------------------
+    # Bloom：載入 / 同步 / 重建
+    # -------------------------------------------------
+    def _bloom(self, day: str) -> BloomFilter:
+        bloom = self._blooms.get(day)
+        if bloom is not None:
+            return bloom
+
+        entry = self._state.get(day)
+        path = self.root / f"{day}.bloom"
+        if entry is not None and path.exists():
+            try:
+                bloom = BloomFilter(
+                    entry["capacity"], bits=bytearray(path.read_bytes()),
+                    m=entry["m"], k=entry["k"], count=entry["count"],
+                )
+                if len(bloom.bits) != (bloom.m + 7) // 8:
+                    bloom = None
+            except (KeyError, OSError, TypeError):
+                bloom = None
+
+        if bloom is None:
+            return self._rebuild(day)
+
+        # 上次存檔之後，檔案被別的 writer 追加 / 改寫過？
+        old = entry.get("files") or {}
+        now = self._file_marks(day)
+        if now == old:
+            self._blooms[day] = bloom
+            self._marks[day] = now
+            return bloom
+        tails = []
+        for name, (size, _) in now.items():
+            prev = old.get(name)
+            if prev == now[name]:
+                continue
+            if prev is None or compression_of(name) or size < prev[0]:
+                return self._rebuild(day)
+            tails.append((name, prev[0]))
+        if set(old) - set(now):
+            return self._rebuild(day)
+
+        self._blooms[day] = bloom
+        self._marks[day] = now          # 先記再讀：讀到 now 之後才 append 的行也無妨（下次再加一次）
+        for name, start in tails:
+            for event_id in iter_event_ids(self._day_dir(day) / name, start):
+                bloom.add(event_id)
+        self._dirty.add(day)
+        if bloom.full:
+            return self._rebuild(day, grow=True)
+        return bloom
+
+    def _rebuild(self, day: str, *, grow: bool = False) -> BloomFilter:
+        """依檔案（+ 還沒落盤的 id）重建；grow → 容量 ×4"""
+        ids, marks = self._scan_ids(day)
+        old = self._blooms.get(day)
+        capacity = max(MIN_CAPACITY, 2 * len(ids))
+        if grow and old is not None:
+            capacity = max(capacity, old.capacity * 4)
+        bloom = BloomFilter(capacity)
+        for event_id in ids:
+            bloom.add(event_id)
+        self._blooms[day] = bloom
+        self._marks[day] = marks
+        self._dirty.add(day)
+        return bloom
+
+    def _exact_ids(self, day: str) -> Set[str]:
+        exact = self._exact.get(day)
+        if exact is not None:
+            self._exact.move_to_end(day)
+            return exact
+        exact, _ = self._scan_ids(day)
+        self._exact[day] = exact
+        while len(self._exact) > self.max_exact_days:
+            self._exact.popitem(last=False)
+        return exact
+
+    def _scan_ids(self, day: str) -> Tuple[Set[str], Dict[str, List[int]]]:
+        """
+        讀檔前先讓呼叫端落盤 → 檔案 = 全部已收下的 id
+        回傳 (ids, 讀檔前的檔案 marks)：marks 之後才 append 的行可能也讀到了，只會多不會少
+        """
+        if self._unflushed.get(day) and self.on_scan is not None:
+            self.on_scan()
+        marks = self._file_marks(day)
+        ids: Set[str] = set()
+        for path in day_files(self.events_root, day):
+            ids.update(iter_event_ids(path))
+        ids.update(self._unflushed.get(day, ()))
+        return ids, marks
+
+    # -------------------------------------------------
+    # 持久化
+    # -------------------------------------------------
+    def _day_dir(self, day: str) -> Path:
+        return self.events_root / day[:4] / day[5:7]
+
+    def _file_marks(self, day: str) -> Dict[str, List[int]]:
+        out = {}
+        for path in day_files(self.events_root, day):
+            st = path.stat()
+            out[path.name] = [st.st_size, st.st_mtime_ns]
+        return out
+
+    def _load_state(self) -> Dict[str, dict]:
+        try:
+            with open(self.root / STATE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self) -> int:
+        """把有變動的日寫回 index/dedup/；回傳寫了幾天（呼叫端應先落盤）"""
+        if not self._dirty:
+            return 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        dirty, self._dirty = self._dirty, set()
+        for day in sorted(dirty):
+            bloom = self._blooms.get(day)
+            if bloom is None:
+                continue
+            path = self.root / f"{day}.bloom"
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(bytes(bloom.bits))
+            os.replace(tmp, path)
+            # Bloom 實際涵蓋到的位置（不是現在的檔案大小：別的 writer 之後 append 的還沒加進來）
+            self._state[day] = {**bloom.params(), "files": self._marks.get(day, {})}
+
+        path = self.root / STATE_FILE
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, path)
+        return len(dirty)
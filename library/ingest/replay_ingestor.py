@@ -1,64 +1,157 @@
 # library/library_ingestor.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, Any
+import atexit
+import time
+from typing import Optional, Any, Iterable, List
 from pathlib import Path
 
 from library.library_event import LibraryEvent
-from library.library_writer import LibraryWriter
+from library.library_writer import LibraryWriter, day_of
+from library.ingest.dedup import EventIdFilter
 
 
 @dataclass
 class LibraryIngestStats:
-    def __init__(self):
-        self.total = 0
-        self.ok = 0
-        self.errors = 0
+    total: int = 0                  # 收到的事件（含失敗 / 重複）
+    ok: int = 0                     # 已寫入 Library
+    errors: int = 0                 # decode / 轉換 / 寫入失敗
+    duplicates: int = 0             # 已在庫內 → 跳過
+    bloom_false_positives: int = 0  # Bloom 說可能有、精確確認沒有
+    seconds: float = 0.0            # 花在灌庫上的時間（吞吐量用）
 
     def snapshot(self):
         return {
             "total": self.total,
             "ok": self.ok,
             "errors": self.errors,
+            "duplicates": self.duplicates,
+            "bloom_false_positives": self.bloom_false_positives,
+            "seconds": round(self.seconds, 3),
+            "events_per_sec": round(self.total / self.seconds, 1) if self.seconds > 0 else 0.0,
         }
 
 
 
 class LibraryIngestor:
     """
-    LibraryIngestor v1 (Full Capability, Clean Responsibility)
+    LibraryIngestor v2 (Full Capability, Clean Responsibility)
 
     職責：
     - 接收 PBEvent / PBEvent-like
     - 轉換為 LibraryEvent
-    - 寫入 LibraryWriter
-    - 收集 ingest 統計資訊
+    - 去重：同一個 event_id 已在該日檔案 → 跳過（EventIdFilter：Bloom + 精確確認）
+    - 寫入 LibraryWriter（攢滿 batch_size 筆走一次 write_many）
+    - 收集 ingest 統計資訊（吞吐量 / 重複 / 錯誤）
 
     ❌ 不碰 EventBus
     ❌ 不處理 replay 時間
     ❌ 不知道 ReplayEngine / Runtime
+
+    ⚠ 批次模式下，最後不滿一批的事件要呼叫 flush() / close() 才會落盤
+      （ReplayEngine.replay 結束或中途出錯時會自動呼叫；process 結束時 atexit 也會 close；
+        flush() 同時把 Bloom 存回 index/dedup/）
+    ⚠ 沒有 event_id 的事件 PBEvent 會現場產生新 id → 無法去重
     """
 
-    def __init__(self, writer: LibraryWriter):
+    def __init__(self, writer: LibraryWriter, batch_size: int = 1000, *, dedup: bool = True):
         self.writer = writer
         self.stats = LibraryIngestStats()
+        self.batch_size = max(1, batch_size)
+        self._pending: List[LibraryEvent] = []
+        self.dedup: Optional[EventIdFilter] = (
+            EventIdFilter(writer.library_root, on_scan=lambda: self.flush(checkpoint=False))
+            if dedup else None
+        )
+        atexit.register(self.close)
 
     def ingest_event(self, ev: Any) -> bool:
         """
         ev: PBEvent 或具有 event_id / event_type / ts / source / payload / meta 的物件
-        return: 是否成功寫入
+        return: 是否「收下」—— 不是「已寫入」
+            True  → 已放進批次（攢滿 batch_size 或 flush() / close() 時才 write_many；
+                    寫入失敗記進 stats.errors，這裡已經回過 True）
+            False → 轉換失敗或重複（已在庫內 / 同一批內）
+        舊版（逐筆 write_event）回傳的是「是否成功寫入」
         """
+        t0 = time.perf_counter()
         self.stats.total += 1
 
         try:
             lib_event = LibraryEvent.from_pbevent(ev)
-            self.writer.write_event(lib_event)
-            self.stats.ok += 1
-            return True
-
+            accepted = self._accept(lib_event)
         except Exception:
             self.stats.errors += 1
-            return False
+            accepted = False
+
+        self.stats.seconds += time.perf_counter() - t0
+        return accepted
+
+    def ingest_library_events(self, events: Iterable[LibraryEvent]) -> int:
+        """已轉換好的 LibraryEvent（bulk pipeline 用）；回傳收下的筆數"""
+        t0 = time.perf_counter()
+        n = 0
+        for ev in events:
+            self.stats.total += 1
+            try:
+                n += self._accept(ev)
+            except Exception:
+                self.stats.errors += 1
+        self.stats.seconds += time.perf_counter() - t0
+        return n
+
+    def ingest_file(self, path, **kwargs) -> int:
+        """
+        整檔灌庫（reader → 平行 decode / 轉換 → 去重 → 批次寫入），見 library/ingest/bulk_ingest.py
+        回傳：讀到的事件數（含重複而跳過的）
+        """
+        from library.ingest.bulk_ingest import ingest_files
+
+        return ingest_files([path], self, **kwargs)
+
+    def _accept(self, lib_event: LibraryEvent) -> bool:
+        if self.dedup is not None and lib_event.event_id:
+            if self.dedup.check_and_add(day_of(lib_event.ts), lib_event.event_id):
+                self.stats.duplicates += 1
+                return False
+
+        self._pending.append(lib_event)
+        if len(self._pending) >= self.batch_size:
+            self.flush(checkpoint=False)
+        return True
+
+    def flush(self, checkpoint: bool = True) -> None:
+        """
+        pending → write_many
+        checkpoint=True：另外把 Bloom 存回 index/dedup/（批次中途不存，結束時存一次）
+        """
+        pending, self._pending = self._pending, []
+        if pending:
+            try:
+                spans = self.writer.append_many(pending)
+                self.stats.ok += len(pending)
+                if self.dedup is not None:
+                    for day, (path, end, nbytes) in spans.items():
+                        self.dedup.wrote(day, path.name, end, nbytes)
+            except Exception:
+                self.stats.errors += len(pending)
+                if self.dedup is not None:
+                    self.dedup.discard((day_of(e.ts), e.event_id) for e in pending)
+            if self.dedup is not None:
+                self.dedup.flushed()
+
+        if checkpoint and self.dedup is not None:
+            try:
+                self.dedup.save()
+            except OSError as e:
+                print(f"[LibraryIngestor] ⚠ dedup checkpoint failed: {e}")
+
+    def close(self) -> None:
+        """落盤剩下的批次 + 存 Bloom（atexit 也會呼叫；可重複呼叫）"""
+        self.flush()
+        atexit.unregister(self.close)
 
     def get_stats(self):
+        if self.dedup is not None:
+            self.stats.bloom_false_positives = self.dedup.false_positives
         return self.stats.snapshot()
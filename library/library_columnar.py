@@ -0,0 +1,596 @@
+# aisop/library/library_columnar.py
+"""
+Library columnar mirror — 依 (event_type, day) 分區的欄式副本，給分析 / 學習 / dataset 用
+
+    library_root/columnar/
+        _state.json                                      ← 每個 day 檔同步到哪個 byte
+        event_type=market.kline/day=2026-01-01/part-000001.parquet
+        event_type=governance.decision/day=2026-01-01/part-000001.parquet
+
+- 欄位：event_id / event_type / source / ts / ts_epoch + 攤平的 payload（巢狀 key 用 "."）
+  meta 攤平成 "meta.*"；list 存成 JSON 字串；market.kline.batch 一根 K 線一列
+- sync() 增量：只讀 day 檔 checkpoint 之後 append 的完整行，寫成新的 part
+  day 檔變小 / 被換掉（封存成壓縮檔、compaction 換檔）→ 該日所有分區重建
+  已結束的日（日期結束後再過 grace_hours）→ 每個分區的 part 合併成一個（之後又有寫入 → 下次再合併）
+- query()：分區剪枝（event_type / day）+ 欄位投影 + 等值 / 時間過濾 → DataFrame
+- 格式：有 pyarrow → Parquet；沒有 → gzip 的欄式 JSON（.columns.json.gz，功能相同、較慢）
+  DataFrame 需要 pandas；as_frame=False 回傳 {column: [values]}
+- 分區目錄是 Hive 風格，可以直接給 pyarrow.dataset / DuckDB / Spark 讀
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import shutil
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, iter_text_lines, record_ts, to_epoch
+from library.library_scan import _is_line_start, _iter_day_files
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+COLUMNAR_DIR = "columnar"
+BASE_COLUMNS = ("event_id", "event_type", "source", "ts", "ts_epoch")
+
+PARQUET_SUFFIX = ".parquet"
+JSON_SUFFIX = ".columns.json.gz"
+
+
+def default_format() -> str:
+    return "parquet" if pa is not None else "json"
+
+
+# ------------------------------------------------------------------
+# 攤平
+# ------------------------------------------------------------------
+def _flatten(obj: Dict[str, Any], prefix: str, row: Dict[str, Any]) -> None:
+    for k, v in obj.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            _flatten(v, key + ".", row)
+            continue
+        if isinstance(v, (list, tuple)):
+            v = json.dumps(v, ensure_ascii=False)
+        if not prefix and key in BASE_COLUMNS:
+            key = "payload." + key
+        row[key] = v
+
+
+def flatten_record(rec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """一筆 Library 紀錄 → 一或多列（market.kline.batch 展開成每根一列）"""
+    etype = rec.get("event_type") or rec.get("type")
+    base = {
+        "event_id": rec.get("event_id"),
+        "event_type": etype,
+        "source": rec.get("source"),
+        "ts": rec.get("ts") or rec.get("timestamp"),
+        "ts_epoch": record_ts(rec),
+    }
+    payload = rec.get("payload")
+    meta = rec.get("meta")
+
+    batch = payload.get("batch") if isinstance(payload, dict) else None
+    if isinstance(batch, dict):
+        # 欄式批次：{symbol, interval, open_time: [...], open: [...], ...}
+        scalars = {k: v for k, v in batch.items() if not isinstance(v, list)}
+        lists = {k: v for k, v in batch.items() if isinstance(v, list)}
+        n = max((len(v) for v in lists.values()), default=0)
+        rows = []
+        for i in range(n):
+            row = dict(base)
+            row.update(scalars)
+            for k, v in lists.items():
+                row[k] = v[i] if i < len(v) else None
+            rows.append(row)
+        return rows
+
+    row = dict(base)
+    if isinstance(payload, dict):
+        _flatten(payload, "", row)
+    elif payload is not None:
+        row["payload"] = json.dumps(payload, ensure_ascii=False)
+    if isinstance(meta, dict):
+        _flatten(meta, "meta.", row)
+    return [row]
+
+
+# ------------------------------------------------------------------
+# part 檔讀寫
+# ------------------------------------------------------------------
+def _columns_of(rows: List[Dict[str, Any]]) -> List[str]:
+    cols = list(BASE_COLUMNS)
+    seen = set(cols)
+    for row in rows:
+        for k in row:
+            if k not in seen:
+                seen.add(k)
+                cols.append(k)
+    return cols
+
+
+def _write_part(path: Path, rows: List[Dict[str, Any]], fmt: str) -> None:
+    cols = _columns_of(rows)
+    _write_columns(path, {c: [r.get(c) for r in rows] for c in cols}, fmt)
+
+
+def _write_columns(path: Path, data: Dict[str, List[Any]], fmt: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+
+    if fmt == "parquet":
+        arrays = {}
+        for c, values in data.items():
+            try:
+                arrays[c] = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # 同一欄混了不同型別 → 存字串
+                arrays[c] = pa.array([None if v is None else str(v) for v in values])
+        pq.write_table(pa.table(arrays), tmp)
+    else:
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=3) as f:
+            json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_part(path: Path, columns: Optional[List[str]]) -> Dict[str, List[Any]]:
+    """→ {column: [values]}；columns=None → 全部欄位；part 沒有的欄位補 None"""
+    if path.name.endswith(PARQUET_SUFFIX):
+        if pq is None:
+            raise ImportError(f"pyarrow is required to read {path}")
+        if columns is not None:
+            have = set(pq.read_schema(path).names)
+            table = pq.read_table(path, columns=[c for c in columns if c in have])
+        else:
+            table = pq.read_table(path)
+        data = table.to_pydict()
+        n = table.num_rows
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        n = len(data.get("ts_epoch", ()))
+        if columns is not None:
+            data = {c: data[c] for c in columns if c in data}
+
+    if columns is not None:
+        for c in columns:
+            if c not in data:
+                data[c] = [None] * n
+    return data
+
+
+# ------------------------------------------------------------------
+# Mirror
+# ------------------------------------------------------------------
+class LibraryColumnar:
+    def __init__(
+        self,
+        library_root: Union[str, Path],
+        *,
+        fmt: Optional[str] = None,
+        grace_hours: float = 2.0,
+    ):
+        """grace_hours：日期結束後再過多久算「已結束」→ part 合併（與 LibraryCompactor 相同）"""
+        self.library_root = Path(library_root)
+        self.events_root = self.library_root / "events"
+        self.root = self.library_root / COLUMNAR_DIR
+        self.fmt = fmt or default_format()
+        self.grace = timedelta(hours=grace_hours)
+        if self.fmt == "parquet" and pa is None:
+            print("[LibraryColumnar] ⚠ pyarrow 未安裝，改用 json")
+            self.fmt = "json"
+        self.codec = get_codec()
+        self.state_path = self.root / "_state.json"
+        self.state: Dict[str, Dict[str, Any]] = self._load_state()
+
+    # -------------------------------------------------
+    # 同步
+    # -------------------------------------------------
+    def sync(self, *, full: bool = False, now: Optional[datetime] = None) -> int:
+        """
+        把 events/ 的新資料寫進欄式副本（增量），已結束的日合併 part
+        回傳：這次新增的列數
+        """
+        if full:
+            for day in list(self.state):
+                self._drop_day(day)
+
+        now = now or datetime.now(timezone.utc)
+        written = 0
+        seen = set()
+        for day, path in self._iter_event_files():
+            seen.add(day)
+            written += self._sync_day(day, path)
+            if self._finished(day, now):
+                self._merge_day(day)
+
+        for day in list(self.state):
+            if day not in seen:
+                self._drop_day(day)
+
+        self._save_state()
+        return written
+
+    def _sync_day(self, day: str, path: Path) -> int:
+        st = path.stat()
+        cp = self.state.get(day)
+        compressed = compression_of(path) is not None
+
+        if cp is not None and cp.get("path") == str(path):
+            if cp["size"] == st.st_size and cp["mtime_ns"] == st.st_mtime_ns:
+                return 0
+            if not compressed and st.st_size > cp["size"] and _is_line_start(path, cp["offset"]):
+                return self._sync_range(day, path, st, cp)
+
+        if cp is not None:
+            self._drop_day(day)
+        cp = self.state[day] = {"path": str(path), "offset": 0, "size": 0, "mtime_ns": 0, "parts": 0}
+        return self._sync_range(day, path, st, cp)
+
+    def _iter_new_lines(self, path: Path, cp: Dict[str, Any]) -> Iterator[bytes]:
+        if compression_of(path):
+            for line in iter_text_lines(path):
+                yield line.encode("utf-8")
+            cp["offset"] = path.stat().st_size
+            return
+        offset = cp["offset"]
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break       # 寫到一半的最後一行 → 下次再讀
+                offset += len(line)
+                yield line
+        cp["offset"] = offset
+
+    def _sync_range(self, day: str, path: Path, st: os.stat_result, cp: Dict[str, Any]) -> int:
+        loads = self.codec.loads
+        groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for line in self._iter_new_lines(path, cp):
+            try:
+                rec = loads(line)
+            except Exception:
+                continue
+            if not isinstance(rec, dict):
+                continue
+            for row in flatten_record(rec):
+                groups[row["event_type"] or "unknown"].append(row)
+
+        n = 0
+        if groups:
+            # 中途當機 → 下次從舊 checkpoint 重讀，寫出同編號的 part（os.replace 覆蓋，不會重複）
+            cp["parts"] += 1
+            suffix = PARQUET_SUFFIX if self.fmt == "parquet" else JSON_SUFFIX
+            for etype, rows in groups.items():
+                part_dir = self._partition_dir(etype, day)
+                part_dir.mkdir(parents=True, exist_ok=True)
+                _write_part(part_dir / f"part-{cp['parts']:06d}{suffix}", rows, self.fmt)
+                n += len(rows)
+
+        cp["size"] = st.st_size
+        cp["mtime_ns"] = st.st_mtime_ns
+        return n
+
+    # -------------------------------------------------
+    # 合併 part
+    # -------------------------------------------------
+    def _finished(self, day: str, now: datetime) -> bool:
+        try:
+            end = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+        except ValueError:
+            return False
+        return end + self.grace <= now
+
+    def _merge_day(self, day: str) -> None:
+        """
+        該日每個分區的 part → 一個 part-N（N = 目前的 part 編號，之後的增量從 N+1 接著寫）
+        1) 合併結果先寫成 part-N<suffix>.merge（查詢不會讀到）
+        2) state 記下 merging = N 並存檔
+        3) .merge 換上 part-N，刪掉編號 < N 的 part
+        存完 state 後中斷 → 下次 sync 從 3) 接著做；存 state 前中斷 → 舊 part 還在，.merge 下次丟掉
+        """
+        cp = self.state.get(day)
+        if cp is None:
+            return
+        if cp.get("merging") is not None:
+            self._finish_merge(day, cp)
+        n = cp["parts"]
+        if n <= max(cp.get("merged") or 0, 1):
+            return
+
+        suffix = PARQUET_SUFFIX if self.fmt == "parquet" else JSON_SUFFIX
+        for part_dir in self._day_partitions(day):
+            parts = _part_files(part_dir)
+            if len(parts) <= 1:
+                continue
+            cols: Dict[str, List[Any]] = {}
+            total = 0
+            for part in parts:
+                data = _read_part(part, None)
+                rows = len(data.get("ts_epoch", ()))
+                for c in data:
+                    if c not in cols:
+                        cols[c] = [None] * total
+                for c, values in cols.items():
+                    values.extend(data.get(c) or [None] * rows)
+                total += rows
+            _write_columns(part_dir / f"part-{n:06d}{suffix}.merge", cols, self.fmt)
+
+        cp["merging"] = n
+        self._save_state()
+        self._finish_merge(day, cp)
+
+    def _finish_merge(self, day: str, cp: Dict[str, Any]) -> None:
+        n = cp["merging"]
+        for part_dir in self._day_partitions(day):
+            for pending in part_dir.glob("part-*.merge"):
+                if _part_no(pending) == n:
+                    os.replace(pending, pending.with_name(pending.name[: -len(".merge")]))
+                else:
+                    pending.unlink(missing_ok=True)     # 更早一次合併在存 state 前中斷的殘留
+            parts = _part_files(part_dir)
+            if not any(_part_no(p) == n for p in parts):
+                continue        # 這個分區沒被合併（本來就只有一個 part）
+            for part in parts:
+                if _part_no(part) < n:
+                    part.unlink(missing_ok=True)
+        cp["merged"] = cp.pop("merging")
+
+    def _day_partitions(self, day: str) -> List[Path]:
+        if not self.root.exists():
+            return []
+        return sorted(p for p in self.root.glob(f"event_type=*/day={day}") if p.is_dir())
+
+    def _drop_day(self, day: str) -> None:
+        self.state.pop(day, None)
+        if not self.root.exists():
+            return
+        for type_dir in self.root.glob("event_type=*"):
+            shutil.rmtree(type_dir / f"day={day}", ignore_errors=True)
+
+    def _partition_dir(self, etype: str, day: str) -> Path:
+        return self.root / f"event_type={etype}" / f"day={day}"
+
+    def _iter_event_files(self) -> Iterator[Tuple[str, Path]]:
+        return _iter_day_files(self.events_root)
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[LibraryColumnar] ⚠ state unreadable, rebuilding: {e}")
+            shutil.rmtree(self.root, ignore_errors=True)
+            return {}
+
+    def _save_state(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    # -------------------------------------------------
+    # 查詢
+    # -------------------------------------------------
+    def types(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name.split("=", 1)[1] for p in self.root.glob("event_type=*") if p.is_dir())
+
+    def iter_parts(
+        self,
+        types: Optional[Sequence[str]] = None,
+        *,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+        days: Optional[Sequence[str]] = None,
+    ) -> Iterator[Path]:
+        """分區剪枝：event_type / day（時間條件前後放寬一天，列再逐筆過濾）"""
+        lo_day = _day_str(start_ts - 86400) if start_ts is not None else None
+        hi_day = _day_str(end_ts + 86400) if end_ts is not None else None
+        day_set = set(days) if days is not None else None
+
+        for etype in (types if types is not None else self.types()):
+            type_dir = self.root / f"event_type={etype}"
+            if not type_dir.exists():
+                continue
+            for day_dir in sorted(type_dir.glob("day=*")):
+                day = day_dir.name.split("=", 1)[1]
+                if day_set is not None and day not in day_set:
+                    continue
+                if lo_day is not None and day < lo_day:
+                    continue
+                if hi_day is not None and day > hi_day:
+                    continue
+                yield from _part_files(day_dir)
+
+    def query(
+        self,
+        type: Union[str, Sequence[str], None] = None,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        start=None,
+        end=None,
+        day: Optional[Union[str, Sequence[str]]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        as_frame: bool = True,
+    ):
+        """
+        - type：event_type（字串或清單；None → 全部）
+        - columns：要的欄位（None → 全部）；where 用到的欄位會自動讀
+        - start / end：datetime（naive 視為 UTC）/ epoch / ISO
+        - where：等值條件 {"symbol": "BTC/USDT"}；值可以是 list / set（IN）
+        - 結果依 ts_epoch 排序
+        """
+        types = [type] if isinstance(type, str) else (list(type) if type is not None else None)
+        days = [day] if isinstance(day, str) else (list(day) if day is not None else None)
+        start_ts, end_ts = to_epoch(start), to_epoch(end)
+        where = dict(where or {})
+        conds = {k: (set(v) if isinstance(v, (list, tuple, set, frozenset)) else {v}) for k, v in where.items()}
+
+        need = None
+        if columns is not None:
+            need = list(dict.fromkeys([*columns, *conds, "ts_epoch"]))
+        parts = list(self.iter_parts(types, start_ts=start_ts, end_ts=end_ts, days=days))
+
+        if pa is not None:
+            table = _query_arrow(parts, need, conds, start_ts, end_ts)
+            if columns is not None:
+                table = table.select([c for c in columns])
+            if as_frame:
+                return table.to_pandas()
+            return table.to_pydict()
+
+        out = _query_lists(parts, need, conds, start_ts, end_ts)
+        if columns is not None:
+            out = {c: out[c] for c in columns}
+        if not as_frame:
+            return out
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("LibraryReader.query(as_frame=True) 需要 pandas；或用 as_frame=False") from e
+        return pd.DataFrame(out, columns=list(out))
+
+
+# ------------------------------------------------------------------
+# 查詢實作
+# ------------------------------------------------------------------
+def _query_arrow(parts: List[Path], need, conds, start_ts, end_ts):
+    """pyarrow：投影 + 過濾下推到 Parquet reader（row group 統計值可整段跳過）"""
+    import pyarrow.compute as pc  # type: ignore
+
+    tables = []
+    for part in parts:
+        if part.name.endswith(PARQUET_SUFFIX):
+            names = set(pq.read_schema(part).names)
+        else:
+            data = _read_part(part, None)
+            names = set(data)
+        if any(k not in names and None not in allowed for k, allowed in conds.items()):
+            continue    # 這個 part 根本沒有過濾用的欄位
+
+        if part.name.endswith(PARQUET_SUFFIX):
+            cols = [c for c in need if c in names] if need is not None else None
+            table = pq.read_table(part, columns=cols)
+        else:
+            table = pa.table({c: _safe_array(v) for c, v in data.items() if need is None or c in need})
+
+        mask = None
+        for k, allowed in conds.items():
+            if k not in table.column_names:
+                continue
+            m = pc.is_in(table[k], value_set=_safe_array([v for v in allowed if v is not None]))
+            if None in allowed:
+                m = pc.or_(m, pc.is_null(table[k]))
+            mask = m if mask is None else pc.and_(mask, m)
+        if start_ts is not None:
+            m = pc.greater_equal(table["ts_epoch"], start_ts)
+            mask = m if mask is None else pc.and_(mask, m)
+        if end_ts is not None:
+            m = pc.less_equal(table["ts_epoch"], end_ts)
+            mask = m if mask is None else pc.and_(mask, m)
+        if mask is not None:
+            table = table.filter(mask)
+        if table.num_rows:
+            tables.append(table)
+
+    if not tables:
+        return pa.table({c: pa.array([]) for c in (need or BASE_COLUMNS)})
+    try:
+        table = pa.concat_tables(tables, promote_options="permissive")
+    except TypeError:   # pyarrow < 14
+        table = pa.concat_tables(tables, promote=True)
+    if need is not None:
+        for c in need:
+            if c not in table.column_names:
+                table = table.append_column(c, pa.nulls(table.num_rows))
+    return table.sort_by("ts_epoch")
+
+
+def _safe_array(values: List[Any]):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values])
+
+
+def _query_lists(parts: List[Path], need, conds, start_ts, end_ts) -> Dict[str, List[Any]]:
+    """沒有 pyarrow：逐 part 讀欄位、逐列過濾"""
+    chunks = []
+    cols: Dict[str, None] = dict.fromkeys(need) if need is not None else {}
+    for part in parts:
+        data = _read_part(part, need)
+        n = len(data.get("ts_epoch", ()))
+        keep = _mask(data, n, conds, start_ts, end_ts)
+        if keep is not None:
+            data = {c: [v[i] for i in keep] for c, v in data.items()}
+            n = len(keep)
+        if n:
+            chunks.append((n, data))
+            if need is None:
+                cols.update(dict.fromkeys(data))
+
+    out: Dict[str, List[Any]] = {c: [] for c in cols}
+    for n, data in chunks:
+        for c in cols:
+            col = data.get(c)
+            out[c].extend(col if col is not None else [None] * n)
+
+    # 依時間排序
+    ts = out.get("ts_epoch", [])
+    order = sorted(range(len(ts)), key=lambda i: (ts[i] is None, ts[i] or 0.0))
+    if order != list(range(len(ts))):
+        out = {c: [v[i] for i in order] for c, v in out.items()}
+    return out
+
+
+def _mask(
+    data: Dict[str, List[Any]],
+    n: int,
+    conds: Dict[str, set],
+    start_ts: Optional[float],
+    end_ts: Optional[float],
+) -> Optional[List[int]]:
+    """符合條件的列 index；全部符合 → None"""
+    if not conds and start_ts is None and end_ts is None:
+        return None
+    keep = []
+    ts = data.get("ts_epoch") or [None] * n
+    cols = [(data.get(k) or [None] * n, allowed) for k, allowed in conds.items()]
+    for i in range(n):
+        t = ts[i]
+        if start_ts is not None and (t is None or t < start_ts):
+            continue
+        if end_ts is not None and (t is None or t > end_ts):
+            continue
+        if all(col[i] in allowed for col, allowed in cols):
+            keep.append(i)
+    return keep
+
+
+def _part_files(part_dir: Path) -> List[Path]:
+    return sorted(p for p in part_dir.iterdir() if p.name.endswith((PARQUET_SUFFIX, JSON_SUFFIX)))
+
+
+def _part_no(path: Path) -> int:
+    """part-000003.parquet → 3"""
+    try:
+        return int(path.name[len("part-"):].split(".", 1)[0])
+    except ValueError:
+        return -1
+
+
+def _day_str(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%d")
@@ -0,0 +1,284 @@
+# aisop/library/library_compactor.py
+"""
+Library compaction — 把已結束的日重寫成「依時間排序、去重、可選壓縮」的單一檔案
+
+    LibraryCompactor(root, compression="gzip").run()       # 壓實所有待處理的日 + 重建索引
+    python scripts/ops/library_compact.py --watch 3600     # 背景定期執行
+
+- 已結束的日：日期結束後再過 grace_hours（replay 灌進來的歷史日也算，只要檔案穩定）
+- 合併該日所有檔案（寫入中的 .jsonl + 封存後的 .jsonl.gz / .zst，封存後又被 append 的也一起收）
+- 去重：同一個 event_id 只留第一次寫入的；壞行（writer 寫到一半）丟掉並計數
+- 排序：依事件時間（record_ts），同時間維持寫入順序；沒有時間的排最前面
+- 換檔（讀取端不中斷）：
+    1) 新內容先寫到暫存檔（同目錄）
+    2) 同 process 的 LibraryWriter 暫停該日寫入（writer.hold），確認來源檔沒有再變
+    3) 丟掉該日的 offset postings（讀取端改整檔掃，不會 seek 到錯的行）
+       已拿到舊 files 快照的讀取端：開檔後比對 inode / size / mtime，不符 → 同樣整檔掃
+    4) os.replace 換上新檔，再刪掉被合併的舊檔（.jsonl 與壓縮檔並存時讀取端讀 .jsonl）
+    5) 全部做完 → LibraryIndex.build() 重建這些日的 postings / hourly
+       壓縮檔的 block index（.idx.json）由 BlockWriter 一起寫；已排序 → 時間範圍讀取可跳 block
+- 壓縮輸出的日之後又有寫入 → LibraryWriter 先解壓回 .jsonl 再 append（下次 compaction 再壓回去）
+- 壓實紀錄：index/compaction.json（size / mtime）；檔案沒再變的日下次不重做
+- 其他 process 的 writer 無法暫停：換檔前發現來源檔變了就放棄這一天（下次再做）
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import (
+    COMPRESSION_SUFFIX,
+    BlockWriter,
+    compression_of,
+    index_path,
+    iter_text_lines,
+    record_ts,
+)
+from shared_core.event_raw.ts_index import ts_index_path
+from library.index.library_index import LibraryIndex
+from library.index.posting_index import PostingIndex
+from library.ingest.dedup import day_files
+from library.library_scan import _iter_day_files
+from library.library_writer import find_library_writer
+
+STATE_FILE = "compaction.json"
+
+
+class LibraryCompactor:
+    def __init__(
+        self,
+        library_root: Path | str,
+        *,
+        compression: Optional[str] = None,
+        grace_hours: float = 2.0,
+        max_day_bytes: int = 2 << 30,
+        reindex: bool = True,
+    ):
+        """
+        compression：None → 輸出未壓縮 .jsonl（可 seek，postings 可用）；"gzip" / "zstd" → 分塊壓縮檔
+        max_day_bytes：單日超過這個大小就跳過（整天在記憶體裡排序）
+        """
+        self.library_root = Path(library_root)
+        self.events_root = self.library_root / "events"
+        self.index_root = self.library_root / "index"
+        self.compression = compression
+        self.grace = timedelta(hours=grace_hours)
+        self.max_day_bytes = max_day_bytes
+        self.reindex = reindex
+        self.codec = get_codec()
+        self.state = self._load_state()
+
+    # --------------------------------------------------
+    # 要做哪些日
+    # --------------------------------------------------
+    def pending_days(self, *, now: Optional[datetime] = None) -> List[str]:
+        """已結束、且上次壓實之後有變動（或從沒壓實過）的日"""
+        now = now or datetime.now(timezone.utc)
+        out = []
+        for day in sorted({d for d, _ in _iter_day_files(self.events_root)}):
+            try:
+                end = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+            except ValueError:
+                continue
+            if end + self.grace > now:
+                continue
+            if self._marks(day) == (self.state.get(day) or {}).get("files"):
+                continue
+            out.append(day)
+        return out
+
+    def run(self, days: Optional[Iterable[str]] = None, *, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """壓實 days（None → pending_days()），有換檔就重建索引；回傳每天的結果"""
+        results = [self.compact_day(d) for d in (days if days is not None else self.pending_days(now=now))]
+        if self.reindex and any(r["status"] == "compacted" for r in results):
+            idx = LibraryIndex(self.library_root)
+            idx.build()
+            idx.flush()
+        return results
+
+    def watch(self, interval_sec: float = 3600.0, *, stop_event: Optional[threading.Event] = None) -> None:
+        """背景定期壓實（與 LibraryIndex.watch 相同的迴圈）"""
+        stop_event = stop_event or threading.Event()
+        print(f"[LibraryCompactor] 👀 compacting {self.events_root} (every {interval_sec}s)")
+        while not stop_event.is_set():
+            try:
+                for r in self.run():
+                    if r["status"] == "compacted":
+                        print(
+                            f"[LibraryCompactor] 🗜 {r['day']}: {r['events']} events, "
+                            f"-{r['duplicates']} dup, {r['bytes_before']} → {r['bytes_after']} bytes"
+                        )
+            except Exception as e:
+                print(f"[LibraryCompactor] ❌ compaction error: {e}")
+            stop_event.wait(interval_sec)
+
+    # --------------------------------------------------
+    # 單日
+    # --------------------------------------------------
+    def compact_day(self, day: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "day": day, "status": "skipped", "events": 0, "duplicates": 0,
+            "bad_lines": 0, "bytes_before": 0, "bytes_after": 0,
+        }
+        sources = self._day_sources(day)
+        if not sources:
+            result["status"] = "missing"
+            return result
+        before = self._marks(day)
+        result["bytes_before"] = sum(size for size, _ in before.values())
+        if result["bytes_before"] > self.max_day_bytes:
+            print(f"[LibraryCompactor] ⚠ {day} is {result['bytes_before']} bytes (> max_day_bytes), skipped")
+            return result
+
+        lines, dup, bad = self._merge(sources)
+        result.update(events=len(lines), duplicates=dup, bad_lines=bad)
+
+        target = self._target(day)
+        tmp = target.with_name(target.name + ".compact.tmp")
+        self._write(tmp, lines)
+
+        writer = find_library_writer(self.library_root)
+        hold = writer.hold(day) if writer is not None else _nullhold()
+        with hold:
+            if self._marks(day) != before:
+                tmp.unlink(missing_ok=True)
+                _drop_index(tmp)
+                result["status"] = "changed"
+                return result
+            self._swap(day, tmp, target, sources)
+
+        result["status"] = "compacted"
+        result["bytes_after"] = target.stat().st_size
+        self.state[day] = {
+            "files": self._marks(day),
+            "events": len(lines),
+            "duplicates": dup,
+            "bad_lines": bad,
+            "compacted_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._save_state()
+        return result
+
+    def _merge(self, sources: List[Path]) -> Tuple[List[bytes], int, int]:
+        """所有來源的行 → 去重（event_id，先寫入的留下）→ 依時間穩定排序"""
+        loads = self.codec.loads
+        seen = set()
+        keyed: List[Tuple[float, bytes]] = []
+        dup = bad = 0
+        for path in sources:
+            for line in iter_text_lines(path):
+                raw = line.encode("utf-8") if isinstance(line, str) else line
+                if not raw.strip():
+                    continue
+                try:
+                    rec = loads(raw)
+                except Exception:
+                    bad += 1
+                    continue
+                if not isinstance(rec, dict):
+                    bad += 1
+                    continue
+                key = rec.get("event_id") or raw.strip()
+                if key in seen:
+                    dup += 1
+                    continue
+                seen.add(key)
+                ts = record_ts(rec)
+                if not raw.endswith(b"\n"):
+                    raw += b"\n"
+                keyed.append((float("-inf") if ts is None else ts, raw))
+        keyed.sort(key=lambda item: item[0])
+        return [raw for _, raw in keyed], dup, bad
+
+    def _write(self, tmp: Path, lines: List[bytes]) -> None:
+        if self.compression is None:
+            with open(tmp, "wb") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            return
+        # BlockWriter 自己先寫 <tmp>.tmp 再 rename，index 寫成 <tmp>.idx.json
+        with BlockWriter(tmp, self.compression) as w:
+            for line in lines:
+                w.write_line(line)
+
+    def _swap(self, day: str, tmp: Path, target: Path, sources: List[Path]) -> None:
+        # 讀取端先退回整檔掃（postings 指向舊檔的 offset）
+        postings = PostingIndex(self.index_root)
+        try:
+            postings.drop_postings(day)
+            postings.commit()
+        finally:
+            postings.close()
+
+        if compression_of(target):
+            # 先拿掉舊的 block index（沒有 index → 讀取端串流，仍然正確），再換資料、放新 index
+            index_path(target).unlink(missing_ok=True)
+            os.replace(tmp, target)
+            os.replace(index_path(tmp), index_path(target))
+        else:
+            # ReplayEngine 補建的時間索引指向舊檔的 offset
+            ts_index_path(target).unlink(missing_ok=True)
+            os.replace(tmp, target)
+
+        for path in sources:
+            if path != target:
+                path.unlink(missing_ok=True)
+                _drop_index(path)
+
+    # --------------------------------------------------
+    # 檔案 / 狀態
+    # --------------------------------------------------
+    def _day_dir(self, day: str) -> Path:
+        return self.events_root / day[:4] / day[5:7]
+
+    def _target(self, day: str) -> Path:
+        name = f"{day}.jsonl"
+        if self.compression is not None:
+            name += COMPRESSION_SUFFIX[self.compression]
+        return self._day_dir(day) / name
+
+    def _day_sources(self, day: str) -> List[Path]:
+        """該日所有檔案（.jsonl 在前 → 同一筆事件以寫入中的檔案為準）"""
+        return day_files(self.events_root, day)
+
+    def _marks(self, day: str) -> Dict[str, List[int]]:
+        out = {}
+        for path in self._day_sources(day):
+            st = path.stat()
+            out[path.name] = [st.st_size, st.st_mtime_ns]
+        return out
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_root / STATE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self) -> None:
+        self.index_root.mkdir(parents=True, exist_ok=True)
+        path = self.index_root / STATE_FILE
+        tmp = path.with_name(STATE_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+
+def _drop_index(path: Path) -> None:
+    index_path(path).unlink(missing_ok=True)
+    ts_index_path(path).unlink(missing_ok=True)
+
+
+class _nullhold:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
@@ -1,11 +1,12 @@
 
 from dataclasses import dataclass, asdict
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any, Optional
-import json
 from pathlib import Path
 import uuid
 
+from shared_core.codec import get_codec
+
 
 @dataclass(frozen=True)
 class LibraryEvent:
@@ -37,11 +38,17 @@ class LibraryEvent:
         """
         將 PBEvent 昇華為 LibraryEvent（記憶單元）
         """
+        payload = pbevent.payload
+        batch = payload.get("batch") if isinstance(payload, dict) else None
+        if batch is not None and hasattr(batch, "to_lists"):
+            # 欄式批次（market.kline.batch）→ 一筆紀錄存整批欄位
+            payload = {**payload, "batch": batch.to_lists()}
+
         return LibraryEvent(
             event_id=pbevent.event_id,
             event_type=pbevent.type,
             source=getattr(pbevent, "source", "unknown"),
-            payload=pbevent.payload,
+            payload=payload,
             ts=pbevent.timestamp
                or datetime.now(timezone.utc).isoformat(),
             weak_label=weak_label,
@@ -52,4 +59,5 @@ class LibraryEvent:
         return asdict(self)
 
     def to_json(self) -> str:
-        return json.dumps(self.to_dict(), ensure_ascii=False)
+        # codec 直接依欄位順序編碼（不經 asdict 的 deep copy）
+        return get_codec().encode_library_event(self)
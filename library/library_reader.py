@@ -2,9 +2,30 @@
 from __future__ import annotations
 
 import json
+import os
 import random
+import sqlite3
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, iter_text_lines, to_epoch
+from shared_core.mmap_jsonl import MmapJsonlReader
+from library.index.posting_index import AGG_COLUMNS, PostingIndex, hour_of
+from library.library_columnar import LibraryColumnar
+from library.library_scan import _iter_day_files, scan_library
+
+# sample() 的候選行快取：(path, size, mtime_ns, types, sources) → 行起點 array('Q')
+# 上限依總 bytes 算（一天上百萬行 → 一個 entry 就幾 MB）；單一 entry 超過上限就不快取
+_SPANS_CACHE: "OrderedDict[tuple, array]" = OrderedDict()
+_SPANS_CACHE_MAX_BYTES = 64 << 20
+_SPANS_CACHE_BYTES = 0
+_SPANS_LOCK = threading.Lock()
 
 
 class LibraryReader:
@@ -18,18 +39,22 @@ class LibraryReader:
 
     Directory layout (expected):
       library_root/
-        events/YYYY/MM/YYYY-MM-DD.jsonl
+        events/YYYY/MM/YYYY-MM-DD.jsonl      (或封存後的 .jsonl.zst / .jsonl.gz)
         index/
           stats.json
-          by_type.json      (optional, v1 legacy)
-          by_source.json    (optional, v1 legacy)
-          by_day.json       (optional, v1 legacy)
+          postings.sqlite   (LibraryIndex v3：type / source / hour_of_day → (file, offset)；hourly 彙總 → aggregate)
+          by_type.json      (optional, v1 legacy；LibraryIndex(legacy_postings=True) 才寫)
+          by_source.json    (optional, v1 legacy；同上)
+          by_day.json       (optional, v1 legacy；同上)
+        columnar/event_type=*/day=*/part-*.parquet   (LibraryColumnar 欄式副本，query 用)
     """
 
     def __init__(self, library_root: Union[str, Path]):
         self.library_root = Path(library_root)
         self.events_root = self.library_root / "events"
         self.index_root = self.library_root / "index"
+        self.codec = get_codec()
+        self._postings: Optional[PostingIndex] = None
 
     # ------------------------------------------------------------
     # Public API
@@ -56,6 +81,7 @@ class LibraryReader:
         day: Optional[str] = None,
         type: Optional[Union[str, Sequence[str]]] = None,
         source: Optional[Union[str, Sequence[str]]] = None,
+        hour: Optional[Union[int, Sequence[int]]] = None,
         limit: Optional[int] = None,
     ) -> Iterator[Dict[str, Any]]:
         """
@@ -63,8 +89,12 @@ class LibraryReader:
         - day: "YYYY-MM-DD"
         - type: "market.kline" 或 ["a", "b", ...]
         - source: "replay/live/..." 或 ["replay", "live", ...]
+        - hour: 0-23 或 [..]（事件時間的小時）
         - limit: 最多 yield 幾筆
 
+        有 type / source / hour 條件且 index/postings.sqlite 存在 → 只 seek 符合的行
+        （索引之後 append 的尾巴、壓縮檔、沒索引到的日 → 照舊掃描）
+
         回傳：dict（原始 record）
         """
         if limit is not None and limit <= 0:
@@ -72,10 +102,26 @@ class LibraryReader:
 
         type_set = _to_set(type)
         source_set = _to_set(source)
+        hour_set = None if hour is None else ({hour} if isinstance(hour, int) else set(hour))
+
+        index = None
+        if type_set is not None or source_set is not None or hour_set is not None:
+            index = self._posting_index()
+        indexed_files = index.files() if index is not None else {}
 
         count = 0
         for path in self._iter_event_files(day=day):
-            for rec in self._iter_jsonl(path):
+            records = None
+            if indexed_files:
+                records = self._iter_indexed(path, index, indexed_files, type_set, source_set, hour_set)
+            if records is None:
+                records = self._iter_jsonl(path)
+
+            for rec in records:
+                if hour_set is not None:
+                    if hour_of(rec.get("ts") or rec.get("timestamp")) not in hour_set:
+                        continue
+
                 if type_set is not None:
                     et = rec.get("event_type") or rec.get("type")
                     if et not in type_set:
@@ -91,6 +137,125 @@ class LibraryReader:
                 if limit is not None and count >= limit:
                     return
 
+    def scan(
+        self,
+        *,
+        type: Optional[Union[str, Sequence[str]]] = None,
+        source: Optional[Union[str, Sequence[str]]] = None,
+        start=None,
+        end=None,
+        day: Optional[Union[str, Sequence[str]]] = None,
+        ordered: bool = True,
+        reduce_fn=None,
+        workers: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """
+        平行掃描（process pool，每個 day 檔一個 task；條件在 worker 內過濾）
+        - ordered=True → 依時間排序；False → 先做完先回（彙總用）
+        - reduce_fn（top-level 函式）→ yield 每個 task 的部分結果
+        細節見 library.library_scan.scan_library
+        """
+        return scan_library(
+            self.library_root,
+            type=type,
+            source=source,
+            start=start,
+            end=end,
+            day=day,
+            ordered=ordered,
+            reduce_fn=reduce_fn,
+            workers=workers,
+        )
+
+    def query(
+        self,
+        type: Optional[Union[str, Sequence[str]]] = None,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        start=None,
+        end=None,
+        day: Optional[Union[str, Sequence[str]]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        as_frame: bool = True,
+    ):
+        """
+        欄式查詢（讀 columnar/ 副本，不碰 events/）→ DataFrame
+            reader.query("market.kline", columns=["ts", "close"], where={"symbol": "BTC/USDT"},
+                         start=datetime(2025, 7, 1), end=datetime(2026, 1, 1))
+        - 分區剪枝（event_type / day）+ 欄位投影；結果依時間排序
+        - 副本由 LibraryColumnar.sync() 維護（scripts/ops/library_index.py --columnar）
+        - as_frame=False → {column: [values]}（不需要 pandas）
+        """
+        return LibraryColumnar(self.library_root).query(
+            type,
+            columns=columns,
+            start=start,
+            end=end,
+            day=day,
+            where=where,
+            as_frame=as_frame,
+        )
+
+    def aggregate(
+        self,
+        group_by: Union[str, Sequence[str]] = ("type",),
+        *,
+        where: Optional[Dict[str, Any]] = None,
+        time_range: Optional[Tuple[Any, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        彙總查詢（只讀 postings.sqlite 的 hourly 表，不碰 events/）
+            reader.aggregate(["hour"], where={"type": "market.kline"},
+                             time_range=(datetime.now(timezone.utc) - timedelta(days=90), None))
+        - group_by：type / source / day / hour 的任意組合（hour = UTC 整點 ISO 字串）
+        - where：{"type": ..., "source": ..., "day": ...}，值可為字串或清單
+        - time_range：(start, end)，datetime（naive 視為 UTC）/ epoch / ISO，None = 不限；以小時為單位
+        回傳：[{<group 欄位>..., "count", "first_ts", "last_ts"}]（first/last 為 epoch 秒），依 group 排序
+        """
+        groups = [group_by] if isinstance(group_by, str) else list(group_by)
+        for g in groups:
+            if g not in AGG_COLUMNS:
+                raise ValueError(f"[LibraryReader] aggregate(group_by=...) must be in {sorted(AGG_COLUMNS)}, got: {g}")
+        where = dict(where or {})
+        unknown = set(where) - {"type", "source", "day"}
+        if unknown:
+            raise ValueError(f"[LibraryReader] aggregate(where=...) unsupported keys: {sorted(unknown)}")
+        start, end = time_range if time_range is not None else (None, None)
+
+        index = self._posting_index()
+        try:
+            if index is None:
+                raise sqlite3.OperationalError("no postings.sqlite")
+            rows = index.aggregate(
+                groups,
+                types=_to_list(where.get("type")),
+                sources=_to_list(where.get("source")),
+                days=_to_list(where.get("day")),
+                start_ts=to_epoch(start),
+                end_ts=to_epoch(end),
+            )
+        except sqlite3.OperationalError as e:
+            # 與 get_stats 一致：沒有索引就 fail fast，不退回掃描
+            raise FileNotFoundError(
+                f"[LibraryReader] hourly aggregates not available under {self.index_root} ({e}). "
+                f"Run LibraryIndex.build()+flush() first."
+            ) from e
+
+        out: List[Dict[str, Any]] = []
+        for row in rows:
+            count = row[len(groups)]
+            if not count:
+                continue
+            item: Dict[str, Any] = {}
+            for g, v in zip(groups, row):
+                if g == "hour":
+                    v = datetime.fromtimestamp(v, tz=timezone.utc).isoformat() if v >= 0 else None
+                item[g] = v
+            item["count"] = count
+            item["first_ts"], item["last_ts"] = row[len(groups) + 1], row[len(groups) + 2]
+            out.append(item)
+        return out
+
     def sample(
         self,
         *,
@@ -102,9 +267,15 @@ class LibraryReader:
         source: Optional[Union[str, Sequence[str]]] = None,
     ) -> List[Dict[str, Any]]:
         """
-        抽樣（只讀，不建立索引、不回寫）。
-        - by="day": 以 stats.json 的 files/day 做「按日抽樣」策略（優先用 index，避免全掃）
-        - by="type": 以 by_type.json 的 key 選一組 type，再從 events 串流抽樣（不做重索引）
+        抽樣（只讀，不回寫 index）。
+        - by="day": 依 stats.json 各日的 event 數（有 type/source 條件 → 該日符合的數量）分配
+                    每天要抽幾筆，再從該日檔案隨機 seek
+        - by="type": 從 stats summary（或 by_type.json）選一組 type，再依同樣方式分配到各日
+
+        每一天的候選行：有 type/source 條件 → postings.sqlite 的 (offset, length)（已過濾）；
+        沒有條件或沒有索引 → 第一次抽到該日時建行邊界（只找換行），都快取在記憶體，
+        之後 k 筆 = k 次 seek。
+        同一天不重複抽；同一個 seed → 同樣結果。壓縮的日沒有 byte offset → 整檔 reservoir。
 
         你也可以加上 day/type/source 限縮抽樣範圍（仍保持只讀）。
 
@@ -124,7 +295,7 @@ class LibraryReader:
 
         # ---- by=day (index-first) ----
         if by == "day":
-            # 若指定 day，直接從該日檔案做 reservoir sampling（不碰 index）
+            # 若指定 day，直接從該日檔案抽（不需要 stats）
             if day is not None:
                 return self._sample_from_day_file(day, n=n, rng=rng, type_set=type_set, source_set=source_set)
 
@@ -133,47 +304,9 @@ class LibraryReader:
             files = (stats or {}).get("files", {})
             if not isinstance(files, dict) or not files:
                 return []
+            return self._sample_days(files, n=n, rng=rng, type_set=type_set, source_set=source_set)
 
-            # 以「count」作為權重（常見：大日子被多抽到；符合資料分布）
-            # 如果你想要「每天等機率」，把 weights 改成 1 即可。
-            days: List[str] = []
-            weights: List[float] = []
-            for d, info in files.items():
-                if not isinstance(info, dict):
-                    continue
-                c = info.get("count", 0)
-                if isinstance(c, int) and c > 0:
-                    days.append(d)
-                    weights.append(float(c))
-
-            if not days:
-                return []
-
-            # 反覆抽 day，再從該 day 檔案抽一些事件（reservoir），直到累積 n
-            out: List[Dict[str, Any]] = []
-            # 每次從一天最多抽的量，避免單一天壟斷
-            per_day_cap = max(5, min(200, n // 3 if n >= 30 else n))
-
-            safety = 0
-            while len(out) < n and safety < n * 10:
-                pick_day = rng.choices(days, weights=weights, k=1)[0]
-                chunk = self._sample_from_day_file(
-                    pick_day,
-                    n=min(per_day_cap, n - len(out)),
-                    rng=rng,
-                    type_set=type_set,
-                    source_set=source_set,
-                )
-                out.extend(chunk)
-                safety += 1
-
-                # 若 filter 太嚴格導致抽不到，就會自然停滯；這裡用 safety 防止死迴圈
-                if safety >= n * 10:
-                    break
-
-            return out[:n]
-
-        # ---- by=type (type-key-first, stream sample) ----
+        # ---- by=type (type-key-first) ----
         # 選一組候選 type（只用 index 的 keys，不依賴 event_id mapping）
         chosen_types: Optional[set] = None
         if type_set is None:
@@ -190,26 +323,46 @@ class LibraryReader:
                             chosen_types = set(rng.sample(keys, k=k))
                 except Exception:
                     chosen_types = None
+            else:
+                # v3 index：type 清單在 stats.json summary.types
+                try:
+                    keys = [k for k in (self.get_stats().get("summary", {}).get("types") or {}) if k]
+                    if keys:
+                        chosen_types = set(rng.sample(keys, k=min(12, len(keys))))
+                except Exception:
+                    chosen_types = None
 
         # 若 caller 指定了 type，或 by_type.json 不存在，就回到「filter + reservoir」全域抽樣
         if chosen_types is None:
             chosen_types = type_set  # 可能為 None
 
+        # v3 stats（各日有 types / sources 計數）→ 分配到各日再 seek，不掃全庫
+        try:
+            files = self.get_stats().get("files") or {}
+        except (FileNotFoundError, ValueError):
+            files = {}
+        if isinstance(files, dict) and files and all(
+            isinstance(info, dict) and isinstance(info.get("types"), dict) for info in files.values()
+        ):
+            if day is not None:
+                files = {day: files[day]} if day in files else {}
+            return self._sample_days(files, n=n, rng=rng, type_set=chosen_types, source_set=source_set)
+
         # reservoir sampling across stream
         reservoir: List[Dict[str, Any]] = []
         seen = 0
 
-        for rec in self.iter_events(day=day, source=source, limit=None):
-            # type filter
-            et = rec.get("event_type") or rec.get("type")
-            if chosen_types is not None and et not in chosen_types:
-                continue
-            if type_set is not None and et not in type_set:
+        # 候選 type / source 在掃描時過濾（byte 前置過濾 → 不相干的行不 decode）
+        # workers=1：sample() 常在訓練迴圈裡反覆呼叫，不為了抽樣開 process pool
+        for rec in self.scan(
+            day=day,
+            type=sorted(chosen_types) if chosen_types is not None else None,
+            source=sorted(source_set) if source_set is not None else None,
+            ordered=True,
+            workers=1,
+        ):
+            if not _matches(rec, chosen_types, source_set):
                 continue
-            if source_set is not None:
-                src = rec.get("source")
-                if src not in source_set:
-                    continue
 
             seen += 1
             if len(reservoir) < n:
@@ -226,44 +379,144 @@ class LibraryReader:
     # ------------------------------------------------------------
     def _iter_event_files(self, *, day: Optional[str] = None) -> Iterator[Path]:
         """
-        events/YYYY/MM/YYYY-MM-DD.jsonl
+        events/YYYY/MM/YYYY-MM-DD.jsonl（.jsonl.zst / .jsonl.gz 同樣讀取；day → 只找該日）
         """
-        if day is not None:
-            # 精準定位單日檔案
-            y, m, _ = day.split("-")
-            path = self.events_root / y / m / f"{day}.jsonl"
-            if path.exists():
-                yield path
-            return
+        for _, path in _iter_day_files(self.events_root, day=day):
+            yield path
 
-        if not self.events_root.exists():
-            return
-
-        for year_dir in sorted(self.events_root.iterdir()):
-            if not year_dir.is_dir():
-                continue
-            for month_dir in sorted(year_dir.iterdir()):
-                if not month_dir.is_dir():
-                    continue
-                for file in sorted(month_dir.glob("*.jsonl")):
-                    yield file
+    def _posting_index(self) -> Optional[PostingIndex]:
+        if self._postings is None:
+            self._postings = PostingIndex.open_readonly(self.index_root)
+        return self._postings
 
-    def _iter_jsonl(self, path: Path) -> Iterator[Dict[str, Any]]:
+    def _iter_indexed(
+        self,
+        path: Path,
+        index: PostingIndex,
+        indexed_files: Dict[str, Any],
+        type_set: Optional[set],
+        source_set: Optional[set],
+        hour_set: Optional[set],
+    ) -> Optional[Iterator[Dict[str, Any]]]:
         """
-        只讀 jsonl 串流。
+        用 postings seek 到符合條件的行；這個檔案不能用索引 → None（呼叫端整檔掃）
+        record 仍由呼叫端逐筆比對條件（索引只負責「少讀」）
         """
-        with open(path, "r", encoding="utf-8") as f:
+        if compression_of(path):
+            return None
+        entry = indexed_files.get(path.name.split(".jsonl")[0])
+        if entry is None:
+            return None
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        # 以開好的 handle 比對：之後就算被換檔（compaction），讀的也是這個檔案
+        hit = None
+        if _postings_match(f, os.fstat(f.fileno()), entry):
+            hit = index.iter_offsets(
+                entry[0],
+                types=sorted(type_set) if type_set is not None else None,
+                sources=sorted(source_set) if source_set is not None else None,
+                hours=sorted(hour_set) if hour_set is not None else None,
+            )
+        if hit is None:
+            f.close()
+            return None
+        indexed_end, offsets = hit
+        return self._read_at(f, offsets, indexed_end)
+
+    def _read_at(self, f, offsets, indexed_end: int) -> Iterator[Dict[str, Any]]:
+        loads = self.codec.loads
+        buf, buf_start = b"", 0
+        with f:
+            for off, length in offsets:
+                # 密集命中 → 一次讀一大塊；稀疏命中 → 直接 seek
+                if not (buf_start <= off and off + length <= buf_start + len(buf)):
+                    f.seek(off)
+                    buf, buf_start = f.read(max(length, 1 << 16)), off
+                line = buf[off - buf_start:off - buf_start + length]
+                try:
+                    rec = loads(line)
+                except Exception:
+                    continue
+                if isinstance(rec, dict):
+                    yield rec
+
+            # 索引之後 append 的尾巴
+            f.seek(indexed_end)
             for line in f:
-                line = line.strip()
-                if not line:
+                if not line.strip():
                     continue
                 try:
-                    rec = json.loads(line)
+                    rec = loads(line)
                 except Exception:
                     continue
                 if isinstance(rec, dict):
                     yield rec
 
+    def _day_path(self, day: str) -> Optional[Path]:
+        return next((path for _, path in _iter_day_files(self.events_root, day=day)), None)
+
+    def _iter_jsonl(self, path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        只讀 jsonl 串流（壓縮檔逐 block 解壓）。
+        """
+        for line in iter_text_lines(path):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = self.codec.loads(line)
+            except Exception:
+                continue
+            if isinstance(rec, dict):
+                yield rec
+
+    def _sample_days(
+        self,
+        files: Dict[str, Any],
+        *,
+        n: int,
+        rng: random.Random,
+        type_set: Optional[set],
+        source_set: Optional[set],
+    ) -> List[Dict[str, Any]]:
+        """
+        按日分層抽樣：權重 = 該日符合條件的 event 數（stats.json 的 count / types / sources）
+        先一次分配每天的配額；某天不夠 → 差額再分給其他天（同一天不重複抽）
+        如果你想要「每天等機率」，把 weights 改成 1 即可。
+        """
+        days: List[str] = []
+        weights: List[float] = []
+        for d in sorted(files):
+            w = _day_weight(files[d], type_set, source_set)
+            if w > 0:
+                days.append(d)
+                weights.append(w)
+
+        out: List[Dict[str, Any]] = []
+        streams: Dict[str, Iterator[Dict[str, Any]]] = {}
+        while len(out) < n and days:
+            quota = Counter(rng.choices(days, weights=weights, k=n - len(out)))
+            exhausted = set()
+            for d in days:
+                if d not in quota:
+                    continue
+                stream = streams.get(d)
+                if stream is None:
+                    stream = streams[d] = self._iter_day_sample(
+                        d, rng=rng, type_set=type_set, source_set=source_set, cap=n
+                    )
+                got = list(islice(stream, quota[d]))
+                out.extend(got)
+                if len(got) < quota[d]:
+                    exhausted.add(d)
+            keep = [i for i, d in enumerate(days) if d not in exhausted]
+            days = [days[i] for i in keep]
+            weights = [weights[i] for i in keep]
+        return out[:n]
+
     def _sample_from_day_file(
         self,
         day: str,
@@ -273,24 +526,123 @@ class LibraryReader:
         type_set: Optional[set],
         source_set: Optional[set],
     ) -> List[Dict[str, Any]]:
+        """單日抽 n 筆（不重複）"""
+        return list(islice(
+            self._iter_day_sample(day, rng=rng, type_set=type_set, source_set=source_set, cap=n), n
+        ))
+
+    def _iter_day_sample(
+        self,
+        day: str,
+        *,
+        rng: random.Random,
+        type_set: Optional[set],
+        source_set: Optional[set],
+        cap: int,
+    ) -> Iterator[Dict[str, Any]]:
         """
-        對單日檔案做 reservoir sampling（只讀）。
+        依隨機順序（不重複）吐出該日符合條件的 record；每筆 = 一次 seek + 一行 decode
+        候選行可能沒過濾過（索引後的尾巴）→ decode 後再比對，不符合就換下一行
+        檔案整天只開一次；沒有候選行（壓縮檔 / 有條件但 postings 不能用）→ 順序掃一遍做 reservoir
         """
-        y, m, _ = day.split("-")
-        path = self.events_root / y / m / f"{day}.jsonl"
-        if not path.exists():
-            return []
+        path = self._day_path(day)
+        if path is None:
+            return
+        spans = self._sample_spans(path, day, type_set, source_set)
+        if spans is None:
+            yield from self._reservoir_day(path, n=cap, rng=rng, type_set=type_set, source_set=source_set)
+            return
+
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return
+        loads = self.codec.loads
+        with f:
+            for i in _shuffled(len(spans), rng):
+                f.seek(spans[i])
+                try:
+                    rec = loads(f.readline())
+                except Exception:
+                    continue
+                if isinstance(rec, dict) and _matches(rec, type_set, source_set):
+                    yield rec
 
+    def _sample_spans(
+        self,
+        path: Path,
+        day: str,
+        type_set: Optional[set],
+        source_set: Optional[set],
+    ) -> Optional[array]:
+        """
+        該日候選行的起點（一行讀到換行為止）；壓縮檔 → None
+        - 有 type/source 條件、postings 沒過期 → 索引內符合條件的行 + 索引之後 append 的尾巴
+        - 有條件但沒有可用的 postings → None（隨機讀每一行再比對，比順序掃一遍還慢）
+        - 沒有條件 → 整檔行邊界
+        以 (path, size, mtime, 條件) 快取：同一個檔案再抽只剩 seek
+        """
+        if compression_of(path):
+            return None
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        key = (
+            str(path), st.st_size, st.st_mtime_ns,
+            tuple(sorted(type_set)) if type_set is not None else None,
+            tuple(sorted(source_set)) if source_set is not None else None,
+        )
+        with _SPANS_LOCK:
+            spans = _SPANS_CACHE.get(key)
+            if spans is not None:
+                _SPANS_CACHE.move_to_end(key)
+                return spans
+
+        starts = array("Q")
+        tail_from = 0
+        # 沒有條件 → 行邊界本身就是答案（找換行比逐列讀 SQLite 快）
+        index = self._posting_index() if type_set is not None or source_set is not None else None
+        entry = index.files().get(day) if index is not None else None
+        hit = None
+        if entry is not None:
+            with open(path, "rb") as f:
+                if _postings_match(f, os.fstat(f.fileno()), entry):
+                    hit = index.iter_offsets(
+                        entry[0],
+                        types=sorted(type_set) if type_set is not None else None,
+                        sources=sorted(source_set) if source_set is not None else None,
+                    )
+        if hit is not None:
+            tail_from, offsets = hit
+            starts.extend(off for off, _ in offsets)
+        elif type_set is not None or source_set is not None:
+            return None
+
+        with MmapJsonlReader(path) as r:
+            bounds = r.line_bounds(tail_from)
+        starts.extend(bounds[:-1])
+
+        _cache_spans(key, starts)
+        return starts
+
+    def _reservoir_day(
+        self,
+        path: Path,
+        *,
+        n: int,
+        rng: random.Random,
+        type_set: Optional[set],
+        source_set: Optional[set],
+    ) -> List[Dict[str, Any]]:
+        """
+        對單日檔案做 reservoir sampling（只讀；壓縮檔沒有 offset 時用）。
+        """
         reservoir: List[Dict[str, Any]] = []
         seen = 0
         for rec in self._iter_jsonl(path):
-            et = rec.get("event_type") or rec.get("type")
-            if type_set is not None and et not in type_set:
+            if not _matches(rec, type_set, source_set):
                 continue
-            if source_set is not None:
-                src = rec.get("source")
-                if src not in source_set:
-                    continue
 
             seen += 1
             if len(reservoir) < n:
@@ -300,9 +652,92 @@ class LibraryReader:
                 if j < n:
                     reservoir[j] = rec
 
+        rng.shuffle(reservoir)
         return reservoir
 
 
+def _postings_match(f, st, entry) -> bool:
+    """
+    postings 是否仍屬於這個檔案（entry = PostingIndex.files() 的一列，st = 開檔後的 stat）
+    - inode 不同 → 已被換檔（compaction 換新檔，新檔重建索引前 file_id 也不同）
+    - 大小相同但 mtime 不同 → 原地改寫；變小 → 被截斷
+    - 變大 → 只能是 append：索引終點前一個 byte 仍須是換行
+    """
+    _, _, indexed_end, ino, size, mtime_ns = entry
+    if ino is None or st.st_ino != ino or st.st_size < indexed_end:
+        return False
+    if st.st_size == size:
+        return st.st_mtime_ns == mtime_ns
+    if st.st_size < size:
+        return False
+    if indexed_end == 0:
+        return True
+    f.seek(indexed_end - 1)
+    return f.read(1) == b"\n"
+
+
+def _cache_spans(key: tuple, starts: array) -> None:
+    """放進 sample() 候選行快取；超過 _SPANS_CACHE_MAX_BYTES → 從最久沒用的開始丟"""
+    global _SPANS_CACHE_BYTES
+    nbytes = starts.itemsize * len(starts)
+    if nbytes > _SPANS_CACHE_MAX_BYTES:
+        return
+    with _SPANS_LOCK:
+        old = _SPANS_CACHE.pop(key, None)
+        if old is not None:
+            _SPANS_CACHE_BYTES -= old.itemsize * len(old)
+        _SPANS_CACHE[key] = starts
+        _SPANS_CACHE_BYTES += nbytes
+        while _SPANS_CACHE_BYTES > _SPANS_CACHE_MAX_BYTES:
+            _, dropped = _SPANS_CACHE.popitem(last=False)
+            _SPANS_CACHE_BYTES -= dropped.itemsize * len(dropped)
+
+
+def _matches(rec: Dict[str, Any], type_set: Optional[set], source_set: Optional[set]) -> bool:
+    if type_set is not None and (rec.get("event_type") or rec.get("type")) not in type_set:
+        return False
+    if source_set is not None and rec.get("source") not in source_set:
+        return False
+    return True
+
+
+def _day_weight(info: Any, type_set: Optional[set], source_set: Optional[set]) -> float:
+    """該日符合條件的 event 數（估計）：count × type 比例 × source 比例；舊 stats 沒有分項 → count"""
+    if not isinstance(info, dict):
+        return 0.0
+    count = info.get("count", 0)
+    if not isinstance(count, int) or count <= 0:
+        return 0.0
+    w = float(count)
+    for names, field in ((type_set, "types"), (source_set, "sources")):
+        by = info.get(field)
+        if names is not None and isinstance(by, dict):
+            w *= sum(by.get(x, 0) for x in names) / count
+    return w
+
+
+def _shuffled(n: int, rng: random.Random) -> Iterator[int]:
+    """
+    range(n) 的隨機排列，lazy 產生（稀疏 Fisher–Yates：只記被換過的位置）
+    抽 k 個 → O(k) 時間 / 記憶體，不建 n 長的 list
+    """
+    swapped: Dict[int, int] = {}
+    for i in range(n):
+        j = rng.randrange(i, n)
+        vi, vj = swapped.get(i, i), swapped.get(j, j)
+        swapped[j] = vi
+        swapped.pop(i, None)
+        yield vj
+
+
+def _to_list(v: Optional[Union[str, Sequence[str]]]) -> Optional[List[str]]:
+    if v is None:
+        return None
+    if isinstance(v, str):
+        return [v]
+    return [x for x in v if isinstance(x, str)]
+
+
 def _to_set(v: Optional[Union[str, Sequence[str]]]) -> Optional[set]:
     if v is None:
         return None
@@ -0,0 +1,352 @@
+# aisop/library/library_scan.py
+"""
+Library parallel scan — 把 day 檔分給 process pool，條件在 worker 內過濾
+
+    for rec in scan_library(root, type="governance.decision", start=..., end=...):
+        ...
+    for part in scan_library(root, source="live", reduce_fn=count_by_type, ordered=False):
+        ...   # 每個 task 的部分結果（彙總用）
+
+- 任務：一個 day 檔一個 task；大檔（> split_bytes）依換行切成多段（mmap split）
+- predicate pushdown：
+    1) byte 前置過濾：行內沒有 '"<type>"' / '"<source>"' 的 bytes → 不 decode
+    2) decode 後再逐筆比對 type / source / 時間（前置過濾只負責「少 decode」）
+    3) 時間條件：先依檔名（日期）剔除整天；壓縮檔用 block 的 min/max ts 跳過 block
+- ordered=True ：依時間排序（day 檔依事件字串的日期歸檔，可能含前一天的事件
+  → 相鄰的 day 一起 heap-merge，不只是天內排序）
+  ordered=False：哪個 task 先做完先回（彙總用）
+- 資料量小（< inline_bytes）或 workers=1 → 在目前 process 直接做，不開 pool
+"""
+from __future__ import annotations
+
+import heapq
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import (
+    COMPRESSION_SUFFIX,
+    compression_of,
+    iter_text_lines,
+    record_ts,
+    to_epoch,
+)
+from shared_core.mmap_jsonl import MmapJsonlReader
+
+TimeLike = Union[datetime, float, int, str, None]
+
+# (path, start, end, day)；start/end = None → 整檔
+Task = Tuple[str, Optional[int], Optional[int], str]
+
+
+def _to_tuple(v: Optional[Union[str, Sequence[str]]]) -> Optional[Tuple[str, ...]]:
+    if v is None:
+        return None
+    if isinstance(v, str):
+        return (v,)
+    return tuple(x for x in v if isinstance(x, str))
+
+
+# ------------------------------------------------------------------
+# 任務規劃
+# ------------------------------------------------------------------
+def _iter_day_files(events_root: Path, *, day: Optional[str] = None) -> Iterator[Tuple[str, Path]]:
+    """
+    events/YYYY/MM/YYYY-MM-DD.jsonl（.jsonl.zst / .jsonl.gz 同樣列出）
+    同一天只取一個檔（封存途中 .jsonl 與壓縮檔會短暫並存 → 以 .jsonl 為準）
+    LibraryReader / LibraryIndex / LibraryColumnar / LibraryCompactor 共用這一份規則
+    day：只找該日（不走整個目錄）
+    """
+    patterns = ("", *COMPRESSION_SUFFIX.values())
+    if day is not None:
+        base = events_root / day[:4] / day[5:7] / f"{day}.jsonl"
+        for suffix in patterns:
+            path = base.with_name(base.name + suffix)
+            if path.exists():
+                yield day, path
+                return
+        return
+
+    if not events_root.exists():
+        return
+    for year_dir in sorted(events_root.iterdir()):
+        if not year_dir.is_dir():
+            continue
+        for month_dir in sorted(year_dir.iterdir()):
+            if not month_dir.is_dir():
+                continue
+            files = {}
+            for suffix in patterns:
+                for file in month_dir.glob(f"*.jsonl{suffix}"):
+                    files.setdefault(file.name.split(".jsonl")[0], file)
+            for name in sorted(files):
+                yield name, files[name]
+
+
+def _is_line_start(path: Path, offset: int) -> bool:
+    """checkpoint 前一個 byte 必須是換行（檔案被改寫過就不是）"""
+    if offset == 0:
+        return True
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset - 1)
+            return f.read(1) == b"\n"
+    except OSError:
+        return False
+
+
+def _day_bounds(day: str) -> Optional[Tuple[float, float]]:
+    """
+    day 檔內事件的可能時間範圍 [lo, hi)：檔名日期依事件字串本身的時區 → 前後各放寬一天
+    檔名不是日期 → None
+    """
+    try:
+        d = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return (d - timedelta(days=1)).timestamp(), (d + timedelta(days=2)).timestamp()
+
+
+def _day_in_range(day: str, start_ts: Optional[float], end_ts: Optional[float]) -> bool:
+    if start_ts is None and end_ts is None:
+        return True
+    bounds = _day_bounds(day)
+    if bounds is None:
+        return True
+    lo, hi = bounds
+    if end_ts is not None and lo > end_ts:
+        return False
+    if start_ts is not None and hi < start_ts:
+        return False
+    return True
+
+
+def plan_tasks(
+    events_root: Path,
+    *,
+    days: Optional[Iterable[str]] = None,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+    split_bytes: int = 64 << 20,
+) -> List[Task]:
+    """依日期排序的任務清單；大的未壓縮檔切成多段"""
+    day_set = set(days) if days is not None else None
+    tasks: List[Task] = []
+    for day, path in _iter_day_files(events_root):
+        if day_set is not None and day not in day_set:
+            continue
+        if not _day_in_range(day, start_ts, end_ts):
+            continue
+        size = path.stat().st_size
+        if compression_of(path) or size <= split_bytes:
+            tasks.append((str(path), None, None, day))
+            continue
+        with MmapJsonlReader(path) as r:
+            for a, b in r.split(-(-size // split_bytes)):
+                tasks.append((str(path), a, b, day))
+    return tasks
+
+
+# ------------------------------------------------------------------
+# Worker（top-level → 可 pickle）
+# ------------------------------------------------------------------
+def _iter_task_lines(task: Task, start_ts, end_ts) -> Iterator[bytes]:
+    path, a, b, _ = task
+    if compression_of(path):
+        for line in iter_text_lines(path, start_ts=start_ts, end_ts=end_ts):
+            yield line.encode("utf-8")
+        return
+    with MmapJsonlReader(path) as r:
+        yield from r.iter_lines(a or 0, b)
+
+
+def scan_task(
+    task: Task,
+    types: Optional[Tuple[str, ...]],
+    sources: Optional[Tuple[str, ...]],
+    start_ts: Optional[float],
+    end_ts: Optional[float],
+    ordered: bool,
+    reduce_fn: Optional[Callable[[List[dict]], Any]] = None,
+) -> Any:
+    """
+    在 worker 內掃一個 task
+    回傳：reduce_fn(records)；或 [(ts, record)]（ordered 時依 ts 排序）
+    """
+    loads = get_codec().loads
+    type_needles = _needles(types)
+    source_needles = _needles(sources)
+    type_set = set(types) if types is not None else None
+    source_set = set(sources) if sources is not None else None
+    need_ts = ordered or start_ts is not None or end_ts is not None
+
+    out = []
+    for line in _iter_task_lines(task, start_ts, end_ts):
+        if type_needles is not None and not any(n in line for n in type_needles):
+            continue
+        if source_needles is not None and not any(n in line for n in source_needles):
+            continue
+        try:
+            rec = loads(line)
+        except Exception:
+            continue
+        if not isinstance(rec, dict):
+            continue
+        if type_set is not None and (rec.get("event_type") or rec.get("type")) not in type_set:
+            continue
+        if source_set is not None and rec.get("source") not in source_set:
+            continue
+
+        ts = None
+        if need_ts:
+            ts = record_ts(rec)
+            if start_ts is not None and (ts is None or ts < start_ts):
+                continue
+            if end_ts is not None and (ts is None or ts > end_ts):
+                continue
+        out.append((ts, rec))
+
+    if ordered:
+        out.sort(key=_sort_key)
+    if reduce_fn is not None:
+        return reduce_fn([rec for _, rec in out])
+    return out
+
+
+def _needles(values: Optional[Tuple[str, ...]]) -> Optional[List[bytes]]:
+    """
+    byte 前置過濾用的 needle：值一定以 '"<value>"' 出現在行內
+    含非 ASCII / 引號 / 反斜線的值可能被 escape → 不做前置過濾
+    """
+    if values is None:
+        return None
+    if not all(v.isascii() and v.isprintable() and '"' not in v and "\\" not in v for v in values):
+        return None
+    return [f'"{v}"'.encode("utf-8") for v in values]
+
+
+def _sort_key(item) -> float:
+    ts = item[0]
+    return float("-inf") if ts is None else ts
+
+
+# ------------------------------------------------------------------
+# 對外 API
+# ------------------------------------------------------------------
+def scan_library(
+    library_root: Union[str, Path],
+    *,
+    type: Optional[Union[str, Sequence[str]]] = None,
+    source: Optional[Union[str, Sequence[str]]] = None,
+    start: TimeLike = None,
+    end: TimeLike = None,
+    day: Optional[Union[str, Sequence[str]]] = None,
+    ordered: bool = True,
+    reduce_fn: Optional[Callable[[List[dict]], Any]] = None,
+    workers: Optional[int] = None,
+    split_bytes: int = 64 << 20,
+    inline_bytes: int = 32 << 20,
+) -> Iterator[Any]:
+    """
+    平行掃描 Library
+    - type / source：字串或清單；start / end：datetime（naive 視為 UTC）/ epoch / ISO
+    - reduce_fn：worker 內對每個 task 的紀錄做彙總，yield 每個 task 的部分結果
+      （必須是 top-level 函式，才能送進 process）
+    - 沒有 reduce_fn → yield record（dict）
+    """
+    start_ts, end_ts = to_epoch(start), to_epoch(end)
+    for v, ts in ((start, start_ts), (end, end_ts)):
+        if v is not None and ts is None:
+            raise ValueError(f"scan_library 無法解析的時間：{v!r}")
+    types, sources = _to_tuple(type), _to_tuple(source)
+    days = _to_tuple(day)
+
+    tasks = plan_tasks(
+        Path(library_root) / "events",
+        days=days, start_ts=start_ts, end_ts=end_ts, split_bytes=split_bytes,
+    )
+    if not tasks:
+        return
+
+    workers = workers or os.cpu_count() or 1
+    total = sum(os.path.getsize(t[0]) for t in {t[0]: t for t in tasks}.values())
+    args = (types, sources, start_ts, end_ts, ordered, reduce_fn)
+
+    if workers <= 1 or len(tasks) == 1 or total < inline_bytes:
+        results: Iterable[Any] = (scan_task(t, *args) for t in tasks)
+        yield from _emit(results, tasks, ordered, reduce_fn)
+        return
+
+    workers = min(workers, len(tasks))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = _run_pool(pool, tasks, args, ordered, window=workers * 2)
+        try:
+            yield from _emit(results, tasks, ordered, reduce_fn)
+        finally:
+            results.close()
+
+
+def _run_pool(pool, tasks: List[Any], args, ordered: bool, window: int, fn: Callable = scan_task) -> Iterator[Any]:
+    """同時最多 window 個 task 在跑（結果不會整庫堆在記憶體裡）；fn 預設 scan_task"""
+    todo = iter(tasks)
+    inflight: deque = deque()
+
+    def submit() -> bool:
+        t = next(todo, None)
+        if t is None:
+            return False
+        inflight.append(pool.submit(fn, t, *args))
+        return True
+
+    try:
+        for _ in range(window):
+            if not submit():
+                break
+        while inflight:
+            if ordered:
+                fut = inflight.popleft()            # 依 task 順序
+            else:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                fut = done.pop()
+                inflight.remove(fut)
+            submit()
+            yield fut.result()
+    finally:
+        for f in inflight:
+            f.cancel()
+
+
+def _emit(results: Iterable[Any], tasks: List[Task], ordered: bool, reduce_fn) -> Iterator[Any]:
+    if reduce_fn is not None:
+        yield from results
+        return
+    if not ordered:
+        for part in results:
+            for _, rec in part:
+                yield rec
+        return
+
+    # 每個 task 已依 ts 排序 → 與還沒送出的（carry）heap-merge
+    # 進到新的一天時，carry 裡早於這一天下界（_day_bounds lo）的紀錄之後不會再有更早的 → 先送出
+    carry: List[Any] = []
+    pending_day, parts = None, []
+    for task, part in zip(tasks, results):
+        if task[3] != pending_day and parts:
+            carry = list(heapq.merge(carry, *parts, key=_sort_key))
+            parts = []
+            bounds = _day_bounds(task[3])
+            if bounds is not None:
+                cut = 0
+                while cut < len(carry) and _sort_key(carry[cut]) < bounds[0]:
+                    cut += 1
+                for _, rec in carry[:cut]:
+                    yield rec
+                del carry[:cut]
+        pending_day = task[3]
+        parts.append(part)
+    for _, rec in heapq.merge(carry, *parts, key=_sort_key):
+        yield rec
@@ -1,57 +1,318 @@
 # aisop/library/library_writer.py
 from pathlib import Path
-import json
+import atexit
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from functools import lru_cache
 import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
 from library.library_event import LibraryEvent
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import COMPRESSION_SUFFIX, index_path, iter_text_lines
+from shared_core.event_raw.ts_index import ts_index_path
+
+
+# ------------------------------------------------------------------
+# Day bucketing
+# ------------------------------------------------------------------
+@lru_cache(maxsize=4096)
+def _epoch_day(day_number: int) -> str:
+    return datetime.fromtimestamp(day_number * 86400, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def day_of(ts: Union[str, float, int]) -> str:
+    """
+    事件時間 → 'YYYY-MM-DD'（不建 datetime）
+    - epoch 秒：UTC 日期，同一天只算一次
+    - ISO-8601：直接取日期部分（與 fromisoformat(ts).strftime 相同，依字串本身的時區）
+    """
+    if isinstance(ts, str):
+        if len(ts) >= 10 and ts[4] == "-" and ts[7] == "-":
+            return ts[:10]
+        return datetime.fromisoformat(ts).strftime("%Y-%m-%d")
+    return _epoch_day(int(ts // 86400))
+
 
 class LibraryWriter:
     """
-    Library Writer v1
+    Library Writer v2
     =================
     - Append-only
-    - Input: PBEvent (validated)
-    - Output: daily jsonl
+    - Input: LibraryEvent
+    - Output: daily jsonl（events/YYYY/MM/YYYY-MM-DD.jsonl）
+
+    v2：
+    - 每天的檔案 handle 開一次，LRU 快取（max_open_files），不再每筆 open / close
+    - 每天的目錄只 mkdir 一次
+    - write_many：依天分組，一天一次 write（灌庫用）；回傳前已 flush 到 OS → 讀取端立刻看得到
+    - write_event：先進 buffer，滿 buffer_events 筆或距第一筆超過 flush_interval 秒才走同一條分組寫入
+      （逐筆事件流用；要立刻看得到 → flush()；release / hold / close 也會先寫出 buffer）
+    - 同一個 library_root 請用 get_library_writer() 共用一個實例（同一把 lock）
+    - 該日已被壓實成 .jsonl.gz / .zst → 第一次寫入先解壓回 .jsonl（同一天只會有一個檔）
+      解壓在全域 lock 外、只持有該日的 lock → 不擋其他天的寫入
     """
 
-    def __init__(self, library_root: Path):
-        self.library_root = library_root
-        self.events_dir = library_root / "events"
+    def __init__(
+        self,
+        library_root: Path,
+        *,
+        max_open_files: int = 16,
+        buffer_events: int = 256,
+        flush_interval: float = 0.5,
+    ):
+        self.library_root = Path(library_root)
+        self.events_dir = self.library_root / "events"
+        self.max_open_files = max(1, max_open_files)
+        self.buffer_events = max(1, buffer_events)
+        self.flush_interval = flush_interval
 
         self.events_dir.mkdir(parents=True, exist_ok=True)
 
         self._lock = threading.Lock()
+        self._handles: "OrderedDict[str, object]" = OrderedDict()   # day → file（LRU）
+        self._paths: Dict[str, Path] = {}                            # day → 檔案路徑（目錄已建立）
+        self._day_locks: Dict[str, threading.Lock] = {}              # day → 還原壓實檔用的 lock
+
+        # write_event 的 buffer：day → 已編碼的行（同一天維持輸入順序）
+        self._pending: Dict[str, List[str]] = {}
+        self._pending_n = 0
+        self._pending_since = 0.0
+
+        self.events_written = 0
+        self.writes = 0
+
+        atexit.register(self.close)
 
         print(f"[LibraryWriter] 📚 Library ready at {self.events_dir}")
 
+    # -------------------------------------------------
+    # 路徑 / handle
+    # -------------------------------------------------
+    def path_for_day(self, day: str) -> Path:
+        path = self._paths.get(day)
+        if path is None:
+            dir_path = self.events_dir / day[:4] / day[5:7]
+            dir_path.mkdir(parents=True, exist_ok=True)
+            path = self._paths[day] = dir_path / f"{day}.jsonl"
+        return path
 
+    def _handle(self, day: str):
+        """呼叫端需持有 self._lock"""
+        f = self._handles.get(day)
+        if f is not None:
+            self._handles.move_to_end(day)
+            return f
+
+        while len(self._handles) >= self.max_open_files:
+            _, old = self._handles.popitem(last=False)
+            old.close()
+
+        path = self.path_for_day(day)
+        if not path.exists():
+            # 罕見：_prepare_day 之後又被壓實 → 只好在 lock 內補還原
+            self._restore_compacted(path)
+        f = open(path, "ab")
+        self._handles[day] = f
+        return f
+
+    def _prepare_day(self, day: str) -> None:
+        """
+        寫入前（不持有 self._lock）：該日只剩壓實檔 → 先還原成 .jsonl
+        同一天的還原由該日的 lock 排隊；其他天照常寫入
+        """
+        if day in self._handles:
+            return
+        path = self.path_for_day(day)
+        if path.exists():
+            return
+        lock = self._day_locks.get(day)
+        if lock is None:
+            lock = self._day_locks.setdefault(day, threading.Lock())
+        with lock:
+            if not path.exists():
+                self._restore_compacted(path)
+
+    @staticmethod
+    def _restore_compacted(path: Path) -> None:
+        """
+        該日已被壓實 / 封存成 .jsonl.zst / .jsonl.gz → 先解壓回 .jsonl 再 append
+        讀取端與索引同一天只取一個檔（.jsonl 優先）；直接開新的 .jsonl 會讓整天其他資料讀不到
+        下次 LibraryCompactor 會再把它壓回去
+        """
+        packed = [path.with_name(path.name + x) for x in COMPRESSION_SUFFIX.values()]
+        packed = [p for p in packed if p.exists()]
+        if not packed:
+            return
+        tmp = path.with_name(f"{path.name}.restore.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for src in packed:
+                for line in iter_text_lines(src):
+                    f.write(line if line.endswith("\n") else line + "\n")
+        try:
+            os.link(tmp, path)      # 不覆蓋：別的 process 已經先還原（可能也寫了新行）→ 用它的
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink(missing_ok=True)
+        for src in packed:
+            src.unlink(missing_ok=True)
+            index_path(src).unlink(missing_ok=True)
+            ts_index_path(src).unlink(missing_ok=True)
+        print(f"[LibraryWriter] ♻ {', '.join(p.name for p in packed)} restored to {path.name} for late writes")
+
+    # -------------------------------------------------
+    # 寫入
+    # -------------------------------------------------
     def write_event(self, event: LibraryEvent):
         if not isinstance(event, LibraryEvent):
             raise TypeError("LibraryWriter only accepts LibraryEvent")
 
         # ✅ 使用事件本身時間（不是 now）
-        ts = datetime.fromisoformat(event.ts)
+        day = day_of(event.ts)
+        line = get_codec().encode_library_event(event)
+        self._prepare_day(day)
+
+        # ✅ thread-safe：進 buffer，滿了 / 放太久才寫出
+        with self._lock:
+            if not self._pending_n:
+                self._pending_since = time.monotonic()
+            self._pending.setdefault(day, []).append(line)
+            self._pending_n += 1
+            if (
+                self._pending_n >= self.buffer_events
+                or time.monotonic() - self._pending_since >= self.flush_interval
+            ):
+                self._drain()
 
-        year = ts.strftime("%Y")
-        month = ts.strftime("%m")
-        day = ts.strftime("%Y-%m-%d")
+    def write_many(self, events: Iterable[LibraryEvent]) -> int:
+        """
+        批次 append：編碼在 lock 外完成，每天的檔案只 write + flush 一次
+        同一天內維持輸入順序；回傳寫入筆數
+        """
+        n, _ = self._write_grouped(events)
+        return n
+
+    def append_many(self, events: Iterable[LibraryEvent]) -> Dict[str, Tuple[Path, int, int]]:
+        """
+        同 write_many；回傳每天的 (檔案, 寫完後的 byte 位置, 這次寫入的 bytes)
+        這次的資料 = [end - nbytes, end)；中間夾了別的 writer 的資料 → end - nbytes 會大於呼叫端記得的檔尾
+        """
+        _, spans = self._write_grouped(events)
+        return spans
 
-        # ✅ 年 / 月 目錄
-        dir_path = self.events_dir / year / month
-        dir_path.mkdir(parents=True, exist_ok=True)
+    def _write_grouped(self, events: Iterable[LibraryEvent]) -> Tuple[int, Dict[str, Tuple[Path, int, int]]]:
+        groups: Dict[str, List[str]] = {}
+        n = 0
+        encode = get_codec().encode_library_event     # 與 event.to_json() 相同，codec 只查一次
+        for event in events:
+            if not isinstance(event, LibraryEvent):
+                raise TypeError("LibraryWriter only accepts LibraryEvent")
+            groups.setdefault(day_of(event.ts), []).append(encode(event))
+            n += 1
 
-        path = dir_path / f"{day}.jsonl"
+        spans: Dict[str, Tuple[Path, int, int]] = {}
+        if not n:
+            return 0, spans
 
-        # ✅ thread-safe append
+        for day in groups:
+            self._prepare_day(day)
         with self._lock:
-            with open(path, "a", encoding="utf-8") as f:
-                f.write(event.to_json() + "\n")
+            self._drain()          # write_event 還在 buffer 的先寫 → 同一天維持呼叫順序
+            spans = self._append_groups(groups)
+            self.events_written += n
+        return n, spans
+
+    def _append_groups(self, groups: Dict[str, List[str]]) -> Dict[str, Tuple[Path, int, int]]:
+        """呼叫端需持有 self._lock：每天 write + flush 一次"""
+        spans: Dict[str, Tuple[Path, int, int]] = {}
+        for day, lines in groups.items():
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            f = self._handle(day)
+            f.write(data)
+            f.flush()
+            spans[day] = (self.path_for_day(day), f.tell(), len(data))   # O_APPEND → tell = 實際檔尾
+            self.writes += 1
+        return spans
 
-    # === 預留擴充（現在不啟用） ===
+    def _drain(self) -> None:
+        """呼叫端需持有 self._lock：把 write_event 的 buffer 寫出"""
+        if not self._pending_n:
+            return
+        pending, n = self._pending, self._pending_n
+        self._pending, self._pending_n = {}, 0
+        self._append_groups(pending)
+        self.events_written += n
 
     def flush(self):
+        """寫出 write_event 的 buffer（write_many 回傳前已 flush）"""
+        with self._lock:
+            self._drain()
+            for f in self._handles.values():
+                f.flush()
+
+    def release(self, day: str = None):
+        """
+        關閉 handle（day=None → 全部）
+        compaction / 搬檔前呼叫（Windows 上開著的檔案不能 rename）；下次寫入會自動重開
+        """
+        with self._lock:
+            self._drain()
+            days = list(self._handles) if day is None else [day]
+            for d in days:
+                f = self._handles.pop(d, None)
+                if f is not None:
+                    f.close()
+
+    @contextmanager
+    def hold(self, day: str):
         """
-        v1 不需要 flush（每次 write 即落盤）
-        v2 可升級為 buffer / batch
+        暫停寫入該日（compaction 換檔用）：持有 lock + 關掉 handle
+        with 區塊內本 process 的寫入都會等；離開後下次寫入重開新檔
         """
-        pass
+        with self._lock:
+            self._drain()
+            f = self._handles.pop(day, None)
+            if f is not None:
+                f.close()
+            yield
+
+    def close(self):
+        self.release()
+
+    def stats(self) -> dict:
+        return {
+            "events_written": self.events_written,
+            "writes": self.writes,
+            "open_files": len(self._handles),
+            "pending": self._pending_n,
+        }
+
+
+# ------------------------------------------------------------------
+# 共用實例：同一個 library_root 在同一個 process 只有一個 writer
+# ------------------------------------------------------------------
+_instances: Dict[Path, LibraryWriter] = {}
+_instances_lock = threading.Lock()
+
+
+def find_library_writer(library_root: Path) -> Optional[LibraryWriter]:
+    """已存在的共用 writer（不建立新的）；compaction 用來暫停同 process 的寫入"""
+    with _instances_lock:
+        return _instances.get(Path(library_root).resolve())
+
+
+def get_library_writer(library_root: Path, **kwargs) -> LibraryWriter:
+    """
+    取得 library_root 對應的共用 LibraryWriter（第一次呼叫時建立）
+    PandoraRuntime 的 fast_bus sink、灌庫、治理決策落盤都用同一個 → 同一把 lock、同一組 handle
+    """
+    key = Path(library_root).resolve()
+    with _instances_lock:
+        writer = _instances.get(key)
+        if writer is None:
+            writer = _instances[key] = LibraryWriter(library_root, **kwargs)
+        return writer
@@ -1,9 +1,10 @@
 # library/replay/library_replay_source.py
 
-import json
 from pathlib import Path
 from typing import Iterator, Dict, Any
 
+from shared_core.codec import get_codec
+
 class LibraryReplaySource:
     """
     Library → Replay 專用讀取器（只讀）
@@ -14,6 +15,7 @@ class LibraryReplaySource:
 
     def __init__(self, library_root: Path):
         self.library_root = Path(library_root)
+        self.codec = get_codec()
 
     def iter_day(self, day: str) -> Iterator[Dict[str, Any]]:
         """
@@ -28,7 +30,7 @@ class LibraryReplaySource:
         with open(path, "r", encoding="utf-8") as f:
             for line in f:
                 try:
-                    yield json.loads(line)
+                    yield self.codec.loads(line)
                 except Exception:
                     continue
 
@@ -1,6 +1,11 @@
-
 from shared_core.pb_lang.pb_event_validator import PBEventValidator
 from shared_core.event_schema import PBEvent
+from shared_core.event.parallel_dispatch import (
+    DISPATCH_MODES,
+    ShardedDispatcher,
+    accepts_batch,
+    key_by_type,
+)
 
 class EventBus:
     """
@@ -8,34 +13,126 @@ class EventBus:
     - subscribe(event_type, callback)
     - emit(event_type, data)
     - publish(PBEvent)  ← PB-Lang 專用入口
+    - publish_many / emit_many ← 批次入口（@batch_handler 收到 list[payload]）
+
+    Dispatch：
+    - 預設 inline（emit 的 thread 直接呼叫 callback）
+    - enable_parallel_dispatch() 後改由 ShardedDispatcher 派送（per-key 保序）
     """
 
     def __init__(self, validator: PBEventValidator | None = None) -> None:
         self.listeners: dict[str, list] = {}
         self.validator = validator or PBEventValidator()
+        self._modes: dict = {}          # callback → ordered / unordered / exclusive
+        self._dispatcher: ShardedDispatcher | None = None
+
+    # ------------------------------
+    # 平行派送（可選）
+    # ------------------------------
+    def enable_parallel_dispatch(self, workers: int = 4, *, key=key_by_type, **queue_opts):
+        """queue_opts：maxsize / overflow / lane_policy（見 ShardedDispatcher）"""
+        if self._dispatcher is None:
+            self._dispatcher = ShardedDispatcher(
+                workers, key=key, name="bus", on_error=self._on_dispatch_error, **queue_opts
+            )
+        return self._dispatcher
+
+    def queue_depth(self) -> int:
+        return self._dispatcher.queue_depth() if self._dispatcher else 0
+
+    def dispatch_stats(self) -> list:
+        return self._dispatcher.stats() if self._dispatcher else []
+
+    def drain(self, timeout: float | None = None) -> bool:
+        return self._dispatcher.drain(timeout) if self._dispatcher else True
+
+    def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+            self._dispatcher = None
 
     # ------------------------------
     # 事件訂閱
     # ------------------------------
-    def subscribe(self, event_type: str, callback):
+    def subscribe(self, event_type: str, callback, mode: str | None = None):
+        if mode is not None:
+            if mode not in DISPATCH_MODES:
+                raise ValueError(f"Unknown dispatch mode: {mode}")
+            self._modes[callback] = mode
         self.listeners.setdefault(event_type, []).append(callback)
 
     # ------------------------------
     # 事件廣播（已經是乾淨的 payload）
     # ------------------------------
-    def emit(self, event_type: str, data=None):
-        for cb in self.listeners.get(event_type, []):
+    def emit(self, event_type: str, data=None, *, priority: int | None = None):
+        callbacks = self.listeners.get(event_type)
+        if not callbacks:
+            return
+
+        if self._dispatcher is not None:
+            self._dispatcher.dispatch(
+                event_type, data, tuple(callbacks), data, self._modes, priority=priority
+            )
+            return
+
+        for cb in callbacks:
             try:
-                cb(data)
+                if accepts_batch(cb):
+                    cb([data])      # batch callback 永遠收到 list
+                else:
+                    cb(data)
             except Exception as e:
-                import traceback
-                print("\n" + "=" * 80)
-                print(f"[EVENT ERROR] type = {event_type}")
-                print(f"[EVENT ERROR] callback = {cb}")
-                print(f"[EVENT ERROR] payload = {repr(data)}")
-                print("[EVENT ERROR] traceback:")
-                traceback.print_exc()
-                print("=" * 80 + "\n")
+                self._report_error(event_type, cb, data)
+
+    def emit_many(self, event_type: str, datas: list, *, priority: int | None = None):
+        """
+        批次廣播同型別 payload：
+        - accepts_batch callback 收到整批 list
+        - 其餘 callback 逐筆呼叫（錯誤處理同 emit）
+        """
+        callbacks = self.listeners.get(event_type)
+        if not callbacks or not datas:
+            return
+
+        if self._dispatcher is not None:
+            self._dispatcher.dispatch_batch(
+                event_type, datas, tuple(callbacks), datas, self._modes, priority=priority
+            )
+            return
+
+        for cb in callbacks:
+            if accepts_batch(cb):
+                try:
+                    cb(datas)
+                except Exception:
+                    self._report_error(event_type, cb, datas)
+                continue
+            for data in datas:
+                try:
+                    cb(data)
+                except Exception:
+                    self._report_error(event_type, cb, data)
+
+    @staticmethod
+    def _report_error(event_type, cb, data):
+        import traceback
+        print("\n" + "=" * 80)
+        print(f"[EVENT ERROR] type = {event_type}")
+        print(f"[EVENT ERROR] callback = {cb}")
+        print(f"[EVENT ERROR] payload = {repr(data)}")
+        print("[EVENT ERROR] traceback:")
+        traceback.print_exc()
+        print("=" * 80 + "\n")
+
+    @staticmethod
+    def _on_dispatch_error(cb, data, exc):
+        import traceback
+        print("\n" + "=" * 80)
+        print(f"[EVENT ERROR] callback = {cb}")
+        print(f"[EVENT ERROR] payload = {repr(data)}")
+        print("[EVENT ERROR] traceback:")
+        traceback.print_exception(exc)
+        print("=" * 80 + "\n")
 
     # ------------------------------
     # PB-Lang 事件入口
@@ -47,4 +144,33 @@ class EventBus:
         2. 檢查通過後，再把 payload 廣播出去
         """
         validated = self.validator.validate(event)
-        self.emit(validated.type, validated.payload)
\ No newline at end of file
+        self.emit(validated.type, validated.payload, priority=validated.priority)
+
+    def publish_many(self, events) -> int:
+        """
+        批次 PB-Lang 入口：逐筆驗證後，連續同型別、同 priority 的事件合併成一次 emit_many
+        （priority 決定 lane：高 priority 的事件不會被併進前一筆的 bulk lane）
+        回傳：廣播的事件數
+        """
+        validate = self.validator.validate
+        count = 0
+        run_type = None
+        run_payloads: list = []
+        run_priority = None
+
+        for event in events:
+            validated = validate(event)
+            if validated is None:
+                continue
+            if validated.type != run_type or validated.priority != run_priority:
+                if run_payloads:
+                    self.emit_many(run_type, run_payloads, priority=run_priority)
+                run_type = validated.type
+                run_payloads = []
+                run_priority = validated.priority
+            run_payloads.append(validated.payload)
+            count += 1
+
+        if run_payloads:
+            self.emit_many(run_type, run_payloads, priority=run_priority)
+        return count
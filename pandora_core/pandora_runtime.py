@@ -261,8 +261,13 @@ class PandoraRuntime:
 
         print(f"[PandoraRuntime] 🧊 Storage(HOT) = {hot_path}")
 
-        # ★ 全系統唯一 EventLogWriter
-        self.event_log_writer = EventLogWriter(str(hot_path))
+        # ★ 全系統唯一 EventLogWriter（分段寫入，roll 條件同 rotate policy）
+        rotate_cfg = cfg["event_raw"].get("rotate", {})
+        self.event_log_writer = EventLogWriter(
+            str(hot_path),
+            segment_max_mb=float(rotate_cfg.get("max_mb", 256)),
+            segment_max_age_sec=float(rotate_cfg.get("max_age_minutes", 0)) * 60,
+        )
         from shared_core.event.event_trace import EventTracer
 
         self.event_tracer = EventTracer()
@@ -291,18 +296,25 @@ class PandoraRuntime:
 
 
         # === Library Writer（被動記憶層）===
-        from library.library_writer import LibraryWriter
+        from library.library_writer import get_library_writer
         from library.ingest.replay_ingestor import LibraryIngestor
 
-        self.library = LibraryWriter(Path(base_dir) / "library")
+        # process 共用實例（DecisionPersistenceHandler 也寫同一個 library）
+        self.library = get_library_writer(Path(base_dir) / "library")
+
+        from library.library_event import LibraryEvent
 
         def _library_sink(ev):
             try:
+                # fast_bus 送的是 PBEvent → 昇華為 LibraryEvent 再落盤
+                if isinstance(ev, PBEvent):
+                    ev = LibraryEvent.from_pbevent(ev)
                 self.library.write_event(ev)
             except Exception as e:
                 print("[Library] ❌ write failed:", e)
 
         # 只接 fast_bus（代表事件已經乾淨）
+        # ⭐ ZeroCopyEventBus 路由表支援 "*"，所有 fast_bus 事件都會進 Library
         self.fast_bus.subscribe("*", _library_sink)
         self.library_ingestor = LibraryIngestor(self.library)
 # ReplayRuntime 內把 ingestor 傳下去
@@ -321,7 +333,10 @@ class PandoraRuntime:
 
         # 2️⃣ 啟動 Live Market Tick Provider（🔥 關鍵）
         if live_provider is not None:
-            live_provider.start(callback=self.fast_bus.publish)
+            live_provider.start(
+                callback=self.fast_bus.publish,
+                batch_callback=self.fast_bus.publish_many,
+            )
             self.live_market_tick_provider = live_provider
 
             print(
@@ -582,7 +597,9 @@ class PandoraRuntime:
                 ),
                 archive_policy=ArchivePolicy(
                     keep_warm_days=int(archive_cfg.get("keep_warm_days", 7)),
+                    compression=str(archive_cfg.get("compression", "auto")),
                 ),
+                writer=getattr(self, "event_log_writer", None),   # ★ active segment 超過 policy 時請 writer roll
             )
 
         except Exception as e:
@@ -648,15 +665,23 @@ class PandoraRuntime:
         from pandora_core.perception_audit.auditor_runtime import PerceptionSafetyAuditor
         from pandora_core.perception_audit.scheduler import run_audit_loop
         from shared_core.event_raw.event_log_reader import EventLogReader
+        from shared_core.tail_follow import JsonlFollower
 
         # 只讀 RAW EVENT
-        reader = EventLogReader(
-            path=Path(self.base_dir) / "event_raw" / "logs.jsonl"
+        raw_path = Path(self.base_dir) / "event_raw" / "logs.jsonl"
+        reader = EventLogReader(path=raw_path)
+
+        # 每輪只讀新 append 的事件；游標跨重啟保留
+        follower = JsonlFollower(
+            raw_path,
+            cursor_path=raw_path.parent / "cursors" / "perception_auditor.json",
+            from_start=False,
         )
 
         auditor = PerceptionSafetyAuditor(
             llm_client=self.manager.get_auditor_llm(),  # Claude mini
-            raw_event_reader=reader
+            raw_event_reader=reader,
+            follower=follower,
         )
 
         # 交給 scheduler（內部 sleep 30 分鐘）
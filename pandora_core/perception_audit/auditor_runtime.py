@@ -1,18 +1,33 @@
-from datetime import datetime, timedelta
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from .auditor_prompt import AUDITOR_SYSTEM_PROMPT
 from .auditor_schema import AUDIT_SCHEMA
 
 class PerceptionSafetyAuditor:
 
-    def __init__(self, llm_client, raw_event_reader):
+    def __init__(self, llm_client, raw_event_reader, follower=None, window_minutes: int = 30):
+        """
+        follower: shared_core.tail_follow.JsonlFollower（可選）
+            有 follower → 每輪只讀新 append 的事件，維護 window_minutes 的滑動視窗
+            沒有        → 每輪用 reader.load(start, end) 重讀整個視窗（舊行為）
+        """
         self.llm = llm_client          # Claude mini client
         self.reader = raw_event_reader # 只讀 raw logs
+        self.follower = follower
+        self.window = timedelta(minutes=window_minutes)
+
+        self._events = deque()         # (ts, event)，依寫入順序
+        self._seeded = False
 
     async def run_audit(self):
         end = datetime.utcnow()
-        start = end - timedelta(minutes=30)
+        start = end - self.window
 
-        events = self.reader.load(start, end)
+        if self.follower is not None:
+            events = await asyncio.to_thread(self._window_events, start, end)
+        else:
+            events = self.reader.load(start, end)
 
         summary = self._build_summary(events)
 
@@ -24,6 +39,42 @@ class PerceptionSafetyAuditor:
 
         self._store_report(result)
 
+    def _window_events(self, start, end):
+        """follower 模式：新事件加進滑動視窗，過期的從前面丟掉"""
+        if not self._seeded:
+            self._seeded = True
+            # 視窗內、follower 游標之前的事件一次讀進來（重啟接著舊游標時也一樣）；
+            # 讀到游標為止 → 與之後 poll 的事件不重疊
+            until = self.follower.position()
+            if until is not None:
+                self._extend(self.reader.load(start, end, until=until))
+
+        # 一輪可能 append 超過 follower 單次 poll 的量 → 讀到沒有新資料為止
+        while True:
+            batch = self.follower.poll()
+            if not batch:
+                break
+            self._extend(batch)
+            self._trim(start)
+
+        self._trim(start)
+        return [ev for ts, ev in self._events if ts <= end]
+
+    def _trim(self, start):
+        q = self._events
+        while q and q[0][0] < start:
+            q.popleft()
+
+    def _extend(self, events):
+        for ev in events:
+            try:
+                ts = datetime.fromisoformat(ev["timestamp"])
+            except Exception:
+                continue
+            if ts.tzinfo is not None:
+                ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+            self._events.append((ts, ev))
+
     def _build_summary(self, events):
         return {
             "total_events": len(events),
@@ -1,7 +1,9 @@
 # pandora_core/replay_runtime.py
 
+import os
 from pathlib import Path
 from shared_core.replay.replay_engine import ReplayEngine
+from shared_core.compressed_jsonl import compression_of
 from library.replay.library_replay_source import LibraryReplaySource
 import time
 
@@ -46,6 +48,7 @@ class ReplayRuntime:
         progress_cb=None,
         ignore_timestamp: bool = False,
         type_filter: set[str] | None = None,
+        workers: int | None = None,
     ) -> int:
         """
         從任意 jsonl 檔 replay
@@ -57,6 +60,7 @@ class ReplayRuntime:
             progress_cb: 每 N 筆回呼
             ignore_timestamp: True = 不依時間 sleep
             type_filter: 只 replay 特定 event type
+            workers: >= 2 → 平行 decode（process pool），順序不變
         """
         return self.engine.replay(
             path=path,
@@ -65,6 +69,7 @@ class ReplayRuntime:
             progress_cb=progress_cb,
             ignore_timestamp=ignore_timestamp,
             type_filter=type_filter,
+            workers=workers,
         )
 
     # ============================================================
@@ -78,8 +83,13 @@ class ReplayRuntime:
     ) -> int:
         """
         Replay HOT layer（目前運行中的事件）
+        HOT 是分段 log，ReplayEngine 依序讀全部 segment（含 writer 正在寫的那個）
         """
-        hot_file = self.runtime.storage.hot_file
+        writer = getattr(self.runtime, "event_log_writer", None)
+        if writer is not None:
+            hot_file = writer.filepath
+        else:
+            hot_file = self.runtime.storage.hot_file
         return self.replay_file(hot_file, speed=speed, **kwargs)
 
     def replay_warm(
@@ -106,26 +116,45 @@ class ReplayRuntime:
     ):
         """
         Replay 檔案並灌入 Library（不走 EventBus）
+        - target="library" 且不模擬時間（speed=0）→ bulk pipeline（平行 decode / 轉換 → 批次寫入）
+        - 其他 → ReplayEngine.replay 逐筆
+        兩條路徑都會跳過 Library 裡已有的 event_id → 同一批 warm 檔重灌是安全的
 
         Returns:
             (count, stats)
         """
-        if not getattr(self.runtime, "library_ingestor", None):
+        ingestor = getattr(self.runtime, "library_ingestor", None)
+        if not ingestor:
             raise RuntimeError("LibraryIngestor not attached to runtime")
 
         print(f"[ReplayRuntime] 📚 ingest_to_library: {path}")
 
-        count = self.engine.replay(
-            path=path,
-            target=target,        # library / both
-            speed=speed,
-            limit=limit,
+        p = Path(path)
+        bulk = (
+            target == "library"
+            and not speed
+            and hasattr(ingestor, "ingest_file")
+            and (p.suffix.lower() in (".jsonl", ".log") or compression_of(p))
         )
+        if bulk:
+            count = ingestor.ingest_file(
+                p,
+                limit=limit,
+                convert_raw=lambda raw: self.engine._raw_to_event(raw, key=self.engine.default_key),
+            )
+        else:
+            count = self.engine.replay(
+                path=path,
+                target=target,        # library / both
+                speed=speed,
+                limit=limit,
+            )
 
         stats = {
             "path": str(path),
             "events": count,
             "target": target,
+            "ingest": self.runtime.library_ingestor.get_stats(),
         }
 
         return count, stats
@@ -174,12 +203,14 @@ class ReplayRuntime:
         limit: int | None = None,
         progress_cb=None,
         type_filter: set[str] | None = None,
+        workers: int | None = None,
     ) -> int:
         """
         🔒 Library 灌庫專用模式
         - 不 sleep
         - 忽略 timestamp
         - 不依賴真實時間
+        - decode 平行化（workers 預設 = CPU 數；順序不變）
         """
         return self.replay_file(
             path=path,
@@ -188,6 +219,7 @@ class ReplayRuntime:
             progress_cb=progress_cb,
             ignore_timestamp=True,
             type_filter=type_filter,
+            workers=workers if workers is not None else os.cpu_count(),
         )
 
     def replay_stress(
@@ -210,7 +242,7 @@ class ReplayRuntime:
     def _collect_replay_files(self):
         """
         從 raw_root 底下收集所有可 replay 的檔案
-        支援 csv / jsonl
+        支援 csv / jsonl / COLD 壓縮 jsonl（.jsonl.zst / .jsonl.gz）
         """
         raw_root = Path(self.raw_root)
 
@@ -218,7 +250,7 @@ class ReplayRuntime:
             return []
 
         files = []
-        for ext in ("*.jsonl", "*.csv"):
+        for ext in ("*.jsonl", "*.jsonl.zst", "*.jsonl.gz", "*.csv"):
             files.extend(raw_root.rglob(ext))
 
         files.sort()
@@ -0,0 +1,59 @@
+"""
+Library compaction（已結束的日 → 依時間排序、去重、可選壓縮，之後重建索引）
+
+    python scripts/ops/library_compact.py [library_root]           # 壓實所有待處理的日一次
+    python scripts/ops/library_compact.py --compress gzip          # 輸出分塊壓縮檔（gzip / zstd）
+    python scripts/ops/library_compact.py --day 2025-09-01         # 只做指定的日（可重複）
+    python scripts/ops/library_compact.py --watch [秒]             # 背景定期執行（預設 3600 秒）
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from library.library_compactor import LibraryCompactor
+
+
+def main(argv):
+    interval = None
+    compression = None
+    days = []
+    args = []
+    for i, a in enumerate(argv):
+        prev = argv[i - 1] if i else None
+        if a == "--watch":
+            interval = 3600.0
+        elif a.startswith("--"):
+            continue
+        elif prev == "--watch":
+            interval = float(a)
+        elif prev == "--compress":
+            compression = a
+        elif prev == "--day":
+            days.append(a)
+        else:
+            args.append(a)
+    library_root = Path(args[0]) if args else ROOT / "library"
+
+    compactor = LibraryCompactor(library_root, compression=compression)
+    if interval is not None:
+        try:
+            compactor.watch(interval)
+        except KeyboardInterrupt:
+            print("[LibraryCompactor] 🛑 stopped")
+        return
+
+    results = compactor.run(days or None)
+    for r in results:
+        print(
+            f"[LibraryCompactor] {r['day']}: {r['status']} "
+            f"({r['events']} events, -{r['duplicates']} dup, {r['bad_lines']} bad, "
+            f"{r['bytes_before']} → {r['bytes_after']} bytes)"
+        )
+    print(f"[LibraryCompactor] ✅ {sum(r['status'] == 'compacted' for r in results)}/{len(results)} days compacted")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
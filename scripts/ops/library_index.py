@@ -0,0 +1,72 @@
+"""
+Library index 維護
+
+    python scripts/ops/library_index.py [library_root]  # 增量更新一次
+    python scripts/ops/library_index.py --full          # 全部重建
+    python scripts/ops/library_index.py --watch [秒]    # 持續增量更新
+    python scripts/ops/library_index.py --legacy        # 另外寫出 v1 by_type / by_source / by_day.json
+    python scripts/ops/library_index.py --columnar      # 一併同步欄式副本（LibraryReader.query 用）
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import threading
+
+from library.index.library_index import LibraryIndex
+from library.library_columnar import LibraryColumnar
+
+
+def main(argv):
+    interval = None
+    args = []
+    for i, a in enumerate(argv):
+        if a == "--watch":
+            interval = 5.0
+        elif a.startswith("--"):
+            continue
+        elif i and argv[i - 1] == "--watch":
+            interval = float(a)
+        else:
+            args.append(a)
+    library_root = Path(args[0]) if args else ROOT / "library"
+
+    idx = LibraryIndex(library_root, legacy_postings="--legacy" in argv)
+    columnar = LibraryColumnar(library_root) if "--columnar" in argv else None
+
+    if interval is not None:
+        stop = threading.Event()
+        if columnar is not None:
+            threading.Thread(target=_sync_loop, args=(columnar, interval, stop), daemon=True).start()
+        try:
+            idx.watch(interval, stop_event=stop)
+        except KeyboardInterrupt:
+            stop.set()
+            print("[LibraryIndex] 🛑 stopped")
+        return
+
+    full = "--full" in argv
+    n = idx.build(full=full)
+    idx.flush()
+    print(f"[LibraryIndex] ✅ indexed {n} new events, total {idx.stats['summary']['total_events']}")
+    if columnar is not None:
+        rows = columnar.sync(full=full)
+        print(f"[LibraryColumnar] ✅ wrote {rows} new rows ({columnar.fmt})")
+
+
+def _sync_loop(columnar: LibraryColumnar, interval: float, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            rows = columnar.sync()
+            if rows:
+                print(f"[LibraryColumnar] ➕ {rows} new rows")
+        except Exception as e:
+            print(f"[LibraryColumnar] ❌ sync error: {e}")
+        stop.wait(interval)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -5,7 +5,7 @@ Core replay logic lives in shared_core.replay.replay_engine.
 """
 import sys
 from pathlib import Path
-import json
+import os
 import time
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -14,19 +14,22 @@ if str(ROOT) not in sys.path:
 
 from storage_core.storage_manager import StorageManager
 from pandora_core.pandora_runtime import PandoraRuntime
+from shared_core.replay.parallel_decode import iter_decoded, source_files
 
 
-def replay_from_file(runtime: PandoraRuntime, path: Path, delay: float = 0.0):
+def replay_from_file(runtime: PandoraRuntime, path: Path, delay: float = 0.0, workers: int | None = None):
+    """decode 交給 parallel_decode（reader thread + process pool），這裡依原順序 publish"""
     print(f"[Replay] ▶ start replay: {path.name}")
 
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-
+    for items, errors in iter_decoded(source_files(path) or [path], workers=workers):
+        for msg in errors:
+            print(f"[Replay] ❌ error: {msg}")
+        for ev in items:
             try:
-                ev = json.loads(line)
-                runtime.fast_bus.publish(ev["type"], ev["payload"])
+                if isinstance(ev, dict):
+                    runtime.fast_bus.publish(ev["type"], ev["payload"])
+                else:
+                    runtime.fast_bus.publish(ev.type, ev.payload)
             except Exception as e:
                 print(f"[Replay] ❌ error: {e}")
 
@@ -50,8 +53,9 @@ def main():
         print("[Replay] ⚠ no warm logs found")
         return
 
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
     for p in files:
-        replay_from_file(runtime, p, delay=0.0)
+        replay_from_file(runtime, p, delay=0.0, workers=workers)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,4 @@
 import sys
-import shutil
 from pathlib import Path
 from datetime import datetime
 
@@ -9,16 +8,18 @@ if str(ROOT) not in sys.path:
 
 from storage_core.storage_manager import StorageManager
 from storage_core.log_rotator import LogRotator, RotatePolicy, ArchivePolicy
+from shared_core.event_raw.segment_log import SegmentLog
 
 
 def rotate_named(hot_file: Path, warm_dir: Path, name: str):
     """
     壓力測試專用：
-    直接從 HOT 複製出一份固定命名的 WARM 檔
+    直接從 HOT（全部 segment 依序串接）複製出一份固定命名的 WARM 檔
     """
     warm_dir.mkdir(parents=True, exist_ok=True)
     target = warm_dir / f"{name}.jsonl"
-    shutil.copy(hot_file, target)
+    with target.open("w", encoding="utf-8") as out:
+        out.writelines(SegmentLog(hot_file).iter_lines())
     print(f"[Rotate] WARM file created: {target}")
 
 
@@ -40,6 +41,7 @@ def main():
         ),
         archive_policy=ArchivePolicy(
             keep_warm_days=int(archive_cfg.get("keep_warm_days", 7)),
+            compression=str(archive_cfg.get("compression", "auto")),
         ),
     )
 
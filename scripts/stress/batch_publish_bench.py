@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/）===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import contextlib
+import csv
+import io
+import time
+from datetime import datetime
+
+from shared_core.event.event_trace import EventTracer
+from shared_core.event.parallel_dispatch import batch_handler
+from shared_core.event.zero_copy_event_bus import ZeroCopyEventBus
+from shared_core.pb_lang.pb_event_validator import PBEventValidator
+from shared_core.perception_core.core import PerceptionCore
+from shared_core.perception_core.perception_gateway import PerceptionGateway
+from trading_core.perception.market_adapter import MarketKlineAdapter
+
+
+# ----------------------------------------
+# ✔ legacy_data/market CSV → raw kline dict
+# ----------------------------------------
+def load_raws(path: Path):
+    interval = path.stem.split("_")[-1]
+    raws = []
+    with path.open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            raws.append({
+                "symbol": "BTC/USDT",
+                "open": float(row["open"]),
+                "high": float(row["high"]),
+                "low": float(row["low"]),
+                "close": float(row["close"]),
+                "volume": float(row["volume"]),
+                "interval": interval,
+                "ts": datetime.fromisoformat(row["timestamp"]).timestamp(),
+            })
+    return raws
+
+
+def make_gateway():
+    validator = PBEventValidator(strict=False)
+    gateway = PerceptionGateway(PerceptionCore(), validator)
+    adapter = MarketKlineAdapter(mode="batch", validator=validator)
+    gateway.register_adapter("market.kline", adapter)
+    return gateway
+
+
+def make_bus():
+    bus = ZeroCopyEventBus()
+    bus.tracer = EventTracer()
+    sink = []
+
+    @batch_handler
+    def library_sink(events):
+        sink.extend(events)
+
+    bus.subscribe("market.kline", lambda ev: None)
+    bus.subscribe("*", library_sink)
+    return bus
+
+
+def run_single(raws):
+    gateway, bus = make_gateway(), make_bus()
+    # library_sink 是 batch handler；逐筆 publish 時包成單元素 list
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for raw in raws:
+            gateway.process_and_publish("market.kline", dict(raw), bus, soft=True)
+    return time.perf_counter() - t0, len(bus.tracer.traces)
+
+
+def run_batch(raws):
+    gateway, bus = make_gateway(), make_bus()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gateway.process_many_and_publish(
+            "market.kline", (dict(r) for r in raws), bus, soft=True
+        )
+    return time.perf_counter() - t0, len(bus.tracer.traces)
+
+
+if __name__ == "__main__":
+    raws = []
+    for p in sorted((ROOT / "legacy_data" / "market").glob("*.csv")):
+        raws.extend(load_raws(p))
+
+    n = len(raws)
+    dt_single, traces_single = run_single(raws)
+    dt_batch, traces_batch = run_batch(raws)
+
+    print(f"[single] {n / dt_single:>12,.0f} ev/s | traces={traces_single:,}")
+    print(f"[batch ] {n / dt_batch:>12,.0f} ev/s | traces={traces_batch:,}")
+    print(f"[speedup] x{dt_single / dt_batch:.1f}")
@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/）===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import time
+
+from shared_core.codec import available_codecs, get_codec
+from shared_core.event_schema import PBEvent
+from library.library_event import LibraryEvent
+
+
+# ----------------------------------------
+# ✔ 每個 codec 的 encode / decode 吞吐
+# ----------------------------------------
+N = 100_000
+
+PAYLOAD = {
+    "symbol": "BTC/USDT",
+    "open": 42000.5,
+    "high": 42100.0,
+    "low": 41950.25,
+    "close": 42080.0,
+    "volume": 12.5,
+    "interval": "15m",
+}
+
+
+def rate(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    events = [
+        PBEvent("market.kline", dict(PAYLOAD), "bench", ts=1_700_000_000.0 + i, compact=True)
+        for i in range(N)
+    ]
+    lib_events = [LibraryEvent.from_pbevent(ev) for ev in events[:N // 10]]
+
+    # baseline：舊版寫法
+    t0 = time.perf_counter()
+    lines = [json.dumps(ev.to_dict(), ensure_ascii=False) for ev in events]
+    base_enc = N / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for line in lines:
+        json.loads(line)
+    base_dec = N / (time.perf_counter() - t0)
+    print(f"[baseline ] encode {base_enc:>12,.0f} ev/s | decode {base_dec:>12,.0f} ev/s")
+
+    for name in available_codecs():
+        codec = get_codec(name, text=False)
+
+        t0 = time.perf_counter()
+        encoded = [codec.encode_event(ev) for ev in events]
+        enc = N / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        for rec in encoded:
+            codec.loads(rec)
+        dec = N / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        for ev in lib_events:
+            codec.encode_library_event(ev)
+        lib = len(lib_events) / (time.perf_counter() - t0)
+
+        size = sum(len(r) for r in encoded) / N
+        print(
+            f"[{name:9}] encode {enc:>12,.0f} ev/s | decode {dec:>12,.0f} ev/s | "
+            f"library {lib:>12,.0f} ev/s | {size:.0f} B/ev | x{enc / base_enc:.1f} enc"
+        )
+
+
+if __name__ == "__main__":
+    main()
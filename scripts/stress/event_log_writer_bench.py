@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/）===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tempfile
+import threading
+import time
+
+from shared_core.event_raw.event_log_writer import DURABILITY_MODES, EventLogWriter
+from shared_core.event_schema import PBEvent
+
+
+# ----------------------------------------
+# ✔ 多 producer 寫入 EventLogWriter（各 durability）
+# ----------------------------------------
+PRODUCERS = 4
+PER_PRODUCER = 50_000
+
+PAYLOAD = {
+    "symbol": "BTC/USDT",
+    "open": 42000.5,
+    "high": 42100.0,
+    "low": 41950.25,
+    "close": 42080.0,
+    "volume": 12.5,
+    "interval": "15m",
+}
+
+
+def run(durability: str, tmp: Path) -> None:
+    writer = EventLogWriter(
+        str(tmp / f"bench_{durability}.jsonl"),
+        durability=durability,
+        fsync_interval_ms=50,
+    )
+    events = [
+        PBEvent("market.kline", dict(PAYLOAD), "bench", ts=1_700_000_000.0 + i, compact=True)
+        for i in range(PER_PRODUCER)
+    ]
+
+    def producer():
+        write = writer.write
+        for ev in events:
+            write(ev)
+
+    threads = [threading.Thread(target=producer) for _ in range(PRODUCERS)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    t_enqueue = time.perf_counter() - t0
+    writer.drain()
+    t_total = time.perf_counter() - t0
+
+    st = writer.stats()
+    writer.close()
+
+    n = PRODUCERS * PER_PRODUCER
+    print(
+        f"[{durability:5}] enqueue {n / t_enqueue:>12,.0f} ev/s | "
+        f"durable {n / t_total:>10,.0f} ev/s | "
+        f"enq avg {st['enqueue_avg_us']:.2f}us max {st['enqueue_max_us']:.0f}us | "
+        f"batch avg {st['batch_avg']:.0f} | {st['bytes'] / t_total / 1e6:.1f} MB/s | "
+        f"fsyncs {st['fsyncs']} | stalls {st['stalls']}"
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for durability in DURABILITY_MODES:
+            run(durability, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/）===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import tempfile
+import time
+from datetime import datetime
+
+from library.ingest.replay_ingestor import LibraryIngestor
+from library.library_event import LibraryEvent
+from library.library_writer import LibraryWriter, day_of, get_library_writer
+from shared_core.event_schema import PBEvent
+
+
+# ----------------------------------------
+# ✔ Library 灌庫：v1（每筆 open/close）vs write_event vs write_many
+# ----------------------------------------
+N = 100_000
+T0 = 1_700_000_000.0
+
+PAYLOAD = {
+    "symbol": "BTC/USDT",
+    "open": 42000.5,
+    "high": 42100.0,
+    "low": 41950.25,
+    "close": 42080.0,
+    "volume": 12.5,
+    "interval": "15m",
+}
+
+
+def v1_write(events_dir: Path, event: LibraryEvent) -> None:
+    """舊版 write_event：每筆 fromisoformat + mkdir + open / close"""
+    ts = datetime.fromisoformat(event.ts)
+    dir_path = events_dir / ts.strftime("%Y") / ts.strftime("%m")
+    dir_path.mkdir(parents=True, exist_ok=True)
+    with open(dir_path / f"{ts.strftime('%Y-%m-%d')}.jsonl", "a", encoding="utf-8") as f:
+        f.write(event.to_json() + "\n")
+
+
+def count_lines(events_dir: Path) -> int:
+    return sum(1 for p in events_dir.rglob("*.jsonl") for _ in p.open(encoding="utf-8"))
+
+
+def main():
+    # 每 60 秒一筆 → 約 70 天，跨多個 day 檔
+    pb = [
+        PBEvent("market.kline", dict(PAYLOAD), "bench", ts=T0 + i * 60, compact=True)
+        for i in range(N)
+    ]
+    events = [LibraryEvent.from_pbevent(ev) for ev in pb]
+
+    assert day_of(T0) == day_of(events[0].ts) == "2023-11-14"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        root = tmp / "v1"
+        (root / "events").mkdir(parents=True)
+        t0 = time.perf_counter()
+        for ev in events:
+            v1_write(root / "events", ev)
+        t_v1 = time.perf_counter() - t0
+        print(f"[BENCH] v1 per-event open/close : {N / t_v1:>10,.0f} ev/s")
+
+        writer = LibraryWriter(tmp / "v2")
+        t0 = time.perf_counter()
+        for ev in events:
+            writer.write_event(ev)
+        writer.flush()
+        t_one = time.perf_counter() - t0
+        print(f"[BENCH] v2 write_event          : {N / t_one:>10,.0f} ev/s  (x{t_v1 / t_one:.1f})")
+        writer.close()
+
+        writer = LibraryWriter(tmp / "v2_many")
+        t0 = time.perf_counter()
+        for i in range(0, N, 1000):
+            writer.write_many(events[i:i + 1000])
+        t_many = time.perf_counter() - t0
+        print(f"[BENCH] v2 write_many(1000)     : {N / t_many:>10,.0f} ev/s  (x{t_v1 / t_many:.1f})")
+        print(f"        {writer.stats()}")
+        writer.close()
+
+        # PBEvent → LibraryIngestor（ReplayEngine 灌庫路徑）
+        shared = get_library_writer(tmp / "ingest")
+        assert get_library_writer(tmp / "ingest") is shared
+        ingestor = LibraryIngestor(shared)
+        t0 = time.perf_counter()
+        for ev in pb:
+            ingestor.ingest_event(ev)
+        ingestor.flush()
+        t_ingest = time.perf_counter() - t0
+        print(f"[BENCH] LibraryIngestor batched : {N / t_ingest:>10,.0f} ev/s  {ingestor.get_stats()}")
+        shared.close()
+
+        for name in ("v1", "v2", "v2_many", "ingest"):
+            assert count_lines(tmp / name / "events") == N, name
+
+        # 同一天的順序與 v1 相同
+        day = sorted((tmp / "v1" / "events").rglob("*.jsonl"))[3]
+        rel = day.relative_to(tmp / "v1")
+        assert day.read_text(encoding="utf-8") == (tmp / "v2_many" / rel).read_text(encoding="utf-8")
+        first = json.loads(day.read_text(encoding="utf-8").splitlines()[0])
+        assert first["ts"].startswith(day.stem)
+
+    print("[BENCH] library writer OK")
+
+
+if __name__ == "__main__":
+    main()
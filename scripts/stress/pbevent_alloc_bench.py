@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/）===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import time
+import tracemalloc
+
+from shared_core.event_schema import PBEvent
+
+
+# ----------------------------------------
+# ✔ PBEvent 建構成本（CPU + 記憶體）
+# ----------------------------------------
+N = 200_000
+
+PAYLOAD = {
+    "symbol": "BTC/USDT",
+    "open": 1.0,
+    "high": 2.0,
+    "low": 0.5,
+    "close": 1.5,
+    "volume": 10.0,
+    "interval": "15m",
+}
+
+
+def build(compact: bool, n: int):
+    ts = 1_700_000_000.0
+    return [
+        PBEvent("market.kline", PAYLOAD, "bench", ts=ts + i, compact=compact)
+        for i in range(n)
+    ]
+
+
+def run(label: str, compact: bool):
+    t0 = time.perf_counter()
+    build(compact, N)
+    cpu = time.perf_counter() - t0
+
+    tracemalloc.start()
+    events = build(compact, N)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"[{label:8}] {N / cpu:>12,.0f} ev/s | "
+        f"{cpu / N * 1e6:6.2f} µs/ev | "
+        f"{current / len(events):6.1f} B/ev"
+    )
+
+    # sink 真正要求時才 materialize
+    t0 = time.perf_counter()
+    for ev in events[:10_000]:
+        ev.to_dict()
+    print(f"[{label:8}] to_dict: {(time.perf_counter() - t0) / 10_000 * 1e6:6.2f} µs/ev")
+
+
+if __name__ == "__main__":
+    run("default", compact=False)
+    run("compact", compact=True)
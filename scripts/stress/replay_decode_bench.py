@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/）===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import os
+import tempfile
+import time
+
+from shared_core.replay.replay_engine import ReplayEngine
+
+
+# ----------------------------------------
+# ✔ ReplayEngine.replay：逐行 decode vs 平行 decode pipeline（workers = 2 … CPU 數）
+# ----------------------------------------
+N = 300_000
+T0 = 1_700_000_000.0
+
+PAYLOAD = {
+    "symbol": "BTC/USDT",
+    "open": 42000.5,
+    "high": 42100.0,
+    "low": 41950.25,
+    "close": 42080.0,
+    "volume": 12.5,
+    "interval": "15m",
+}
+
+
+class CountingBus:
+    def __init__(self):
+        self.n = 0
+
+    def publish(self, ev):
+        self.n += 1
+
+    def publish_many(self, evs):
+        self.n += len(evs)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "logs.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(N):
+                f.write(json.dumps({
+                    "type": "market.kline",
+                    "event_id": f"k{i}",
+                    "source": "bench",
+                    "payload": dict(PAYLOAD, close=42000.0 + i % 100),
+                    "ts": T0 + i * 60,
+                }) + "\n")
+        print(f"[BENCH] {N:,} events, {path.stat().st_size / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+
+        cpus = os.cpu_count() or 1
+        for workers in [None] + sorted({2, max(2, cpus // 2), max(2, cpus)}):
+            bus = CountingBus()
+            engine = ReplayEngine(bus, gateway=None)
+            t0 = time.perf_counter()
+            n = engine.replay(str(path), speed=0, workers=workers)
+            dt = time.perf_counter() - t0
+            assert n == bus.n == N
+            label = "sequential" if workers is None else f"workers={workers}"
+            print(f"[BENCH] replay {label:<12}: {N / dt:>10,.0f} ev/s")
+
+
+if __name__ == "__main__":
+    main()
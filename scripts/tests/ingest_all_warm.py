@@ -18,8 +18,9 @@ def main():
 
     for f in sorted(warm_dir.glob("logs_*.jsonl")):
         print(f"[INGEST] {f.name}")
-        n, _ = rt.replay.ingest_to_library(f)
+        n, stats = rt.replay.ingest_to_library(f)
         total += n
+        print(f"[INGEST]   {stats['ingest']}")
 
     print("================================")
     print("TOTAL INGESTED EVENTS:", total)
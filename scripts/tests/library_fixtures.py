@@ -0,0 +1,64 @@
+"""
+Library 測試共用的事件產生器（test_library_*.py 共用，不是測試本身）
+
+    from library_fixtures import T0, iso, make_events
+    events = make_events(0, 1000, step=30.0, event_type=lambda i: "governance.decision" if i % 100 == 7 else "market.kline")
+
+- 第 i 筆的時間 = t0 + i * step（+ shift(i)，模擬 replay 回補的亂序）
+- 欄位可給常數或 f(i)；extra(i, ts) → 同一個時間點再多寫幾筆（例如每 7 根 K 線一個決議）
+"""
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, List, Optional
+
+from library.library_event import LibraryEvent
+
+
+T0 = 1_767_225_600.0      # 2026-01-01 UTC
+
+
+def iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def day_of(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _value(v: Any, i: int) -> Any:
+    return v(i) if callable(v) else v
+
+
+def make_events(
+    start: int,
+    n: int,
+    *,
+    step: float,
+    t0: float = T0,
+    event_id: Any = lambda i: f"e{i}",
+    event_type: Any = "market.kline",
+    source: Any = "live",
+    payload: Any = lambda i: {"i": i},
+    shift: Optional[Callable[[int], float]] = None,
+    extra: Optional[Callable[[int, str], Iterable[LibraryEvent]]] = None,
+) -> List[LibraryEvent]:
+    out = []
+    for i in range(start, start + n):
+        ts = iso(t0 + i * step + (shift(i) if shift is not None else 0.0))
+        out.append(LibraryEvent(
+            event_id=_value(event_id, i),
+            event_type=_value(event_type, i),
+            source=_value(source, i),
+            payload=_value(payload, i),
+            ts=ts,
+        ))
+        if extra is not None:
+            out.extend(extra(i, ts))
+    return out
@@ -0,0 +1,177 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import math
+import os
+import tempfile
+
+from shared_core.codec import available_codecs, get_codec
+from shared_core.event_schema import PBEvent
+from library.library_event import LibraryEvent
+
+
+# --------------------------------------------------
+# 舊版 writer 寫法（stdlib json.dumps）產生的參考紀錄
+# --------------------------------------------------
+def legacy_records():
+    kline = PBEvent(
+        "market.kline",
+        {
+            "symbol": "BTC/USDT",
+            "open": 42000.5,
+            "high": 42100.0,
+            "low": 41950.25,
+            "close": 42080.0,
+            "volume": 12.5,
+            "interval": "15m",
+        },
+        source="replay",
+        tags=["market", "kline"],
+    )
+    text = PBEvent("text.input", {"text": "中文 / emoji 🚀"}, source="text.input")
+    custom_meta = PBEvent("world.health.warning", {"world_id": "w1"}, priority=0)
+    custom_meta.meta = {"lang": "PB-Lang v2", "note": "自訂 meta"}
+
+    records = []
+    for ev in (kline, text, custom_meta):
+        data = ev.to_dict()
+        records.append(json.dumps(data, ensure_ascii=False))
+        data["_weak_label"] = ["kline"]
+        records.append(json.dumps(data, ensure_ascii=False))
+
+    lib = LibraryEvent.from_pbevent(kline, weak_label={"confidence": 0.9}, meta={"note": "x"})
+    records.append(json.dumps(lib.to_dict(), ensure_ascii=False))
+
+    # learning attempts / governance audit 類紀錄
+    records.append(json.dumps({"gate_result": "ALLOW", "is_executable": True, "n": 3}))
+    records.append(json.dumps({"ratio": float("nan"), "big": 2 ** 70}))
+    return (kline, text, custom_meta), records
+
+
+def existing_jsonl_files(limit: int = 20):
+    """repo 內已經存在的 jsonl（logs / library / learning…），有就一起驗"""
+    files = []
+    for p in ROOT.rglob("*.jsonl"):
+        if ".git" in p.parts:
+            continue
+        files.append(p)
+        if len(files) >= limit:
+            break
+    return files
+
+
+def same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def has_nan(obj) -> bool:
+    if isinstance(obj, float):
+        return math.isnan(obj)
+    if isinstance(obj, dict):
+        return any(has_nan(v) for v in obj.values())
+    if isinstance(obj, list):
+        return any(has_nan(v) for v in obj)
+    return False
+
+
+def main():
+    events, records = legacy_records()
+    failures = 0
+
+    # 0) 預設（沒設 AISOP_CODEC）= stdlib json：有沒有裝 orjson，落地格式都不變
+    env = os.environ.pop("AISOP_CODEC", None)
+    try:
+        default = get_codec()
+    finally:
+        if env is not None:
+            os.environ["AISOP_CODEC"] = env
+    assert default.name == "json", default
+    rec = {"ratio": float("nan"), "inf": float("inf"), "text": "中文", "n": [1, 2]}
+    assert default.dumps(rec) == json.dumps(rec, ensure_ascii=False)
+    assert get_codec("auto") is get_codec("json")
+    print(f"[TEST] default codec is stdlib json (available: {', '.join(available_codecs())}) ✅")
+
+    # 1) json codec 的預排 encoder 必須與舊版輸出逐字相同
+    json_codec = get_codec("json")
+    for ev in events:
+        assert json_codec.encode_event(ev) == json.dumps(ev.to_dict(), ensure_ascii=False)
+        assert json_codec.encode_event(ev, {"_weak_label": ["kline"]}) == json.dumps(
+            {**ev.to_dict(), "_weak_label": ["kline"]}, ensure_ascii=False
+        )
+    lib = LibraryEvent.from_pbevent(events[0])
+    assert json_codec.encode_library_event(lib) == json.dumps(lib.to_dict(), ensure_ascii=False)
+    print("[TEST] json codec pre-shaped encoders byte-identical ✅")
+
+    # 2) 每個 codec：讀舊紀錄 → 寫 → 讀，結果一致
+    lines = list(records)
+    for path in existing_jsonl_files():
+        with path.open("r", encoding="utf-8") as f:
+            lines.extend(line for line in f if line.strip())
+
+    for name in available_codecs():
+        codec = get_codec(name, text=False)
+        checked = 0
+        for line in lines:
+            try:
+                obj = json.loads(line)
+            except Exception:
+                continue    # 舊檔壞行：reader 本來就略過
+
+            decoded = get_codec(name).loads(line) if not codec.binary else obj
+            if not same(decoded, obj):
+                print(f"[TEST] ❌ {name} decode mismatch: {line[:120]}")
+                failures += 1
+                continue
+
+            back = codec.loads(codec.dumps(obj))
+            # orjson 依 JSON 標準把 NaN 寫成 null
+            if name == "orjson" and has_nan(obj):
+                checked += 1
+                continue
+            if not same(back, obj):
+                print(f"[TEST] ❌ {name} round-trip mismatch: {line[:120]}")
+                failures += 1
+                continue
+            checked += 1
+
+        # encode_event 產物必須等價於 to_dict()
+        for ev in events:
+            if not same(codec.loads(codec.encode_event(ev)), ev.to_dict()):
+                print(f"[TEST] ❌ {name} encode_event mismatch: {ev}")
+                failures += 1
+
+        print(f"[TEST] {name:8} round-trip {checked} records ✅")
+
+    # 3) 經過 Library writer 的檔案可以被任何文字 codec 讀回
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.jsonl"
+        with path.open("w", encoding="utf-8") as f:
+            for ev in events:
+                f.write(LibraryEvent.from_pbevent(ev).to_json() + "\n")
+        for name in available_codecs():
+            codec = get_codec(name)
+            with path.open("r", encoding="utf-8") as f:
+                rows = list(codec.iter_lines(f))
+            assert len(rows) == len(events), name
+            assert [r["event_id"] for r in rows] == [ev.event_id for ev in events]
+        print("[TEST] LibraryEvent.to_json readable by all text codecs ✅")
+
+    if failures:
+        raise SystemExit(f"❌ codec round-trip failures: {failures}")
+    print("[TEST] codec round-trip OK")
+
+
+if __name__ == "__main__":
+    main()
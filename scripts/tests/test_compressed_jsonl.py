@@ -0,0 +1,130 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import gzip
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from library.library_event import LibraryEvent
+from library.library_reader import LibraryReader
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import BlockReader, available_compressions, compress_file
+from shared_core.event_raw.event_log_reader import EventLogReader
+from shared_core.event_schema import PBEvent
+from shared_core.replay.replay_engine import ReplayEngine
+from storage_core.log_rotator import ArchivePolicy, LogRotator, RotatePolicy
+
+
+N = 20_000
+T0 = datetime(2026, 1, 1)
+
+
+def write_warm(path: Path) -> None:
+    codec = get_codec("json")
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(N):
+            ev = PBEvent(
+                "market.kline",
+                {"symbol": "BTC/USDT", "interval": "1m", "close": 42000.0 + i % 100, "i": i},
+                "test",
+                timestamp=(T0 + timedelta(minutes=i)).isoformat(),
+            )
+            f.write(codec.encode_event(ev) + "\n")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        warm, cold = tmp / "warm", tmp / "cold"
+        warm.mkdir()
+        src = warm / "logs_20260101_000000_000001.jsonl"
+        write_warm(src)
+        raw_size = src.stat().st_size
+        old = time.time() - 30 * 86400
+        os.utime(src, (old, old))
+
+        # 1) archive_warm_to_cold：壓縮 + block index，WARM 原檔刪除
+        rotator = LogRotator(
+            hot_file=tmp / "hot" / "logs.jsonl",
+            warm_dir=warm,
+            cold_dir=cold,
+            rotate_policy=RotatePolicy(),
+            archive_policy=ArchivePolicy(keep_warm_days=7, block_kb=256),
+        )
+        assert rotator.archive_warm_to_cold() == 1
+        assert not src.exists()
+        archived = next(p for p in cold.iterdir() if not p.name.endswith(".idx.json"))
+        reader = BlockReader(archived)
+        assert reader.index["lines"] == N and len(reader) > 1
+        print(f"[TEST] archived {archived.name}: {len(reader)} blocks, x{raw_size / archived.stat().st_size:.1f} ✅")
+
+        # 2) 整檔讀取：ReplayEngine / EventLogReader 透明解壓
+        engine = ReplayEngine(bus=None, gateway=None)
+        rows = list(engine._iter_raw_records(str(archived)))
+        assert [r["payload"]["i"] for r in rows] == list(range(N))
+
+        start, end = T0 + timedelta(minutes=5000), T0 + timedelta(minutes=5029)
+        window = EventLogReader(archived).load(start, end)
+        assert [r["payload"]["i"] for r in window] == list(range(5000, 5030))
+        print("[TEST] ReplayEngine / EventLogReader read compressed log ✅")
+
+        # 3) 時間範圍只解必要的 block
+        skipped = [
+            i for i in range(len(reader))
+            if not reader.block_in_range(i, start.timestamp(), end.timestamp())
+        ]
+        assert len(skipped) >= len(reader) - 2
+        last = reader.read_block(len(reader) - 1).decode("utf-8").splitlines()
+        assert engine.codec.loads(last[-1])["payload"]["i"] == N - 1
+        print(f"[TEST] range read skips {len(skipped)}/{len(reader)} blocks, read_block seeks ✅")
+
+        # 4) 仍是標準 gzip / zstd stream
+        if archived.suffix == ".gz":
+            with gzip.open(archived, "rt", encoding="utf-8") as f:
+                assert sum(1 for _ in f) == N
+            print("[TEST] archive readable by plain gzip ✅")
+
+        # 5) LibraryReader 讀壓縮後的 day 檔
+        lib_root = tmp / "library"
+        day_dir = lib_root / "events" / "2026" / "01"
+        day_dir.mkdir(parents=True)
+        day_file = day_dir / "2026-01-01.jsonl"
+        with day_file.open("w", encoding="utf-8") as f:
+            for r in rows[:500]:
+                ev = PBEvent(r["type"], r["payload"], r["source"], timestamp=r["timestamp"])
+                f.write(LibraryEvent.from_pbevent(ev).to_json() + "\n")
+        for compression in available_compressions():
+            compress_file(day_file, compression=compression, block_size=4096)
+        day_file.unlink()
+
+        lib = LibraryReader(lib_root)
+        assert len(list(lib.iter_events())) == 500
+        assert len(list(lib.iter_events(day="2026-01-01", limit=10))) == 10
+        assert len(lib.sample(n=20, day="2026-01-01", seed=1)) == 20
+        print("[TEST] LibraryReader reads compressed day files ✅")
+
+        # 6) payload 含 U+2028 / U+2029 / U+0085（json codec 不跳脫）→ 壓縮後仍是一行一筆
+        odd = tmp / "odd.jsonl"
+        texts = ["line\u2028sep", "para\u2029sep", "nel\u0085x", "plain"]
+        with odd.open("w", encoding="utf-8") as f:
+            for i, text in enumerate(texts * 50):
+                f.write(get_codec("json").dumps({"event_id": f"u{i}", "ts": 1767225600.0 + i, "text": text}) + "\n")
+        for compression in available_compressions():
+            packed = compress_file(odd, compression=compression, block_size=1024)
+            got = list(BlockReader(packed).iter_lines())
+            assert len(got) == 200 and all(line.endswith("\n") for line in got), len(got)
+            assert [get_codec().loads(line)["text"] for line in got] == texts * 50
+        print("[TEST] U+2028 / U+2029 / U+0085 inside records survive block reads ✅")
+
+    print("[TEST] compressed jsonl OK")
+
+
+if __name__ == "__main__":
+    main()
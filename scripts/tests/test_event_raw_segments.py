@@ -0,0 +1,153 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from shared_core.event_raw.event_log_reader import EventLogReader
+from shared_core.event_raw.event_log_writer import EventLogWriter
+from shared_core.event_raw.segment_log import SegmentLog
+from shared_core.replay.replay_engine import ReplayEngine
+from storage_core.log_rotator import ArchivePolicy, LogRotator, RotatePolicy
+
+
+N = 3000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        hot = tmp / "hot" / "logs.jsonl"
+        hot.parent.mkdir(parents=True)
+
+        # 舊版單檔 → 視為最舊的 segment
+        hot.write_text(
+            '{"type": "legacy", "timestamp": "2026-01-01T00:00:00", "payload": {}}\n',
+            encoding="utf-8",
+        )
+
+        writer = EventLogWriter(str(hot), buffer_size=100, segment_max_mb=0.02, enable_weak_label=False)
+        for i in range(N):
+            writer.write({"type": "x", "timestamp": datetime.now().isoformat(), "payload": {"i": i}})
+        assert writer.drain(5)
+
+        segs = SegmentLog(hot).segments()
+        assert segs[0] == hot and len(segs) > 3, segs
+        print(f"[TEST] writer rolled into {len(segs) - 1} segments ✅")
+
+        # 1) reader 看到的是一個依序的邏輯 log
+        rows = EventLogReader(hot).load(datetime(2000, 1, 1), datetime(2100, 1, 1))
+        assert rows[0]["type"] == "legacy"
+        assert [r["payload"]["i"] for r in rows[1:]] == list(range(N))
+        raw = list(ReplayEngine(bus=None, gateway=None)._iter_raw_records(str(hot)))
+        assert len(raw) == N + 1
+        print("[TEST] EventLogReader / ReplayEngine read segments in order ✅")
+
+        # 2) 輪轉：sealed segment rename 到 WARM，active 留在 HOT
+        rotator = LogRotator(
+            hot_file=hot,
+            warm_dir=tmp / "warm",
+            cold_dir=tmp / "cold",
+            rotate_policy=RotatePolicy(max_mb=1),
+            archive_policy=ArchivePolicy(),
+            writer=writer,
+            cooldown_sec=0,
+        )
+        assert rotator.should_rotate()
+        sealed_inodes = {p.stat().st_ino for p in SegmentLog(hot).sealed(writer.current_path)}
+        rotator.tick()
+
+        assert SegmentLog(hot).segments() == [writer.current_path]
+        warm = sorted((tmp / "warm").glob("logs_*.jsonl"))
+        assert {p.stat().st_ino for p in warm} == sealed_inodes      # rename，不是 copy
+        print(f"[TEST] rotated {len(warm)} segments by rename ✅")
+
+        # 3) active 超過 policy → writer roll，之後的寫入進新 segment
+        before = writer.current_path
+        rotator.rotate_policy = RotatePolicy(max_mb=0.0001)
+        rotator.tick()
+        assert writer.current_path != before and not before.exists()
+        writer.write({"type": "after", "timestamp": datetime.now().isoformat(), "payload": {}})
+        writer.close()
+        assert SegmentLog(hot).segments() == [writer.current_path]
+
+        total = sum(1 for p in (tmp / "warm").glob("logs_*.jsonl") for _ in p.open(encoding="utf-8"))
+        total += sum(1 for _ in SegmentLog(hot).iter_lines())
+        assert total == N + 2, total
+        print("[TEST] no events lost across roll + rotate ✅")
+
+        # 4) durability=fsync：最後一批寫完就沒有新事件 → 仍在 fsync_interval 到期時補 fsync
+        writer = EventLogWriter(str(tmp / "durable" / "logs.jsonl"), durability="fsync",
+                                fsync_interval_ms=300, flush_interval=0.05, enable_weak_label=False)
+        for i in range(10):
+            writer.write({"type": "x", "timestamp": datetime.now().isoformat(), "payload": {"i": i}})
+        assert writer.drain(5)
+        deadline = time.monotonic() + 3
+        while writer.stats()["fsyncs"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert writer.stats()["fsyncs"] >= 1 and not writer._unsynced
+        writer.close()
+        print("[TEST] fsync durability syncs on the timer with an idle queue ✅")
+
+        # 5) close(timeout) 逾時：writer thread 卡在 _commit_group 裡 → close 不並行補寫（不亂序）
+        #    offset 由寫出的 bytes 累加，與檔案大小一致
+        path = tmp / "close" / "logs.jsonl"
+        gate = threading.Event()
+        entered = threading.Event()
+
+        class SlowEvent:
+            def to_dict(self):
+                entered.set()
+                gate.wait(5)
+                return {"type": "x", "timestamp": datetime.now().isoformat(), "payload": {"i": 0}}
+
+        writer = EventLogWriter(str(path), buffer_size=10, flush_interval=0.01, enable_weak_label=False)
+        writer.write(SlowEvent())
+        assert entered.wait(2)
+        total = 200
+        for i in range(1, total):
+            writer.write({"type": "x", "timestamp": datetime.now().isoformat(), "payload": {"i": i, "s": "中文"}})
+        writer.close(timeout=0.1)
+        assert writer.thread.is_alive()
+        gate.set()
+        writer.close()
+        assert not writer.thread.is_alive()
+        got = [r["payload"]["i"] for r in EventLogReader(path).iter()]
+        assert got == list(range(total)), got[:12]
+        assert writer._segment_bytes == writer.current_path.stat().st_size
+        print("[TEST] close(timeout) leaves the drain to the writer thread, bytes offset matches file ✅")
+
+        # 6) 重啟：最後一個 segment 還沒滿 → 接著寫（不會每次啟動多一個 sealed segment 被輪轉走）
+        path = tmp / "resume" / "logs.jsonl"
+        for run in range(3):
+            writer = EventLogWriter(str(path), enable_weak_label=False, segment_max_mb=1)
+            for i in range(run * 10, run * 10 + 10):
+                writer.write({"type": "x", "timestamp": datetime.now().isoformat(), "payload": {"i": i}})
+            writer.close()
+            if run == 0:
+                with open(writer.current_path, "a", encoding="utf-8") as f:
+                    f.write('{"type": "x", "payl')        # crash 留下的半行
+        segs = SegmentLog(path).segments()
+        assert [p.name for p in segs] == ["logs.000001.jsonl"], segs
+        assert [r["payload"]["i"] for r in EventLogReader(path).iter()] == list(range(30))
+        rotator = LogRotator(path, tmp / "resume_warm", tmp / "resume_cold",
+                             RotatePolicy(max_mb=1), ArchivePolicy(keep_warm_days=0))
+        assert not rotator.should_rotate()
+
+        writer = EventLogWriter(str(path), enable_weak_label=False, segment_max_mb=0.0001)
+        assert writer.current_path.name == "logs.000002.jsonl"       # 已超過上限 → 開新編號
+        writer.close()
+        print("[TEST] restart resumes the last segment while it is under the roll limits ✅")
+
+    print("[TEST] event_raw segments OK")
+
+
+if __name__ == "__main__":
+    main()
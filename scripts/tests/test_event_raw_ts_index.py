@@ -0,0 +1,149 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from shared_core.event_raw.event_log_reader import EventLogReader
+from shared_core.event_raw.event_log_writer import EventLogWriter
+from shared_core.event_raw.segment_log import SegmentLog
+from shared_core.event_raw import ts_index
+from shared_core.event_raw.ts_index import build_ts_index, iter_range_lines, load_chunks, ts_index_path
+from shared_core.event_schema import PBEvent
+
+
+N = 100_000
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def full_scan(reader: EventLogReader, start, end):
+    """舊版 load：逐行解析、逐筆比對"""
+    out = []
+    for path in reader_segments(reader):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    obj = reader.codec.loads(line)
+                    ts = datetime.fromisoformat(obj["timestamp"])
+                    if start <= ts <= end:
+                        out.append(obj)
+                except Exception:
+                    continue
+    return out
+
+
+def reader_segments(reader: EventLogReader):
+    return SegmentLog(reader.path).segments()
+
+
+def main():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        hot = Path(tmp) / "logs.jsonl"
+        writer = EventLogWriter(
+            str(hot), buffer_size=500, index_every=2000, enable_weak_label=False,
+            segment_max_mb=8,
+        )
+        base = T0.timestamp()
+        for i in range(N):
+            ts = base + i
+            if 60_000 <= i < 60_500:
+                ts = base + rng.randrange(N)        # 一段 replay 進來的亂序歷史事件
+            writer.write(PBEvent("market.kline", {"i": i, "close": 1.0}, "test", ts=ts, compact=True))
+        writer.close()
+
+        segs = reader_segments(EventLogReader(hot))
+        chunks = sum(len(load_chunks(p)) for p in segs)
+        assert chunks >= N // 2000 - len(segs), chunks
+        print(f"[TEST] {len(segs)} segments, {chunks} index chunks ✅")
+
+        reader = EventLogReader(hot)
+        start = T0 + timedelta(seconds=40_000)
+        end = start + timedelta(minutes=30)
+
+        t0 = time.perf_counter()
+        got = reader.load(start, end)
+        t_index = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        expect = full_scan(reader, start, end)
+        t_full = time.perf_counter() - t0
+
+        assert sorted(r["payload"]["i"] for r in got) == sorted(r["payload"]["i"] for r in expect)
+        assert len(got) >= 1800
+        print(f"[TEST] window {len(got)} events: index {t_index * 1000:.1f} ms vs full {t_full * 1000:.1f} ms ✅")
+
+        window = [
+            line for p in segs
+            for line in iter_range_lines(p, start_ts=start.timestamp(), end_ts=end.timestamp())
+        ]
+        lines = len(window)
+        assert lines < N // 5, lines
+        assert all(line.endswith("\n") and reader.codec.loads(line) for line in window)   # 逐行讀，不會切半
+        print(f"[TEST] window read touched {lines}/{N} lines ✅")
+
+        # naive datetime（utcnow() 風格）一律視為 UTC，不受本機時區影響
+        old_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Asia/Taipei"
+        time.tzset()
+        try:
+            naive = reader.load(start.replace(tzinfo=None), end.replace(tzinfo=None))
+        finally:
+            if old_tz is None:
+                os.environ.pop("TZ", None)
+            else:
+                os.environ["TZ"] = old_tz
+            time.tzset()
+        assert [r["payload"]["i"] for r in naive] == [r["payload"]["i"] for r in got]
+        print(f"[TEST] naive UTC window under TZ=Asia/Taipei -> {len(naive)} events ✅")
+
+        # 索引損毀（例如檔案被外部截斷）→ 退回全掃描，不會少讀
+        victim = segs[-1]
+        data = victim.read_bytes()
+        victim.write_bytes(data[: len(data) // 2])
+        assert load_chunks(victim) == []
+        reader.load(start, end)
+        print("[TEST] stale index falls back to full scan ✅")
+
+        # segment 被換成另一個大小相同的檔案（不同 inode）→ sidecar 失效
+        seg = segs[0]
+        assert load_chunks(seg)
+        copy = seg.with_name("copy.tmp")
+        shutil.copyfile(seg, copy)
+        os.replace(copy, seg)
+        assert ts_index_path(seg).exists() and load_chunks(seg) == []
+        print("[TEST] swapped segment (same size, new inode) invalidates the index ✅")
+
+        # 補建索引：PBEvent 前綴直接取 timestamp，不逐行 json decode
+        decoded = []
+
+        class CountingCodec:
+            def loads(self, line):
+                decoded.append(line)
+                return reader.codec.loads(line)
+
+        real_get_codec = ts_index.get_codec
+        ts_index.get_codec = lambda *a, **k: CountingCodec()
+        try:
+            rebuilt = build_ts_index(seg, every=2000)
+        finally:
+            ts_index.get_codec = real_get_codec
+        assert rebuilt and load_chunks(seg) == rebuilt
+        assert len(decoded) == 0, len(decoded)
+        assert all(lo is not None and hi is not None for _, _, _, lo, hi in rebuilt)
+        print(f"[TEST] rebuilt {len(rebuilt)} chunks from the record prefix without decoding ✅")
+
+    print("[TEST] event_raw ts index OK")
+
+
+if __name__ == "__main__":
+    main()
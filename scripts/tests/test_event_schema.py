@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import copy
+import json
+import pickle
+
+from shared_core.codec import get_codec
+from shared_core.event_schema import PBEvent
+from shared_core.foundation.data_unit import DataUnit
+
+
+def main():
+    # 1) slots 只在 PBEvent 自己身上，DataUnit 欄位不被 property 蓋住
+    assert "__slots__" not in DataUnit.__dict__
+    ev = PBEvent("market.kline", {"close": 1.0}, "test", ts=1_700_000_000)
+    assert not ev.__dict__, ev.__dict__           # 不跑 DataUnit.__init__ → 沒有 instance dict
+    unit = DataUnit("state", {"x": 1})
+    assert unit.to_dict()["content"] == {"x": 1}
+    print("[TEST] PBEvent keeps its own slots, DataUnit stays slot-less ✅")
+
+    # 2) lazy：event_id / timestamp 讀取時才建立，之後固定
+    ev = PBEvent.compact("market.kline", {"close": 1.0}, "test", ts=1_700_000_000)
+    assert ev._event_id is None and ev._timestamp is None
+    eid = ev.event_id
+    assert eid.startswith("pb-") and ev.event_id == eid == ev.unit_id
+    assert ev.timestamp == "2023-11-14T22:13:20+00:00"
+    print("[TEST] lazy event_id / timestamp ✅")
+
+    # 3) meta：建立之後改 priority / tags / source 會跟著更新；自訂 meta 原樣保留
+    ev = PBEvent("text.input", {"text": "hi"}, "a", priority=1)
+    assert ev.meta["priority"] == 1
+    ev.meta["note"] = "kept"
+    ev.priority = 9
+    ev.tags = ["x"]
+    ev.source = "b"
+    assert ev.meta == {"lang": "PB-Lang v2", "priority": 9, "tags": ["x"], "source": "b", "note": "kept"}
+    assert json.loads(get_codec("json").encode_event(ev))["meta"]["priority"] == 9
+
+    custom = PBEvent("text.input", {"text": "hi"}, "a", priority=1)
+    custom.meta = {"lang": "PB-Lang v2", "note": "自訂 meta"}
+    custom.priority = 5
+    assert custom.meta == {"lang": "PB-Lang v2", "note": "自訂 meta"}
+    print("[TEST] auto meta follows priority / tags / source, custom meta untouched ✅")
+
+    # 4) pickle：還沒建立的 event_id 帶 None；已建立的原樣帶回
+    ev = PBEvent.compact("market.kline", {"close": 2.0}, "test", ts=1_700_000_000)
+    ev._validated = "stamp"
+    back = pickle.loads(pickle.dumps(ev))
+    assert ev._event_id is None and back._event_id is None
+    assert (back.type, back.payload, back.source, back.ts, back._validated) == (
+        "market.kline", {"close": 2.0}, "test", 1_700_000_000.0, "stamp"
+    )
+    eid = ev.event_id
+    back = pickle.loads(pickle.dumps(ev))
+    assert back.event_id == eid and back.to_dict() == ev.to_dict()
+
+    custom_back = pickle.loads(pickle.dumps(custom))
+    custom_back.priority = 7
+    assert custom_back.meta == {"lang": "PB-Lang v2", "note": "自訂 meta"}
+    print("[TEST] pickle round trip keeps an uncreated event_id uncreated ✅")
+
+    # 5) copy / deepcopy：同一個 process 內的副本共用 id
+    ev = PBEvent("text.input", {"text": "hi"}, "a")
+    c1, c2 = copy.copy(ev), copy.deepcopy(ev)
+    assert c1.event_id == c2.event_id == ev.event_id
+    assert c2.payload == ev.payload and c2.payload is not ev.payload
+    print("[TEST] copy / deepcopy share the event_id ✅")
+
+    print("[TEST] event schema OK")
+
+
+if __name__ == "__main__":
+    main()
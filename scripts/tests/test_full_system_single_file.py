@@ -202,6 +202,7 @@ class DummyPBEvent:
 
 lib_event = LibraryEvent.from_pbevent(DummyPBEvent)
 writer.write_event(lib_event)
+writer.flush()
 
 # 先建立 index
 idx = LibraryIndex(library_root)
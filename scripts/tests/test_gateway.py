@@ -67,3 +67,53 @@ ev2 = gateway.process("text.input", {"text": "Hello AI!"})
 print("\n=== 最終事件（text.input） ===")
 print(ev2)
 print(ev2.to_dict())
+
+# ------------------------------------------------------
+# 7) 批次：make_event 回 None 的資料不會被 publish（同單筆 process）
+# ------------------------------------------------------
+class SkipOddAdapter:
+    def make_event(self, raw):
+        if raw["i"] % 2:
+            return None
+        return text_adapter.make_event({"text": f"#{raw['i']}"})
+
+
+class ListBus:
+    def __init__(self):
+        self.events = []
+
+    def publish_many(self, events):
+        self.events.extend(events)
+
+
+gateway.register_adapter("library.event", SkipOddAdapter())
+bus = ListBus()
+count = gateway.process_many_and_publish("library.event", ({"i": i} for i in range(10)), bus, batch_size=3)
+assert count == 5 and len(bus.events) == 5 and None not in bus.events, bus.events
+assert gateway.process("library.event", {"i": 1}) is None
+print("\n[TEST] process_many_and_publish drops None events ✅")
+
+# ------------------------------------------------------
+# 8) EventBus.publish_many：priority 不同就拆批（lane 不跟著批次第一筆走）
+# ------------------------------------------------------
+from pandora_core.event_bus import EventBus
+from shared_core.event_schema import PBEvent
+
+event_bus = EventBus()
+emitted = []
+event_bus.emit_many = lambda event_type, datas, *, priority=None: emitted.append(
+    (event_type, [d["text"] for d in datas], priority)
+)
+published = event_bus.publish_many([
+    PBEvent("text.input", {"text": "a"}, "test", priority=1),
+    PBEvent("text.input", {"text": "b"}, "test", priority=9),
+    PBEvent("text.input", {"text": "c"}, "test", priority=9),
+    PBEvent("text.input", {"text": "d"}, "test", priority=1),
+])
+assert published == 4
+assert emitted == [
+    ("text.input", ["a"], 1),
+    ("text.input", ["b", "c"], 9),
+    ("text.input", ["d"], 1),
+], emitted
+print("\n[TEST] publish_many splits runs on priority ✅")
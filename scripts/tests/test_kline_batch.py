@@ -0,0 +1,117 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from shared_core.event.zero_copy_event_bus import ZeroCopyEventBus
+from shared_core.pb_lang.kline_batch import COLUMNS, KLINE_BATCH, KlineBatch, per_bar
+from shared_core.pb_lang.pb_event_validator import PBEventValidator
+
+
+SYMBOL, INTERVAL = "BTC/USDT", "15m"
+
+
+def records(n: int, start: int = 0, close_time: bool = True):
+    out = []
+    for i in range(start, start + n):
+        r = {
+            "open_time": 1_700_000_000 + i * 900,
+            "open": 100.0 + i,
+            "high": 101.5 + i,
+            "low": 99.25 + i,
+            "close": 100.5 + i,
+            "volume": 10.0 * (i + 1),
+        }
+        if close_time:
+            r["close_time"] = r["open_time"] + 899
+        out.append(r)
+    return out
+
+
+def bar_payload(r: dict) -> dict:
+    return {"symbol": SYMBOL, "interval": INTERVAL, **r}
+
+
+def expect_value_error(fn, what: str) -> None:
+    try:
+        fn()
+    except ValueError:
+        return
+    raise AssertionError(f"{what}: expected ValueError")
+
+
+def main():
+    validator = PBEventValidator()
+
+    # 1) records → 欄式 → 逐根 market.kline payload：值與欄位完全還原
+    recs = records(50)
+    batch = KlineBatch.from_records(recs, symbol=SYMBOL, interval=INTERVAL)
+    assert len(batch) == 50 and batch.open_time.dtype == np.int64
+    events = batch.to_events("replay")
+    assert [ev.payload for ev in events] == [bar_payload(r) for r in recs]
+    assert all(ev.type == "market.kline" and ev.source == "replay" for ev in events)
+    assert [ev.ts for ev in events] == [float(r["open_time"]) for r in recs]
+    assert validator.validate_many(events) == events
+    assert batch.to_events() is events                       # 展開結果快取共用
+    print("[TEST] columnar batch expands back to the original kline payloads ✅")
+
+    # 逐根 payload → 欄式 → 欄位不變；to_lists / DataFrame 也能還原
+    again = KlineBatch.from_records([ev.payload for ev in events], symbol=SYMBOL, interval=INTERVAL)
+    for name, col in batch.columns().items():
+        assert np.array_equal(col, again.columns()[name]), name
+    lists = batch.to_lists()
+    assert lists["symbol"] == SYMBOL and lists["close_time"] == [r["close_time"] for r in recs]
+    framed = KlineBatch.from_frame(batch.to_frame(), symbol=SYMBOL, interval=INTERVAL)
+    assert [ev.payload for ev in framed.to_events()] == [bar_payload(r) for r in recs]
+
+    no_close = KlineBatch.from_records(records(3, close_time=False), symbol=SYMBOL, interval=INTERVAL)
+    assert no_close.close_time is None and "close_time" not in no_close.to_events()[0].payload
+    print("[TEST] payloads / to_lists / DataFrame round trip ✅")
+
+    # 2) 批次事件 → per_bar handler 收到逐根事件
+    bus = ZeroCopyEventBus()
+    bars = []
+    bus.subscribe(KLINE_BATCH, per_bar(lambda ev: bars.append(ev.payload)))
+    event = validator.validate(batch.to_event())
+    assert event.payload["count"] == 50 and event.ts == float(recs[-1]["open_time"])
+    bus.publish(event)
+    assert bars == [bar_payload(r) for r in recs]
+    print("[TEST] per_bar fans a batch event out to per-kline handlers ✅")
+
+    # 3) 空輸入
+    empty = KlineBatch.from_records([], symbol=SYMBOL, interval=INTERVAL)
+    assert len(empty) == 0 and empty.to_events() == [] and empty.close_time is None
+    empty.check()
+    assert validator.validate(empty.to_event()).payload["count"] == 0
+    assert all(v == [] for k, v in empty.to_lists().items() if k in COLUMNS)
+    assert len(batch.tail(0)) == 0 and len(batch.tail(-1)) == 0
+    assert len(batch.tail(5)) == 5 and batch.tail(5).open_time[0] == recs[-5]["open_time"]
+    assert batch.tail(100) is batch
+    assert len(KlineBatch.concat([empty, batch])) == 50
+    expect_value_error(lambda: KlineBatch.concat([]), "concat of nothing")
+    print("[TEST] empty batches / tail(0) ✅")
+
+    # 4) 長度不一致 / 不同 (symbol, interval)
+    cols = {name: [r[name] for r in recs] for name in COLUMNS}
+    for name in COLUMNS[1:]:
+        bad = dict(cols, **{name: cols[name][:-1]})
+        expect_value_error(lambda: KlineBatch(SYMBOL, INTERVAL, **bad), f"short {name}")
+    expect_value_error(
+        lambda: KlineBatch(SYMBOL, INTERVAL, close_time=[1, 2], **cols), "short close_time"
+    )
+    other = KlineBatch.from_records(records(2), symbol="ETH/USDT", interval=INTERVAL)
+    expect_value_error(lambda: KlineBatch.concat([batch, other]), "concat across symbols")
+    payload = dict(event.payload, count=49)
+    assert validator.validate_payloads(KLINE_BATCH, [payload]) == []
+    print("[TEST] mismatched lengths / symbols are rejected ✅")
+
+    print("[TEST] kline batch OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from library.index.library_index import LibraryIndex
+from library.library_event import LibraryEvent
+from library.library_reader import LibraryReader
+from library.library_writer import LibraryWriter
+from shared_core.compressed_jsonl import compress_file
+
+import library_fixtures
+
+
+T0 = datetime(2025, 9, 1, tzinfo=timezone.utc)
+DAYS = 120
+STEP = 900          # 15m
+
+
+def decision(i: int, ts: str):
+    """每 7 根 K 線一個議會決議（同一時間點）"""
+    if i % 7:
+        return []
+    return [LibraryEvent(event_id=f"d{i}", event_type="governance.decision", source="parliament",
+                         payload={"i": i}, ts=ts)]
+
+
+def make_events(start: int, n: int):
+    return library_fixtures.make_events(
+        start, n, step=STEP, t0=T0.timestamp(),
+        event_id=lambda i: f"k{i}",
+        source=lambda i: "live" if i % 4 else "replay",
+        payload=lambda i: {"i": i, "close": 100.0 + i},
+        extra=decision,
+    )
+
+
+def brute(reader: LibraryReader, group_by, where=None, time_range=None):
+    """不用彙總：整庫掃描 → Counter（hour 依 UTC 整點）"""
+    where = where or {}
+    lo, hi = time_range or (None, None)
+    lo = lo.timestamp() // 3600 * 3600 if lo is not None else None
+    out = Counter()
+    for r in reader.iter_events():
+        t = datetime.fromisoformat(r["ts"]).timestamp()
+        if lo is not None and t < lo:
+            continue
+        if hi is not None and t // 3600 * 3600 > hi.timestamp():
+            continue
+        fields = {"type": r["event_type"], "source": r["source"], "day": r["ts"][:10]}
+        if any(fields[k] not in ([v] if isinstance(v, str) else v) for k, v in where.items()):
+            continue
+        key = []
+        for g in group_by:
+            if g == "hour":
+                key.append(datetime.fromtimestamp(t // 3600 * 3600, tz=timezone.utc).isoformat())
+            elif g == "day":
+                key.append(r["ts"][:10])
+            else:
+                key.append(r["event_type"] if g == "type" else r["source"])
+        out[tuple(key)] += 1
+    return out
+
+
+def as_counter(rows, group_by):
+    return Counter({tuple(r[g] for g in group_by): r["count"] for r in rows})
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        reader = LibraryReader(root)
+        try:
+            reader.aggregate()
+            raise AssertionError("expected FileNotFoundError without index")
+        except FileNotFoundError:
+            pass
+
+        writer = LibraryWriter(root)
+        n_bars = DAYS * 96
+        events = make_events(0, n_bars)
+        for i in range(0, len(events), 5000):
+            writer.write_many(events[i:i + 5000])
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+
+        # 1) 儀表板：最近 90 天每小時 K 線數（只讀 hourly 表）
+        reader = LibraryReader(root)
+        end = T0 + timedelta(days=DAYS)
+        span = (end - timedelta(days=90), end)
+        t0 = time.perf_counter()
+        rows = reader.aggregate("hour", where={"type": "market.kline"}, time_range=span)
+        t_agg = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        expect = brute(reader, ["hour"], {"type": "market.kline"}, span)
+        t_scan = time.perf_counter() - t0
+        assert as_counter(rows, ["hour"]) == expect and len(rows) == 90 * 24
+        assert all(r["count"] == 4 for r in rows)
+        assert t_agg < 0.1 and t_agg < t_scan
+        print(f"[TEST] {len(rows)} hourly kline counts: aggregate {t_agg * 1000:.1f} ms vs scan {t_scan * 1000:.0f} ms ✅")
+
+        # 2) 其他組合：type × source、day + where、全部合計（first / last 時間）
+        for group_by, where in (
+            (["type", "source"], None),
+            (["day"], {"source": ["live", "parliament"]}),
+            (["source", "hour"], {"day": "2025-10-03"}),
+        ):
+            got = reader.aggregate(group_by, where=where)
+            assert as_counter(got, group_by) == brute(reader, group_by, where), group_by
+        total = reader.aggregate([])
+        assert total[0]["count"] == len(events)
+        assert total[0]["first_ts"] == T0.timestamp()
+        assert total[0]["last_ts"] == (T0 + timedelta(seconds=(n_bars - 1) * STEP)).timestamp()
+        print("[TEST] type × source / day / hour groupings match full scan ✅")
+
+        # 3) 增量 + 當機重播：stats.json 的 checkpoint 落後 DB → 不重複累加
+        stale = Path(tmp) / "stats.json"
+        shutil.copy(root / "index" / "stats.json", stale)
+        more = make_events(n_bars, 200)
+        writer.write_many(more)
+        idx = LibraryIndex(root)
+        assert idx.build() == len(more)
+        idx.flush()
+        shutil.copy(stale, root / "index" / "stats.json")       # 模擬 commit 後、寫 stats 前當機
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+        reader = LibraryReader(root)
+        assert reader.aggregate([])[0]["count"] == len(events) + len(more)
+        assert as_counter(reader.aggregate(["type", "day"]), ["type", "day"]) == brute(reader, ["type", "day"])
+        print("[TEST] incremental build / replayed checkpoint counted once ✅")
+
+        # 4) 壓縮的日照樣有彙總；舊版索引（沒有 hourly）→ 自動整庫重建
+        writer.close()
+        first = sorted((root / "events").rglob("*.jsonl"))[0]
+        compress_file(first, first.with_name(first.name + ".gz"), compression="gzip")
+        first.unlink()
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+        day0 = first.name.split(".jsonl")[0]
+        got = LibraryReader(root).aggregate(["type"], where={"day": day0})
+        assert as_counter(got, ["type"]) == brute(LibraryReader(root), ["type"], {"day": day0})
+
+        idx.postings.close()
+        with sqlite3.connect(root / "index" / "postings.sqlite") as conn:
+            conn.execute("DROP TABLE hourly")
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+        assert LibraryReader(root).aggregate([])[0]["count"] == len(events) + len(more)
+        print("[TEST] compressed day aggregated / legacy index upgraded ✅")
+
+    print("[TEST] library aggregate OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from library.library_columnar import JSON_SUFFIX, PARQUET_SUFFIX, LibraryColumnar
+from library.library_event import LibraryEvent
+from library.library_reader import LibraryReader
+from library.library_writer import LibraryWriter
+
+import library_fixtures
+
+
+T0 = datetime(2025, 7, 1, tzinfo=timezone.utc)
+SYMBOLS = ("BTC/USDT", "ETH/USDT", "SOL/USDT")
+DAYS = 90
+STEP = 900          # 15m
+
+
+def kline(i: int, sym: str):
+    return {"symbol": sym, "interval": "15m", "open": 100.0 + i, "high": 101.0 + i,
+            "low": 99.0 + i, "close": 100.5 + i, "volume": 1.5, "ts": T0.timestamp() + i * STEP}
+
+
+def more_rows(i: int, ts: str):
+    """其餘 symbol 的 K 線 + 每天一個議會決議（同一時間點）"""
+    out = [
+        LibraryEvent(event_id=f"k{i}-{k}", event_type="market.kline", source="live", payload=kline(i, sym), ts=ts)
+        for k, sym in enumerate(SYMBOLS) if k
+    ]
+    if i % 96 == 0:
+        out.append(LibraryEvent(
+            event_id=f"d{i}",
+            event_type="governance.decision",
+            source="parliament",
+            payload={"agenda_id": f"a{i}", "outcome": "approved", "votes": [1, 2, 3]},
+            ts=ts,
+            meta={"agenda_id": f"a{i}", "outcome": "approved"},
+        ))
+    return out
+
+
+def make_events(start: int, n: int):
+    return library_fixtures.make_events(
+        start, n, step=STEP, t0=T0.timestamp(),
+        event_id=lambda i: f"k{i}-0",
+        payload=lambda i: kline(i, SYMBOLS[0]),
+        extra=more_rows,
+    )
+
+
+def check_part_merge(root: Path, fmt: str) -> None:
+    writer = LibraryWriter(root)
+    col = LibraryColumnar(root, fmt=fmt)
+    today = T0 + timedelta(hours=20)
+    for k in range(5):
+        writer.write_many(make_events(k * 10, 10))      # 同一天（前 50 根 15m K 線）
+        assert col.sync(now=today) == 30 + (k == 0)     # + 一個議會決議
+    day = T0.strftime("%Y-%m-%d")
+    part_dir = root / "columnar" / "event_type=market.kline" / f"day={day}"
+    assert len(list(part_dir.iterdir())) == 5
+    query = dict(columns=["event_id", "close", "symbol"], day=day, as_frame=False)
+    before = col.query("market.kline", **query)
+
+    # 隔天（過了 grace）→ 合併；之後又 append → 新 part，下次再合併
+    col.sync(now=T0 + timedelta(days=1, hours=3))
+    assert [p.name for p in part_dir.iterdir()] == [f"part-000005{_suffix(fmt)}"]
+    assert col.query("market.kline", **query) == before and len(before["event_id"]) == 150
+    dec_dir = root / "columnar" / "event_type=governance.decision" / f"day={day}"
+    assert len(list(dec_dir.iterdir())) == 1
+    assert col.query("governance.decision", columns=["meta.outcome"], day=day, as_frame=False)["meta.outcome"] == ["approved"]
+
+    writer.write_many(make_events(50, 2))
+    assert col.sync(now=T0 + timedelta(days=1, hours=4)) == 6
+    assert [p.name for p in part_dir.iterdir()] == [f"part-000006{_suffix(fmt)}"]
+    assert len(col.query("market.kline", **query)["event_id"]) == 156
+
+    # 合併到一半中斷（state 已記下 merging）→ 重開後接著做完，不會多出重複的列
+    writer.write_many(make_events(52, 1))
+    col = LibraryColumnar(root, fmt=fmt)
+    col._finish_merge = lambda day, cp: None
+    col.sync(now=T0 + timedelta(days=2))
+    col = LibraryColumnar(root, fmt=fmt)
+    assert col.state[day].get("merging") == 7
+    assert len(col.query("market.kline", **query)["event_id"]) == 159      # .merge 還沒換上 → 讀舊 part
+    col.sync(now=T0 + timedelta(days=2))
+    assert [p.name for p in part_dir.iterdir()] == [f"part-000007{_suffix(fmt)}"]
+    assert len(col.query("market.kline", **query)["event_id"]) == 159
+    writer.close()
+    print(f"[TEST] {fmt} parts merged once the day is finished (incl. interrupted merge) ✅")
+
+
+def _suffix(fmt: str) -> str:
+    return PARQUET_SUFFIX if fmt == "parquet" else JSON_SUFFIX
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        writer = LibraryWriter(root)
+        n_bars = DAYS * 96
+        events = make_events(0, n_bars)
+        for i in range(0, len(events), 5000):
+            writer.write_many(events[i:i + 5000])
+        # 欄式批次（market.kline.batch）→ 一根一列
+        writer.write_event(LibraryEvent(
+            event_id="batch-1",
+            event_type="market.kline.batch",
+            source="replay",
+            payload={"symbol": "BTC/USDT", "interval": "15m", "count": 3,
+                     "batch": {"symbol": "BTC/USDT", "interval": "15m",
+                               "open_time": [1, 2, 3], "close": [1.0, 2.0, 3.0]}},
+            ts=T0.isoformat(),
+        ))
+        writer.flush()
+
+        col = LibraryColumnar(root)
+        t0 = time.perf_counter()
+        rows = col.sync()
+        print(f"[TEST] initial sync: {rows} rows ({col.fmt}) in {time.perf_counter() - t0:.2f}s ✅")
+        assert rows == len(events) + 3
+        assert col.sync() == 0
+        assert col.types() == ["governance.decision", "market.kline", "market.kline.batch"]
+
+        # 1) 「某 symbol 兩個月的 K 線」：欄式 vs 逐筆 JSON
+        reader = LibraryReader(root)
+        start, end = T0 + timedelta(days=30), T0 + timedelta(days=90)
+        t0 = time.perf_counter()
+        got = reader.query(
+            "market.kline", columns=["ts_epoch", "close"], where={"symbol": "ETH/USDT"},
+            start=start, end=end, as_frame=False,
+        )
+        t_query = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        expect = [
+            r for r in reader.iter_events(type="market.kline")
+            if r["payload"]["symbol"] == "ETH/USDT"
+            and start.timestamp() <= datetime.fromisoformat(r["ts"]).timestamp() <= end.timestamp()
+        ]
+        t_scan = time.perf_counter() - t0
+
+        assert got["close"] == [r["payload"]["close"] for r in expect]
+        assert got["ts_epoch"] == sorted(got["ts_epoch"])
+        assert list(got) == ["ts_epoch", "close"]
+        print(f"[TEST] {len(expect)} klines: query {t_query * 1000:.0f} ms vs JSON scan {t_scan * 1000:.0f} ms ✅")
+
+        # 2) 攤平：meta.* / list → JSON 字串 / batch 展開
+        dec = reader.query("governance.decision", as_frame=False)
+        assert dec["meta.outcome"][0] == "approved" and dec["votes"][0] == "[1, 2, 3]"
+        batch = reader.query("market.kline.batch", columns=["open_time", "close"], as_frame=False)
+        assert batch == {"open_time": [1, 2, 3], "close": [1.0, 2.0, 3.0]}
+        print("[TEST] payload / meta flattened, batch exploded ✅")
+
+        # 3) 增量：append 只寫新 part；改寫的日整天重建
+        more = make_events(n_bars, 10)
+        writer.write_many(more)
+        assert col.sync() == len(more)
+        last_day = (T0 + timedelta(seconds=(n_bars + 9) * STEP)).strftime("%Y-%m-%d")
+        got = reader.query("market.kline", columns=["event_id"], day=last_day, as_frame=False)
+        assert got["event_id"][-1] == f"k{n_bars + 9}-2"
+
+        writer.close()
+        first = sorted((root / "events").rglob("*.jsonl"))[0]
+        lines = first.read_text(encoding="utf-8").splitlines(keepends=True)
+        first.write_text("".join(lines[:7]), encoding="utf-8")
+        col = LibraryColumnar(root)
+        assert col.sync() == 7
+        day = first.name.split(".jsonl")[0]
+        ids = reader.query(None, columns=["event_id"], day=day, as_frame=False)["event_id"]
+        assert len(ids) == 7
+        parts = sorted((root / "columnar").rglob("part-*"))
+        assert len(parts) == len({p.parent for p in parts})            # 已結束的日 → 每個分區一個 part
+        print("[TEST] incremental sync / rewritten day rebuilt ✅")
+
+        # 4) part 合併：今天的日照常一次 sync 一個 part；日結束後合併成一個，查詢結果不變
+        check_part_merge(Path(tmp) / "merge-json", "json")
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("[TEST] pyarrow not installed → Parquet part merge skipped")
+        else:
+            check_part_merge(Path(tmp) / "merge-parquet", "parquet")
+
+        # 5) DataFrame（有 pandas 才測）
+        try:
+            import pandas  # noqa: F401
+        except ImportError:
+            print("[TEST] pandas not installed → DataFrame path skipped")
+        else:
+            df = reader.query("market.kline", columns=["ts_epoch", "close"], where={"symbol": "BTC/USDT"})
+            assert list(df.columns) == ["ts_epoch", "close"] and len(df) > 0
+            print("[TEST] DataFrame result ✅")
+
+    print("[TEST] library columnar OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import random
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+
+from library.index.library_index import LibraryIndex
+from library.library_compactor import LibraryCompactor
+from library.library_event import LibraryEvent
+from library.library_reader import LibraryReader
+from library.library_writer import get_library_writer
+from shared_core.compressed_jsonl import BlockReader, index_path, iter_text_lines, record_ts
+from shared_core.event_raw.ts_index import build_ts_index, ts_index_path
+
+
+T0 = datetime(2025, 9, 1, tzinfo=timezone.utc)
+NOW = T0 + timedelta(days=3, hours=12)      # 09-01、09-02 已結束；09-04 是「今天」
+DAYS = ["2025-09-01", "2025-09-02", "2025-09-04"]
+
+
+def make_events(day_offset: int, n: int, rng: random.Random):
+    """亂序時間（多來源回補）"""
+    out = []
+    for i in range(n):
+        ts = T0 + timedelta(days=day_offset, seconds=rng.randrange(86400))
+        out.append(LibraryEvent(
+            event_id=f"e{day_offset}-{i}",
+            event_type="market.kline" if i % 3 else "governance.decision",
+            source="live" if i % 2 else "replay",
+            payload={"i": i},
+            ts=ts.isoformat(),
+        ))
+    return out
+
+
+def day_file(root: Path, day: str) -> Path:
+    return root / "events" / day[:4] / day[5:7] / f"{day}.jsonl"
+
+
+def read_ts(path: Path):
+    return [record_ts(json.loads(line)) for line in iter_text_lines(path) if line.strip()]
+
+
+def main():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        writer = get_library_writer(root)
+        per_day = {}
+        for k, day in enumerate(DAYS):
+            events = make_events([0, 1, 3][k], 3000, rng)
+            per_day[day] = events
+            writer.write_many(events)
+            writer.write_many(events[:500])                 # 重播 → 重複
+        with open(day_file(root, DAYS[0]), "ab") as f:
+            f.write(b'{"event_id": "torn", "event_type": "mark')   # 寫到一半的行
+        writer.release()
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+
+        # 1) 只挑已結束的日；去重、排序、壞行丟掉、索引重建
+        build_ts_index(day_file(root, DAYS[0]))                # ReplayEngine 時間窗查詢補建的索引
+        compactor = LibraryCompactor(root)
+        assert compactor.pending_days(now=NOW) == DAYS[:2]
+        results = compactor.run(now=NOW)
+        assert not ts_index_path(day_file(root, DAYS[0])).exists()     # offset 已失效 → 刪掉
+        assert [r["status"] for r in results] == ["compacted", "compacted"]
+        assert results[0]["duplicates"] == 500 and results[0]["bad_lines"] == 1
+        assert results[0]["bytes_after"] < results[0]["bytes_before"]
+        for day in DAYS[:2]:
+            ts = read_ts(day_file(root, day))
+            assert len(ts) == 3000 and ts == sorted(ts)
+        ts = read_ts(day_file(root, DAYS[2]))
+        assert len(ts) == 3500                              # 今天的日不動
+        print("[TEST] finished days deduplicated / time-sorted, today untouched ✅")
+
+        reader = LibraryReader(root)
+        got = list(reader.iter_events(day=DAYS[0], type="governance.decision"))
+        assert len(got) == 1000 and len({r["event_id"] for r in got}) == 1000
+        assert [r["ts"] for r in got] == sorted(r["ts"] for r in got)
+        agg = {r["day"]: r["count"] for r in reader.aggregate(["day"])}
+        assert agg == {DAYS[0]: 3000, DAYS[1]: 3000, DAYS[2]: 3500}, agg
+        assert len(reader.sample(n=200, seed=1, day=DAYS[1])) == 200
+        print("[TEST] iter_events / aggregate / sample consistent after swap + reindex ✅")
+
+        # 2) 再跑一次 → 沒事做；之後又被寫入 → 重新列入
+        assert LibraryCompactor(root).pending_days(now=NOW) == []
+        late = make_events(1, 1, rng)[0]
+        writer.write_event(LibraryEvent(
+            event_id="late", event_type=late.event_type, source=late.source,
+            payload={}, ts=(T0 + timedelta(days=1)).isoformat(),
+        ))
+        writer.release()
+        assert LibraryCompactor(root).pending_days(now=NOW) == [DAYS[1]]
+        print("[TEST] compaction marker skips unchanged days, late writes re-queue ✅")
+
+        # 3) 壓縮輸出 + 讀取端在換檔期間持續讀
+        stop = threading.Event()
+        seen, errors = set(), []
+
+        def read_loop():
+            while not stop.is_set():
+                try:
+                    seen.add(sum(1 for _ in LibraryReader(root).iter_events(day=DAYS[1])))
+                except Exception as e:                      # noqa: BLE001
+                    errors.append(e)
+
+        t = threading.Thread(target=read_loop)
+        t.start()
+        try:
+            results = LibraryCompactor(root, compression="gzip").run(now=NOW)
+        finally:
+            stop.set()
+            t.join()
+        assert [r["status"] for r in results] == ["compacted"]
+        assert not errors, errors
+        assert seen <= {3001}, seen
+        gz = day_file(root, DAYS[1]).with_name(f"{DAYS[1]}.jsonl.gz")
+        assert gz.exists() and index_path(gz).exists() and not day_file(root, DAYS[1]).exists()
+        ts = read_ts(gz)
+        assert len(ts) == 3001 and ts == sorted(ts)
+        blocks = BlockReader(gz).blocks
+        assert all(a["max_ts"] <= b["min_ts"] for a, b in zip(blocks, blocks[1:]))
+        assert {r["day"]: r["count"] for r in LibraryReader(root).aggregate(["day"])}[DAYS[1]] == 3001
+        print(f"[TEST] gzip output with block index, {len(seen)} concurrent read result(s) all complete ✅")
+
+        # 4) 同 process 的 writer 在換檔後繼續寫 → 寫到新檔；壓縮過的日先解壓回 .jsonl 再 append
+        #    解壓在全域 lock 外；write_event 先進 buffer，release 時才寫出
+        restore, restored_locked = writer._restore_compacted, []
+
+        def spy_restore(path):
+            restored_locked.append(writer._lock.locked())
+            restore(path)
+
+        writer._restore_compacted = spy_restore
+        writer.write_event(LibraryEvent(
+            event_id="after", event_type="market.kline", source="live",
+            payload={}, ts=T0.isoformat(),
+        ))
+        writer.write_event(LibraryEvent(
+            event_id="after-gz", event_type="governance.decision", source="live",
+            payload={}, ts=(T0 + timedelta(days=1, hours=3)).isoformat(),
+        ))
+        del writer._restore_compacted
+        assert restored_locked == [False], restored_locked
+        assert writer.stats()["pending"] == 2 and len(read_ts(day_file(root, DAYS[0]))) == 3000
+        writer.release()
+        assert writer.stats()["pending"] == 0
+        assert len(read_ts(day_file(root, DAYS[0]))) == 3001
+        assert not gz.exists() and not index_path(gz).exists()
+        assert len(read_ts(day_file(root, DAYS[1]))) == 3002
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+        reader = LibraryReader(root)
+        assert sum(1 for _ in reader.iter_events(day=DAYS[1])) == 3002
+        assert sum(1 for _ in reader.scan(day=DAYS[1], workers=1)) == 3002
+        assert reader.get_stats()["files"][DAYS[1]]["count"] == 3002
+        got = list(reader.iter_events(day=DAYS[1], type="governance.decision"))
+        assert len(got) == 1002 and "after-gz" in {r["event_id"] for r in got}      # 1000 + late + after-gz
+        assert LibraryCompactor(root).pending_days(now=NOW) == [DAYS[0], DAYS[1]]
+        writer.close()
+        print("[TEST] late write to a gzip-compacted day: restored outside the writer lock, whole day readable / indexed ✅")
+
+        # 5) 讀取端拿著舊的 postings 快照，compaction 換檔（未壓縮、大小不變）→ 不能整天讀不到
+        root2 = Path(tmp) / "library2"
+        writer2 = get_library_writer(root2)
+        for k, day in enumerate(DAYS[:2]):
+            writer2.write_many(make_events(k, 2000, rng))          # 沒有重複 / 壞行，只是亂序
+        writer2.release()
+        idx = LibraryIndex(root2)
+        idx.build()
+        idx.flush()
+        size_before = day_file(root2, DAYS[1]).stat().st_size
+        it = LibraryReader(root2).iter_events(type="governance.decision")
+        first = next(it)                                            # 已開始讀 DAYS[0]，快照已拿
+        results = LibraryCompactor(root2, reindex=False).run(days=DAYS[:2])     # 換完檔、索引還沒重建
+        assert [r["status"] for r in results] == ["compacted", "compacted"]
+        assert day_file(root2, DAYS[1]).stat().st_size == size_before
+        got = [first, *it]
+        assert len(got) == 2 * 667 and len({r["event_id"] for r in got}) == len(got), len(got)
+        idx = LibraryIndex(root2)
+        idx.build()
+        idx.flush()
+        got = list(LibraryReader(root2).iter_events(day=DAYS[1], type="governance.decision"))
+        assert len(got) == 667 and [r["ts"] for r in got] == sorted(r["ts"] for r in got)
+        writer2.close()
+        print("[TEST] in-flight indexed read across an uncompressed same-size swap sees every event ✅")
+
+    print("[TEST] library compaction OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import tempfile
+import threading
+import time
+
+from library.index.library_index import LibraryIndex
+from library.library_reader import LibraryReader
+from library.library_writer import LibraryWriter
+
+import library_fixtures
+
+
+def make_events(start: int, n: int):
+    return library_fixtures.make_events(
+        start, n, step=30.0,
+        event_type=lambda i: "market.kline" if i % 3 else "system.heartbeat",
+        source=lambda i: "replay" if i % 2 else "live",
+    )
+
+
+def snapshot(idx: LibraryIndex):
+    """可比較的索引內容（不含 checkpoint 欄位）"""
+    files = {
+        day: {k: v for k, v in info.items() if k in ("count", "first_ts", "last_ts", "types", "sources")}
+        for day, info in idx.stats["files"].items()
+    }
+    postings = {}
+    for day, (fid, _, end, *_) in idx.postings.files().items():
+        rows = idx.postings.conn.execute(
+            "SELECT p.offset, p.length, t.name, s.name, p.hour_of_day FROM postings p"
+            " LEFT JOIN terms t ON t.id = p.type_id LEFT JOIN terms s ON s.id = p.source_id"
+            " WHERE p.file_id = ? ORDER BY p.offset", (fid,)
+        ).fetchall()
+        postings[day] = (end, rows)
+    return files, idx.stats["summary"], postings
+
+
+def posting_count(idx: LibraryIndex, day: str) -> int:
+    fid = idx.postings.files()[day][0]
+    return idx.postings.conn.execute("SELECT COUNT(*) FROM postings WHERE file_id = ?", (fid,)).fetchone()[0]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        writer = LibraryWriter(root)
+        writer.write_many(make_events(0, 20_000))       # 約 7 天
+
+        idx = LibraryIndex(root)
+        assert idx.build() == 20_000
+        idx.flush()
+        days = len(idx.stats["files"])
+        print(f"[TEST] initial build: 20000 events, {days} days ✅")
+
+        # 1) 沒變 → 不讀任何東西
+        idx = LibraryIndex(root)
+        t0 = time.perf_counter()
+        assert idx.build() == 0
+        t_noop = time.perf_counter() - t0
+        print(f"[TEST] unchanged library: 0 events re-parsed ({t_noop * 1000:.1f} ms) ✅")
+
+        # 2) append 到最後一天 + 寫到一半的行
+        writer.write_many(make_events(20_000, 100))
+        last = sorted((root / "events").rglob("*.jsonl"))[-1]
+        with last.open("a", encoding="utf-8") as f:
+            f.write('{"event_id": "half')
+        idx = LibraryIndex(root)
+        assert idx.build() == 100
+        idx.flush()
+        with last.open("a", encoding="utf-8") as f:
+            f.write('", "event_type": "x", "source": "s", "ts": "2026-01-07T23:00:00+00:00"}\n')
+        assert idx.build() == 1
+        idx.flush()
+        print("[TEST] appended tail only, partial line deferred ✅")
+
+        # 3) 增量結果 == 全量重建
+        incr = snapshot(LibraryIndex(root))
+        full = LibraryIndex(Path(tmp) / "library")
+        full.build(full=True)
+        full.flush()
+        assert snapshot(full) == incr
+        assert incr[1]["total_events"] == 20_101
+        print("[TEST] incremental == full rebuild ✅")
+
+        # 4) 檔案被改寫（變小）→ 該日重建；檔案刪除 → 索引移除
+        first = sorted((root / "events").rglob("*.jsonl"))[0]
+        lines = first.read_text(encoding="utf-8").splitlines(keepends=True)
+        first.write_text("".join(lines[:10]), encoding="utf-8")
+        victim = sorted((root / "events").rglob("*.jsonl"))[1]
+        victim.unlink()
+        writer.release()
+
+        idx = LibraryIndex(root)
+        assert idx.build() == 10
+        idx.flush()
+        assert idx.stats["files"][first.stem]["count"] == 10
+        assert victim.stem not in idx.stats["files"]
+        assert posting_count(idx, first.stem) == 10
+        assert victim.stem not in idx.postings.files()
+        print("[TEST] truncated day rebuilt, deleted day dropped ✅")
+
+        # 5) flush 中途當機（postings 已 commit、stats 沒寫）→ 不會重複
+        idx = LibraryIndex(root)
+        writer.write_many(make_events(20_101, 5))
+        idx.build()
+        idx._write = lambda name, data: None      # stats.json 沒寫出去
+        idx.flush()
+        idx = LibraryIndex(root)
+        assert idx.build() == 5
+        idx.flush()
+        assert posting_count(idx, last.stem) == idx.stats["files"][last.stem]["count"]
+        print("[TEST] re-indexed range after crash deduplicated ✅")
+
+        # 6) legacy v1 postings + reader
+        idx = LibraryIndex(root, legacy_postings=True)
+        idx.build(full=True)
+        idx.flush()
+        by_type = json.loads((root / "index" / "by_type.json").read_text(encoding="utf-8"))
+        assert sum(len(v) for v in by_type.values()) == idx.stats["summary"]["total_events"]
+        reader = LibraryReader(root)
+        assert reader.get_stats()["summary"]["types"]["market.kline"] > 0
+        assert len(reader.sample(n=10, by="type", seed=1)) == 10
+
+        # 7) watch
+        expected = idx.stats["summary"]["total_events"] + 7
+        stop = threading.Event()
+        watcher = LibraryIndex(root)
+        th = threading.Thread(target=watcher.watch, args=(0.05,), kwargs={"stop_event": stop})
+        th.start()
+        writer.write_many(make_events(20_106, 7))
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            if reader.get_stats()["summary"]["total_events"] == expected:
+                break
+            time.sleep(0.05)
+        stop.set()
+        th.join()
+        writer.close()
+        assert reader.get_stats()["summary"]["total_events"] == expected
+        print("[TEST] watch mode picks up new events ✅")
+
+    print("[TEST] library index incremental OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import tempfile
+import time
+
+from library.ingest.dedup import BloomFilter
+from library.ingest.replay_ingestor import LibraryIngestor
+from library.library_writer import LibraryWriter
+from shared_core.replay.replay_engine import ReplayEngine
+
+from library_fixtures import T0, make_events
+
+
+N = 60_000
+STEP = 30.0               # 約 21 天
+
+
+def write_raw(path: Path, start: int, n: int, *, junk: bool = False):
+    """event_raw 格式（PBEvent.to_dict）；junk → 夾雜壞行 / 沒有 type 的 raw / 檔內重複"""
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(start, start + n):
+            f.write(json.dumps({
+                "type": "market.kline",
+                "source": "live",
+                "event_id": f"e{i}",
+                "ts": T0 + i * STEP,
+                "payload": {"i": i, "close": 42000.5 + i},
+            }) + "\n")
+            if junk and i % 10_000 == 0:
+                f.write("{not json\n")
+                f.write(json.dumps({"symbol": "BTC/USDT", "close": 1.0}) + "\n")
+                f.write(json.dumps({"type": "market.kline", "source": "live", "event_id": f"e{i}",
+                                    "ts": T0 + i * STEP, "payload": {"i": i}}) + "\n")
+
+
+def library_ids(root: Path):
+    ids = []
+    for p in sorted((root / "events").rglob("*.jsonl")):
+        ids.extend(json.loads(line)["event_id"] for line in p.read_text(encoding="utf-8").splitlines())
+    return ids
+
+
+def main():
+    # 0) Bloom：沒有 false negative，誤判率約 1%
+    bloom = BloomFilter(20_000)
+    for i in range(20_000):
+        bloom.add(f"x{i}")
+    assert all(f"x{i}" in bloom for i in range(20_000))
+    fp = sum(f"y{i}" in bloom for i in range(20_000)) / 20_000
+    assert fp < 0.02
+    print(f"[TEST] bloom m={bloom.m} k={bloom.k} false positive rate {fp:.2%} ✅")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        warm = tmp / "logs_warm.jsonl"
+        write_raw(warm, 0, N, junk=True)
+
+        # 1) 第一次灌庫：全部寫入；壞行 / 需要 gateway 的 raw 記 errors；檔內重複跳過
+        root = tmp / "library"
+        ingestor = LibraryIngestor(LibraryWriter(root))
+        t0 = time.perf_counter()
+        count = ingestor.ingest_file(warm, workers=1)
+        t_first = time.perf_counter() - t0
+        stats = ingestor.get_stats()
+        assert count == N + 6 and stats["ok"] == N
+        assert stats["duplicates"] == 6 and stats["errors"] == 12
+        ids = library_ids(root)
+        assert len(ids) == len(set(ids)) == N
+        assert (root / "index" / "dedup" / "_state.json").exists()
+        print(f"[TEST] first ingest {N} events in {t_first * 1000:.0f} ms: {stats} ✅")
+
+        # 2) 重灌整個檔案（新的 ingestor → Bloom 從 index/dedup 載入）：一筆都不重寫
+        ingestor = LibraryIngestor(LibraryWriter(root))
+        t0 = time.perf_counter()
+        ingestor.ingest_file(warm, workers=1)
+        t_again = time.perf_counter() - t0
+        stats = ingestor.get_stats()
+        assert stats["ok"] == 0 and stats["duplicates"] == N + 6
+        assert len(library_ids(root)) == N
+        print(f"[TEST] re-ingest skipped {stats['duplicates']} duplicates in {t_again * 1000:.0f} ms ✅")
+
+        # 3) 別的 writer 追加（Bloom 存檔之後）→ 載入時補上尾巴；新資料照常寫入
+        writer = LibraryWriter(root)
+        writer.write_many(make_events(N, 1, step=STEP))
+        writer.close()
+        write_raw(warm, N, 100)
+        ingestor = LibraryIngestor(LibraryWriter(root))
+        ingestor.ingest_file(warm, workers=1)
+        stats = ingestor.get_stats()
+        assert stats["ok"] == 99 and stats["duplicates"] == N + 7
+        ids = library_ids(root)
+        assert len(ids) == len(set(ids)) == N + 100
+        print("[TEST] appended by another writer → tail folded into bloom ✅")
+
+        # 4) ReplayEngine 逐筆路徑（target=library）同樣去重
+        ingestor = LibraryIngestor(LibraryWriter(root))
+        engine = ReplayEngine(bus=None, gateway=None, ingestor=ingestor)
+        engine.replay(str(warm), target="library", speed=0)
+        stats = ingestor.get_stats()
+        assert stats["ok"] == 0 and stats["duplicates"] == N + 106
+        print(f"[TEST] ReplayEngine target=library: {stats['duplicates']} duplicates skipped ✅")
+
+        # 5) 平行 pipeline：結果與單一 process 相同（依原順序）
+        root2 = tmp / "library2"
+        ingestor = LibraryIngestor(LibraryWriter(root2))
+        count = ingestor.ingest_file(warm, workers=2, chunk_bytes=256 << 10, inline_bytes=0)
+        assert count == N + 106 and ingestor.get_stats()["ok"] == N + 100
+        assert library_ids(root2) == library_ids(root)
+        print(f"[TEST] parallel pipeline (workers=2): {ingestor.get_stats()} ✅")
+
+        # 6) 灌庫途中別的 writer 也 append 同一天 → Bloom 存檔只記自己涵蓋到的位置，下次載入補讀
+        ingestor = LibraryIngestor(LibraryWriter(root2))
+        assert ingestor.ingest_library_events(make_events(N + 100, 1, step=STEP)) == 1
+        other = LibraryWriter(root2)
+        other.write_many(make_events(N + 101, 1, step=STEP))
+        other.close()
+        ingestor.ingest_library_events(make_events(N + 102, 1, step=STEP))
+        ingestor.flush()
+        assert ingestor.stats.seconds > 0
+        ingestor = LibraryIngestor(LibraryWriter(root2))
+        assert ingestor.ingest_library_events(make_events(N + 100, 3, step=STEP)) == 0
+        ids = library_ids(root2)
+        assert len(ids) == len(set(ids)) == N + 103
+        print("[TEST] concurrent append during ingest stays deduplicated after checkpoint ✅")
+
+        # 7) replay 中途出錯（bus 丟例外）→ 已收下但還沒滿一批的事件照樣落盤
+        class FailingBus:
+            def __init__(self):
+                self.n = 0
+
+            def publish(self, ev):
+                self.n += 1
+                if self.n == 1500:
+                    raise RuntimeError("bus down")
+
+        root3 = tmp / "library3"
+        ingestor = LibraryIngestor(LibraryWriter(root3))
+        engine = ReplayEngine(bus=FailingBus(), gateway=None, ingestor=ingestor)
+        try:
+            engine.replay(str(warm), target="both", speed=0, batch_size=1)
+            raise AssertionError("expected bus failure")
+        except RuntimeError as e:
+            assert str(e) == "bus down"
+        assert len(library_ids(root3)) == ingestor.get_stats()["ok"] == 1499      # 1500 筆含一筆檔內重複
+        ingestor.close()
+        print("[TEST] replay failure still flushes the ingestor batch ✅")
+
+    print("[TEST] library ingest dedup OK")
+
+
+if __name__ == "__main__":
+    main()
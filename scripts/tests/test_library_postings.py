@@ -0,0 +1,147 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import sqlite3
+import tempfile
+import time
+
+from library.index.library_index import LibraryIndex
+from library.index.posting_index import POSTINGS_DB
+from library.library_reader import LibraryReader
+from library.library_writer import LibraryWriter
+from shared_core.compressed_jsonl import compress_file
+
+import library_fixtures
+
+
+N = 200_000
+STEP = 13.0               # 約 30 天
+
+
+def make_events(start: int, n: int):
+    return library_fixtures.make_events(
+        start, n, step=STEP,
+        event_type=lambda i: "governance.decision" if i % 200 == 7 else "market.kline",
+        source=lambda i: "parliament" if i % 200 == 7 else ("replay" if i % 2 else "live"),
+        payload=lambda i: {"i": i, "close": 42000.5 + i},
+    )
+
+
+def ids(records):
+    return [r["payload"]["i"] for r in records]
+
+
+def scan(reader: LibraryReader, **kw):
+    """不用索引：整檔掃描 + 逐筆比對"""
+    reader._postings = None
+    reader._posting_index = lambda: None
+    return list(reader.iter_events(**kw))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        writer = LibraryWriter(root)
+        events = make_events(0, N)
+        for i in range(0, N, 5000):
+            writer.write_many(events[i:i + 5000])
+
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+        size_db = (root / "index" / "postings.sqlite").stat().st_size
+        size_ev = sum(p.stat().st_size for p in (root / "events").rglob("*.jsonl"))
+        print(f"[TEST] postings.sqlite {size_db / 1e6:.1f} MB for {size_ev / 1e6:.1f} MB of events ✅")
+
+        # 1) 稀有 type：索引 seek vs 整檔掃描
+        reader = LibraryReader(root)
+        t0 = time.perf_counter()
+        got = list(reader.iter_events(type="governance.decision"))
+        t_index = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        expect = scan(LibraryReader(root), type="governance.decision")
+        t_scan = time.perf_counter() - t0
+
+        assert ids(got) == ids(expect) and len(got) == N // 200
+        assert t_index < t_scan
+        print(f"[TEST] rare type {len(got)} events: index {t_index * 1000:.0f} ms vs scan {t_scan * 1000:.0f} ms ✅")
+
+        # 2) 組合條件：day + source + hour
+        day = "2026-01-10"
+        for kw in (
+            {"day": day, "source": "live"},
+            {"type": "market.kline", "source": ["replay"], "hour": [3, 4]},
+            {"day": day, "hour": 12, "limit": 50},
+        ):
+            assert ids(reader.iter_events(**kw)) == ids(scan(LibraryReader(root), **kw)), kw
+        print("[TEST] day / source / hour filters match full scan ✅")
+
+        # 3) 索引之後 append 的尾巴照樣讀得到
+        writer.write_many(make_events(N, 400))
+        got = list(LibraryReader(root).iter_events(type="governance.decision"))
+        assert ids(got) == ids(scan(LibraryReader(root), type="governance.decision"))
+        assert len(got) == (N + 400) // 200
+        print("[TEST] unindexed tail still scanned ✅")
+
+        # 4) 壓縮的日 / 被改寫的日 → 退回掃描
+        writer.close()
+        first = sorted((root / "events").rglob("*.jsonl"))[0]
+        compress_file(first, first.with_name(first.name + ".gz"), compression="gzip")
+        first.unlink()
+        second = sorted((root / "events").rglob("*.jsonl"))[0]
+        lines = second.read_text(encoding="utf-8").splitlines(keepends=True)
+        second.write_text("".join(lines[:100]), encoding="utf-8")
+
+        kw = {"type": "governance.decision"}
+        assert ids(LibraryReader(root).iter_events(**kw)) == ids(scan(LibraryReader(root), **kw))
+
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+        assert ids(LibraryReader(root).iter_events(**kw)) == ids(scan(LibraryReader(root), **kw))
+        print("[TEST] compressed / rewritten days fall back to scan ✅")
+
+        # 5) postings 存當地小時（hour_of_day）、hourly 存 UTC 整點（epoch_hour）；
+        #    改名前的索引（兩邊都叫 hour）→ 讀取端退回掃描，build() 整庫重建
+        db = root / "index" / POSTINGS_DB
+
+        def columns(table):
+            with sqlite3.connect(db) as conn:
+                return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+        assert "hour_of_day" in columns("postings") and "epoch_hour" in columns("hourly")
+        idx.postings.close()
+        with sqlite3.connect(db) as conn:
+            conn.execute("ALTER TABLE postings RENAME COLUMN hour_of_day TO hour")
+            conn.execute("ALTER TABLE hourly RENAME COLUMN epoch_hour TO hour")
+        kw = {"type": "market.kline", "hour": [3], "day": "2026-01-10"}
+        expect = ids(scan(LibraryReader(root), **kw))
+        assert expect and ids(LibraryReader(root).iter_events(**kw)) == expect
+        try:
+            LibraryReader(root).aggregate(["hour"])
+        except FileNotFoundError:
+            pass
+        else:
+            raise AssertionError("aggregate on a pre-rename index must ask for a rebuild")
+
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+        assert "hour_of_day" in columns("postings") and "epoch_hour" in columns("hourly")
+        assert ids(LibraryReader(root).iter_events(**kw)) == expect
+        rows = LibraryReader(root).aggregate(["day"], where={"day": "2026-01-10"})
+        assert rows and rows[0]["count"] == sum(1 for _ in scan(LibraryReader(root), day="2026-01-10"))
+        idx.postings.close()
+        print("[TEST] hour_of_day / epoch_hour columns, pre-rename index rebuilt ✅")
+
+    print("[TEST] library postings OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import random
+import tempfile
+import time
+from collections import Counter
+
+import library.library_reader as library_reader
+import library.library_scan as library_scan
+from library.index.library_index import LibraryIndex
+from library.library_reader import LibraryReader, _shuffled
+from library.library_writer import LibraryWriter
+from shared_core.compressed_jsonl import compress_file
+
+import library_fixtures
+
+
+N = 150_000
+STEP = 17.28              # 每天 5000 筆，共 30 天
+
+
+def make_events(start: int, n: int):
+    return library_fixtures.make_events(
+        start, n, step=STEP,
+        event_type=lambda i: "governance.decision" if i % 100 == 7 else "market.kline",
+        source=lambda i: "live" if i % 3 else "replay",
+        payload=lambda i: {"i": i, "close": 42000.5 + i},
+    )
+
+
+def ids(records):
+    return [r["event_id"] for r in records]
+
+
+def old_sample(reader: LibraryReader, n: int, seed: int):
+    """舊做法：每次抽一天 → 整檔 reservoir，直到湊滿 n"""
+    rng = random.Random(seed)
+    files = reader.get_stats()["files"]
+    days = sorted(files)
+    weights = [files[d]["count"] for d in days]
+    out = []
+    while len(out) < n:
+        d = rng.choices(days, weights=weights, k=1)[0]
+        out.extend(reader._reservoir_day(reader._day_path(d), n=min(200, n - len(out)), rng=rng,
+                                         type_set=None, source_set=None))
+    return out
+
+
+def main():
+    # 0) lazy 隨機排列：不重複、涵蓋全部
+    perm = list(_shuffled(1000, random.Random(1)))
+    assert sorted(perm) == list(range(1000)) and perm != list(range(1000))
+    print("[TEST] sparse Fisher–Yates permutation ✅")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        writer = LibraryWriter(root)
+        events = make_events(0, N)
+        for i in range(0, N, 5000):
+            writer.write_many(events[i:i + 5000])
+        writer.close()
+        idx = LibraryIndex(root)
+        idx.build()
+        idx.flush()
+
+        # 1) 同一個 seed → 同樣結果；不重複；依日分層
+        reader = LibraryReader(root)
+        a = reader.sample(n=1000, seed=7)
+        b = LibraryReader(root).sample(n=1000, seed=7)
+        assert ids(a) == ids(b) and len(a) == 1000
+        assert len(set(ids(a))) == 1000
+        assert ids(a) != ids(reader.sample(n=1000, seed=8))
+        per_day = Counter(r["ts"][:10] for r in a)
+        assert len(per_day) >= 25 and max(per_day.values()) < 80
+
+        # 訓練迴圈：同一個 library 反覆抽（行邊界已快取 → 只剩 seek）
+        t0 = time.perf_counter()
+        for seed in range(5):
+            reader.sample(n=1000, seed=seed)
+        t_new = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for seed in range(5):
+            old_sample(reader, 1000, seed=seed)
+        t_old = time.perf_counter() - t0
+        assert t_new < t_old
+        print(f"[TEST] 5 × 1000 samples: offsets {t_new * 1000:.0f} ms vs per-day reservoir {t_old * 1000:.0f} ms ✅")
+
+        # 2) type / source 條件：postings 直接給候選行
+        dec = reader.sample(n=300, type="governance.decision", source="live", seed=1)
+        assert len(dec) == 300 and len(set(ids(dec))) == 300
+        assert all(r["event_type"] == "governance.decision" and r["source"] == "live" for r in dec)
+        assert len(reader.sample(n=5000, type="governance.decision", source="replay", seed=1)) == N // 100 // 3
+        one_day = reader.sample(n=50, day="2026-01-03", seed=2)
+        assert len(one_day) == 50 and all(r["ts"].startswith("2026-01-03") for r in one_day)
+        by_type = reader.sample(n=40, by="type", seed=4)
+        assert by_type == reader.sample(n=40, by="type", seed=4) and len(by_type) == 40
+        print("[TEST] type / source / day filters, by=type reproducible ✅")
+
+        # 同一天抽很多筆：整天只開一次檔案（逐筆 seek，不逐筆重開）
+        opened = Counter()
+
+        def counting_open(file, *a, **kw):
+            opened[str(file)] += 1
+            return open(file, *a, **kw)
+
+        library_reader.open = counting_open
+        try:
+            assert len(reader.sample(n=500, day="2026-01-05", seed=3)) == 500
+        finally:
+            del library_reader.open
+        assert list(opened.values()) == [1], opened
+        print("[TEST] one open per sampled day ✅")
+
+        # 3) 沒有 postings + type 條件 → 順序掃 reservoir（不隨機讀每一行）；壓縮的日 → reservoir；
+        #    索引後 append 的尾巴也抽得到
+        (root / "index" / "postings.sqlite").unlink()
+        plain = LibraryReader(root)
+        library_reader._SPANS_CACHE.clear()
+        library_reader._SPANS_CACHE_BYTES = 0
+        got = plain.sample(n=200, type="governance.decision", seed=3)
+        assert len(got) == 200 and all(r["event_type"] == "governance.decision" for r in got)
+        assert len(set(ids(got))) == 200
+        assert ids(got) == ids(LibraryReader(root).sample(n=200, type="governance.decision", seed=3))
+        assert not library_reader._SPANS_CACHE, "filtered sample without postings must not build line spans"
+
+        first = sorted((root / "events").rglob("*.jsonl"))[0]
+        compress_file(first, first.with_name(first.name + ".gz"), compression="gzip")
+        first.unlink()
+        day0 = first.name.split(".jsonl")[0]
+        got = plain.sample(n=30, day=day0, seed=5)
+        assert len(got) == 30 and len(set(ids(got))) == 30
+
+        writer = LibraryWriter(root)
+        writer.write_many(make_events(N, 50))
+        writer.close()
+        last_day = library_fixtures.day_of(library_fixtures.T0 + (N + 49) * STEP)
+        got = plain.sample(n=10_000, day=last_day, seed=6)
+        assert f"e{N + 49}" in ids(got)
+        print("[TEST] reservoir fallback without postings / compressed day / appended tail ✅")
+
+        # 4) 候選行快取依 bytes 設上限（不是依 entry 數）：一天 5000 行 × 8 bytes
+        cap = library_reader._SPANS_CACHE_MAX_BYTES
+        library_reader._SPANS_CACHE_MAX_BYTES = 3 * 5000 * 8 + 64
+        library_reader._SPANS_CACHE.clear()
+        library_reader._SPANS_CACHE_BYTES = 0
+        try:
+            for day in sorted(plain.get_stats()["files"])[1:10]:
+                assert len(plain.sample(n=5, day=day, seed=7)) == 5
+            cached = sum(v.itemsize * len(v) for v in library_reader._SPANS_CACHE.values())
+            assert cached == library_reader._SPANS_CACHE_BYTES <= library_reader._SPANS_CACHE_MAX_BYTES
+            assert 1 <= len(library_reader._SPANS_CACHE) <= 3, len(library_reader._SPANS_CACHE)
+        finally:
+            library_reader._SPANS_CACHE_MAX_BYTES = cap
+        print(f"[TEST] spans cache bounded by bytes ({cached} bytes, {len(library_reader._SPANS_CACHE)} days) ✅")
+
+        # 5) 沒有 stats.json → by=type 退回串流 reservoir：在目前 process 掃，不開 process pool
+        (root / "index" / "stats.json").unlink()
+
+        class NoPool:
+            def __init__(self, *a, **kw):
+                raise AssertionError("sample() must not start a process pool")
+
+        # 多核 + 資料量超過 inline_bytes 才會開 pool → 兩個條件都模擬出來
+        pool_cls, cpu_count = library_scan.ProcessPoolExecutor, library_scan.os.cpu_count
+        defaults = dict(library_scan.scan_library.__kwdefaults__)
+        library_scan.ProcessPoolExecutor = NoPool
+        library_scan.os.cpu_count = lambda: 8
+        library_scan.scan_library.__kwdefaults__["inline_bytes"] = 0
+        try:
+            got = LibraryReader(root).sample(n=20, by="type", seed=9)
+        finally:
+            library_scan.ProcessPoolExecutor = pool_cls
+            library_scan.os.cpu_count = cpu_count
+            library_scan.scan_library.__kwdefaults__.update(defaults)
+        assert len(got) == 20 and len(set(ids(got))) == 20
+        print("[TEST] by=type fallback without stats scans inline ✅")
+
+    print("[TEST] library sample OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from library.library_event import LibraryEvent
+from library.library_reader import LibraryReader
+from library.library_scan import plan_tasks, scan_library
+from library.library_writer import LibraryWriter
+from shared_core.compressed_jsonl import compress_file
+
+import library_fixtures
+
+
+N = 120_000
+STEP = 20.0               # 約 28 天
+
+
+def make_events(start: int, n: int):
+    return library_fixtures.make_events(
+        start, n, step=STEP,
+        event_type=lambda i: "governance.decision" if i % 100 == 3 else "market.kline",
+        source=lambda i: "live" if i % 2 else "replay",
+        payload=lambda i: {"i": i, "note": "market.kline"},     # payload 內出現 type 字串也不能誤判
+        shift=lambda i: -3600.0 if i % 1000 == 999 else 0.0,    # 少量亂序（replay 寫進來的）
+    )
+
+
+def count_by_type(records):
+    """reduce_fn：必須是 top-level 函式"""
+    return Counter(r["event_type"] for r in records)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "library"
+        writer = LibraryWriter(root)
+        events = make_events(0, N)
+        for i in range(0, N, 5000):
+            writer.write_many(events[i:i + 5000])
+        writer.close()
+
+        # 一天封存成 gzip
+        day_file = sorted((root / "events").rglob("*.jsonl"))[5]
+        compress_file(day_file, day_file.with_name(day_file.name + ".gz"), compression="gzip")
+        day_file.unlink()
+
+        reader = LibraryReader(root)
+
+        # 1) 順序掃描 vs 平行掃描（ordered → 依時間排序）
+        t0 = time.perf_counter()
+        expect = [r for r in reader.iter_events() if r["event_type"] == "governance.decision" and r["source"] == "live"]
+        t_seq = time.perf_counter() - t0
+
+        for workers in (1, 2, 4):
+            t0 = time.perf_counter()
+            got = list(scan_library(
+                root, type="governance.decision", source="live",
+                workers=workers, inline_bytes=0,
+            ))
+            t = time.perf_counter() - t0
+            assert sorted(r["event_id"] for r in got) == sorted(r["event_id"] for r in expect)
+            ts = [datetime.fromisoformat(r["ts"]).timestamp() for r in got]
+            assert ts == sorted(ts)
+            print(f"[TEST] scan workers={workers}: {len(got)} events in {t * 1000:.0f} ms "
+                  f"(sequential iter_events {t_seq * 1000:.0f} ms, cpus={os.cpu_count()}) ✅")
+
+        # 2) 時間條件：整天剔除 + 逐筆比對
+        start = datetime(2026, 1, 10, 6, tzinfo=timezone.utc)
+        end = datetime(2026, 1, 12, 18, tzinfo=timezone.utc)
+        got = list(reader.scan(start=start, end=end, workers=2))
+        expect = [
+            r for r in reader.iter_events()
+            if start.timestamp() <= datetime.fromisoformat(r["ts"]).timestamp() <= end.timestamp()
+        ]
+        assert sorted(r["event_id"] for r in got) == sorted(r["event_id"] for r in expect)
+        tasks = plan_tasks(root / "events", start_ts=start.timestamp(), end_ts=end.timestamp())
+        assert len(tasks) <= 5
+        print(f"[TEST] time range: {len(got)} events from {len(tasks)} day files ✅")
+
+        # 3) 彙總：unordered + reduce_fn 在 worker 內
+        total = Counter()
+        for part in reader.scan(ordered=False, reduce_fn=count_by_type, workers=2):
+            total.update(part)
+        assert total == Counter(r["event_type"] for r in reader.iter_events())
+        print(f"[TEST] unordered reduce: {dict(total)} ✅")
+
+        # 4) 大檔切段：結果與整檔相同
+        whole = list(scan_library(root, source="replay", workers=1))
+        split = list(scan_library(root, source="replay", workers=2, split_bytes=256 << 10, inline_bytes=0))
+        assert [r["event_id"] for r in whole] == [r["event_id"] for r in split]
+        print("[TEST] split day files merged in time order ✅")
+
+        # 5) sample(by="type") 走平行掃描，仍可重現
+        a = reader.sample(n=20, by="type", type="governance.decision", seed=3)
+        b = reader.sample(n=20, by="type", type="governance.decision", seed=3)
+        assert a == b and len(a) == 20
+        assert all(r["event_type"] == "governance.decision" for r in a)
+
+        # 6) day 檔依事件字串的日期歸檔：+08:00 的事件落在隔天的檔，但時間早於前一天的尾巴
+        #    → ordered 要跨天 merge；start / end 的 epoch 毫秒也要正規化
+        root2 = Path(tmp) / "library_tz"
+        writer = LibraryWriter(root2)
+        writer.write_many([
+            LibraryEvent(event_id=f"utc{h}", event_type="t.x", source="s", payload={},
+                         ts=f"2026-01-01T{h:02d}:30:00+00:00")
+            for h in (20, 22, 23)
+        ] + [
+            LibraryEvent(event_id=f"tpe{h}", event_type="t.x", source="s", payload={},
+                         ts=f"2026-01-02T{h:02d}:00:00+08:00")
+            for h in (5, 7, 9)        # = 01-01 21:00Z / 23:00Z / 01-02 01:00Z
+        ])
+        writer.close()
+        assert len(plan_tasks(root2 / "events")) == 2
+        got = [r["event_id"] for r in scan_library(root2, workers=1)]
+        assert got == ["utc20", "tpe5", "utc22", "tpe7", "utc23", "tpe9"], got
+        start_ms = datetime(2026, 1, 1, 22, tzinfo=timezone.utc).timestamp() * 1000
+        got = [r["event_id"] for r in scan_library(root2, start=start_ms, end="2026-01-01T23:59:00", workers=1)]
+        assert got == ["utc22", "tpe7", "utc23"], got
+        print("[TEST] ordered scan merges across adjacent day files, epoch ms / naive ISO bounds ✅")
+
+    print("[TEST] library scan OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from shared_core.event_raw.event_log_reader import EventLogReader
+from shared_core.mmap_jsonl import MmapJsonlReader, decode_range, read_latest
+from shared_core.replay.reader import RawMarketReader
+
+
+N = 50_000
+
+
+def write_lines(path: Path, start: int, n: int, *, partial_tail: bool = False) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(start, start + n):
+            f.write(json.dumps({"type": "x", "payload": {"i": i}}) + "\n")
+            if i == start + n // 2:
+                f.write("\n{broken\n")
+        if partial_tail:
+            f.write('{"type": "x", "payl')      # writer 寫到一半
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        path = tmp / "one.jsonl"
+        write_lines(path, 0, N, partial_tail=True)
+
+        # 1) 順向 / 反向
+        with MmapJsonlReader(path) as r:
+            assert [rec["payload"]["i"] for rec in r] == list(range(N))
+            assert r.latest()["payload"]["i"] == N - 1
+            assert [rec["payload"]["i"] for rec in r.tail(5)] == list(range(N - 5, N))
+        assert read_latest(path)["payload"]["i"] == N - 1
+        print("[TEST] mmap forward / tail / latest ✅")
+
+        # 2) 切塊平行解析：結果與順序讀完全相同
+        with MmapJsonlReader(path) as r:
+            ranges = r.split(4)
+        assert ranges[0][0] == 0 and ranges[-1][1] == path.stat().st_size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            parts = list(pool.map(decode_range, [str(path)] * len(ranges), *zip(*ranges)))
+        assert [rec["payload"]["i"] for part in parts for rec in part] == list(range(N))
+        print(f"[TEST] split into {len(ranges)} line-aligned chunks, parallel decode ✅")
+
+        # 3) 空檔
+        empty = tmp / "empty.jsonl"
+        empty.write_text("", encoding="utf-8")
+        with MmapJsonlReader(empty) as r:
+            assert list(r) == [] and r.latest() is None and r.split(3) == []
+
+        # 4) EventLogReader：跨 segment 的 tail / latest / iter
+        hot = tmp / "hot" / "logs.jsonl"
+        hot.parent.mkdir()
+        write_lines(hot.with_name("logs.000001.jsonl"), 0, 10)
+        write_lines(hot.with_name("logs.000002.jsonl"), 10, 3)
+        reader = EventLogReader(hot)
+        assert [rec["payload"]["i"] for rec in reader.tail(5)] == [8, 9, 10, 11, 12]
+        assert reader.latest()["payload"]["i"] == 12
+        assert sum(1 for _ in reader.iter()) == 13
+        print("[TEST] EventLogReader tail / latest across segments ✅")
+
+        # 5) RawMarketReader：空行略過，壞行照舊 raise（不默默少資料）
+        raw = tmp / "raw" / "BTCUSDT" / "1m"
+        raw.mkdir(parents=True)
+        write_lines(raw / "2026-01-01.jsonl", 0, 10)
+        it = RawMarketReader(tmp / "raw").iter_records("BTCUSDT", "1m", "2026-01-01")
+        got = []
+        try:
+            for rec in it:
+                got.append(rec["payload"]["i"])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("malformed line was skipped silently")
+        assert got == list(range(6)), got
+        print("[TEST] RawMarketReader raises on malformed lines ✅")
+
+    print("[TEST] mmap jsonl OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import random
+import threading
+import time
+
+from shared_core.event.parallel_dispatch import (
+    EXCLUSIVE,
+    ShardedDispatcher,
+    batch_handler,
+    dispatch_mode,
+    key_by_symbol_interval,
+)
+from shared_core.event.priority_queue import EventQueueFull
+
+
+def wait_until(cond, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def main():
+    # 1) reject：exclusive shard 滿了 → 整個事件都不入列（ordered handler 也不會收到）
+    gate = threading.Event()
+    started = threading.Event()
+    got = []
+
+    @dispatch_mode(EXCLUSIVE)
+    def slow(ev):
+        started.set()
+        gate.wait(5)
+
+    @dispatch_mode(EXCLUSIVE)
+    def audit(ev):
+        got.append(("audit", ev))
+
+    def on_event(ev):
+        got.append(("ordered", ev))
+
+    d = ShardedDispatcher(2, name="t-reject", maxsize=1, overflow="reject")
+    d.dispatch("test.event", {}, [slow], "a")
+    assert started.wait(2)                              # exclusive worker 卡在 a
+    d.dispatch("test.event", {}, [slow], "b")           # exclusive queue 滿了
+    try:
+        d.dispatch("test.event", {}, [on_event, audit], "c")
+    except EventQueueFull:
+        pass
+    else:
+        raise AssertionError("expected EventQueueFull")
+    gate.set()
+    assert d.drain(2)
+    assert got == [], got
+    d.dispatch("test.event", {}, [on_event, audit], "d")
+    assert d.drain(2) and sorted(got) == [("audit", "d"), ("ordered", "d")], got
+    assert sum(s["rejected"] for s in d.stats()) == 1
+    d.close()
+    print("[TEST] overflow=reject enqueues an event on every target shard or none ✅")
+
+    # 2) block：handler 在自己 shard 的 worker 裡 publish 回同一個 shard → 不死結
+    inner = []
+    d = ShardedDispatcher(1, name="t-block", maxsize=1, overflow="block")
+
+    def on_inner(ev):
+        inner.append(ev)
+
+    def on_outer(ev):
+        for i in range(3):
+            d.dispatch("test.inner", {}, [on_inner], i)
+
+    d.dispatch("test.outer", {}, [on_outer], "outer")
+    assert d.drain(2), "worker deadlocked on its own full queue"
+    assert inner == [0, 1, 2], inner
+    assert wait_until(lambda: d.queue_depth() == 0)
+    d.close()
+    print("[TEST] overflow=block re-entry from the shard's own worker does not deadlock ✅")
+
+    # 3) conflation + 批次：同一批混了多個 symbol，後來的 [BTC] 只覆蓋 BTC，ETH 不會被丟掉
+    gate = threading.Event()
+    started = threading.Event()
+    seen = []
+
+    def blocker(ev):
+        started.set()
+        gate.wait(5)
+
+    @batch_handler
+    def on_health(evs):
+        seen.append(list(evs))
+
+    d = ShardedDispatcher(1, name="t-conflate")
+    d.dispatch("test.block", {}, [blocker], None)
+    assert started.wait(2)
+    topic = "world.health.feed"
+    d.dispatch_batch(
+        topic,
+        [{"symbol": "BTC"}, {"symbol": "ETH"}],
+        [on_health],
+        ["btc-1", "eth-1"],
+    )
+    d.dispatch_batch(topic, [{"symbol": "BTC"}], [on_health], ["btc-2"])
+    gate.set()
+    assert d.drain(2)
+    assert sorted(ev for batch in seen for ev in batch) == ["btc-2", "eth-1"], seen
+    assert sum(s["conflated"] for s in d.stats()) == 1
+    d.close()
+    print("[TEST] batch conflation replaces only the matching symbol ✅")
+
+    # 4) per-key 保序：同一個 (symbol, interval) 依 publish 順序執行，不同 key 分散到多個 shard
+    rng = random.Random(3)
+    seen = {}
+    threads = set()
+    lock = threading.Lock()
+
+    def on_kline(payload):
+        time.sleep(rng.random() / 20000)
+        with lock:
+            seen.setdefault(payload["symbol"], []).append(payload["seq"])
+            threads.add(threading.current_thread().name)
+
+    d = ShardedDispatcher(4, name="t-order", key=key_by_symbol_interval)
+    symbols = [f"S{i}" for i in range(16)]
+    for seq in range(200):
+        for sym in symbols:
+            payload = {"symbol": sym, "interval": "1m", "seq": seq}
+            d.dispatch("market.kline", payload, [on_kline], payload)
+    assert d.drain(10)
+    assert all(seen[sym] == list(range(200)) for sym in symbols), {k: v[:5] for k, v in seen.items()}
+    assert len(threads) > 1, threads
+    d.close()
+    print(f"[TEST] per-key order kept across {len(threads)} shards ✅")
+
+    # 5) back-pressure：overflow=block 時 publisher 等 queue 騰出位置，不丟、不亂序
+    gate = threading.Event()
+    started = threading.Event()
+    order = []
+
+    def on_item(i):
+        started.set()
+        gate.wait(5)
+        order.append(i)
+
+    d = ShardedDispatcher(1, name="t-backpressure", maxsize=2, overflow="block")
+    published = []
+
+    def publisher():
+        for i in range(6):
+            d.dispatch("test.event", {}, [on_item], i)
+            published.append(i)
+
+    t = threading.Thread(target=publisher)
+    t.start()
+    assert started.wait(2)
+    time.sleep(0.1)
+    # worker 卡在 0，queue 裝 1、2 → 第 4 筆（3）的 publish 被擋住
+    assert published == [0, 1, 2] and d.queue_depth() <= 3, (published, d.queue_depth())
+    gate.set()
+    t.join(5)
+    assert not t.is_alive() and d.drain(2)
+    assert order == list(range(6)), order
+    assert sum(s["dropped"] + s["rejected"] for s in d.stats()) == 0
+    d.close()
+    print("[TEST] overflow=block holds the publisher until the shard has room ✅")
+
+    # 6) back-pressure：drop_oldest 只丟 bulk lane，control 事件保留
+    gate = threading.Event()
+    started = threading.Event()
+    got = []
+
+    def on_any(ev):
+        if ev == "block":
+            started.set()
+            gate.wait(5)
+            return
+        got.append(ev)
+
+    d = ShardedDispatcher(1, name="t-drop", maxsize=3, overflow="drop_oldest")
+    d.dispatch("test.block", {}, [on_any], "block")
+    assert started.wait(2)
+    for i in range(5):
+        d.dispatch("market.kline", {}, [on_any], f"k{i}")
+    d.dispatch("system.alert", {}, [on_any], "alert")
+    gate.set()
+    assert d.drain(2)
+    assert got[0] == "alert" and got[1:] == ["k3", "k4"], got
+    assert sum(s["dropped"] for s in d.stats()) == 3
+    d.close()
+    print("[TEST] overflow=drop_oldest sheds bulk before control ✅")
+
+    print("[TEST] parallel dispatch OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from shared_core.event_schema import PBEvent
+from shared_core.pb_lang.kline_batch import KlineBatch
+from shared_core.pb_lang.pb_event_validator import (
+    DEFAULT_SCHEMAS,
+    PBEventValidator,
+    PBPayloadSchema,
+)
+
+
+# ------------------------------------------------------------------
+# 直譯版（逐條規則照順序檢查，不預先攤平）— compiled 結果必須與它一致
+# ------------------------------------------------------------------
+def interpret(schema: PBPayloadSchema, payload: dict) -> None:
+    for key in schema.required:
+        if key not in payload:
+            raise ValueError(f"{schema.event_type} 缺少欄位：{key}")
+    for key, expected in schema.types.items():
+        if key in payload and not isinstance(payload[key], expected):
+            raise ValueError(schema._type_error(key, expected))
+    for check in schema.checks:
+        check(payload)
+
+
+def outcome(fn, payload):
+    try:
+        fn(payload)
+    except ValueError as e:
+        return ("reject", str(e))
+    return ("accept", None)
+
+
+KLINE = {"symbol": "BTC/USDT", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10, "interval": "1m"}
+
+
+def batch(**over):
+    cols = dict(open_time=[1, 2], open=[1.0, 1.1], high=[2.0, 2.1], low=[0.5, 0.6], close=[1.5, 1.6], volume=[3.0, 4.0])
+    cols.update(over)
+    return KlineBatch("BTC/USDT", "1m", **cols)
+
+
+def batch_payload(b=None, **over):
+    b = b or batch()
+    p = {"symbol": b.symbol, "interval": b.interval, "count": len(b), "batch": b}
+    p.update(over)
+    return p
+
+
+def without(p: dict, key: str) -> dict:
+    p = dict(p)
+    p.pop(key)
+    return p
+
+
+# event_type → [(規則說明, payload, 預期 accept?)]
+CASES = {
+    "market.kline": [
+        ("ok", KLINE, True),
+        ("ok int prices", {**KLINE, "open": 1, "high": 2, "low": 0, "close": 1}, True),
+        ("ok optional extra / meta", {**KLINE, "extra": {}, "meta": {"a": 1}}, True),
+        *[(f"missing {k}", without(KLINE, k), False) for k in ("symbol", "open", "high", "low", "close", "volume", "interval")],
+        ("symbol type", {**KLINE, "symbol": 1}, False),
+        ("interval type", {**KLINE, "interval": 60}, False),
+        *[(f"{k} type", {**KLINE, k: "1"}, False) for k in ("open", "high", "low", "close", "volume")],
+        *[(f"{k} negative", {**KLINE, k: -1.0, **({"low": -2.0} if k == "high" else {})}, False) for k in ("open", "high", "low", "close")],
+        ("high < low", {**KLINE, "high": 0.4}, False),
+        ("volume negative", {**KLINE, "volume": -1}, False),
+        ("extra type", {**KLINE, "extra": []}, False),
+        ("meta type", {**KLINE, "meta": "x"}, False),
+    ],
+    "market.kline.batch": [
+        ("ok", batch_payload(), True),
+        ("ok meta", batch_payload(meta={}), True),
+        *[(f"missing {k}", without(batch_payload(), k), False) for k in ("symbol", "interval", "count", "batch")],
+        ("count type", batch_payload(count="2"), False),
+        ("count mismatch", batch_payload(count=3), False),
+        ("symbol mismatch", batch_payload(symbol="ETH/USDT"), False),
+        ("negative close", batch_payload(batch(close=[1.5, -1.0])), False),
+        ("NaN low", batch_payload(batch(low=[0.5, float("nan")])), False),
+        ("high < low", batch_payload(batch(high=[2.0, 0.1])), False),
+        ("negative volume", batch_payload(batch(volume=[3.0, -4.0])), False),
+        ("meta type", batch_payload(meta=[]), False),
+    ],
+    "text.input": [
+        ("ok", {"text": "hi"}, True),
+        ("missing text", {}, False),
+        ("text type", {"text": 1}, False),
+        ("blank text", {"text": "  "}, False),
+    ],
+    "persona.signal.trade": [
+        ("ok", {"source": "p", "target_persona": "q", "signal": {}}, True),
+        ("missing source", {"target_persona": "q", "signal": {}}, False),
+        ("missing target_persona", {"source": "p", "signal": {}}, False),
+        ("missing signal", {"source": "p", "target_persona": "q"}, False),
+        ("signal type", {"source": "p", "target_persona": "q", "signal": []}, False),
+    ],
+    "system.governance.decision.created": [
+        ("ok", {"agenda_id": 1, "proposal_id": 2, "result": None}, True),
+        *[(f"missing {k}", without({"agenda_id": 1, "proposal_id": 2, "result": None}, k), False)
+          for k in ("agenda_id", "proposal_id", "result")],
+    ],
+}
+
+
+def main():
+    validator = PBEventValidator(strict=True)
+    schemas = {s.event_type: s for s in DEFAULT_SCHEMAS}
+    assert set(CASES) == set(schemas), set(schemas) ^ set(CASES)
+
+    # 1) 每條 schema 規則：compiled 與直譯版 accept / reject（含錯誤訊息）一致
+    total = 0
+    for event_type, cases in CASES.items():
+        schema = schemas[event_type]
+        compiled = schema.compile()
+        for rule, payload, ok in cases:
+            got = outcome(compiled, payload)
+            expect = outcome(lambda p: interpret(schema, p), payload)
+            assert got == expect, (event_type, rule, got, expect)
+            assert (got[0] == "accept") is ok, (event_type, rule, got)
+            total += 1
+    print(f"[TEST] compiled schemas match the interpreted rules ({total} cases) ✅")
+
+    # 2) 三個入口（validate / validate_many / validate_payloads）結果一致
+    for event_type, cases in CASES.items():
+        payloads = [p for _, p, _ in cases]
+        expected = [ok for _, _, ok in cases]
+
+        by_event = []
+        for p in payloads:
+            try:
+                by_event.append(validator.validate(PBEvent(event_type, p, "test")) is not None)
+            except ValueError:
+                by_event.append(False)
+        assert by_event == expected, (event_type, by_event)
+
+        many = validator.validate_many([PBEvent(event_type, p, "test") for p in payloads])
+        assert [ev.payload for ev in many] == [p for p, ok in zip(payloads, expected) if ok]
+
+        kept = validator.validate_payloads(event_type, payloads)
+        assert kept == [p for p, ok in zip(payloads, expected) if ok], event_type
+    print("[TEST] validate / validate_many / validate_payloads agree ✅")
+
+    # 3) register_schema：自訂 schema 也走同一條 compiled 路徑；strict 拒收未註冊型別
+    custom = PBPayloadSchema(
+        "custom.metric",
+        required=("name", "value"),
+        types={"name": str, "value": (int, float), "unit": str},
+    )
+    validator.register_schema(custom)
+    compiled = validator._payload_checks["custom.metric"]
+    for payload in (
+        {"name": "x", "value": 1}, {"name": "x", "value": 1.5, "unit": "ms"}, {"name": "x"},
+        {"value": 1}, {"name": 1, "value": 1}, {"name": "x", "value": "1"}, {"name": "x", "value": 1, "unit": 3},
+    ):
+        assert outcome(compiled, payload) == outcome(lambda p: interpret(custom, p), payload), payload
+    try:
+        validator.validate(PBEvent("unknown.type", {}, "test"))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("strict validator accepted an unregistered type")
+    assert validator.validate(PBEvent("unknown.type", {}, "test"), soft=True) is None
+    assert PBEventValidator(strict=False).validate(PBEvent("unknown.type", {}, "test")) is not None
+    print("[TEST] registered schema compiled like the defaults, strict rejects unknown types ✅")
+
+    # 4) stamp：通過後同一個 validator 直接放行，另一個 validator 照樣重驗
+    ev = validator.validate(PBEvent("text.input", {"text": "hi"}, "test"))
+    ev.payload["text"] = " "
+    assert validator.validate(ev) is ev
+    assert PBEventValidator().validate(ev, soft=True) is None
+    print("[TEST] validated stamp is per validator ✅")
+
+    print("[TEST] pb event validator OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import tempfile
+import threading
+
+from shared_core.compressed_jsonl import compress_file
+from shared_core.event_schema import PBEvent
+from shared_core.replay.parallel_decode import iter_decoded, source_files
+from shared_core.replay.replay_engine import ReplayEngine
+
+
+class ListBus:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, ev):
+        self.events.append(ev)
+
+    def publish_many(self, evs):
+        self.events.extend(evs)
+
+
+class KlineGateway:
+    """沒有 "type" 的 raw（行情）→ PBEvent；只能在主 process 呼叫"""
+
+    def __init__(self):
+        self.thread = None
+
+    def process(self, key, raw, soft=True):
+        self.thread = threading.current_thread()
+        return PBEvent(key, payload=raw, source="gateway", ts=raw.get("ts"), compact=True)
+
+
+def write_log(path: Path, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            if i % 11 == 0:
+                rec = {"symbol": "BTC/USDT", "close": 100.0 + i, "ts": 1.7e9 + i}
+            elif i % 5 == 0:
+                rec = {"type": "governance.decision", "payload": {"i": i}, "ts": 1.7e9 + i}  # 沒有 event_id
+            else:
+                rec = {"type": "market.tick", "event_id": f"t{i}", "payload": {"i": i}, "ts": 1.7e9 + i}
+            f.write(json.dumps(rec) + "\n")
+            if i == 777:
+                f.write('{"type": "market.tick", "payl\n')       # 壞行
+
+
+def signature(events):
+    return [(e.type, e.payload, e.source, e.ts) for e in events]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / "logs.jsonl"
+        write_log(log, 20000)
+        seg2 = Path(tmp) / "logs.000001.jsonl"                  # 分段 log：第二個 segment 接在後面
+        write_log(seg2, 3000)
+        gz = Path(tmp) / "cold.jsonl.gz"
+        compress_file(log, gz, compression="gzip")
+
+        # 1) pipeline 本身：強制開 pool、切小 chunk → 順序與逐行相同
+        files = source_files(log)
+        assert files == [log, seg2]
+        serial = [x for items, _ in iter_decoded(files, workers=1) for x in items]
+        pooled, errors = [], []
+        for items, errs in iter_decoded(files, workers=2, chunk_bytes=64 << 10, inline_bytes=0):
+            pooled.extend(items)
+            errors.extend(errs)
+        assert len(errors) == 2 and len(pooled) == len(serial) == 23000
+        key = lambda x: x if isinstance(x, dict) else (x.type, x.payload, x.ts)
+        assert [key(x) for x in pooled] == [key(x) for x in serial]
+        ids = [x.event_id for x in pooled if isinstance(x, PBEvent) and x.type == "governance.decision"]
+        assert len(ids) == len(set(ids)), "event_id collision across decode workers"
+        print(f"[TEST] pooled decode: {len(pooled)} items in file order, {len(errors)} bad lines reported ✅")
+
+        # 2) ReplayEngine.replay / iter_events：workers=2 與逐行結果完全相同（含 gateway 轉換）
+        for path in (log, gz):
+            results = {}
+            for workers in (None, 2):
+                bus, gateway = ListBus(), KlineGateway()
+                engine = ReplayEngine(bus, gateway, default_key="market.kline")
+                n = engine.replay(str(path), speed=0, workers=workers)
+                assert n == len(bus.events)
+                assert gateway.thread is threading.main_thread()
+                results[workers] = signature(bus.events)
+            assert results[None] == results[2], path.name
+        print("[TEST] replay(workers=2) publishes the exact sequential order (.jsonl segments / .gz) ✅")
+
+        engine = ReplayEngine(ListBus(), KlineGateway(), default_key="market.kline")
+        want = signature(engine.iter_events(str(log), type_filter={"governance.decision", "market.kline"}))
+        got = signature(engine.iter_events(str(log), type_filter={"governance.decision", "market.kline"}, workers=2))
+        assert got == want and len(got) > 0
+
+        # 3) limit → 提早結束，pool / reader thread 收乾淨
+        want = signature(engine.iter_events(str(log), limit=100))
+        bus = ListBus()
+        engine = ReplayEngine(bus, KlineGateway(), default_key="market.kline")
+        before = threading.active_count()
+        assert engine.replay(str(log), speed=0, limit=100, workers=2) == 100
+        assert signature(bus.events) == want
+        assert threading.active_count() <= before
+        print("[TEST] type_filter pushdown / early stop on limit ✅")
+
+    print("[TEST] replay parallel decode OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compress_file
+from shared_core.event_raw.ts_index import load_chunks, ts_index_path
+from shared_core.replay.replay_engine import ReplayEngine, event_epoch
+
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+DAYS = 30
+STEP = 30           # 每 30 秒一筆 → 一個月 86,400 筆
+
+
+class CountingCodec:
+    """記錄 ReplayEngine 實際 decode 了幾行"""
+
+    def __init__(self):
+        self.inner = get_codec()
+        self.calls = 0
+
+    def loads(self, s):
+        self.calls += 1
+        return self.inner.loads(s)
+
+
+class ListBus:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, ev):
+        self.events.append(ev)
+
+    def publish_many(self, evs):
+        self.events.extend(evs)
+
+
+def write_month(path: Path, start: int = 0, n: int = DAYS * 86400 // STEP) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(start, start + n):
+            rec = {
+                "event_id": f"k{i}",
+                "type": "market.kline",
+                "source": "test",
+                "timestamp": (T0 + timedelta(seconds=i * STEP)).isoformat(),
+                "payload": {"i": i, "close": 100.0 + i % 50},
+            }
+            if i % 1000 == 0:
+                rec.pop("timestamp")
+                rec["ts"] = (T0 + timedelta(seconds=i * STEP)).timestamp()   # epoch 欄位
+            f.write(json.dumps(rec) + "\n")
+
+
+def ids(events):
+    return [e.event_id for e in events]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / "month.jsonl"
+        write_month(log)
+        n_total = DAYS * 86400 // STEP
+
+        engine = ReplayEngine(ListBus(), gateway=None)
+        lo = T0 + timedelta(days=17, hours=12)
+        hi = lo + timedelta(hours=1)
+        want = [f"k{i}" for i in range(n_total) if lo <= T0 + timedelta(seconds=i * STEP) <= hi]
+        assert len(want) == 3600 // STEP + 1
+
+        # 1) 全掃（沒有時間窗）當對照
+        engine.codec = CountingCodec()
+        t0 = time.perf_counter()
+        brute = [e for e in engine.iter_events(str(log)) if lo.timestamp() <= event_epoch(e) <= hi.timestamp()]
+        t_full = time.perf_counter() - t0
+        assert ids(brute) == want and engine.codec.calls == n_total
+
+        # 2) 第一次時間窗查詢：補建 .tsidx，之後只 decode 相關 chunk
+        assert not ts_index_path(log).exists()
+        engine.codec = CountingCodec()
+        got = list(engine.iter_events(str(log), start_time=lo, end_time=hi))
+        assert ids(got) == want
+        assert ts_index_path(log).exists() and load_chunks(log)
+        assert engine.codec.calls <= 2 * 1000 + 1000, engine.codec.calls
+
+        engine.codec = CountingCodec()
+        t0 = time.perf_counter()
+        got = list(engine.iter_events(str(log), start_time=lo, end_time=hi))
+        t_seek = time.perf_counter() - t0
+        assert ids(got) == want and engine.codec.calls <= 3000
+        assert t_seek * 10 < t_full, (t_seek, t_full)
+        print(f"[TEST] 1h of a 30-day log: decoded {engine.codec.calls} of {n_total} lines, "
+              f"{t_seek * 1000:.1f} ms vs full scan {t_full * 1000:.0f} ms ✅")
+
+        # 3) 時間一律正規化成 epoch：naive datetime（UTC）/ epoch / ISO 字串 / 毫秒都一樣
+        for a, b in (
+            (lo.replace(tzinfo=None), hi.replace(tzinfo=None)),
+            (lo.timestamp(), hi.timestamp()),
+            (lo.isoformat(), hi.isoformat()),
+            (lo.timestamp() * 1000, hi.timestamp() * 1000),
+        ):
+            assert ids(engine.iter_events(str(log), start_time=a, end_time=b)) == want, type(a)
+        only_start = list(engine.iter_events(str(log), start_time=T0 + timedelta(days=DAYS) - timedelta(minutes=5)))
+        assert len(only_start) == 5 * 60 // STEP
+        print("[TEST] naive / epoch / ISO / ms bounds compare on numeric time ✅")
+
+        # 4) replay()：時間窗 + 模擬間隔（以前 ISO 字串相減會直接丟 TypeError）
+        bus = ListBus()
+        engine = ReplayEngine(bus, gateway=None)
+        t0 = time.perf_counter()
+        n = engine.replay(str(log), speed=3000, start_time=lo, end_time=lo + timedelta(minutes=5))
+        assert n == 11 and ids(bus.events) == want[:11]
+        assert time.perf_counter() - t0 >= 300 / 3000 * 0.9
+        bus.events.clear()
+        engine.replay(str(log), speed=0, start_time=lo, end_time=hi, workers=2)
+        assert ids(bus.events) == want
+
+        # 5) 建索引之後又 append → 尾巴照樣讀到
+        write_month(log, n_total, 200)
+        late_lo = T0 + timedelta(seconds=(n_total + 100) * STEP)
+        got = list(engine.iter_events(str(log), start_time=late_lo))
+        assert ids(got) == [f"k{i}" for i in range(n_total + 100, n_total + 200)]
+
+        # 6) 壓縮檔（block index）
+        gz = Path(tmp) / "month.jsonl.gz"
+        compress_file(log, gz, compression="gzip")
+        engine.codec = CountingCodec()
+        assert ids(engine.iter_events(str(gz), start_time=lo, end_time=hi)) == want
+        assert engine.codec.calls < n_total // 10
+        print("[TEST] replay speed / workers, appended tail, .gz block seek ✅")
+
+    print("[TEST] replay time-range seek OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import asyncio
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from pandora_core.perception_audit.auditor_runtime import PerceptionSafetyAuditor
+from shared_core.event_raw.event_log_reader import EventLogReader
+from shared_core.event_raw.event_log_writer import EventLogWriter
+from shared_core.event_schema import PBEvent
+from shared_core.tail_follow import CsvFollower, JsonlFollower
+
+
+def ids(records):
+    return [r["payload"]["i"] for r in records]
+
+
+def write_events(writer: EventLogWriter, start: int, n: int) -> None:
+    for i in range(start, start + n):
+        writer.write(PBEvent("market.kline", {"i": i}, "test", compact=True))
+    writer.drain()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # 1) 只讀完整的行：寫到一半的最後一行等下一次 poll
+        path = tmp / "plain" / "logs.jsonl"
+        path.parent.mkdir()
+        with path.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"payload": {"i": 0}}) + "\n")
+            f.write('{"payload": {"i"')
+        follower = JsonlFollower(path)
+        assert ids(follower.poll()) == [0]
+        assert follower.poll() == []
+        with path.open("a", encoding="utf-8") as f:
+            f.write(': 1}}\n')
+        assert ids(follower.poll()) == [1]
+        print("[TEST] partial line held back until complete ✅")
+
+        # 2) EventLogWriter 分段：roll 之後自動接到下一個 segment
+        hot = tmp / "hot" / "logs.jsonl"
+        cursor = tmp / "cursors" / "auditor.json"
+        writer = EventLogWriter(str(hot), buffer_size=10, enable_weak_label=False)
+        write_events(writer, 0, 50)
+
+        follower = JsonlFollower(hot, cursor_path=cursor)
+        assert ids(follower.poll()) == list(range(50))
+
+        writer.roll()
+        write_events(writer, 50, 30)
+        writer.roll()
+        write_events(writer, 80, 20)
+        assert ids(follower.poll()) == list(range(50, 100))
+        print("[TEST] follows across segment rollover ✅")
+
+        # 3) 目前的 segment 被 rotate 走 → 從下一個 segment 繼續
+        write_events(writer, 100, 10)
+        current = hot.parent / follower.file
+        writer.roll()
+        write_events(writer, 110, 5)
+        os.replace(current, tmp / "warm.jsonl")
+        assert ids(follower.poll()) == list(range(110, 115))
+        print("[TEST] current segment rotated away → next segment ✅")
+
+        # 4) 重啟：游標接著讀，不重送
+        write_events(writer, 115, 5)
+        restarted = JsonlFollower(hot, cursor_path=cursor, from_start=False)
+        assert restarted.resumed
+        assert ids(restarted.poll()) == list(range(115, 120))
+        fresh = JsonlFollower(hot, from_start=False)
+        assert fresh.poll() == []
+        writer.close()
+        print("[TEST] cursor survives restart ✅")
+
+        # 5) CSV：header 只讀一次（從結尾開始也一樣），列轉成 dict
+        csv_path = tmp / "kline.csv"
+        csv_path.write_text("open,close\n1,2\n", encoding="utf-8")
+        csv_cursor = tmp / "kline.csv.cursor.json"
+        rows = CsvFollower(csv_path, cursor_path=csv_cursor).poll()
+        assert rows == [{"open": "1", "close": "2"}]
+        with csv_path.open("a", encoding="utf-8") as f:
+            f.write("3,4\n5,6\n")
+        tail = CsvFollower(csv_path, from_start=False)
+        with csv_path.open("a", encoding="utf-8") as f:
+            f.write("7,8\n")
+        assert tail.poll() == [{"open": "7", "close": "8"}]
+        assert CsvFollower(csv_path, cursor_path=csv_cursor).poll() == [
+            {"open": "3", "close": "4"},
+            {"open": "5", "close": "6"},
+            {"open": "7", "close": "8"},
+        ]
+        print("[TEST] csv header kept, rows as dicts ✅")
+
+        # 6) asyncio
+        async def take(n):
+            out = []
+            async for rec in JsonlFollower(path, poll_interval=0.01).aiter():
+                out.append(rec["payload"]["i"])
+                if len(out) >= n:
+                    return out
+
+        assert asyncio.run(take(2)) == [0, 1]
+        print("[TEST] async iterator ✅")
+
+        # 7) 稽核滑動視窗：啟動後才 seed 不重複、一輪超過 max_bytes 也追得上、重啟後補回游標之前的事件
+        hot = tmp / "audit" / "logs.jsonl"
+        cursor = tmp / "audit" / "cursors" / "auditor.json"
+        writer = EventLogWriter(str(hot), buffer_size=10, enable_weak_label=False)
+        write_events(writer, 0, 100)
+
+        def window(auditor):
+            end = datetime.utcnow() + timedelta(seconds=1)
+            return sorted(ids(auditor._window_events(end - auditor.window, end)))
+
+        follower = JsonlFollower(hot, cursor_path=cursor, from_start=False, max_bytes=2048)
+        auditor = PerceptionSafetyAuditor(None, EventLogReader(hot), follower=follower)
+        write_events(writer, 100, 50)                   # follower 建好之後、第一次稽核之前
+        assert window(auditor) == list(range(150))
+        write_events(writer, 150, 500)                  # 遠超過單次 poll 的 2 KB
+        assert window(auditor) == list(range(650))
+
+        restarted = JsonlFollower(hot, cursor_path=cursor, from_start=False, max_bytes=2048)
+        assert restarted.resumed
+        write_events(writer, 650, 10)
+        auditor = PerceptionSafetyAuditor(None, EventLogReader(hot), follower=restarted)
+        assert window(auditor) == list(range(660))
+        writer.close()
+        print("[TEST] auditor window: no double count, drains backlog, backfills after restart ✅")
+
+    print("[TEST] tail follow OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import sys
+from pathlib import Path
+
+# === 專案根目錄（aisop/） ===
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import threading
+
+from shared_core.event.parallel_dispatch import batch_handler
+from shared_core.event.zero_copy_event_bus import ZeroCopyEventBus
+from shared_core.event_schema import PBEvent
+
+
+def ev(t: str, i: int = 0) -> PBEvent:
+    return PBEvent.compact(t, {"i": i}, "test")
+
+
+def main():
+    # 1) exact / wildcard / "*"：依訂閱順序，一個 handler 只收一次
+    bus = ZeroCopyEventBus()
+    got = []
+
+    def on(name):
+        def h(e):
+            got.append((name, e.type))
+        h.__name__ = name
+        return h
+
+    kline, market, star, other = on("kline"), on("market"), on("star"), on("other")
+    bus.subscribe("market.kline", kline)
+    bus.subscribe("market.*", market)
+    bus.subscribe("*", star)
+    bus.subscribe("world.health.?arning", other)
+
+    bus.publish(ev("market.kline"))
+    bus.publish(ev("market.trade"))
+    bus.publish(ev("world.health.warning"))
+    bus.publish(ev("text.input"))
+    assert got == [
+        ("kline", "market.kline"), ("market", "market.kline"), ("star", "market.kline"),
+        ("market", "market.trade"), ("star", "market.trade"),
+        ("star", "world.health.warning"), ("other", "world.health.warning"),
+        ("star", "text.input"),
+    ], got
+    assert bus.handlers_for("market.kline") == (kline, market, star)
+    assert bus.handlers_for("governance.decision") == (star,)
+    print("[TEST] exact / wildcard / * routing in subscription order ✅")
+
+    # 2) unsubscribe：路由表重建，快取的 type 也跟著更新
+    assert bus.unsubscribe("market.*", market)
+    assert not bus.unsubscribe("market.*", market)
+    assert bus.handlers_for("market.kline") == (kline, star)
+    got.clear()
+    bus.publish_many([ev("market.trade", i) for i in range(3)])
+    assert got == [("star", "market.trade")] * 3, got
+    print("[TEST] unsubscribe rebuilds cached routes ✅")
+
+    # 3) publish 途中 subscribe / unsubscribe：這一次 publish 用舊快照，下一次才生效
+    bus = ZeroCopyEventBus()
+    got = []
+    late = on("late")
+
+    def first(e):
+        got.append(("first", e.payload["i"]))
+        bus.unsubscribe("test.event", second)
+        bus.subscribe("test.*", late)
+
+    def second(e):
+        got.append(("second", e.payload["i"]))
+
+    bus.subscribe("test.event", first)
+    bus.subscribe("test.event", second)
+    bus.publish(ev("test.event", 1))
+    assert got == [("first", 1), ("second", 1)], got
+    got.clear()
+    bus.unsubscribe("test.event", first)
+    bus.publish(ev("test.event", 2))
+    assert got == [("late", "test.event")], got
+    print("[TEST] subscribe / unsubscribe during publish applies to the next publish ✅")
+
+    # 4) 另一條 thread 持續 subscribe / unsubscribe，publish 不加 lock 也不出錯、不漏穩定的 handler
+    bus = ZeroCopyEventBus()
+    stable = []
+
+    @batch_handler
+    def on_stable(evs):
+        stable.extend(e.payload["i"] for e in evs)
+
+    bus.subscribe("market.*", on_stable)
+    stop = threading.Event()
+    errors = []
+
+    def churn():
+        def noop(e):
+            pass
+        try:
+            while not stop.is_set():
+                bus.subscribe("market.kline", noop)
+                bus.subscribe("*", noop)
+                bus.unsubscribe("market.kline", noop)
+                bus.unsubscribe("*", noop)
+        except Exception as e:
+            errors.append(e)
+
+    t = threading.Thread(target=churn)
+    t.start()
+    try:
+        for i in range(5000):
+            bus.publish(ev("market.kline", i))
+    finally:
+        stop.set()
+        t.join()
+    assert not errors, errors
+    assert stable == list(range(5000))
+    assert bus.handlers_for("market.kline") == (on_stable,)
+    print("[TEST] concurrent subscribe / unsubscribe while publishing ✅")
+
+    # 5) publish_many：priority 不同就拆組（lane 不跟著組內第一筆走）
+    bus = ZeroCopyEventBus()
+    calls = []
+
+    class RecordingDispatcher:
+        def dispatch_batch(self, etype, payloads, handlers, run, modes, priority=None):
+            calls.append((etype, [e.payload["i"] for e in run], priority))
+
+    bus._dispatcher = RecordingDispatcher()
+    events = [PBEvent("text.input", {"i": i}, "test", priority=p) for i, p in enumerate((1, 9, 9, 1))]
+    assert bus.publish_many(events) == 4
+    assert calls == [("text.input", [0], 1), ("text.input", [1, 2], 9), ("text.input", [3], 1)], calls
+    print("[TEST] publish_many splits runs on priority ✅")
+
+    print("[TEST] zero-copy event bus OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# shared_core/codec.py
+"""
+Codec — 事件 / 紀錄的序列化層
+
+所有 JSONL writer / reader（event_raw、Library、Replay、learning、governance audit）
+統一經過這裡，不再各自 json.dumps / json.loads：
+
+- json    ：stdlib（永遠可用；輸出與舊版 json.dumps(..., ensure_ascii=False) 逐字相同）← 預設
+- orjson  ：有安裝、且明確指定才用（文字 JSON，可直接寫進既有 .jsonl）
+- msgpack ：有安裝才啟用（binary，需要 framing → 只給 binary segment / 檔案用）
+
+選擇方式：
+    get_codec()                 → AISOP_CODEC 環境變數（預設 auto = json）
+    get_codec("orjson")         → 指定；或 AISOP_CODEC=orjson 整個 process 切換
+    get_codec("msgpack", text=False)
+
+預設不自動選 orjson：它寫出的檔案格式不同（compact separators、NaN / Infinity → null），
+同一個 library / event log 裡會混兩種寫法，舊工具逐字比對 / 讀回 NaN 都會變
+
+PBEvent / LibraryEvent 有預先排好欄位的 encoder（encode_event / encode_library_event）：
+不呼叫 to_dict() / asdict()，直接依欄位順序組字串，payload 只編碼一次。
+
+讀取相容性：
+- 所有文字 codec 都能讀舊檔（orjson 遇到 NaN / Infinity 等 stdlib 專屬寫法會自動退回 json）
+- orjson 寫出的 NaN 會變成 null（JSON 標準限制）
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from json.encoder import encode_basestring
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def default_encoder(obj: Any) -> Any:
+    """未知型別 fallback（同 json_utils._default_encoder，另外支援 NumPy / to_dict）"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "to_lists"):
+        return obj.to_lists()
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return str(obj)
+
+
+class Codec:
+    """
+    Codec 介面
+    - dumps(obj) → 單筆紀錄（文字 codec 回傳 str；binary codec 回傳 bytes），不含換行
+    - loads(data) → obj
+    - encode_event / encode_library_event → 預先排好欄位的事件 encoder
+    """
+
+    name = "base"
+    binary = False
+
+    def dumps(self, obj: Any, *, default: Optional[Callable] = None):
+        raise NotImplementedError
+
+    def loads(self, data) -> Any:
+        raise NotImplementedError
+
+    def encode_event(self, event, extra: Optional[Dict[str, Any]] = None):
+        """PBEvent → 紀錄（欄位與 PBEvent.to_dict() 相同，extra 接在最後）"""
+        data = event.to_dict()
+        if extra:
+            data.update(extra)
+        return self.dumps(data)
+
+    def encode_library_event(self, ev):
+        """LibraryEvent → 紀錄（欄位與 LibraryEvent.to_dict() 相同）"""
+        return self.dumps(_library_event_dict(ev))
+
+    def iter_lines(self, f) -> Iterator[Any]:
+        """逐行解碼文字檔；空行 / 壞行略過"""
+        loads = self.loads
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except Exception:
+                continue
+
+    def __repr__(self) -> str:
+        return f"<Codec {self.name}>"
+
+
+def _library_event_dict(ev) -> Dict[str, Any]:
+    # LibraryEvent 是 frozen dataclass；asdict() 會 deep copy payload，這裡只取欄位
+    return {
+        "event_id": ev.event_id,
+        "event_type": ev.event_type,
+        "source": ev.source,
+        "payload": ev.payload,
+        "ts": ev.ts,
+        "weak_label": ev.weak_label,
+        "meta": ev.meta,
+    }
+
+
+# ------------------------------------------------------------------
+# stdlib json
+# ------------------------------------------------------------------
+class JsonCodec(Codec):
+    """
+    stdlib json
+    - encoder 實例只建一次（json.dumps 帶參數時每次都會新建 JSONEncoder）
+    - 預先排好欄位的 encoder 與 json.dumps(to_dict(), ensure_ascii=False) 逐字相同
+    """
+
+    name = "json"
+
+    def __init__(self) -> None:
+        self._encode = json.JSONEncoder(ensure_ascii=False, default=default_encoder).encode
+        self.loads = json.loads     # str / bytes 皆可，直接綁定省一層呼叫
+
+    def dumps(self, obj: Any, *, default: Optional[Callable] = None) -> str:
+        if default is not None:
+            return json.dumps(obj, ensure_ascii=False, default=default)
+        return self._encode(obj)
+
+    def encode_event(self, event, extra: Optional[Dict[str, Any]] = None) -> str:
+        enc = self._encode
+        s = encode_basestring
+
+        eid = enc(event.event_id)
+        payload = enc(event.payload)
+        meta = event._meta
+        if meta is None:
+            # 與 PBEvent.meta 相同欄位，但不建立 dict
+            meta_s = (
+                '{"lang": "PB-Lang v2", "priority": ' + enc(event.priority)
+                + ', "tags": ' + enc(event.tags)
+                + ', "source": ' + enc(event.source) + "}"
+            )
+        else:
+            meta_s = enc(event.meta)     # 經過 property：自動組的 meta 會先跟上 priority / tags / source
+
+        parts = [
+            '{"unit_id": ', eid,
+            ', "unit_type": "event", "timestamp": ', s(event.timestamp),
+            ', "content": ', payload,
+            ', "meta": ', meta_s,
+            ', "event_id": ', eid,
+            ', "type": ', s(event.type),
+            ', "source": ', enc(event.source),
+            ', "payload": ', payload,
+        ]
+        if extra:
+            for k, v in extra.items():
+                parts.append(", " + s(k) + ": " + enc(v))
+        parts.append("}")
+        return "".join(parts)
+
+    def encode_library_event(self, ev) -> str:
+        enc = self._encode
+        s = encode_basestring
+        return "".join((
+            '{"event_id": ', enc(ev.event_id),
+            ', "event_type": ', s(ev.event_type),
+            ', "source": ', enc(ev.source),
+            ', "payload": ', enc(ev.payload),
+            ', "ts": ', enc(ev.ts),
+            ', "weak_label": ', enc(ev.weak_label),
+            ', "meta": ', enc(ev.meta),
+            "}",
+        ))
+
+
+# ------------------------------------------------------------------
+# orjson（可選）
+# ------------------------------------------------------------------
+class OrjsonCodec(Codec):
+    """
+    orjson：文字 JSON（compact separators），讀舊檔失敗時退回 stdlib
+    - 非字串 key / NumPy 陣列直接支援
+    - orjson 無法處理的值（> 64-bit 整數等）整筆退回 stdlib
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise ImportError("orjson 未安裝")
+        self._option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        self._fallback = JsonCodec()
+
+    def dumps(self, obj: Any, *, default: Optional[Callable] = None) -> str:
+        try:
+            return orjson.dumps(obj, default=default or default_encoder, option=self._option).decode()
+        except (orjson.JSONEncodeError, TypeError):
+            return self._fallback.dumps(obj, default=default)
+
+    def loads(self, data) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # stdlib 寫出的 NaN / Infinity 等
+            return self._fallback.loads(data)
+
+    def encode_event(self, event, extra: Optional[Dict[str, Any]] = None) -> str:
+        # orjson 一次序列化整個 dict 與逐欄拼接一樣快（見 scripts/stress/codec_bench.py），
+        # 保留較單純的寫法
+        return super().encode_event(event, extra)
+
+
+# ------------------------------------------------------------------
+# msgpack（可選，binary）
+# ------------------------------------------------------------------
+class MsgpackCodec(Codec):
+    """
+    msgpack：binary 紀錄，不能寫進 .jsonl
+    串流讀取用 iter_stream(f)（f 以 "rb" 開啟，紀錄直接串接，不需要換行）
+    """
+
+    name = "msgpack"
+    binary = True
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise ImportError("msgpack 未安裝")
+        self._packer = msgpack.Packer(default=default_encoder, use_bin_type=True)
+
+    def dumps(self, obj: Any, *, default: Optional[Callable] = None) -> bytes:
+        if default is not None:
+            return msgpack.packb(obj, default=default, use_bin_type=True)
+        return self._packer.pack(obj)
+
+    def loads(self, data) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    def iter_lines(self, f) -> Iterator[Any]:
+        return self.iter_stream(f)
+
+    def iter_stream(self, f) -> Iterator[Any]:
+        yield from msgpack.Unpacker(f, raw=False, strict_map_key=False)
+
+
+# ------------------------------------------------------------------
+# Registry
+# ------------------------------------------------------------------
+_CODEC_TYPES: Dict[str, type] = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+    "msgpack": MsgpackCodec,
+}
+
+# auto 只選不改變落地格式的 codec；orjson 要明確指定
+_AUTO_ORDER = ("json",)
+
+_instances: Dict[str, Codec] = {}
+
+
+def available_codecs() -> list:
+    """目前環境可用的 codec 名稱"""
+    names = ["json"]
+    if orjson is not None:
+        names.append("orjson")
+    if msgpack is not None:
+        names.append("msgpack")
+    return names
+
+
+def get_codec(name: Optional[str] = None, *, text: bool = True) -> Codec:
+    """
+    取得 codec（每種一個共用實例）
+    name=None → 環境變數 AISOP_CODEC（預設 auto）
+    text=True → 呼叫端寫的是 .jsonl；選到 binary codec 時退回最佳文字 codec
+    """
+    name = (name or os.getenv("AISOP_CODEC", "auto")).lower()
+
+    if name == "auto":
+        name = next(n for n in _AUTO_ORDER if n in available_codecs())
+    elif name not in _CODEC_TYPES:
+        raise ValueError(f"Unknown codec: {name}")
+    elif name not in available_codecs():
+        print(f"[Codec] ⚠ {name} 未安裝，改用 auto")
+        return get_codec("auto", text=text)
+
+    if text and _CODEC_TYPES[name].binary:
+        return get_codec("auto", text=True)
+
+    codec = _instances.get(name)
+    if codec is None:
+        codec = _instances[name] = _CODEC_TYPES[name]()
+    return codec
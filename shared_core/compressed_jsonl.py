@@ -0,0 +1,379 @@
+# shared_core/compressed_jsonl.py
+"""
+Compressed JSONL — WARM → COLD 封存用的分塊壓縮檔
+
+檔案格式：
+    logs_xxx.jsonl.zst / .jsonl.gz       ← 獨立壓縮 block 直接串接
+    logs_xxx.jsonl.zst.idx.json          ← block index（sidecar）
+
+- 每個 block 只包含完整的行（預設 ~1 MB 未壓縮），可單獨解壓
+- 串接後仍是合法的 zstd / gzip stream（zstdcat / zcat 可直接讀）
+- block index：offset / length / 行數 / block 內最小、最大時間（epoch 秒）
+  → 讀取端可以 seek 到指定 block、跳過時間範圍外的 block，不用解壓整個檔案
+- zstd 需要 zstandard（有安裝才啟用），否則用 stdlib gzip
+
+讀取端統一用 iter_text_lines(path)：.jsonl / .jsonl.zst / .jsonl.gz 都可以
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from shared_core.codec import get_codec
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+COMPRESSION_SUFFIX = {"zstd": ".zst", "gzip": ".gz"}
+SUFFIX_COMPRESSION = {v: k for k, v in COMPRESSION_SUFFIX.items()}
+INDEX_SUFFIX = ".idx.json"
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+
+def available_compressions() -> list:
+    names = ["gzip"]
+    if zstandard is not None:
+        names.insert(0, "zstd")
+    return names
+
+
+def default_compression() -> str:
+    return available_compressions()[0]
+
+
+def compression_of(path: Path | str) -> Optional[str]:
+    """依副檔名判斷壓縮格式；未壓縮回傳 None"""
+    return SUFFIX_COMPRESSION.get(Path(path).suffix.lower())
+
+
+def index_path(path: Path | str) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def resolve_path(path: Path | str) -> Optional[Path]:
+    """
+    找出實際存在的檔案：path 本身 → path.zst → path.gz
+    （Library 的 day 檔被封存後，呼叫端仍用原本的 .jsonl 名稱找）
+    """
+    path = Path(path)
+    if path.exists():
+        return path
+    for suffix in COMPRESSION_SUFFIX.values():
+        p = path.with_name(path.name + suffix)
+        if p.exists():
+            return p
+    return None
+
+
+def to_epoch(v: Any) -> Optional[float]:
+    """
+    時間 → epoch 秒（float）；replay / event_raw 的時間窗一律用這個比較
+    datetime（naive 視為 UTC）/ epoch 秒或毫秒 / ISO 字串；無法解析 → None
+    """
+    if v is None:
+        return None
+    if isinstance(v, (int, float)):
+        v = float(v)
+        return v / 1000.0 if v > 1e11 else v      # 毫秒
+    if isinstance(v, str):
+        try:
+            v = datetime.fromisoformat(v)
+        except ValueError:
+            return None
+    if isinstance(v, datetime):
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=timezone.utc)
+        return v.timestamp()
+    return None
+
+
+def record_ts(rec: Any) -> Optional[float]:
+    """紀錄時間 → epoch 秒（raw event 的 ISO timestamp / Library 的 ts）"""
+    if not isinstance(rec, dict):
+        return None
+    return to_epoch(rec.get("timestamp", rec.get("ts")))
+
+
+def _block_ts_range(lines: List[bytes], loads) -> tuple:
+    """block 內最小 / 最大時間（不假設紀錄依時間排序；replay 寫進來的歷史事件可能亂序）"""
+    lo = hi = None
+    for line in lines:
+        try:
+            ts = record_ts(loads(line))
+        except Exception:
+            continue
+        if ts is None:
+            continue
+        if lo is None or ts < lo:
+            lo = ts
+        if hi is None or ts > hi:
+            hi = ts
+    return lo, hi
+
+
+# ------------------------------------------------------------------
+# block codec
+# ------------------------------------------------------------------
+def _compressor(compression: str, level: Optional[int]):
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstandard 未安裝")
+        return zstandard.ZstdCompressor(level=level or 3, write_content_size=True).compress
+    if compression == "gzip":
+        lv = 6 if level is None else level
+        return lambda data: gzip.compress(data, compresslevel=lv, mtime=0)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _decompressor(compression: str):
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstandard 未安裝，無法讀取 .zst")
+        return zstandard.ZstdDecompressor().decompress
+    if compression == "gzip":
+        return gzip.decompress
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+# ------------------------------------------------------------------
+# Writer
+# ------------------------------------------------------------------
+class BlockWriter:
+    """
+    逐行寫入 → 湊滿 block_size 壓一個獨立 block
+    close() 時寫出 block index（先寫到 .tmp，完成後 rename，半成品不會被讀到）
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        compression: Optional[str] = None,
+        *,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        level: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.compression = compression or compression_of(self.path) or default_compression()
+        self.block_size = block_size
+        self._compress = _compressor(self.compression, level)
+        self._loads = get_codec().loads
+
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f = open(self._tmp, "wb")
+        self._buf: List[bytes] = []
+        self._buf_bytes = 0
+        self._offset = 0
+        self._lines = 0
+        self.raw_bytes = 0
+        self.blocks: List[Dict[str, Any]] = []
+
+    def write_line(self, line: bytes | str) -> None:
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        self._buf.append(line)
+        self._buf_bytes += len(line)
+        if self._buf_bytes >= self.block_size:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        buf = self._buf
+        if not buf:
+            return
+        data = b"".join(buf)
+        comp = self._compress(data)
+        self._f.write(comp)
+        min_ts, max_ts = _block_ts_range(buf, self._loads)
+        self.blocks.append({
+            "offset": self._offset,
+            "length": len(comp),
+            "line": self._lines,
+            "lines": len(buf),
+            "min_ts": min_ts,
+            "max_ts": max_ts,
+        })
+        self._offset += len(comp)
+        self._lines += len(buf)
+        self.raw_bytes += len(data)
+        self._buf = []
+        self._buf_bytes = 0
+
+    def close(self) -> Path:
+        self._flush_block()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+
+        index = {
+            "version": 1,
+            "compression": self.compression,
+            "lines": self._lines,
+            "raw_bytes": self.raw_bytes,
+            "bytes": self._offset,
+            "blocks": self.blocks,
+        }
+        idx_tmp = index_path(self._tmp)
+        with open(idx_tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+
+        os.replace(self._tmp, self.path)
+        os.replace(idx_tmp, index_path(self.path))
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            self._tmp.unlink(missing_ok=True)
+
+
+def compress_file(
+    src: Path | str,
+    dst: Path | str | None = None,
+    compression: Optional[str] = None,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    level: Optional[int] = None,
+) -> Path:
+    """
+    .jsonl → 分塊壓縮檔（來源檔不刪，由呼叫端決定）
+    dst=None → 與來源同目錄，檔名加 .zst / .gz
+    """
+    src = Path(src)
+    compression = compression or default_compression()
+    if dst is None:
+        dst = src.with_name(src.name + COMPRESSION_SUFFIX[compression])
+
+    with BlockWriter(dst, compression, block_size=block_size, level=level) as w:
+        with open(src, "rb") as f:
+            for line in f:
+                if line.strip():
+                    w.write_line(line)
+    return Path(dst)
+
+
+# ------------------------------------------------------------------
+# Reader
+# ------------------------------------------------------------------
+class BlockReader:
+    """
+    分塊壓縮檔的讀取器
+    - 有 index：read_block(i) 直接 seek；iter_lines(start_ts, end_ts) 跳過範圍外的 block
+    - 沒 index（外部工具壓的 .gz / .zst）：只能整檔串流
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.compression = compression_of(self.path)
+        if self.compression is None:
+            raise ValueError(f"not a compressed jsonl: {self.path}")
+        self._decompress = None
+        self.index = self._load_index()
+
+    def _load_index(self) -> Optional[Dict[str, Any]]:
+        p = index_path(self.path)
+        if not p.exists():
+            return None
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None     # index 壞了 → 退回串流
+
+    @property
+    def blocks(self) -> List[Dict[str, Any]]:
+        return self.index["blocks"] if self.index else []
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def read_block(self, i: int, f=None) -> bytes:
+        """解壓第 i 個 block（只讀那一段 bytes）"""
+        if self._decompress is None:
+            self._decompress = _decompressor(self.compression)
+        b = self.blocks[i]
+        if f is None:
+            with open(self.path, "rb") as fh:
+                fh.seek(b["offset"])
+                return self._decompress(fh.read(b["length"]))
+        f.seek(b["offset"])
+        return self._decompress(f.read(b["length"]))
+
+    def block_in_range(self, i: int, start_ts: Optional[float], end_ts: Optional[float]) -> bool:
+        """block i 是否可能包含 [start_ts, end_ts] 內的紀錄（時間未知的 block 一律要讀）"""
+        b = self.blocks[i]
+        if start_ts is not None and b.get("max_ts") is not None and b["max_ts"] < start_ts:
+            return False
+        if end_ts is not None and b.get("min_ts") is not None and b["min_ts"] > end_ts:
+            return False
+        return True
+
+    def iter_lines(
+        self,
+        *,
+        start_block: int = 0,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+    ) -> Iterator[str]:
+        """
+        逐行讀取（含換行）
+        start_ts / end_ts：只是跳過「整個 block 都在範圍外」的 block，逐筆過濾仍由呼叫端做
+        """
+        if self.index is None:
+            if start_block:
+                print(f"[BlockReader] ⚠ no block index, full scan: {self.path}")
+            yield from self._iter_stream()
+            return
+
+        ranged = start_ts is not None or end_ts is not None
+        with open(self.path, "rb") as f:
+            for i in range(start_block, len(self.blocks)):
+                if ranged and not self.block_in_range(i, start_ts, end_ts):
+                    continue
+                data = self.read_block(i, f)
+                # 只切 b"\n"：str.splitlines 也會切 U+2028 / U+2029 / U+0085（json codec 不跳脫）
+                for line in io.BytesIO(data):
+                    yield line.decode("utf-8")
+
+    def _iter_stream(self) -> Iterator[str]:
+        if self.compression == "gzip":
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                yield from f
+            return
+
+        if zstandard is None:
+            raise ImportError("zstandard 未安裝，無法讀取 .zst")
+        with open(self.path, "rb") as fh:
+            reader = zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True)
+            yield from io.TextIOWrapper(reader, encoding="utf-8")
+
+
+def iter_text_lines(
+    path: Path | str,
+    *,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+) -> Iterator[str]:
+    """
+    讀 .jsonl / .jsonl.zst / .jsonl.gz 的每一行（含換行）
+    start_ts / end_ts（epoch 秒）：壓縮檔有 index 時跳過範圍外的 block（未壓縮檔忽略）
+    """
+    path = Path(path)
+    if compression_of(path) is None:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from f
+        return
+    yield from BlockReader(path).iter_lines(start_ts=start_ts, end_ts=end_ts)
@@ -8,6 +8,7 @@ class EventTrace:
     source: str
     delivered_to: list[str] = field(default_factory=list)
     ts: float = field(default_factory=time.time)
+    count: int = 1          # publish_many：一個 trace 代表整批事件
 
 class EventTracer:
     def __init__(self):
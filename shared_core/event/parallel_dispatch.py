@@ -0,0 +1,407 @@
+# shared_core/event/parallel_dispatch.py
+"""
+ShardedDispatcher — EventBus 平行派送（per-key 保序）
+
+設計：
+- N 個 shard，每個 shard = 一條 worker thread + 一個 FIFO queue
+- 事件依 key（例如 event type、(symbol, interval)）hash 到固定 shard
+  → 同一個 key 的事件永遠依 publish 順序執行
+  → 不同 key 的事件可以在不同 shard 上同時執行
+- Handler 派送模式：
+    ordered    ：走 key 對應的 shard（預設）
+    unordered  ：round-robin 丟到任一 shard，不保序
+    exclusive  ：走專用的單一 shard，全域序列化（handler 絕不並行）
+- 每個 shard 的 queue 是 PriorityEventQueue（見 priority_queue.py）：
+    control 事件（world.health.* / system.* / risk.*）插隊於 bulk market 流量、
+    有界 + overflow policy（block / drop_oldest / reject）、
+    狀態型 topic latest-value conflation
+- reject：一個事件要進的所有 shard 先檢查容量，任一個滿了 → 整個事件都不入列（不會只送到部分 handler）
+- block：handler 在自己 shard 的 worker thread 裡 publish、又派回同一個 shard
+  → 不等待（worker 在等自己清 queue = 死結），直接超過上限入列
+- 觀測：queue depth / per-shard lag / processed / errors
+
+使用方式（例）：
+    bus = ZeroCopyEventBus()
+    bus.enable_parallel_dispatch(workers=4, key=key_by_symbol_interval)
+
+    @dispatch_mode(EXCLUSIVE)
+    def on_decision(ev): ...
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from shared_core.event.priority_queue import (
+    BLOCK,
+    CONTROL,
+    REJECT,
+    EventQueueFull,
+    LanePolicy,
+    PriorityEventQueue,
+)
+
+ORDERED = "ordered"
+UNORDERED = "unordered"
+EXCLUSIVE = "exclusive"
+
+DISPATCH_MODES = (ORDERED, UNORDERED, EXCLUSIVE)
+
+KeyFunc = Callable[[str, Any], Hashable]
+
+
+# ------------------------------------------------------------------
+# Handler 宣告
+# ------------------------------------------------------------------
+def dispatch_mode(mode: str):
+    """decorator：宣告 handler 的派送模式"""
+    if mode not in DISPATCH_MODES:
+        raise ValueError(f"Unknown dispatch mode: {mode}")
+
+    def _wrap(fn):
+        fn.dispatch_mode = mode
+        return fn
+
+    return _wrap
+
+
+def batch_handler(fn):
+    """
+    decorator：宣告 handler 支援批次
+    publish_many 時會收到「同型別事件的 list」，而不是逐筆呼叫
+    """
+    fn.accepts_batch = True
+    return fn
+
+
+def accepts_batch(handler) -> bool:
+    return getattr(handler, "accepts_batch", False)
+
+
+def handler_mode(handler, modes: Optional[Dict[Any, str]] = None) -> str:
+    """subscribe 時指定的模式優先，其次 handler.dispatch_mode，預設 ordered"""
+    if modes:
+        mode = modes.get(handler)
+        if mode:
+            return mode
+    return getattr(handler, "dispatch_mode", ORDERED)
+
+
+# ------------------------------------------------------------------
+# Shard key
+# ------------------------------------------------------------------
+def key_by_type(event_type: str, payload: Any) -> Hashable:
+    return event_type
+
+
+def key_by_symbol_interval(event_type: str, payload: Any) -> Hashable:
+    """market 類事件依 (symbol, interval) 分流；其他事件退回 event type"""
+    if isinstance(payload, dict):
+        symbol = payload.get("symbol")
+        if symbol is not None:
+            return (symbol, payload.get("interval"))
+    return event_type
+
+
+# ------------------------------------------------------------------
+# Shard
+# ------------------------------------------------------------------
+class _Shard:
+    __slots__ = (
+        "index", "name", "queue", "thread", "on_error",
+        "processed", "errors", "_busy_since", "last_lag", "_may_block",
+    )
+
+    def __init__(self, index: int, name: str, on_error, maxsize: int, overflow: str):
+        self.index = index
+        self.name = name
+        self.queue = PriorityEventQueue(maxsize, overflow=overflow)
+        self.on_error = on_error
+        self._may_block = maxsize > 0 and overflow == BLOCK
+
+        self.processed = 0
+        self.errors = 0
+        self._busy_since: Optional[float] = None   # 目前處理中項目的 enqueue 時間
+        self.last_lag = 0.0                        # 最近一筆「enqueue → 開始執行」延遲
+
+        self.thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self.thread.start()
+
+    def put(
+        self, handlers: tuple, arg: Any, lane: int, conflate_key=None, batch: bool = False
+    ) -> bool:
+        # 自己的 worker 重入 → 不能等自己清 queue（block 模式會死結）
+        force = self._may_block and threading.current_thread() is self.thread
+        return self.queue.put(
+            (time.monotonic(), handlers, arg, batch),
+            lane=lane,
+            conflate_key=self.conflate_key(handlers, conflate_key),
+            force=force,
+        )
+
+    @staticmethod
+    def conflate_key(handlers: tuple, conflate_key) -> Optional[tuple]:
+        return None if conflate_key is None else (handlers, conflate_key)
+
+    def stop(self) -> None:
+        self.queue.put(None, lane=CONTROL, force=True)
+
+    def lag(self) -> float:
+        """目前落後秒數（處理中項目等待多久；閒置 = 0）"""
+        since = self._busy_since
+        if since is None:
+            return 0.0
+        return time.monotonic() - since
+
+    def _run(self) -> None:
+        q = self.queue
+        while True:
+            item = q.get()
+            if item is None:
+                q.task_done()
+                return
+
+            enq_ts, handlers, arg, batch = item
+            self._busy_since = enq_ts
+            self.last_lag = time.monotonic() - enq_ts
+
+            for h in handlers:
+                try:
+                    if not batch and accepts_batch(h):
+                        h([arg])    # batch handler 永遠收到 list
+                    else:
+                        h(arg)
+                except Exception as e:
+                    self.errors += 1
+                    if self.on_error is not None:
+                        try:
+                            self.on_error(h, arg, e)
+                        except Exception:
+                            pass
+
+            self.processed += 1
+            self._busy_since = None
+            q.task_done()
+
+
+# ------------------------------------------------------------------
+# Dispatcher
+# ------------------------------------------------------------------
+class ShardedDispatcher:
+    """
+    per-key 保序的 worker pool（給 EventBus / ZeroCopyEventBus 共用）
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        *,
+        key: KeyFunc = key_by_type,
+        name: str = "bus",
+        on_error: Optional[Callable[[Any, Any, Exception], None]] = None,
+        maxsize: int = 0,
+        overflow: str = BLOCK,
+        lane_policy: Optional[LanePolicy] = None,
+    ) -> None:
+        """
+        maxsize    : 每個 shard queue 的上限（0 = 無上限）
+        overflow   : block / drop_oldest / reject（reject 會 raise EventQueueFull）
+        lane_policy: event type → lane / conflation 規則
+        """
+        if workers < 1:
+            raise ValueError("ShardedDispatcher workers 必須 >= 1")
+
+        self.key = key
+        self.name = name
+        self.overflow = overflow
+        self.on_error = on_error or self._default_on_error
+        self.lane_policy = lane_policy or LanePolicy()
+
+        self._shards: List[_Shard] = [
+            _Shard(i, f"{name}-shard-{i}", self.on_error, maxsize, overflow)
+            for i in range(workers)
+        ]
+        self._exclusive = _Shard(
+            workers, f"{name}-exclusive", self.on_error, maxsize, overflow
+        )
+        self._rr = itertools.count()
+        self._reject_lock = threading.Lock()   # reject：容量檢查 + 入列不被其他 publisher 插隊
+        self._closed = False
+
+    # ------------------------------
+    # 派送
+    # ------------------------------
+    def shard_for(self, key: Hashable) -> int:
+        return hash(key) % len(self._shards)
+
+    def dispatch(
+        self,
+        event_type: str,
+        payload: Any,
+        handlers: Iterable,
+        arg: Any,
+        modes: Optional[Dict[Any, str]] = None,
+        priority: Optional[int] = None,
+        *,
+        batch: bool = False,
+    ) -> None:
+        """
+        將一個事件依 handler 模式拆成（最多）三個 queue 項目：
+        - ordered handlers   → key shard（一個項目，handler 順序保留）
+        - exclusive handlers → exclusive shard（一個項目）
+        - unordered handlers → 各自 round-robin
+
+        lane / conflation 由 lane_policy 依 event type（+ PBEvent.priority）決定。
+        overflow=reject：任一目標 shard 放不下 → raise EventQueueFull，這個事件完全沒入列
+        """
+        if self._closed:
+            raise RuntimeError(f"[{self.name}] dispatcher 已關閉")
+
+        lane, conflate_key = self.lane_policy.classify(event_type, payload, priority)
+
+        items: List[tuple] = []      # (shard, handlers)
+        ordered = []
+        exclusive = []
+        for h in handlers:
+            mode = handler_mode(h, modes)
+            if mode == ORDERED:
+                ordered.append(h)
+            elif mode == EXCLUSIVE:
+                exclusive.append(h)
+            else:
+                shards = self._shards
+                items.append((shards[next(self._rr) % len(shards)], (h,)))
+
+        if ordered:
+            k = self.key(event_type, payload)
+            items.append((self._shards[self.shard_for(k)], tuple(ordered)))
+
+        if exclusive:
+            items.append((self._exclusive, tuple(exclusive)))
+
+        if self.overflow != REJECT:
+            for shard, hs in items:
+                shard.put(hs, arg, lane, conflate_key, batch)
+            return
+
+        # 只有 publisher 會佔位置（worker 只會騰出位置）→ 同一把鎖下檢查完再入列，不會入列到一半
+        with self._reject_lock:
+            self._check_room(items, conflate_key)
+            for shard, hs in items:
+                shard.put(hs, arg, lane, conflate_key, batch)
+
+    def _check_room(self, items: List[tuple], conflate_key) -> None:
+        need: Dict[int, int] = {}
+        for shard, hs in items:
+            if not shard.queue.is_pending(shard.conflate_key(hs, conflate_key)):
+                need[shard.index] = need.get(shard.index, 0) + 1
+        for shard in self._all_shards():
+            n = need.get(shard.index)
+            if n is None:
+                continue
+            free = shard.queue.free_slots()
+            if free is not None and free < n:
+                shard.queue.rejected += 1
+                raise EventQueueFull(
+                    f"[{self.name}] {shard.name} full (maxsize={shard.queue.maxsize}), event not enqueued"
+                )
+
+    def dispatch_batch(
+        self,
+        event_type: str,
+        payloads: List[Any],
+        handlers: Iterable,
+        args: List[Any],
+        modes: Optional[Dict[Any, str]] = None,
+        priority: Optional[int] = None,
+    ) -> None:
+        """
+        publish_many 用：同型別的一批事件
+        - 一般 handler      → 逐筆 dispatch（行為同 dispatch）
+        - accepts_batch handler → 依 (shard key, conflate key) 分組，每組一個 queue 項目（收到 list）
+          conflate key 也分組：一個項目只含同一個 conflate key 的事件，
+          後來的 [BTC] 批次只會覆蓋排隊中的 [BTC]，不會連同一批的 ETH 一起蓋掉
+        overflow=reject 時每一次 dispatch 各自全有或全無；EventQueueFull 之前已入列的不會撤回
+        """
+        singles = []
+        batched = []
+        for h in handlers:
+            (batched if accepts_batch(h) else singles).append(h)
+
+        if singles:
+            for payload, arg in zip(payloads, args):
+                self.dispatch(event_type, payload, singles, arg, modes, priority)
+
+        if batched:
+            groups: Dict[Hashable, tuple] = {}
+            classify = self.lane_policy.classify
+            for payload, arg in zip(payloads, args):
+                k = (self.key(event_type, payload), classify(event_type, payload, priority)[1])
+                group = groups.get(k)
+                if group is None:
+                    group = groups[k] = (payload, [])
+                group[1].append(arg)
+            for first_payload, group_args in groups.values():
+                self.dispatch(
+                    event_type, first_payload, batched, group_args, modes, priority, batch=True
+                )
+
+    # ------------------------------
+    # 觀測
+    # ------------------------------
+    def _all_shards(self) -> List[_Shard]:
+        return self._shards + [self._exclusive]
+
+    def queue_depth(self) -> int:
+        return sum(s.queue.qsize() for s in self._all_shards())
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "shard": s.name,
+                "depth": s.queue.qsize(),
+                "lanes": s.queue.lane_sizes(),
+                "lag_ms": round(s.lag() * 1000, 3),
+                "last_lag_ms": round(s.last_lag * 1000, 3),
+                "processed": s.processed,
+                "errors": s.errors,
+                "dropped": s.queue.dropped,
+                "rejected": s.queue.rejected,
+                "conflated": s.queue.conflated,
+            }
+            for s in self._all_shards()
+        ]
+
+    # ------------------------------
+    # 生命週期
+    # ------------------------------
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """等待所有 shard 清空；timeout 到期回傳 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for s in self._all_shards():
+            if deadline is None:
+                s.queue.join()
+                continue
+            while s.queue.unfinished_tasks:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.001)
+        return True
+
+    def close(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        if self._closed:
+            return
+        if drain:
+            self.drain(timeout)
+        self._closed = True
+        for s in self._all_shards():
+            s.stop()
+        for s in self._all_shards():
+            s.thread.join(timeout)
+
+    @staticmethod
+    def _default_on_error(handler, arg, exc: Exception) -> None:
+        name = getattr(handler, "__name__", repr(handler))
+        print(f"[ShardedDispatcher] ❌ handler error ({name}): {exc}")
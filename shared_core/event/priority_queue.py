@@ -0,0 +1,261 @@
+# shared_core/event/priority_queue.py
+"""
+PriorityEventQueue — 有界、分 lane 的事件佇列（給 ShardedDispatcher 用）
+
+設計：
+- 3 條 lane：control(0) > normal(1) > bulk(2)
+  → world.health.* / system.* / risk.* 永遠先於 replay 灌進來的 market.kline
+- 有界（maxsize），滿了依 overflow policy 處理：
+    block       ：publisher 等待（可給 timeout）
+    drop_oldest ：丟掉「最低優先 lane」裡最舊的一筆
+    reject      ：直接 raise EventQueueFull
+- Conflation（latest-value）：狀態型 topic（risk.snapshot、world.health.*）
+  若同 key 已有一筆在排隊，直接覆蓋成最新值，不佔新位置
+
+事件 → lane 的規則見 LanePolicy。
+"""
+from __future__ import annotations
+
+import fnmatch
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+CONTROL = 0
+NORMAL = 1
+BULK = 2
+LANES = (CONTROL, NORMAL, BULK)
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+REJECT = "reject"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, REJECT)
+
+# PB-Lang 數值 priority ≥ 此值 → 升到 control lane（PBsystem.error / order / signal.final）
+HIGH_PRIORITY = 7
+
+DEFAULT_LANE_RULES: Tuple[Tuple[str, int], ...] = (
+    ("world.health.*", CONTROL),
+    ("system.*", CONTROL),
+    ("risk.*", CONTROL),
+    ("market.risk_alert", CONTROL),
+    ("market.order.*", CONTROL),
+    ("market.kline", BULK),
+    ("market.kline.*", BULK),
+    ("market.trade", BULK),
+)
+
+DEFAULT_CONFLATE: Tuple[str, ...] = (
+    "risk.snapshot",
+    "world.health.*",
+)
+
+
+class EventQueueFull(RuntimeError):
+    """overflow=reject 時佇列已滿"""
+
+
+class LanePolicy:
+    """
+    event type → lane / 是否 conflate（依 type 快取，hot path 只查 dict）
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[Tuple[str, int]] = DEFAULT_LANE_RULES,
+        conflate: Iterable[str] = DEFAULT_CONFLATE,
+        default_lane: int = NORMAL,
+    ) -> None:
+        self.rules = tuple(rules)
+        self.conflate = tuple(conflate)
+        self.default_lane = default_lane
+        self._cache: Dict[str, Tuple[int, bool]] = {}
+
+    def _resolve(self, event_type: str) -> Tuple[int, bool]:
+        lane = self.default_lane
+        for pattern, rule_lane in self.rules:
+            if fnmatch.fnmatchcase(event_type, pattern):
+                lane = rule_lane
+                break
+        conflate = any(fnmatch.fnmatchcase(event_type, p) for p in self.conflate)
+        resolved = (lane, conflate)
+        self._cache[event_type] = resolved
+        return resolved
+
+    def classify(
+        self,
+        event_type: str,
+        payload: Any = None,
+        priority: Optional[int] = None,
+    ) -> Tuple[int, Optional[Hashable]]:
+        """回傳 (lane, conflate_key)；不需要 conflate 時 key = None"""
+        resolved = self._cache.get(event_type)
+        if resolved is None:
+            resolved = self._resolve(event_type)
+        lane, conflate = resolved
+
+        if priority is not None and priority >= HIGH_PRIORITY:
+            lane = CONTROL
+
+        if not conflate:
+            return lane, None
+
+        sub = None
+        if isinstance(payload, dict):
+            sub = payload.get("symbol") or payload.get("world_id")
+        return lane, (event_type, sub)
+
+
+class PriorityEventQueue:
+    """
+    執行緒安全、有界、分 lane 的 FIFO（同 lane 內保序）
+    介面對齊 queue.Queue：put / get / qsize / task_done / join
+    """
+
+    def __init__(self, maxsize: int = 0, *, overflow: str = BLOCK) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+
+        self._lanes: List[deque] = [deque() for _ in LANES]
+        self._pending: Dict[Hashable, list] = {}   # conflate_key → entry
+        self._size = 0
+
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+        self._all_done = threading.Condition(self._mutex)
+        self.unfinished_tasks = 0
+
+        self.dropped = 0
+        self.rejected = 0
+        self.conflated = 0
+
+    # ------------------------------
+    # 寫入
+    # ------------------------------
+    def put(
+        self,
+        item: Any,
+        *,
+        lane: int = NORMAL,
+        conflate_key: Optional[Hashable] = None,
+        timeout: Optional[float] = None,
+        force: bool = False,
+    ) -> bool:
+        """
+        回傳 True = 已入列（或已覆蓋同 key 的排隊值）
+        回傳 False = 被丟棄（drop_oldest 且沒有更低優先的可丟 / block timeout）
+        """
+        with self._not_full:
+            # ---- conflation：同 key 還在排隊 → 原地覆蓋 ----
+            if conflate_key is not None:
+                entry = self._pending.get(conflate_key)
+                if entry is not None:
+                    entry[0] = item
+                    self.conflated += 1
+                    return True
+
+            if not force and self.maxsize > 0 and self._size >= self.maxsize:
+                if not self._make_room(lane, timeout):
+                    return False
+
+            entry = [item, conflate_key]
+            self._lanes[lane].append(entry)
+            if conflate_key is not None:
+                self._pending[conflate_key] = entry
+            self._size += 1
+            self.unfinished_tasks += 1
+            self._not_empty.notify()
+            return True
+
+    def _make_room(self, lane: int, timeout: Optional[float]) -> bool:
+        if self.overflow == REJECT:
+            self.rejected += 1
+            raise EventQueueFull(
+                f"PriorityEventQueue full (maxsize={self.maxsize})"
+            )
+
+        if self.overflow == DROP_OLDEST:
+            # 從最低優先 lane 開始丟，但不犧牲比新事件更重要的 lane
+            for victim_lane in reversed(LANES):
+                if victim_lane < lane:
+                    break
+                q = self._lanes[victim_lane]
+                if q:
+                    victim = q.popleft()
+                    if victim[1] is not None:
+                        self._pending.pop(victim[1], None)
+                    self._size -= 1
+                    self.dropped += 1
+                    self._task_done_locked()
+                    return True
+            self.dropped += 1
+            return False
+
+        # BLOCK
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._size >= self.maxsize:
+            if deadline is None:
+                self._not_full.wait()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.dropped += 1
+                    return False
+                self._not_full.wait(remaining)
+        return True
+
+    def free_slots(self) -> Optional[int]:
+        """還能再放幾筆（無上限 → None）"""
+        if self.maxsize <= 0:
+            return None
+        return max(self.maxsize - self._size, 0)
+
+    def is_pending(self, conflate_key: Optional[Hashable]) -> bool:
+        """同 key 已在排隊 → put 只會覆蓋，不佔新位置"""
+        return conflate_key is not None and conflate_key in self._pending
+
+    # ------------------------------
+    # 讀取
+    # ------------------------------
+    def get(self) -> Any:
+        with self._not_empty:
+            while not self._size:
+                self._not_empty.wait()
+            for q in self._lanes:
+                if q:
+                    entry = q.popleft()
+                    break
+            if entry[1] is not None:
+                self._pending.pop(entry[1], None)
+            self._size -= 1
+            self._not_full.notify()
+            return entry[0]
+
+    # ------------------------------
+    # queue.Queue 相容
+    # ------------------------------
+    def qsize(self) -> int:
+        return self._size
+
+    def lane_sizes(self) -> List[int]:
+        return [len(q) for q in self._lanes]
+
+    def task_done(self) -> None:
+        with self._mutex:
+            self._task_done_locked()
+
+    def _task_done_locked(self) -> None:
+        self.unfinished_tasks -= 1
+        if self.unfinished_tasks <= 0:
+            self.unfinished_tasks = 0
+            self._all_done.notify_all()
+
+    def join(self) -> None:
+        with self._all_done:
+            while self.unfinished_tasks:
+                self._all_done.wait()
@@ -1,5 +1,67 @@
 # shared_core/event/zero_copy_event_bus.py
+import fnmatch
+import threading
+
 from shared_core.event.event_trace import EventTrace
+from shared_core.event.parallel_dispatch import (
+    DISPATCH_MODES,
+    ShardedDispatcher,
+    accepts_batch,
+    key_by_type,
+)
+
+
+def _is_wildcard(pattern: str) -> bool:
+    return any(ch in pattern for ch in "*?[")
+
+
+class _RouteTable:
+    """
+    不可變的訂閱快照 + per-type handler 快取（copy-on-write）
+
+    - subscriptions：(pattern, handler) tuple，依訂閱順序
+    - routes       ：event_type → handler tuple（第一次 publish 時解析後快取）
+    - batchy       ：含 @batch_handler 的 event_type（逐筆 publish 時要包成 list）
+
+    subscribe / unsubscribe 只會建立「新的」_RouteTable 再整個換掉，
+    publish 端拿到的永遠是一致的快照，不需要 lock。
+    """
+
+    __slots__ = ("subscriptions", "exact", "wildcards", "routes", "batchy")
+
+    def __init__(self, subscriptions: tuple):
+        self.subscriptions = subscriptions
+        self.exact = {}
+        wildcards = []
+        for pattern, handler in subscriptions:
+            if not _is_wildcard(pattern):
+                self.exact.setdefault(pattern, []).append(handler)
+            else:
+                wildcards.append(pattern)
+        self.wildcards = tuple(dict.fromkeys(wildcards))
+
+        # ⭐ 預先編譯：已知的 exact type 直接解析
+        self.routes = {}
+        self.batchy = set()
+        for event_type in self.exact:
+            self.routes[event_type] = self.resolve(event_type)
+
+    def resolve(self, event_type: str) -> tuple:
+        matched = {
+            p for p in self.wildcards
+            if p == "*" or fnmatch.fnmatchcase(event_type, p)
+        }
+        handlers = tuple(
+            h for p, h in self.subscriptions
+            if p == event_type or p in matched
+        )
+        # dict 單一 setitem 在 GIL 下為原子操作；併發重算結果相同
+        if any(accepts_batch(h) for h in handlers):
+            self.batchy.add(event_type)
+        self.routes[event_type] = handlers
+        return handlers
+
+
 class ZeroCopyEventBus:
     """
     Zero-Copy EventBus：
@@ -7,49 +69,201 @@ class ZeroCopyEventBus:
     - 不複製 payload（傳參考）
     - handler 直接吃 event object
     - 大幅減少 CPU 負載
+
+    Routing：
+    - 支援 exact（market.kline）/ wildcard（market.*）/ 全部（*）
+    - publish = 一次 dict lookup + 一次 tuple iteration（lock-free）
+    - subscribe / unsubscribe 以 copy-on-write 原子替換路由表
+
+    Batch：
+    - publish_many() 一批只解析一次路由、一個 trace
+    - @batch_handler 宣告的 handler 直接收到 list[event]
+
+    Dispatch：
+    - 預設 inline（publisher thread 直接呼叫 handler）
+    - enable_parallel_dispatch() 後改由 ShardedDispatcher 派送（per-key 保序）
     """
 
     def __init__(self):
-        # event_type → [handlers]
-        self._subscribers = {}
+        self._lock = threading.Lock()   # 只保護「寫入端」
+        self._table = _RouteTable(())
+        self._modes = {}                # handler → ordered / unordered / exclusive
+        self._dispatcher = None
+
+    # --------------------------------------
+    # 平行派送（可選）
+    # --------------------------------------
+    def enable_parallel_dispatch(self, workers: int = 4, *, key=key_by_type, on_error=None, **queue_opts):
+        """queue_opts：maxsize / overflow / lane_policy（見 ShardedDispatcher）"""
+        if self._dispatcher is None:
+            self._dispatcher = ShardedDispatcher(
+                workers, key=key, name="fast_bus", on_error=on_error, **queue_opts
+            )
+        return self._dispatcher
+
+    def queue_depth(self) -> int:
+        return self._dispatcher.queue_depth() if self._dispatcher else 0
+
+    def dispatch_stats(self) -> list:
+        return self._dispatcher.stats() if self._dispatcher else []
+
+    def drain(self, timeout: float | None = None) -> bool:
+        return self._dispatcher.drain(timeout) if self._dispatcher else True
+
+    def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+            self._dispatcher = None
 
     # --------------------------------------
     # 訂閱事件
     # --------------------------------------
-    def subscribe(self, event_type: str, handler):
-        if event_type not in self._subscribers:
-            self._subscribers[event_type] = []
-        self._subscribers[event_type].append(handler)
+    def subscribe(self, event_type: str, handler, mode: str | None = None):
+        if mode is not None:
+            if mode not in DISPATCH_MODES:
+                raise ValueError(f"Unknown dispatch mode: {mode}")
+            self._modes[handler] = mode
+        with self._lock:
+            subs = self._table.subscriptions + ((event_type, handler),)
+            self._table = _RouteTable(subs)
+
+    def unsubscribe(self, event_type: str, handler) -> bool:
+        with self._lock:
+            subs = list(self._table.subscriptions)
+            try:
+                subs.remove((event_type, handler))
+            except ValueError:
+                return False
+            self._table = _RouteTable(tuple(subs))
+            return True
+
+    def handlers_for(self, event_type: str) -> tuple:
+        """回傳此 event_type 會被送到的 handlers（依訂閱順序）"""
+        table = self._table
+        handlers = table.routes.get(event_type)
+        if handlers is None:
+            handlers = table.resolve(event_type)
+        return handlers
 
     # --------------------------------------
     # 發布事件（不複製）
     # --------------------------------------
 
     def publish(self, event, skip_log: bool = False):
+        table = self._table
+        handlers = table.routes.get(event.type)
+        if handlers is None:
+            handlers = table.resolve(event.type)
+
+        tracer = getattr(self, "tracer", None)
+        dispatcher = self._dispatcher
+
+        if dispatcher is not None:
+            dispatcher.dispatch(
+                event.type, event.payload, handlers, event, self._modes,
+                priority=getattr(event, "priority", None),
+            )
+            if tracer is not None:
+                tracer.record(EventTrace(
+                    event_type=event.type,
+                    source=getattr(event, "source", "unknown"),
+                    delivered_to=[getattr(h, "__name__", repr(h)) for h in handlers],
+                ))
+            return
+
+        batchy = event.type in table.batchy
+
+        if tracer is None and not batchy:
+            for h in handlers:
+                h(event)
+            return
+
         trace = None
-        if hasattr(self, "tracer"):
+        if tracer is not None:
             trace = EventTrace(
                 event_type=event.type,
                 source=getattr(event, "source", "unknown"),
             )
-
-        handlers = self._subscribers.get(event.type, [])
         for h in handlers:
-            if trace:
-                trace.delivered_to.append(h.__name__)
-            h(event)
+            if trace is not None:
+                trace.delivered_to.append(getattr(h, "__name__", repr(h)))
+            if batchy and accepts_batch(h):
+                h([event])      # batch handler 永遠收到 list
+            else:
+                h(event)
+
+        if trace is not None:
+            tracer.record(trace)
+
+    # --------------------------------------
+    # 批次發布（bulk kline / replay / backfill）
+    # --------------------------------------
+    def publish_many(self, events) -> int:
+        """
+        批次發布：連續同型別、同 priority 的事件為一組（priority 決定 dispatcher lane）
+        - 每組只解析一次 handlers、只記一筆 EventTrace
+        - accepts_batch handler 收到整組 list，其餘 handler 逐筆呼叫
+        - 每個 handler 看到的事件順序不變
+          （差別：handler 依序吃完整組，而非事件 × handler 交錯）
+
+        回傳：發布的事件數
+        """
+        if not isinstance(events, list):
+            events = list(events)
+
+        n = len(events)
+        table = self._table
+        tracer = getattr(self, "tracer", None)
+        dispatcher = self._dispatcher
+
+        i = 0
+        while i < n:
+            etype = events[i].type
+            prio = getattr(events[i], "priority", None)
+            j = i + 1
+            while j < n and events[j].type == etype and getattr(events[j], "priority", None) == prio:
+                j += 1
+            run = events if (i == 0 and j == n) else events[i:j]
+            i = j
+
+            handlers = table.routes.get(etype)
+            if handlers is None:
+                handlers = table.resolve(etype)
+
+            if dispatcher is not None:
+                dispatcher.dispatch_batch(
+                    etype,
+                    [ev.payload for ev in run],
+                    handlers,
+                    run,
+                    self._modes,
+                    priority=prio,
+                )
+            else:
+                for h in handlers:
+                    if accepts_batch(h):
+                        h(run)
+                    else:
+                        for ev in run:
+                            h(ev)
+
+            if tracer is not None:
+                tracer.record(EventTrace(
+                    event_type=etype,
+                    source=getattr(run[0], "source", "unknown"),
+                    delivered_to=[getattr(h, "__name__", repr(h)) for h in handlers],
+                    count=len(run),
+                ))
+
+        return n
 
-        if trace:
-            self.tracer.record(trace)
-    
     # --------------------------------------
     # 訂閱所有事件（萬用監聽）
     # --------------------------------------
-    def subscribe_all(self, handler):
-        if "*" not in self._subscribers:
-            self._subscribers["*"] = []
-        self._subscribers["*"].append(handler)
+    def subscribe_all(self, handler, mode: str | None = None):
+        self.subscribe("*", handler, mode)
 
     def publish_all(self, event):
-        for h in self._subscribers.get("*", []):
-            h(event)
+        for p, h in self._table.subscriptions:
+            if p == "*":
+                h(event)
@@ -1,6 +1,12 @@
-import json
+from collections import deque
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, iter_text_lines, record_ts, to_epoch
+from shared_core.mmap_jsonl import MmapJsonlReader
+from .segment_log import SegmentLog
 
 class EventLogReader:
     """
@@ -8,34 +14,83 @@ class EventLogReader:
     ✔ 僅供 Audit / Replay 使用
     ✔ 不修改任何資料
     ✔ 不影響 EventLogWriter
+    ✔ path 是分段 log 的邏輯名稱時，依序讀全部 segment
+    ✔ path 是 COLD 壓縮檔（.jsonl.zst / .gz）時透明解壓，只解範圍內的 block
+    ✔ iter() 串流、tail() / latest() 從檔尾反向讀（mmap），多 GB log 也是固定記憶體
     """
 
     def __init__(self, path):
         self.path = Path(path)
+        self.codec = get_codec()
 
-    def load(self, start, end):
+    def iter(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        *,
+        until: Optional[Tuple[str, int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
         """
-        讀取指定時間區間內的事件
+        串流讀取（時間區間可省略）；有 .tsidx / block index 時只讀相關範圍
+        時間一律換成 epoch 比較：naive datetime（utcnow()）/ naive ISO 都視為 UTC
+        until=(segment 檔名, offset)：只讀到這個位置（JsonlFollower.position()）為止
         """
-        events = []
+        loads = self.codec.loads
+        start_ts, end_ts = to_epoch(start), to_epoch(end)
+        lines = SegmentLog(self.path).iter_lines(start_ts=start_ts, end_ts=end_ts, until=until)
+        ranged = start_ts is not None or end_ts is not None
+        for line in lines:
+            try:
+                obj = loads(line)
+            except Exception:
+                # audit 只讀，壞行 / 寫到一半的最後一行直接略過
+                continue
+            if not ranged:
+                yield obj
+                continue
+
+            ts = record_ts(obj)
+            if ts is None:
+                continue
+            if (start_ts is None or start_ts <= ts) and (end_ts is None or ts <= end_ts):
+                yield obj
 
-        if not self.path.exists():
-            return events
+    def load(self, start, end, *, until: Optional[Tuple[str, int]] = None):
+        """
+        讀取指定時間區間內的事件
+        """
+        return list(self.iter(start, end, until=until))
 
-        with open(self.path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    obj = json.loads(line)
-                    ts_str = obj.get("timestamp")
-                    if not ts_str:
-                        continue
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        """最後 n 筆事件（舊 → 新），從最新的 segment 往回讀"""
+        out: List[Dict[str, Any]] = []
+        if n <= 0:
+            return out
 
-                    ts = datetime.fromisoformat(ts_str)
-                    if start <= ts <= end:
-                        events.append(obj)
+        for path in reversed(SegmentLog(self.path).segments()):
+            need = n - len(out)
+            try:
+                if compression_of(path):
+                    # 壓縮檔無法反向讀：順向串流，只留最後 need 筆
+                    recent = deque(maxlen=need)
+                    for line in iter_text_lines(path):
+                        try:
+                            recent.append(self.codec.loads(line))
+                        except Exception:
+                            continue
+                    chunk = list(recent)
+                else:
+                    with MmapJsonlReader(path, self.codec) as r:
+                        chunk = r.tail(need)
+            except FileNotFoundError:
+                continue    # 剛被 rotate 走
 
-                except Exception:
-                    # audit 只讀，任何壞資料直接略過
-                    continue
+            out[:0] = chunk
+            if len(out) >= n:
+                break
+        return out
 
-        return events
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """最新一筆事件（沒有 → None）"""
+        last = self.tail(1)
+        return last[0] if last else None
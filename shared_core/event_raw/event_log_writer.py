@@ -1,108 +1,517 @@
 # shared_core/log_utils/event_log_writer.py
 
-import json
+import atexit
+import contextlib
+import os
 import threading
 import time
+from collections import deque
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Optional
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import record_ts
+from .segment_log import SegmentLog
+from .ts_index import TsIndexWriter
 from .weak_labeler import WeakLabeler
-import time
+
+DURABILITY_NONE = "none"      # 交給 OS / Python buffer（最快，crash 可能丟最後一批）
+DURABILITY_FLUSH = "flush"    # 每次 group commit 後 flush 到 OS（process crash 不丟）
+DURABILITY_FSYNC = "fsync"    # flush + 每 fsync_interval_ms 一次 fsync（機器斷電也不丟）
+DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_FLUSH, DURABILITY_FSYNC)
+
+
+class _DrainBarrier(threading.Event):
+    """drain() 插進 queue 的標記（不會被寫出）"""
+
 
 class EventLogWriter:
+    """
+    EventLogWriter v2 — RAW EVENT 唯一 Writer（group commit）
+
+    - write()：producer 只做 deque.append（GIL 下原子，不拿 lock）
+    - 序列化（codec）+ weak label 全部在 writer thread 做
+    - 檔案 handle 常駐，一次 group commit = 一次 writelines
+    - 分段寫入：filepath 是邏輯名稱（logs.jsonl），實際寫 logs.000001.jsonl …
+      超過 segment_max_mb / segment_max_age_sec 就 roll 到下一個編號（見 segment_log.py）；
+      重啟時接續最後一個還沒到 roll 條件的 segment
+    - 每個 segment 附帶稀疏時間索引 .tsidx（見 ts_index.py），時間窗查詢只讀相關 chunk
+    - durability：none / flush / fsync（fsync 依 fsync_interval_ms 節流；之後沒有新寫入也會在到期時補 fsync）
+    - 有界 queue：滿了 producer 等待（backpressure），不丟事件
+    - 觀測：enqueue latency、batch size、bytes/s（stats()）
+    - roll() / drain() / hold() / close()：給 LogRotator 協調輪轉
+
+    ⚠ 事件在 write() 之後才被序列化：發布後請勿再修改事件內容
+    """
+
     def __init__(
         self,
         filepath: str,
         buffer_size: int = 1000,
         flush_interval: float = 0.2,
         enable_weak_label: bool = True,
+        codec: str | None = None,
+        durability: str = DURABILITY_FLUSH,
+        fsync_interval_ms: int = 1000,
+        max_queue: int = 100_000,
+        segment_max_mb: float = 256,
+        segment_max_age_sec: float = 0,
+        index_every: int = 1000,
+        index_interval_sec: float = 60.0,
     ):
+        """
+        buffer_size      : 累積到這個數量立刻喚醒 writer（也是單次 group commit 上限）
+        flush_interval   : 沒滿 buffer_size 時，最多等多久 commit 一次（秒）
+        durability       : none / flush / fsync
+        fsync_interval_ms: durability=fsync 時，兩次 fsync 的最短間隔（0 = 每次 commit）
+        max_queue        : queue 上限，滿了 write() 會等待
+        segment_max_mb   : 單一 segment 上限（0 = 不依大小 roll）
+        segment_max_age_sec: segment 開啟多久後 roll（0 = 不依時間 roll）
+        index_every / index_interval_sec: 時間索引每 N 筆或每 M 秒記一個 chunk
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability: {durability}")
+
         self.filepath = Path(filepath)
         self.buffer_size = buffer_size
         self.flush_interval = flush_interval
         self.enable_weak_label = enable_weak_label
+        self.durability = durability
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self.max_queue = max_queue
+        self.segment_max_bytes = int(segment_max_mb * 1024 * 1024)
+        self.segment_max_age = segment_max_age_sec
+        self.index_every = index_every
+        self.index_interval = index_interval_sec
 
         self.filepath.parent.mkdir(parents=True, exist_ok=True)
 
-        self.buffer = []
-        self.lock = threading.Lock()
+        # --- segment：上次的最後一個 segment 還沒到 roll 條件 → 接著寫；否則開新編號 ---
+        #     （每次啟動都開新檔 → 一堆小 segment，LogRotator 又會把它們全當 sealed 搬走）
+        self.segments = SegmentLog(self.filepath)
+        self._segment_bytes = 0
+        self._segment_opened = time.monotonic()
+        self._seq = self._resume_or_next_seq()
+        self.current_path = self.segments.path_for(self._seq)
+        self._ts_index = TsIndexWriter(self.current_path, index_every, index_interval_sec)
 
         self.labeler = WeakLabeler() if enable_weak_label else None
+        self.codec = get_codec(codec)
+
+        # --- producer → writer ---
+        self._queue: deque = deque()
+        self._wake = threading.Event()
+
+        # --- writer 端（檔案只在 _io_lock 內存取）---
+        self._io_lock = threading.RLock()
+        self._file = None
+        self._pending: list = []       # 已序列化（utf-8 bytes）、尚未成功寫出（檔案忙碌時保留重試）
+        self._pending_ts = [None, None]  # _pending 內事件的 min / max 時間（給 .tsidx）
+        self._barriers: list = []      # drain() 標記：前面的事件全部寫出後才放行
+        self._inflight = 0
+        self._last_fsync = time.monotonic()
+        self._unsynced = False         # durability=fsync：上次 fsync 之後有寫入（由 writer thread 依時補 fsync）
+
+        # --- 統計（producer 端計數不加 lock，多 producer 時為近似值）---
+        self._written = 0
+        self._errors = 0
+        self._stalls = 0
+        self._enqueue_ns_total = 0
+        self._enqueue_ns_max = 0
+        self._enqueue_count = 0
+        self._batches = 0
+        self._batch_max = 0
+        self._bytes = 0
+        self._fsyncs = 0
+        self._rolls = 0
+        self._started = time.monotonic()
 
         self._last_busy_log_ts = 0.0
         self._busy_log_interval = 5.0
 
         self._stop = False
+        self._closed = False
+        self._finalized = False
         self.thread = threading.Thread(
-            target=self._background_flush_loop, daemon=True
+            target=self._writer_loop, daemon=True, name="EventLogWriter"
         )
         self.thread.start()
+        atexit.register(self.close)
 
-        print(f"[EventLogWriter] 📘 初始化完成 → {self.filepath}")
+        print(f"[EventLogWriter] 📘 初始化完成 → {self.current_path} (durability={durability})")
 
+    # -------------------------------------------------
+    # Producer 端
     # -------------------------------------------------
     def write(self, event: Any):
-        try:
-            with self.lock:
-                data = event.to_dict() if hasattr(event, "to_dict") else event
+        t0 = time.perf_counter_ns()
+        q = self._queue
 
-                if self.enable_weak_label and self.labeler:
-                    data["_weak_label"] = self.labeler.label_event(data)
+        if len(q) >= self.max_queue:
+            self._backpressure()
 
-                self.buffer.append(json.dumps(data, ensure_ascii=False))
+        q.append(event)
+        if len(q) >= self.buffer_size:
+            self._wake.set()
 
-                if len(self.buffer) >= self.buffer_size:
-                    self._flush_locked()
+        dt = time.perf_counter_ns() - t0
+        self._enqueue_ns_total += dt
+        self._enqueue_count += 1
+        if dt > self._enqueue_ns_max:
+            self._enqueue_ns_max = dt
 
-        except Exception as e:
-            print("[EventLogWriter] ❌ write error:", e)
+    def _backpressure(self) -> None:
+        """queue 滿：喚醒 writer 並等待空位（writer 已停止時直接放行）"""
+        self._stalls += 1
+        q = self._queue
+        while len(q) >= self.max_queue and not self._stop:
+            self._wake.set()
+            time.sleep(0.0005)
 
     # -------------------------------------------------
-    def _background_flush_loop(self):
-        last = time.time()
-        while not self._stop:
-            time.sleep(0.05)
-            if time.time() - last >= self.flush_interval:
-                with self.lock:
-                    self._flush_locked()
-                last = time.time()
-
+    # Writer thread
     # -------------------------------------------------
-    def _flush_locked(self):
-        if not self.buffer:
-            return
+    def _writer_loop(self):
+        while True:
+            timeout = self.flush_interval
+            if self._unsynced:
+                # 還有沒 fsync 的資料 → 最晚在 fsync_interval 到期時醒來（queue 空了也補做）
+                timeout = min(timeout, max(0.0, self._last_fsync + self.fsync_interval - time.monotonic()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+            while self._queue or self._pending:
+                if not self._commit_group():
+                    break   # 檔案忙碌 → 等下一輪
+
+            if self._unsynced and time.monotonic() - self._last_fsync >= self.fsync_interval:
+                with self._io_lock:
+                    self._fsync_locked()
+
+            if self._stop and not self._queue:
+                self._finalize()    # close() 等逾時先回去時，由 writer thread 自己收尾
+                return
+
+    def _commit_group(self) -> bool:
+        """取出最多 buffer_size 筆 → 序列化 → 一次 writelines；回傳是否成功寫出"""
+        q = self._queue
+        n = min(len(q), self.buffer_size)
+        self._inflight = n
+
+        pending = self._pending
+        encode = self._encode
+        popleft = q.popleft
+        lo, hi = self._pending_ts
+        for _ in range(n):
+            event = popleft()
+            if event.__class__ is _DrainBarrier:
+                self._barriers.append(event)
+                continue
+            try:
+                pending.append((encode(event) + "\n").encode("utf-8"))
+            except Exception as e:
+                self._errors += 1
+                print("[EventLogWriter] ❌ write error:", e)
+                continue
+
+            ts = getattr(event, "ts", None)
+            if ts is None and isinstance(event, dict):
+                ts = record_ts(event)
+            if ts is not None:
+                if lo is None or ts < lo:
+                    lo = ts
+                if hi is None or ts > hi:
+                    hi = ts
+        self._pending_ts = [lo, hi]
+        self._inflight = 0     # 之後由 _pending 計入 backlog
+
+        with self._io_lock:
+            return self._write_pending_locked()
+
+    def _write_pending_locked(self) -> bool:
+        lines = self._pending
+        if not lines:
+            self._release_barriers()
+            return True
 
         try:
-            # ⚠️ 每次 flush 才 open，避免長時間持有 handle
-            with open(self.filepath, "a", encoding="utf-8") as f:
-                for line in self.buffer:
-                    f.write(line + "\n")
+            if self._segment_bytes and self._segment_full():
+                self._roll_locked()
+
+            f = self._file
+            if f is None:
+                # binary append：offset 只在開檔時 tell 一次，之後累加寫出的 bytes
+                f = self._file = open(self.current_path, "ab", buffering=1 << 20)
+                self._segment_bytes = f.tell()
+
+            start = self._segment_bytes
+            f.writelines(lines)
+            end = start + sum(map(len, lines))
+
+            if self.durability != DURABILITY_NONE:
+                f.flush()
+                if self.durability == DURABILITY_FSYNC:
+                    self._unsynced = True
+                    if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                        self._fsync_locked()
 
-            self.buffer.clear()
+            n = len(lines)
+            self._written += n
+            self._batches += 1
+            if n > self._batch_max:
+                self._batch_max = n
+            self._bytes += end - start
+            self._segment_bytes = end
+            self._ts_index.add_group(start, end, n, *self._pending_ts, time.monotonic())
+            self._pending_ts = [None, None]
+            lines.clear()
+            self._release_barriers()
+            return True
 
         except PermissionError:
-            # ✔ Windows rotate 同步安全處理（加上 log 節流）
+            # ✔ Windows rotate 同步安全處理（加上 log 節流）；資料留在 _pending 下次重試
+            self._close_file_locked()
             now = time.time()
             if now - self._last_busy_log_ts >= self._busy_log_interval:
                 print("[EventLogWriter] ⚠ flush skipped (file busy)")
                 self._last_busy_log_ts = now
+            return False
 
         except Exception as e:
+            self._errors += 1
+            self._close_file_locked()
             print("[EventLogWriter] ❌ flush error:", e)
+            return False
 
+    def _fsync_locked(self) -> None:
+        """fsync 目前的 segment（呼叫端需持有 _io_lock）"""
+        self._last_fsync = time.monotonic()     # 失敗也算一次：下一個 interval 再試，不空轉
+        f = self._file
+        if f is not None and self._unsynced:
+            try:
+                f.flush()
+                os.fsync(f.fileno())
+                self._fsyncs += 1
+            except Exception as e:
+                print("[EventLogWriter] ❌ fsync error:", e)
+                return
+        self._unsynced = False
+
+    def _encode(self, event: Any) -> str:
+        labeler = self.labeler if self.enable_weak_label else None
+
+        # PBEvent → 預先排好欄位的 encoder（不呼叫 to_dict）
+        if hasattr(event, "payload") and hasattr(event, "to_dict"):
+            extra = None
+            if labeler:
+                extra = {
+                    "_weak_label": labeler.label_event(
+                        {"type": event.type, "payload": event.payload}
+                    )
+                }
+            return self.codec.encode_event(event, extra)
+
+        data = event.to_dict() if hasattr(event, "to_dict") else event
+        if labeler:
+            # 不修改呼叫端的 dict（EventBus 廣播的 payload 是共用的）
+            data = {**data, "_weak_label": labeler.label_event(data)}
+        return self.codec.dumps(data)
+
+    def _resume_or_next_seq(self) -> int:
+        """
+        接續最後一個 segment（沒超過 segment_max_mb / segment_max_age_sec）→ 它的編號，否則下一個編號
+        - 上次 crash 留下寫到一半的最後一行 → 先補一個換行（reader 當壞行略過），不接在半行後面
+        - 重啟後的 age 以檔案 mtime 起算（開檔時間沒有記錄）
+        """
+        last = self.segments.last_seq()
+        if not last:
+            return 1
+        path = self.segments.path_for(last)
+        try:
+            st = path.stat()
+            self._segment_bytes = st.st_size
+            self._segment_opened = time.monotonic() - max(0.0, time.time() - st.st_mtime)
+            if self._segment_full():
+                self._segment_bytes = 0
+                self._segment_opened = time.monotonic()
+                return last + 1
+            if st.st_size:
+                with open(path, "rb+") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                        self._segment_bytes += 1
+        except OSError:
+            self._segment_bytes = 0
+            self._segment_opened = time.monotonic()
+            return last + 1
+        return last
+
+    def _segment_full(self) -> bool:
+        if self.segment_max_bytes and self._segment_bytes >= self.segment_max_bytes:
+            return True
+        if self.segment_max_age and time.monotonic() - self._segment_opened >= self.segment_max_age:
+            return True
+        return False
+
+    def _roll_locked(self) -> Path:
+        """封存目前 segment，之後的寫入進下一個編號（只開新檔，不搬資料）"""
+        sealed = self.current_path
+        if self._file is not None:
+            self._file.flush()
+            if self.durability == DURABILITY_FSYNC:
+                os.fsync(self._file.fileno())
+                self._unsynced = False
+        self._close_file_locked()
+        self._ts_index.close()
+
+        self._seq += 1
+        self.current_path = self.segments.path_for(self._seq)
+        self._ts_index = TsIndexWriter(self.current_path, self.index_every, self.index_interval)
+        self._segment_bytes = 0
+        self._segment_opened = time.monotonic()
+        self._rolls += 1
+        return sealed
+
+    def _release_barriers(self) -> None:
+        barriers = self._barriers
+        while barriers:
+            barriers.pop().set()
+
+    def _close_file_locked(self) -> None:
+        self._fsync_locked()        # 關檔前補上還沒 fsync 的資料（之後就沒有 handle 可 fsync 了）
+        f = self._file
+        self._file = None
+        if f is not None:
+            try:
+                f.close()
+            except Exception:
+                pass
+
+    # -------------------------------------------------
+    # 協調（LogRotator）
     # -------------------------------------------------
+    def backlog(self) -> int:
+        """尚未落盤的事件數（queue + 處理中 + 重試中）"""
+        return len(self._queue) + self._inflight + len(self._pending)
+
+    def roll(self) -> Optional[Path]:
+        """
+        立刻封存目前 segment（LogRotator 依 max_age 強制輪轉用）
+        目前 segment 還沒寫過任何資料 → None
+        """
+        with self._io_lock:
+            if not self._segment_bytes:
+                return None
+            return self._roll_locked()
+
+    def is_busy(self) -> bool:
+        """writer 落後超過一個 group（此時輪轉會拖住 producer）"""
+        return self.backlog() > self.buffer_size
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待「呼叫當下已 enqueue 的事件」全部寫出（FIFO barrier）
+        timeout 到期回傳 False
+        """
+        if not self.thread.is_alive():
+            return not self.backlog()
+        barrier = _DrainBarrier()
+        self._queue.append(barrier)
+        self._wake.set()
+        return barrier.wait(timeout)
+
+    @contextlib.contextmanager
+    def hold(self):
+        """
+        暫停落盤（producer 照常 enqueue）：
+            with writer.hold():
+                copy / rename / truncate
+        離開時檔案 handle 重新開啟
+        """
+        with self._io_lock:
+            if self._file is not None:
+                self._file.flush()
+            try:
+                yield self
+            finally:
+                self._close_file_locked()
+
     def truncate(self):
-        """給 LogRotator 呼叫：清空檔案但不 rename"""
-        with self.lock:
+        """清空目前 segment（舊版 copy + truncate 輪轉用；分段後 LogRotator 不再呼叫）"""
+        with self._io_lock:
             try:
-                with open(self.filepath, "w", encoding="utf-8"):
+                self._close_file_locked()
+                with open(self.current_path, "w", encoding="utf-8"):
                     pass
+                self._ts_index.discard()
+                self._segment_bytes = 0
             except Exception as e:
                 print("[EventLogWriter] ❌ truncate error:", e)
 
     # -------------------------------------------------
-    def close(self):
-        self._stop = True
-        self.thread.join()
-        with self.lock:
-            self._flush_locked()
+    # 觀測
+    # -------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        enq = self._enqueue_count
+        return {
+            "written": self._written,
+            "backlog": self.backlog(),
+            "errors": self._errors,
+            "stalls": self._stalls,
+            "enqueue_avg_us": round(self._enqueue_ns_total / enq / 1000, 3) if enq else 0.0,
+            "enqueue_max_us": round(self._enqueue_ns_max / 1000, 3),
+            "batches": self._batches,
+            "batch_avg": round(self._written / self._batches, 1) if self._batches else 0.0,
+            "batch_max": self._batch_max,
+            "bytes": self._bytes,
+            "bytes_per_sec": round(self._bytes / elapsed, 1),
+            "fsyncs": self._fsyncs,
+            "segment": self.current_path.name,
+            "rolls": self._rolls,
+        }
+
+    # -------------------------------------------------
+    def close(self, timeout: Optional[float] = None):
+        """
+        停止 writer thread 並寫完剩下的事件
+        timeout 到期而 thread 還在寫 → 不在這裡並行補寫（會和 _commit_group 搶 _pending、打亂順序），
+        由 writer thread 寫完後自行收尾；之後再呼叫 close()（例如 atexit）會等它結束
+        """
+        if not self._closed:
+            self._closed = True
+            self._stop = True
+            self._wake.set()
+
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            print(f"[EventLogWriter] ⚠ close timeout, writer thread still draining (backlog={self.backlog()})")
+            return
+
+        self._finalize()
+        atexit.unregister(self.close)
+
+    def _finalize(self) -> None:
+        """最後一次寫出 + 關檔（只做一次；writer thread 結束時，或 close() 確認 thread 已結束後）"""
+        with self._io_lock:
+            if self._finalized:
+                return
+            self._finalized = True
+
+            # writer thread 已結束：queue 裡還有的（例如 close 之後才 write 的）在這裡補寫
+            while self._queue:
+                self._commit_group()
+            self._write_pending_locked()
+            if self._file is not None:
+                try:
+                    self._file.flush()
+                    if self.durability == DURABILITY_FSYNC:
+                        os.fsync(self._file.fileno())
+                        self._unsynced = False
+                except Exception as e:
+                    print("[EventLogWriter] ❌ flush error:", e)
+            self._close_file_locked()
+            self._ts_index.close()
+
         print("[EventLogWriter] 📕 closed")
@@ -0,0 +1,137 @@
+# shared_core/event_raw/segment_log.py
+"""
+SegmentLog — event_raw 的分段檔（一個邏輯 log = 多個編號 segment）
+
+    hot/logs.jsonl            ← 邏輯名稱（舊版單檔，若存在視為最舊的 segment）
+    hot/logs.000001.jsonl     ← sealed
+    hot/logs.000002.jsonl     ← sealed
+    hot/logs.000003.jsonl     ← active（編號最大，EventLogWriter 正在寫）
+
+- EventLogWriter 依大小 / 時間 roll 到下一個編號（開新檔，不搬資料）
+- LogRotator 只把 sealed segment rename 到 WARM（不複製 bytes）
+- Reader（EventLogReader / ReplayEngine）依編號順序串起來讀
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .ts_index import iter_range_lines
+
+SEQ_WIDTH = 6
+
+
+class SegmentLog:
+    def __init__(self, base: Path | str):
+        self.base = Path(base)
+        self.dir = self.base.parent
+        self.stem = self.base.stem            # logs
+        self.suffix = self.base.suffix or ".jsonl"
+        self._pattern = re.compile(
+            re.escape(self.stem) + r"\.(\d+)" + re.escape(self.suffix) + "$"
+        )
+
+    # -------------------------------------------------
+    # 命名
+    # -------------------------------------------------
+    def path_for(self, seq: int) -> Path:
+        return self.dir / f"{self.stem}.{seq:0{SEQ_WIDTH}d}{self.suffix}"
+
+    def seq_of(self, path: Path) -> Optional[int]:
+        """segment 編號；舊版單檔 = 0；不是這個 log 的檔案回傳 None"""
+        if path.name == self.base.name:
+            return 0
+        m = self._pattern.match(path.name)
+        return int(m.group(1)) if m else None
+
+    # -------------------------------------------------
+    # 列舉
+    # -------------------------------------------------
+    def _numbered(self) -> List[Tuple[int, Path]]:
+        if not self.dir.exists():
+            return []
+        out = []
+        for p in self.dir.glob(f"{self.stem}.*{self.suffix}"):
+            m = self._pattern.match(p.name)
+            if m:
+                out.append((int(m.group(1)), p))
+        out.sort()
+        return out
+
+    def segments(self) -> List[Path]:
+        """全部 segment（舊版單檔在最前面），依寫入順序"""
+        paths = [p for _, p in self._numbered()]
+        if self.base.exists():
+            paths.insert(0, self.base)
+        return paths
+
+    def last_seq(self) -> int:
+        numbered = self._numbered()
+        return numbered[-1][0] if numbered else 0
+
+    def active(self) -> Optional[Path]:
+        """編號最大的 segment（writer 正在寫的那個）"""
+        numbered = self._numbered()
+        return numbered[-1][1] if numbered else None
+
+    def sealed(self, active: Optional[Path] = None) -> List[Path]:
+        """
+        已封存（不再寫入）的 segment
+        active=None → 以編號最大者為 active
+        """
+        if active is None:
+            active = self.active()
+        return [p for p in self.segments() if p != active]
+
+    def exists(self) -> bool:
+        return bool(self.segments())
+
+    def size(self) -> int:
+        total = 0
+        for p in self.segments():
+            try:
+                total += p.stat().st_size
+            except FileNotFoundError:
+                continue    # 剛被 rotate 走
+        return total
+
+    # -------------------------------------------------
+    # 讀取
+    # -------------------------------------------------
+    def iter_lines(
+        self,
+        *,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+        until: Optional[Tuple[str, int]] = None,
+    ) -> Iterator[str]:
+        """
+        依序讀所有 segment 的行（讀到一半被 rotate 走的 segment 直接略過）
+        start_ts / end_ts：segment 有 .tsidx 時只讀相關 chunk（ts_index.py）；
+        base 是 COLD 壓縮檔（.jsonl.zst / .gz）時透明解壓，只讀相關 block
+        until=(segment 檔名, offset)：只讀這個位置之前的行（tail follower 的游標；之後的交給 follower）
+        """
+        stop_seq = self.seq_of(self.dir / until[0]) if until is not None else None
+        for p in self.segments():
+            stop = None
+            if until is not None:
+                if p.name == until[0]:
+                    stop = until[1]
+                elif stop_seq is not None and (self.seq_of(p) or 0) > stop_seq:
+                    return
+            try:
+                yield from iter_range_lines(p, start_ts=start_ts, end_ts=end_ts, stop=stop)
+            except FileNotFoundError:
+                continue
+            if stop is not None:
+                return
+
+
+def segment_paths(path: Path | str) -> List[Path]:
+    """
+    reader 用：path 若是分段 log 的邏輯名稱 → 全部 segment；否則 → [path]
+    """
+    path = Path(path)
+    segs = SegmentLog(path).segments()
+    return segs or [path]
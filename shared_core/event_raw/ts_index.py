@@ -0,0 +1,352 @@
+# shared_core/event_raw/ts_index.py
+"""
+TsIndex — event_raw segment 的稀疏時間索引（sidecar）
+
+    hot/logs.000003.jsonl
+    hot/logs.000003.jsonl.tsidx      ← 第一行 #ino <inode>，之後每行一個 chunk：start  end  count  min_ts  max_ts
+
+- EventLogWriter 每累積 index_every 筆或 index_interval_sec 秒，記一個 chunk
+  （chunk 邊界 = group commit 邊界，byte offset 精確）
+- min_ts / max_ts 是 chunk 內的實際範圍：不假設事件依時間寫入
+  （replay 進來的歷史事件可能亂序，仍然不會漏讀）
+- 最後一個 chunk 之後（還沒記進索引的尾巴）一律掃描
+- 讀取端：只 seek 到與時間窗重疊的 chunk → 成本與時間窗大小成正比，而不是檔案大小
+- 有效性：sidecar 記錄 segment 的 inode（換成另一個檔案 → 失效），
+  且最後一個 chunk 的結尾要落在檔案內、換行之後（被截斷 / 原地改寫 → 失效）
+
+時間一律是 epoch 秒（float）；記錄本身的逐筆過濾仍由呼叫端做
+
+沒有 writer 產生的 .tsidx（外部匯入的 .jsonl、Library 日檔…）：
+ensure_ts_index() 掃一次補建同格式的 sidecar（append-only 檔案之後一直有效；
+改寫檔案的一方要負責刪掉 sidecar，LibraryCompactor / LogRotator 都有處理）；
+PBEvent 紀錄的 timestamp 在固定前綴裡，補建時用 regex 取出，不逐行 json decode
+"""
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, iter_text_lines, record_ts, to_epoch
+
+TS_INDEX_SUFFIX = ".tsidx"
+
+# ensure_ts_index：小於這個大小的檔案不補建索引（整檔掃比較快）
+AUTO_INDEX_MIN_BYTES = 4 << 20
+
+# (start, end, count, min_ts, max_ts)
+Chunk = Tuple[int, int, int, Optional[float], Optional[float]]
+
+
+# EventLogWriter / codec.encode_event 寫出的 PBEvent 紀錄：timestamp 固定是第三個欄位
+# （json：'{"unit_id": "…", "unit_type": "event", "timestamp": "…"'；compact separators 也接受）
+_PREFIX_TS = re.compile(
+    rb'\{"unit_id": ?"[^"\\]*", ?"unit_type": ?"event", ?"timestamp": ?"([^"\\]+)"'
+)
+
+
+def ts_index_path(path: Path | str) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + TS_INDEX_SUFFIX)
+
+
+def _header(segment: Path) -> str:
+    """sidecar 第一行：segment 的 inode（檔案被換掉 → 索引失效）"""
+    return f"#ino\t{os.stat(segment).st_ino}\n"
+
+
+def _line_ts(line: bytes, loads) -> Optional[float]:
+    """一行紀錄的時間：PBEvent 固定前綴走 regex，其他格式才 decode"""
+    m = _PREFIX_TS.match(line)
+    if m is not None:
+        ts = to_epoch(m.group(1).decode("ascii", errors="replace"))
+        if ts is not None:
+            return ts
+    try:
+        return record_ts(loads(line))
+    except Exception:
+        return None
+
+
+# ------------------------------------------------------------------
+# Writer 端（由 EventLogWriter 在 writer thread 內呼叫，不加 lock）
+# ------------------------------------------------------------------
+class TsIndexWriter:
+    def __init__(self, segment: Path, every: int = 1000, interval_sec: float = 60.0):
+        self.segment = Path(segment)
+        self.path = ts_index_path(segment)
+        self.every = every
+        self.interval = interval_sec
+        self._f = None
+        self._reset(None)
+
+    def _reset(self, start: Optional[int]) -> None:
+        self._start = start
+        self._end = start
+        self._count = 0
+        self._min = None
+        self._max = None
+        self._opened = None
+
+    def add_group(self, start: int, end: int, count: int, min_ts, max_ts, now: float) -> None:
+        """一次 group commit 寫出的 byte 範圍 [start, end)"""
+        if self._start is None or start != self._end:
+            # 第一個 group，或中間有不經過 writer 的寫入 → 先收掉目前 chunk
+            self.close_chunk()
+            self._reset(start)
+        if not self._count:
+            self._opened = now
+
+        self._end = end
+        self._count += count
+        if min_ts is not None and (self._min is None or min_ts < self._min):
+            self._min = min_ts
+        if max_ts is not None and (self._max is None or max_ts > self._max):
+            self._max = max_ts
+
+        if (self.every and self._count >= self.every) or (
+            self.interval and now - self._opened >= self.interval
+        ):
+            self.close_chunk()
+
+    def close_chunk(self) -> None:
+        if self._start is None or not self._count:
+            return
+        if self._f is None:
+            self._f = open(self.path, "a", encoding="utf-8")
+            if not self._f.tell():
+                self._f.write(_header(self.segment))
+        self._f.write(
+            f"{self._start}\t{self._end}\t{self._count}\t{_fmt(self._min)}\t{_fmt(self._max)}\n"
+        )
+        self._f.flush()
+        self._reset(self._end)
+
+    def close(self) -> None:
+        self.close_chunk()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def discard(self) -> None:
+        """segment 被 truncate：索引一起作廢"""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        self._reset(None)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _fmt(v: Optional[float]) -> str:
+    return "-" if v is None else repr(v)
+
+
+def _parse(v: str) -> Optional[float]:
+    return None if v == "-" else float(v)
+
+
+# ------------------------------------------------------------------
+# Reader 端
+# ------------------------------------------------------------------
+def load_chunks(segment: Path | str) -> List[Chunk]:
+    """
+    讀 sidecar；以下情況 → []（呼叫端退回整檔掃描）
+    - 不存在、格式錯
+    - inode 不同（segment 被另一個檔案換掉）
+    - 最後一個 chunk 超出檔案大小，或結尾不在換行之後（被 truncate / 原地改寫過）
+    """
+    segment = Path(segment)
+    p = ts_index_path(segment)
+    try:
+        st = segment.stat()
+        size = st.st_size
+        chunks: List[Chunk] = []
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    key, _, value = line.rstrip("\n").partition("\t")
+                    if key == "#ino" and int(value) != st.st_ino:
+                        return []
+                    continue
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 5:
+                    break       # 寫到一半的最後一行
+                chunks.append(
+                    (int(parts[0]), int(parts[1]), int(parts[2]), _parse(parts[3]), _parse(parts[4]))
+                )
+    except (FileNotFoundError, ValueError):
+        return []
+    if chunks:
+        end = chunks[-1][1]
+        if end > size or not _ends_line(segment, end):
+            return []
+    return chunks
+
+
+def _ends_line(segment: Path, end: int) -> bool:
+    """byte offset end 是否在行首（前一個 byte 是換行）"""
+    if end <= 0:
+        return True
+    try:
+        with open(segment, "rb") as f:
+            f.seek(end - 1)
+            return f.read(1) == b"\n"
+    except OSError:
+        return False
+
+
+def _overlaps(chunk: Chunk, start_ts: Optional[float], end_ts: Optional[float]) -> bool:
+    _, _, _, lo, hi = chunk
+    if start_ts is not None and hi is not None and hi < start_ts:
+        return False
+    if end_ts is not None and lo is not None and lo > end_ts:
+        return False
+    return True
+
+
+def _add_range(ranges: List[List[int]], start: int, end: int) -> None:
+    if ranges and ranges[-1][1] == start:
+        ranges[-1][1] = end
+    else:
+        ranges.append([start, end])
+
+
+def plan_ranges(
+    chunks: List[Chunk],
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+) -> Tuple[List[List[int]], int]:
+    """
+    要讀的 byte 範圍：與時間窗重疊的 chunk + 索引沒涵蓋到的空隙（相鄰的合併）
+    回傳 (ranges, pos)：pos 之後是索引之後的尾巴，呼叫端一律掃描
+    chunk 重疊（補建的索引之後 writer 又接著記）→ 只取還沒涵蓋的部分（邊界都在行首）
+    """
+    ranges: List[List[int]] = []
+    pos = 0
+    for c in chunks:
+        if c[0] > pos:
+            _add_range(ranges, pos, c[0])
+        start = max(c[0], pos)
+        if c[1] > start and _overlaps(c, start_ts, end_ts):
+            _add_range(ranges, start, c[1])
+        pos = max(pos, c[1])
+    return ranges, pos
+
+
+def build_ts_index(path: Path | str, *, every: int = 1000, persist: bool = True) -> List[Chunk]:
+    """
+    掃一次檔案，每 every 行記一個 chunk（min / max = _line_ts：PBEvent 前綴 regex，其他 record_ts）
+    最後不完整的行不進索引（留給尾巴掃描）；persist=False 或寫不進去 → 只回傳不存檔
+    """
+    path = Path(path)
+    loads = get_codec().loads
+    chunks: List[Chunk] = []
+    start = pos = 0
+    count = 0
+    lo = hi = None
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            pos += len(line)
+            count += 1
+            if line.strip():
+                ts = _line_ts(line, loads)
+                if ts is not None:
+                    lo = ts if lo is None or ts < lo else lo
+                    hi = ts if hi is None or ts > hi else hi
+            if count >= every:
+                chunks.append((start, pos, count, lo, hi))
+                start, count, lo, hi = pos, 0, None, None
+    if count:
+        chunks.append((start, pos, count, lo, hi))
+
+    if persist:
+        target = ts_index_path(path)
+        tmp = target.with_name(target.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(_header(path))
+                for a, b, n, mn, mx in chunks:
+                    f.write(f"{a}\t{b}\t{n}\t{_fmt(mn)}\t{_fmt(mx)}\n")
+            os.replace(tmp, target)
+        except OSError as e:
+            print(f"[TsIndex] ⚠ cannot write {target}: {e}")
+    return chunks
+
+
+def ensure_ts_index(path: Path | str, *, min_bytes: int = AUTO_INDEX_MIN_BYTES) -> List[Chunk]:
+    """有效的 .tsidx → 直接用；沒有（或已失效）且檔案夠大 → 補建；壓縮檔 → []（有 block index）"""
+    path = Path(path)
+    if compression_of(path):
+        return []
+    chunks = load_chunks(path)
+    if chunks:
+        return chunks
+    try:
+        if path.stat().st_size < min_bytes:
+            return []
+    except FileNotFoundError:
+        return []
+    return build_ts_index(path)
+
+
+def iter_range_lines(
+    path: Path | str,
+    *,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+    auto_index: bool = False,
+    stop: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    讀一個 segment 中「可能」落在 [start_ts, end_ts] 的行
+    - 有 .tsidx：只讀重疊的 chunk + 索引之後的尾巴
+    - auto_index=True：沒有 .tsidx 的大檔先補建（ensure_ts_index）
+    - 壓縮檔：交給 block index（compressed_jsonl）
+    - 都沒有：整檔掃描
+    - stop：只讀 byte offset < stop 的行（行邊界，例如 tail follower 的游標；壓縮檔不適用）
+    """
+    path = Path(path)
+    if compression_of(path) or (stop is None and start_ts is None and end_ts is None):
+        yield from iter_text_lines(path, start_ts=start_ts, end_ts=end_ts)
+        return
+
+    ranged = start_ts is not None or end_ts is not None
+    chunks = (ensure_ts_index(path) if auto_index else load_chunks(path)) if ranged else []
+    if chunks:
+        ranges, pos = plan_ranges(chunks, start_ts, end_ts)
+    else:
+        ranges, pos = [], 0
+    if stop is not None:
+        ranges = [[a, min(b, stop)] for a, b in ranges if a < stop]
+    with open(path, "rb") as f:
+        for start, end in ranges:
+            # 逐行讀到 end（合併後的範圍可能很大，不整段讀進記憶體）
+            f.seek(start)
+            at = start
+            while at < end:
+                line = f.readline(end - at)
+                if not line:
+                    break
+                at += len(line)
+                yield line.decode("utf-8", errors="replace")
+
+        # 索引之後的尾巴（active segment 最新的部分）；沒有索引 → 整檔
+        f.seek(pos)
+        if stop is None:
+            for line in f:
+                yield line.decode("utf-8", errors="replace")
+            return
+        at = pos
+        while at < stop:
+            line = f.readline(stop - at)
+            if not line:
+                break
+            at += len(line)
+            yield line.decode("utf-8", errors="replace")
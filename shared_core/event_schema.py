@@ -1,20 +1,79 @@
 # shared_core/event_schema.py
 from __future__ import annotations
+import copy
+import itertools
+import os
 import uuid
 import re
+import time
 from datetime import datetime, timezone
-from typing import Optional 
+from typing import Optional
 from shared_core.foundation.data_unit import DataUnit
 
 
+# ------------------------------------------------------------------
+# 便宜的單調遞增 event_id（compact 模式專用）
+# - 每個 process 一個隨機前綴，避免多 process / 重啟撞號
+# - itertools.count 在 GIL 下為原子操作，不需要 lock
+# ------------------------------------------------------------------
+_EVENT_ID_PREFIX = f"{os.getpid():x}{uuid.uuid4().hex[:8]}"
+_event_seq = itertools.count(1)
+
+
+def _reseed_event_ids() -> None:
+    """fork 出來的 child（ProcessPoolExecutor worker）換新前綴，否則會和 parent / 兄弟 process 撞號"""
+    global _EVENT_ID_PREFIX, _event_seq
+    _EVENT_ID_PREFIX = f"{os.getpid():x}{uuid.uuid4().hex[:8]}"
+    _event_seq = itertools.count(1)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_event_ids)
+
+
+def next_event_id() -> str:
+    """產生 process 內單調遞增的 event_id（比 uuid4 便宜一個數量級）"""
+    return f"pb-{_EVENT_ID_PREFIX}-{next(_event_seq):012d}"
+
+
 class PBEvent(DataUnit):
     """
     PB-Lang Event (通用事件語言)
     Pandora OS / Trading Core / AISOP 通用事件格式
+
+    ⚡ Compact / Lazy 表示法：
+    - 欄位全在 PBEvent 自己的 __slots__（DataUnit 不帶 slots；DataUnit 欄位由 property 提供，
+      不跑 DataUnit.__init__ → __dict__ 不會被建立）
+    - event_id / timestamp(ISO) / meta 只有在被讀取時才建立
+    - 自動組的 meta 跟著 priority / tags / source 更新；自訂的 meta（meta setter）原樣保留
+    - 事件型別格式檢查結果依 type 快取（hot path 不再跑 regex）
+    - compact=True：event_id 改用單調遞增 id（不產生 uuid4）
+    - _validated：通過 PBEventValidator 後蓋上的 stamp（下游 bus 不再重驗）
     """
 
+    __slots__ = (
+        "type",
+        "payload",
+        "source",
+        "priority",
+        "tags",
+        "ts",
+        "_event_id",
+        "_timestamp",
+        "_meta",
+        "_meta_auto",
+        "_compact",
+        "_validated",
+    )
+
     TYPE_PATTERN = re.compile(r"^[a-zA-Z0-9_]+(\.[a-zA-Z0-9_]+)+$")
 
+    # 已驗證過的事件型別（上限避免被垃圾 type 灌爆）
+    _VALID_TYPES: set[str] = set()
+    _VALID_TYPES_MAX = 4096
+
+    unit_type = "event"
+
     def __init__(
         self,
         type: str,
@@ -25,54 +84,161 @@ class PBEvent(DataUnit):
         event_id: str = None,
         timestamp: str = None,
         ts: float | None = None,
+        *,
+        compact: bool = False,
     ):
 
-        # --- 事件名稱格式驗證 ---
-        self._validate_type(type)
+        # --- 事件名稱格式驗證（per-type 快取）---
+        if type not in PBEvent._VALID_TYPES:
+            self._validate_type(type)
 
-        self.event_id = event_id or str(uuid.uuid4())
         self.type = type
         self.payload = payload or {}
         self.source = source
 
-        # ⭐ PBEvent 與 DataUnit 統一 ID
-        unit_id = self.event_id
+        # ⭐ PBEvent 與 DataUnit 統一 ID（lazy：讀取時才產生）
+        self._event_id = event_id
+        self._compact = compact
 
-        # ⭐ PBEvent 的 meta 會與 DataUnit meta 合併
-        event_meta = {
-            "lang": "PB-Lang v2",
-            "priority": priority,
-            "tags": tags or [],
-            "source": source,
-        }
+        # ⭐ meta 延後到讀取時才組（見 meta property）
+        self._meta = None
+        self._meta_auto = True
 
-        # ⭐ 呼叫父類別 DataUnit.__init__()
-        super().__init__(
-            unit_type="event",
-            content=self.payload,
-            meta=event_meta,
-        )
-
-        # DataUnit 會自己產生 unit_id → 我們覆蓋掉它
-        self.unit_id = unit_id
+        # ⭐ 驗證來源（PBEventValidator.stamp；None = 尚未驗證）
+        self._validated = None
 
         # --- 時間處理 ---
         if ts is not None:
-            # 使用 UNIX timestamp
+            # 使用 UNIX timestamp → ISO 字串延後產生
             self.ts = float(ts)
-            self.timestamp = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+            self._timestamp = None
 
-        else:
+        elif timestamp:
             # 使用 ISO 時間字串
-            self.timestamp = timestamp or self._now()
+            self._timestamp = timestamp
             try:
-                self.ts = datetime.fromisoformat(self.timestamp).timestamp()
-            except:
+                self.ts = datetime.fromisoformat(timestamp).timestamp()
+            except Exception:
                 self.ts = time.time()
 
+        else:
+            # 都沒給 → 現在時間，ISO 字串延後產生
+            self.ts = time.time()
+            self._timestamp = None
+
         # 優先級 / 標籤
         self.priority = priority
         self.tags = tags or []
+
+    # ------------------------------
+    # Compact 建構入口（hot path 用）
+    # ------------------------------
+    @classmethod
+    def compact(
+        cls,
+        type: str,
+        payload: dict = None,
+        source: str = "unknown",
+        priority: int = 1,
+        ts: float | None = None,
+    ) -> "PBEvent":
+        return cls(type, payload, source, priority, ts=ts, compact=True)
+
+    # ------------------------------
+    # Lazy 欄位
+    # ------------------------------
+    @property
+    def event_id(self) -> str:
+        eid = self._event_id
+        if eid is None:
+            eid = next_event_id() if self._compact else str(uuid.uuid4())
+            self._event_id = eid
+        return eid
+
+    @event_id.setter
+    def event_id(self, value: str) -> None:
+        self._event_id = value
+
+    # DataUnit 相容：unit_id 永遠等於 event_id
+    unit_id = event_id
+
+    @property
+    def timestamp(self) -> str:
+        iso = self._timestamp
+        if iso is None:
+            iso = datetime.fromtimestamp(self.ts, tz=timezone.utc).isoformat()
+            self._timestamp = iso
+        return iso
+
+    @timestamp.setter
+    def timestamp(self, value: str) -> None:
+        self._timestamp = value
+
+    @property
+    def content(self) -> dict:
+        return self.payload
+
+    @property
+    def meta(self) -> dict:
+        m = self._meta
+        if m is None:
+            m = {
+                "lang": "PB-Lang v2",
+                "priority": self.priority,
+                "tags": self.tags,
+                "source": self.source,
+            }
+            self._meta = m
+        elif self._meta_auto and (
+            m.get("priority") is not self.priority
+            or m.get("tags") is not self.tags
+            or m.get("source") is not self.source
+        ):
+            # 建立 meta 之後 priority / tags / source 被改過 → 就地更新（保留呼叫端加的其他 key）
+            m["priority"] = self.priority
+            m["tags"] = self.tags
+            m["source"] = self.source
+        return m
+
+    @meta.setter
+    def meta(self, value: dict) -> None:
+        self._meta = value
+        self._meta_auto = False
+
+    # ------------------------------
+    # pickle / copy（只帶 PBEvent 自己的 slots；DataUnit 欄位由 property 提供）
+    # - 平行 replay decode 每筆事件都要從 worker pickle 回來 → 用 tuple + 建構函式，
+    #   比 __getstate__ / __setstate__（dict + 逐欄 setattr）還原快約 1.6 倍
+    # - pickle：還沒建立的 event_id 照樣帶 None（不為了序列化產生 id；要跨 process 共用 id 先讀 event_id）
+    # - copy / deepcopy：同一個 process 內的副本必須共用同一個 id → 先建立
+    # ------------------------------
+    def __reduce__(self):
+        return (
+            _restore_pbevent,
+            (
+                self.type,
+                self.payload,
+                self.source,
+                self.priority,
+                self.tags,
+                self.ts,
+                self._event_id,
+                self._timestamp,
+                self._meta,
+                self._compact,
+                self._validated,
+                self._meta_auto,
+            ),
+        )
+
+    def __copy__(self):
+        _ = self.event_id
+        return _restore_pbevent(*self.__reduce__()[1])
+
+    def __deepcopy__(self, memo):
+        _ = self.event_id
+        return _restore_pbevent(*copy.deepcopy(self.__reduce__()[1], memo))
+
     # ------------------------------
     # Utility：現在時間 ISO 字串
     # ------------------------------
@@ -83,21 +249,44 @@ class PBEvent(DataUnit):
     @classmethod
     def _validate_type(cls, t: str):
         """確保事件名稱格式正確，避免 wildcard routing 錯亂"""
-        if not cls.TYPE_PATTERN.match(t):
+        if not isinstance(t, str) or not cls.TYPE_PATTERN.match(t):
             raise ValueError(f"Invalid PBEvent type format: {t}")
+        if len(PBEvent._VALID_TYPES) < cls._VALID_TYPES_MAX:
+            PBEvent._VALID_TYPES.add(t)
 
     def to_dict(self):
-        base = super().to_dict()  # 來自 DataUnit，提供統一序列化
-        base.update({
-            "event_id": self.event_id,
+        # 與 DataUnit.to_dict() 欄位完全一致，只在 sink 需要時才組
+        return {
+            "unit_id": self.event_id,
+            "unit_type": "event",
             "timestamp": self.timestamp,
+            "content": self.payload,
+            "meta": self.meta,
+            "event_id": self.event_id,
             "type": self.type,
             "source": self.source,
             "payload": self.payload,
-            "meta": self.meta,
-        })
-        return base
+        }
 
     def __repr__(self):
         return f"<PBEvent {self.type} id={self.event_id}>"
 
+
+def _restore_pbevent(
+    type, payload, source, priority, tags, ts, event_id, timestamp, meta, compact, validated, meta_auto=True
+):
+    """PBEvent.__reduce__ 的還原端（不重跑 __init__ 的驗證 / 時間解析）"""
+    ev = PBEvent.__new__(PBEvent)
+    ev.type = type
+    ev.payload = payload
+    ev.source = source
+    ev.priority = priority
+    ev.tags = tags
+    ev.ts = ts
+    ev._event_id = event_id
+    ev._timestamp = timestamp
+    ev._meta = meta
+    ev._meta_auto = meta_auto
+    ev._compact = compact
+    ev._validated = validated
+    return ev
@@ -34,4 +34,3 @@ class DataUnit:
 
     def __repr__(self):
         return f"<DataUnit type={self.unit_type} id={self.unit_id}>"
-
@@ -1,10 +1,10 @@
 # shared_core/governance/audit/governance_audit_writer.py
 
-import json
 from pathlib import Path
 from datetime import datetime
 from typing import Any
 
+from shared_core.codec import get_codec
 from shared_core.governance.arbiter.schema import PersonaTrustSnapshot
 from shared_core.governance.chair.chair_supervisor import ChairDirective
 
@@ -18,13 +18,14 @@ class GovernanceAuditWriter:
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.codec = get_codec()
 
     def _write(self, name: str, payload: Any):
         ts = datetime.now().strftime("%Y%m%d")
         path = self.base_dir / f"{name}_{ts}.jsonl"
 
         with path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(payload, default=str) + "\n")
+            f.write(self.codec.dumps(payload, default=str) + "\n")
 
     def record_snapshot(self, snapshot: PersonaTrustSnapshot):
         self._write("trust_snapshot", snapshot.__dict__)
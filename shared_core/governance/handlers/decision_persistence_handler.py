@@ -1,4 +1,4 @@
-from library.library_writer import LibraryWriter
+from library.library_writer import get_library_writer
 from library.decision_writer import DecisionLibraryWriter
 from shared_core.event_schema import PBEvent
 
@@ -9,7 +9,8 @@ class DecisionPersistenceHandler:
     """
 
     def __init__(self, library_root):
-        library_writer = LibraryWriter(library_root)
+        # 與 PandoraRuntime 的 Library sink 共用同一個 writer（同一把 lock、同一組 handle）
+        library_writer = get_library_writer(library_root)
         self.decision_writer = DecisionLibraryWriter(library_writer)
 
     def handle(self, event):
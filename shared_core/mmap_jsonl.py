@@ -0,0 +1,199 @@
+# shared_core/mmap_jsonl.py
+"""
+MmapJsonlReader — 以 mmap 讀大型 JSONL（event_raw segment、market raw、learning …）
+
+- 串流：逐行 lazy decode，記憶體固定（不建 list、不 readlines）
+- 反向：從檔尾往回找換行 → tail(n) / latest() 只碰最後 N 行的 bytes
+- 切塊：split(k) 依換行對齊切成 k 段，decode_range() 可丟給 process pool 平行解析
+- 行邊界：line_bounds() → 每行起點的 array（隨機抽樣 / seek 用，不 decode）
+- 開啟當下的檔案大小就是快照：之後 append 的內容看不到（要追新資料用 follow / cursor）
+
+只處理未壓縮的 .jsonl；壓縮檔請用 shared_core.compressed_jsonl.iter_text_lines
+
+⚠ Windows：mmap 期間檔案不能被 rename（LogRotator 遇到會下一輪再搬），
+  請用 with 讀完就關
+"""
+from __future__ import annotations
+
+import mmap
+import os
+from array import array
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+
+from shared_core.codec import get_codec
+
+
+class MmapJsonlReader:
+    def __init__(self, path: Path | str, codec=None):
+        self.path = Path(path)
+        self.codec = codec or get_codec()
+        self._f = open(self.path, "rb")
+        self.size = os.fstat(self._f.fileno()).st_size
+        # 空檔不能 mmap
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    # -------------------------------------------------
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _decode(self, line: bytes) -> Any:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return self.codec.loads(line)
+        except Exception:
+            return None     # 壞行 / writer 寫到一半的最後一行
+
+    # -------------------------------------------------
+    # 順向
+    # -------------------------------------------------
+    def iter_lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """[start, end) 內的每一行（start 必須在行首；最後一行可能沒有換行）"""
+        mm = self._mm
+        if mm is None:
+            return
+        end = self.size if end is None else min(end, self.size)
+        pos = start
+        seek, readline = mm.seek, mm.readline
+        # 每行前 seek：同一個 reader 上多個 generator 交錯時也不會互相干擾
+        while pos < end:
+            seek(pos)
+            line = readline()
+            if not line:
+                return
+            pos += len(line)
+            yield line
+
+    def iter_records(self, start: int = 0, end: Optional[int] = None) -> Iterator[Any]:
+        loads = self.codec.loads
+        for line in self.iter_lines(start, end):
+            try:
+                yield loads(line)
+            except Exception:
+                continue    # 空行 / 壞行 / writer 寫到一半的最後一行
+
+    __iter__ = iter_records
+
+    # -------------------------------------------------
+    # 反向
+    # -------------------------------------------------
+    def iter_lines_reverse(self) -> Iterator[bytes]:
+        """從檔尾往回逐行（只掃描需要的 bytes）"""
+        mm = self._mm
+        if mm is None:
+            return
+        end = self.size
+        # 結尾換行不算一行
+        while end > 0 and mm[end - 1:end] in (b"\n", b"\r"):
+            end -= 1
+        rfind = mm.rfind
+        while end > 0:
+            nl = rfind(b"\n", 0, end)
+            yield mm[nl + 1:end]
+            end = nl
+            if end < 0:
+                return
+
+    def iter_records_reverse(self) -> Iterator[Any]:
+        decode = self._decode
+        for line in self.iter_lines_reverse():
+            rec = decode(line)
+            if rec is not None:
+                yield rec
+
+    def tail(self, n: int) -> List[Any]:
+        """最後 n 筆可解析的紀錄（舊 → 新）"""
+        out: List[Any] = []
+        if n <= 0:
+            return out
+        for rec in self.iter_records_reverse():
+            out.append(rec)
+            if len(out) >= n:
+                break
+        out.reverse()
+        return out
+
+    def latest(self) -> Any:
+        """最後一筆可解析的紀錄（沒有 → None）"""
+        for rec in self.iter_records_reverse():
+            return rec
+        return None
+
+    def line_bounds(self, start: int = 0, end: Optional[int] = None) -> array:
+        """
+        [start, end) 內每行的起點 + 最後一行的結尾（array('Q')，長度 = 行數 + 1）
+        第 i 行 = [b[i], b[i + 1])；只找換行、不 decode
+        """
+        out = array("Q")
+        mm = self._mm
+        if mm is None:
+            out.append(start)
+            return out
+        end = self.size if end is None else min(end, self.size)
+        pos = start
+        find, append = mm.find, out.append
+        while pos < end:
+            append(pos)
+            nl = find(b"\n", pos, end)
+            pos = end if nl < 0 else nl + 1
+        append(pos)
+        return out
+
+    # -------------------------------------------------
+    # 切塊（平行解析用）
+    # -------------------------------------------------
+    def split(self, k: int) -> List[Tuple[int, int]]:
+        """切成最多 k 段 [start, end)，邊界對齊到換行"""
+        mm = self._mm
+        if mm is None or k <= 0:
+            return []
+        bounds = [0]
+        for i in range(1, k):
+            target = self.size * i // k
+            if target <= bounds[-1]:
+                continue
+            nl = mm.find(b"\n", target)
+            if nl < 0:
+                break
+            if nl + 1 > bounds[-1] and nl + 1 < self.size:
+                bounds.append(nl + 1)
+        bounds.append(self.size)
+        return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+
+# ------------------------------------------------------------------
+# 便利函式
+# ------------------------------------------------------------------
+def decode_range(path: str, start: int, end: int) -> List[Any]:
+    """
+    解析 [start, end) 內的紀錄（top-level，可 pickle → ProcessPoolExecutor.map 用）
+    """
+    with MmapJsonlReader(path) as r:
+        return list(r.iter_records(start, end))
+
+
+def read_latest(path: Path | str) -> Any:
+    with MmapJsonlReader(path) as r:
+        return r.latest()
+
+
+def read_tail(path: Path | str, n: int) -> List[Any]:
+    with MmapJsonlReader(path) as r:
+        return r.tail(n)
+
+
+def iter_records(path: Path | str, codec=None) -> Iterator[Any]:
+    """lazy 逐筆讀取；generator 結束（或被關閉）時釋放 mmap"""
+    with MmapJsonlReader(path, codec) as r:
+        yield from r.iter_records()
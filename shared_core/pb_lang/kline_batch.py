@@ -0,0 +1,289 @@
+# shared_core/pb_lang/kline_batch.py
+"""
+KlineBatch — market.kline.batch 的欄式（columnar）payload
+
+bootstrap / replay / backfill 一次搬上千根 K 線時，
+不再「每根一個 PBEvent + 一個 payload dict」，而是一個事件帶整批 NumPy 欄位：
+
+    payload = {
+        "symbol":   "BTC/USDT",
+        "interval": "15m",
+        "count":    N,
+        "batch":    KlineBatch(open_time / open / high / low / close / volume),
+    }
+
+- 批次 consumer（指標、Library、CSV）直接吃欄位 → 向量化運算，沒有逐筆物件
+- 只有需要逐根 K 線的 handler 才展開：bus.subscribe(KLINE_BATCH, per_bar(on_kline))
+  展開結果快取在 batch 上，多個逐筆 handler 共用同一份
+- open_time / close_time 單位：秒（同 backfill 的 v1.7 標準 schema）
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from shared_core.event_schema import PBEvent
+from shared_core.event.parallel_dispatch import ORDERED, batch_handler
+
+KLINE_BATCH = "market.kline.batch"
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+COLUMNS = ("open_time",) + PRICE_COLUMNS + ("volume",)
+
+
+class KlineBatch:
+    """
+    同一 (symbol, interval) 的一段 K 線（欄式）
+    """
+
+    __slots__ = (
+        "symbol",
+        "interval",
+        "open_time",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "close_time",
+        "_events",
+    )
+
+    def __init__(
+        self,
+        symbol: str,
+        interval: str,
+        *,
+        open_time,
+        open,
+        high,
+        low,
+        close,
+        volume,
+        close_time=None,
+    ) -> None:
+        self.symbol = symbol
+        self.interval = interval
+        self.open_time = np.asarray(open_time, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+        self.close_time = (
+            None if close_time is None else np.asarray(close_time, dtype=np.int64)
+        )
+        self._events: Optional[List[PBEvent]] = None
+
+        n = len(self.open_time)
+        for name in COLUMNS[1:]:
+            if len(getattr(self, name)) != n:
+                raise ValueError(f"{KLINE_BATCH}.{name} 長度不一致（{len(getattr(self, name))} != {n}）")
+        if self.close_time is not None and len(self.close_time) != n:
+            raise ValueError(f"{KLINE_BATCH}.close_time 長度不一致")
+
+    # ------------------------------
+    # 建構
+    # ------------------------------
+    @classmethod
+    def from_records(
+        cls,
+        records: List[Dict[str, Any]],
+        *,
+        symbol: str,
+        interval: str,
+    ) -> "KlineBatch":
+        """[{open_time, close_time?, open, high, low, close, volume}] → 欄式"""
+        n = len(records)
+        cols = {
+            name: np.fromiter((r[name] for r in records), dtype=np.float64, count=n)
+            for name in COLUMNS
+        }
+        close_time = None
+        if n and "close_time" in records[0]:
+            close_time = np.fromiter((r["close_time"] for r in records), dtype=np.int64, count=n)
+        return cls(symbol, interval, close_time=close_time, **cols)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df,
+        *,
+        symbol: str,
+        interval: str,
+        time_col: str = "open_time",
+    ) -> "KlineBatch":
+        """DataFrame（open/high/low/close/volume + time_col）→ 欄式，直接拿底層陣列"""
+        return cls(
+            symbol,
+            interval,
+            open_time=df[time_col].to_numpy(),
+            open=df["open"].to_numpy(),
+            high=df["high"].to_numpy(),
+            low=df["low"].to_numpy(),
+            close=df["close"].to_numpy(),
+            volume=df["volume"].to_numpy(),
+            close_time=df["close_time"].to_numpy() if "close_time" in df.columns else None,
+        )
+
+    @classmethod
+    def concat(cls, batches: Iterable["KlineBatch"]) -> "KlineBatch":
+        batches = list(batches)
+        if not batches:
+            raise ValueError("KlineBatch.concat 需要至少一個 batch")
+        first = batches[0]
+        for b in batches[1:]:
+            if b.symbol != first.symbol or b.interval != first.interval:
+                raise ValueError(
+                    f"KlineBatch.concat 只能合併同一 (symbol, interval)："
+                    f"{first.symbol}/{first.interval} != {b.symbol}/{b.interval}"
+                )
+        close_time = None
+        if all(b.close_time is not None for b in batches):
+            close_time = np.concatenate([b.close_time for b in batches])
+        return cls(
+            first.symbol,
+            first.interval,
+            close_time=close_time,
+            **{name: np.concatenate([getattr(b, name) for b in batches]) for name in COLUMNS},
+        )
+
+    # ------------------------------
+    # 切片 / 轉換
+    # ------------------------------
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def tail(self, n: int) -> "KlineBatch":
+        """最後 n 根（NumPy view，不複製）；n <= 0 → 空 batch"""
+        if n >= len(self):
+            return self
+        start = len(self) - max(n, 0)      # 不用 [-n:]：n = 0 時會變成整段
+        return KlineBatch(
+            self.symbol,
+            self.interval,
+            close_time=None if self.close_time is None else self.close_time[start:],
+            **{name: getattr(self, name)[start:] for name in COLUMNS},
+        )
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        cols = {name: getattr(self, name) for name in COLUMNS}
+        if self.close_time is not None:
+            cols["close_time"] = self.close_time
+        return cols
+
+    def to_frame(self):
+        """給 build_indicator_bundle 用的 DataFrame（欄位直接包 NumPy 陣列）"""
+        import pandas as pd
+        return pd.DataFrame(self.columns(), copy=False)
+
+    def to_lists(self) -> Dict[str, Any]:
+        """JSON 友善的欄式表示（Library 落盤用；一個 batch 一筆紀錄）"""
+        out: Dict[str, Any] = {"symbol": self.symbol, "interval": self.interval}
+        for name, arr in self.columns().items():
+            out[name] = arr.tolist()
+        return out
+
+    # ------------------------------
+    # 檢查（向量化）
+    # ------------------------------
+    def check(self) -> None:
+        """market.kline 的 sanity check，整批一次做完"""
+        for name in PRICE_COLUMNS:
+            arr = getattr(self, name)
+            bad = np.flatnonzero(~(arr >= 0))     # 同時擋負數與 NaN
+            if bad.size:
+                raise ValueError(
+                    f"{KLINE_BATCH}.{name} 不能是負數（第 {int(bad[0])} 根，收到 {arr[bad[0]]}）"
+                )
+
+        bad = np.flatnonzero(self.high < self.low)
+        if bad.size:
+            i = int(bad[0])
+            raise ValueError(
+                f"{KLINE_BATCH}.high < low（第 {i} 根，high={self.high[i]}, low={self.low[i]}）數據不合理"
+            )
+
+        bad = np.flatnonzero(~(self.volume >= 0))
+        if bad.size:
+            raise ValueError(
+                f"{KLINE_BATCH}.volume 不能是負數（第 {int(bad[0])} 根，收到 {self.volume[bad[0]]}）"
+            )
+
+    # ------------------------------
+    # 事件化
+    # ------------------------------
+    def to_event(self, source: str = "market", priority: int = 1) -> PBEvent:
+        ts = float(self.open_time[-1]) if len(self) else None
+        return PBEvent(
+            type=KLINE_BATCH,
+            payload={
+                "symbol": self.symbol,
+                "interval": self.interval,
+                "count": len(self),
+                "batch": self,
+            },
+            source=source,
+            priority=priority,
+            ts=ts,
+            compact=True,
+        )
+
+    def to_events(self, source: str = "market") -> List[PBEvent]:
+        """
+        逐根展開成 market.kline（只給 per_bar handler 用）
+        第一次呼叫時建立，之後共用
+        """
+        events = self._events
+        if events is None:
+            symbol = self.symbol
+            interval = self.interval
+            cols = [getattr(self, name).tolist() for name in COLUMNS]
+            close_times = self.close_time.tolist() if self.close_time is not None else None
+            events = []
+            for i, (ot, o, h, l, c, v) in enumerate(zip(*cols)):
+                payload = {
+                    "symbol": symbol,
+                    "open": o,
+                    "high": h,
+                    "low": l,
+                    "close": c,
+                    "volume": v,
+                    "interval": interval,
+                    "open_time": ot,
+                }
+                if close_times is not None:
+                    payload["close_time"] = close_times[i]
+                events.append(PBEvent.compact("market.kline", payload, source, ts=ot))
+            self._events = events
+        return events
+
+
+# ------------------------------------------------------------------
+# 逐筆 handler 轉接
+# ------------------------------------------------------------------
+def per_bar(handler: Callable[[Any], None]):
+    """
+    將逐根 market.kline handler 接到 market.kline.batch：
+
+        bus.subscribe(KLINE_BATCH, per_bar(runner.on_kline))
+
+    - ZeroCopyEventBus：收到 PBEvent → handler 拿到逐根 PBEvent
+    - EventBus：收到 payload dict → handler 拿到逐根 payload
+    只有這樣訂閱的 handler 才會觸發展開；批次 consumer 不受影響。
+    """
+
+    @batch_handler
+    def _fan_out(items):
+        for item in items:
+            is_event = isinstance(item, PBEvent)
+            payload = item.payload if is_event else item
+            batch = payload["batch"]
+            source = item.source if is_event else "market"
+            for ev in batch.to_events(source):
+                handler(ev if is_event else ev.payload)
+
+    _fan_out.__name__ = f"per_bar({getattr(handler, '__name__', repr(handler))})"
+    _fan_out.dispatch_mode = getattr(handler, "dispatch_mode", ORDERED)
+    return _fan_out
@@ -1,24 +1,206 @@
 # shared_core/pb_lang/pb_event_validator.py
 
-from typing import Any, Dict, Callable, Optional
+import itertools
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from shared_core.event_schema import PBEvent
 
 
 Number = (int, float)
 
+# 每個 validator 實例一個 stamp（int，pickle 安全）
+# 起始值帶隨機高位 → 不同 process 的 validator 不會撞號
+_stamp_seq = itertools.count(int.from_bytes(os.urandom(4), "big") << 32)
+
+
+class PBPayloadSchema:
+    """
+    PB-Lang 事件 payload schema（每個事件型別註冊一次）
+
+    - required : 必填欄位
+    - types    : 欄位 → 型別（必填欄位一定檢查；選填欄位有出現才檢查）
+    - checks   : 額外 sanity check（payload → None，不合法 raise ValueError）
+
+    compile() 產生一個只吃 payload 的檢查函式：
+    先用一次 set 比對確認必填欄位，再跑預先攤平的型別表。
+    """
+
+    _TYPE_NAMES = {
+        str: "字串",
+        dict: "dict",
+        list: "list",
+        Number: "數值",
+    }
+
+    def __init__(
+        self,
+        event_type: str,
+        required: Iterable[str] = (),
+        types: Optional[Dict[str, Any]] = None,
+        checks: Iterable[Callable[[dict], None]] = (),
+    ) -> None:
+        self.event_type = event_type
+        self.required = tuple(required)
+        self.types = dict(types or {})
+        self.checks = tuple(checks)
+
+    def _type_error(self, key: str, expected: Any) -> str:
+        name = self._TYPE_NAMES.get(expected, getattr(expected, "__name__", str(expected)))
+        return f"{self.event_type}.{key} 必須是{name}"
+
+    def compile(self) -> Callable[[dict], None]:
+        name = self.event_type
+        required = self.required
+        required_set = frozenset(required)
+        required_types: Tuple = tuple(
+            (k, t, self._type_error(k, t)) for k, t in self.types.items() if k in required_set
+        )
+        optional_types: Tuple = tuple(
+            (k, t, self._type_error(k, t)) for k, t in self.types.items() if k not in required_set
+        )
+        checks = self.checks
+
+        def _check(payload: dict) -> None:
+            if not required_set <= payload.keys():
+                for key in required:
+                    if key not in payload:
+                        raise ValueError(f"{name} 缺少欄位：{key}")
+
+            for key, expected, msg in required_types:
+                if not isinstance(payload[key], expected):
+                    raise ValueError(msg)
+
+            for key, expected, msg in optional_types:
+                if key in payload and not isinstance(payload[key], expected):
+                    raise ValueError(msg)
+
+            for check in checks:
+                check(payload)
+
+        return _check
+
+
+# ------------------------------
+# 各事件型別的細部檢查
+# ------------------------------
+def _market_kline_sanity(p: dict) -> None:
+    """market.kline v2：數值 sanity check"""
+    o = p["open"]
+    h = p["high"]
+    l = p["low"]
+    c = p["close"]
+    v = p["volume"]
+
+    # 3-1 所有價格必須 >= 0
+    if o < 0 or h < 0 or l < 0 or c < 0:
+        for key, val in (("open", o), ("high", h), ("low", l), ("close", c)):
+            if val < 0:
+                raise ValueError(f"market.kline.{key} 不能是負數（收到 {val}）")
+
+    # 3-2 high >= low
+    if h < l:
+        raise ValueError(f"market.kline.high < low（high={h}, low={l}）數據不合理")
+
+    # 3-3 volume >= 0
+    if v < 0:
+        raise ValueError(f"market.kline.volume 不能是負數（收到 {v}）")
+
+
+def _kline_batch_sanity(p: dict) -> None:
+    """market.kline.batch：欄位長度 / symbol 一致 + 向量化 sanity check（KlineBatch.check）"""
+    batch = p["batch"]
+    if len(batch) != p["count"]:
+        raise ValueError(f"market.kline.batch.count 與欄位長度不一致（{p['count']} != {len(batch)}）")
+    if batch.symbol != p["symbol"] or batch.interval != p["interval"]:
+        raise ValueError("market.kline.batch 的 symbol / interval 與欄位資料不一致")
+    batch.check()
+
+
+def _text_input_non_empty(p: dict) -> None:
+    if not p["text"].strip():
+        raise ValueError("text.input.text 必須是非空字串")
+
+
+DEFAULT_SCHEMAS: Tuple[PBPayloadSchema, ...] = (
+    PBPayloadSchema(
+        "market.kline",
+        required=("symbol", "open", "high", "low", "close", "volume", "interval"),
+        types={
+            "symbol": str,
+            "open": Number,
+            "high": Number,
+            "low": Number,
+            "close": Number,
+            "volume": Number,
+            "interval": str,
+            # optional / extra 欄位（保持 v1）
+            "extra": dict,
+            "meta": dict,
+        },
+        checks=(_market_kline_sanity,),
+    ),
+    # ⭐ 欄式 K 線批次（KlineBatch）
+    PBPayloadSchema(
+        "market.kline.batch",
+        required=("symbol", "interval", "count", "batch"),
+        types={
+            "symbol": str,
+            "interval": str,
+            "count": int,
+            "meta": dict,
+        },
+        checks=(_kline_batch_sanity,),
+    ),
+    # ⭐ 文字事件型別
+    PBPayloadSchema(
+        "text.input",
+        required=("text",),
+        types={"text": str},
+        checks=(_text_input_non_empty,),
+    ),
+    # === Persona / Governance Signals ===
+    PBPayloadSchema(
+        "persona.signal.trade",
+        required=("source", "target_persona", "signal"),
+        types={"signal": dict},
+    ),
+    # === Governance Decisions ===
+    PBPayloadSchema(
+        "system.governance.decision.created",
+        required=("agenda_id", "proposal_id", "result"),
+    ),
+)
+
+# 預設 schema 在 import 時編譯一次，所有 validator 實例共用
+_DEFAULT_COMPILED: Dict[str, Callable[[dict], None]] = {
+    s.event_type: s.compile() for s in DEFAULT_SCHEMAS
+}
+
+
+def _event_check(payload_check: Callable[[dict], None]) -> Callable[[PBEvent], None]:
+    def _check(event: PBEvent) -> None:
+        payload_check(event.payload)
+    _check.payload_check = payload_check
+    return _check
+
 
 class PBEventValidator:
     """
     PB-Lang v2 事件驗證器：
     - 檢查 PBEvent
     - 支援 soft-drop（批次模式不丟例外）
+    - per-type schema 只編譯一次（register_schema）
+    - 驗證通過的事件會蓋上此 validator 的 stamp，
+      之後再經過同一個 validator（例如 EventBus.publish）直接放行
     """
 
     def __init__(self, strict: bool = True, soft: bool = False) -> None:
         self.strict = strict
         self.soft = soft
+        self.stamp = next(_stamp_seq)
         self.type_validators: Dict[str, Callable[[PBEvent], None]] = {}
-        self._register_default_validators() 
+        self._payload_checks: Dict[str, Callable[[dict], None]] = {}
+        self._register_default_validators()
 
 
     # ------------------------------
@@ -31,11 +213,15 @@ class PBEventValidator:
         soft=False：維持原本行為 → 錯誤直接 raise
         """
 
+        # ⚡ 已被本 validator 驗證過（trusted internal path）
+        if getattr(event, "_validated", None) == self.stamp:
+            return event
+
         try:
             # 1) 型別檢查
             if not isinstance(event, PBEvent):
                 raise TypeError(f"PBEventValidator 只接受 PBEvent，收到 {type(event)}")
-    
+
             # 2) 基本欄位檢查
             if not isinstance(event.type, str) or not event.type.strip():
                 raise ValueError("PBEvent.type 必須是非空字串")
@@ -60,6 +246,7 @@ class PBEventValidator:
                 # 嚴格模式 → 未註冊的型別拒收
                 raise ValueError(f"未註冊的事件型別：{event.type}")
 
+            event._validated = self.stamp
             return event  # 🔥 最終通過
 
         except Exception as e:
@@ -69,125 +256,69 @@ class PBEventValidator:
             else:
                 # ⭐ 嚴格模式：正常噴錯
                 raise
-    
-    # ------------------------------
-    # 內部：註冊預設事件驗證器
-    # ------------------------------
-    def _register_default_validators(self) -> None:
-        self.type_validators["market.kline"] = self._validate_market_kline
-
-        # ⭐ 新增：文字事件型別驗證器
-        self.type_validators["text.input"] = self._validate_text_input
-        # === Persona / Governance Signals ===
-        self.type_validators["persona.signal.trade"] = self._validate_persona_signal_trade
-
-        # === Governance Decisions（🔥缺的就是這個🔥）===
-        self.type_validators["system.governance.decision.created"] = (
-            self._validate_governance_decision_created
-        )
-
-    def _validate_governance_decision_created(self, event: PBEvent) -> None:
-        p = event.payload
 
-        if "agenda_id" not in p:
-            raise ValueError("system.governance.decision.created 缺少 agenda_id")
-
-        if "proposal_id" not in p:
-            raise ValueError("system.governance.decision.created 缺少 proposal_id")
-
-        if "result" not in p:
-            raise ValueError("system.governance.decision.created 缺少 result")
-
-    # ------------------------------
-    # 各事件型別的細部檢查
-    # ------------------------------
-    def _validate_market_kline(self, event: PBEvent) -> None:
+    def validate_many(self, events: Iterable[PBEvent], soft: bool = True) -> List[PBEvent]:
         """
-        market.kline 事件驗證器（v2 強化版）
-        - 欄位檢查
-        - 型別檢查
-        - 數值 sanity check（新版）
+        批次驗證：回傳通過的事件（soft=True 時不合法的直接丟棄）
         """
-        p = event.payload
-
-        # ---------------------------
-        # ① 欄位是否存在
-        # ---------------------------
-        required_keys = ["symbol", "open", "high", "low", "close", "volume", "interval"]
-        for key in required_keys:
-            if key not in p:
-                raise ValueError(f"market.kline 缺少欄位：{key}")
-
-        # ---------------------------
-        # ② 基本型別檢查
-        # ---------------------------
-        if not isinstance(p["symbol"], str):
-            raise ValueError("market.kline.symbol 必須是字串")
-
-        numeric_keys = ["open", "high", "low", "close", "volume"]
-        for key in numeric_keys:
-            if not isinstance(p[key], (int, float)):
-                raise ValueError(f"market.kline.{key} 必須是數值")
-
-        if not isinstance(p["interval"], str):
-            raise ValueError("market.kline.interval 必須是字串")
-
-        # ---------------------------
-        # ③ v2: 數值 sanity check（新增）
-        # ---------------------------
-
-        o = p["open"]
-        h = p["high"]
-        l = p["low"]
-        c = p["close"]
-        v = p["volume"]
-
-        # 3-1 所有價格必須 >= 0
-        for key, val in [("open", o), ("high", h), ("low", l), ("close", c)]:
-            if val < 0:
-                raise ValueError(f"market.kline.{key} 不能是負數（收到 {val}）")
-
-        # 3-2 high >= low
-        if h < l:
-            raise ValueError(f"market.kline.high < low（high={h}, low={l}）數據不合理")
-
-        # 3-3 volume >= 0
-        if v < 0:
-            raise ValueError(f"market.kline.volume 不能是負數（收到 {v}）")
-
-        # ---------------------------
-        # optional / extra 欄位（保持 v1）
-        # ---------------------------
-        if "extra" in p and not isinstance(p["extra"], dict):
-            raise ValueError("market.kline.extra 必須是 dict")
-
-        if "meta" in p and not isinstance(p["meta"], dict):
-            raise ValueError("market.kline.meta 必須是 dict")
-    def _validate_text_input(self, event: PBEvent) -> None:
+        validate = self.validate
+        out = []
+        for event in events:
+            ev = validate(event, soft=soft)
+            if ev is not None:
+                out.append(ev)
+        return out
+
+    def validate_payloads(
+        self,
+        event_type: str,
+        payloads: Iterable[dict],
+        soft: bool = True,
+    ) -> List[dict]:
         """
-        text.input 事件驗證器
-        - payload 必須是 dict
-        - text 必須是非空字串
+        同型別 payload 陣列的批次驗證（不需要先建 PBEvent）
+        - 只查一次 schema
+        - soft=True：不合法的 payload 直接略過；soft=False：第一筆錯誤就 raise
         """
-        p = event.payload
-
-        if not isinstance(p, dict):
-            raise ValueError("text.input.payload 必須是 dict")
-
-        if "text" not in p:
-            raise ValueError("text.input 缺少欄位：text")
-
-        if not isinstance(p["text"], str) or not p["text"].strip():
-            raise ValueError("text.input.text 必須是非空字串")
-        
-    def _validate_persona_signal_trade(self, event: PBEvent) -> None:
-        p = event.payload
+        check = self._payload_checks.get(event_type)
+        if check is None:
+            legacy = self.type_validators.get(event_type)
+            if legacy is not None:
+                check = lambda p: legacy(PBEvent(event_type, p))
+            elif self.strict:
+                if soft:
+                    return []
+                raise ValueError(f"未註冊的事件型別：{event_type}")
+            else:
+                return [p for p in payloads if isinstance(p, dict)]
+
+        out = []
+        for p in payloads:
+            try:
+                if not isinstance(p, dict):
+                    raise ValueError(f"{event_type}.payload 必須是 dict")
+                check(p)
+            except Exception:
+                if soft:
+                    continue
+                raise
+            out.append(p)
+        return out
 
-        if "source" not in p:
-            raise ValueError("persona.signal.trade 缺少欄位：source")
+    # ------------------------------
+    # Schema 註冊
+    # ------------------------------
+    def register_schema(self, schema: PBPayloadSchema) -> None:
+        """註冊（或覆蓋）某事件型別的 payload schema，註冊時即編譯"""
+        self._install(schema.event_type, schema.compile())
 
-        if "target_persona" not in p:
-            raise ValueError("persona.signal.trade 缺少欄位：target_persona")
+    def _install(self, event_type: str, payload_check: Callable[[dict], None]) -> None:
+        self._payload_checks[event_type] = payload_check
+        self.type_validators[event_type] = _event_check(payload_check)
 
-        if "signal" not in p or not isinstance(p["signal"], dict):
-            raise ValueError("persona.signal.trade.signal 必須是 dict")
\ No newline at end of file
+    # ------------------------------
+    # 內部：註冊預設事件驗證器
+    # ------------------------------
+    def _register_default_validators(self) -> None:
+        for event_type, payload_check in _DEFAULT_COMPILED.items():
+            self._install(event_type, payload_check)
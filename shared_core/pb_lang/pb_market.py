@@ -15,6 +15,7 @@ class PBmarket:
 
     命名範圍統一使用：
       - market.kline
+      - market.kline.batch（欄式批次，見 kline_batch.py）
       - market.trade
       - market.risk_alert
       - market.indicator.update
@@ -71,8 +72,42 @@ class PBmarket:
             payload=payload,
             source=source,
             ts=ts,
+            compact=True,
         )
 
+    @staticmethod
+    def kline_batch(
+        symbol: str,
+        interval: str,
+        open_time,
+        open,
+        high,
+        low,
+        close,
+        volume,
+        close_time=None,
+        source: str = DEFAULT_SOURCE,
+    ) -> PBEvent:
+        """
+        欄式 K 線批次事件：market.kline.batch
+        各欄位為等長陣列（list / NumPy array），時間單位：秒
+        bootstrap / replay / backfill 用，一個事件取代 N 個 market.kline
+        """
+        from shared_core.pb_lang.kline_batch import KlineBatch
+
+        batch = KlineBatch(
+            symbol,
+            interval,
+            open_time=open_time,
+            open=open,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume,
+            close_time=close_time,
+        )
+        return batch.to_event(source=source)
+
     @staticmethod
     def trade(
         symbol: str,
@@ -19,3 +19,27 @@ class PerceptionCore:
 
         event = adapter.make_event(raw)
         return event
+
+    def run_pipeline_many(self, adapter, raws, soft=False):
+        """
+        批次版 run_pipeline：stage 只解析一次（不再每筆 hasattr ×4）
+        被任一 stage 丟棄的資料、make_event 回 None 的都不會產出（同 run_pipeline 回 None）
+        → 呼叫端不用再濾 None
+        soft：同 run_pipeline，core 不使用（soft / strict 只影響 gateway 之後的 validator）
+        """
+        stages = [
+            getattr(adapter, name)
+            for name in ("filter", "auto_fix", "anti_poison", "enrich")
+            if hasattr(adapter, name)
+        ]
+        make_event = adapter.make_event
+
+        for raw in raws:
+            for stage in stages:
+                raw = stage(raw)
+                if raw is None:
+                    break
+            else:
+                event = make_event(raw)
+                if event is not None:
+                    yield event
@@ -100,10 +100,27 @@ class PerceptionGateway:
         soft: bool = True,
     ) -> Iterator[PBEvent]:
 
-        for raw in raws:
-            ev = self.process(key, raw, soft=soft)
-            if ev is not None:
-                yield ev
+        adapter = self.get_adapter(key)
+
+        # Core 不支援批次 → 退回逐筆
+        run_many = getattr(self.core, "run_pipeline_many", None)
+        if run_many is None:
+            for raw in raws:
+                ev = self.process(key, raw, soft=soft)
+                if ev is not None:
+                    yield ev
+            return
+
+        # library.event 是歷史事件，不做 domain-level 驗證（同 process）
+        validate = None if key == "library.event" else self.validator.validate
+
+        # run_pipeline_many 不會產出 None（見 PerceptionCore.run_pipeline_many）
+        for event in run_many(adapter, raws, soft=soft):
+            if validate is not None:
+                event = validate(event, soft=soft)
+                if event is None:
+                    continue
+            yield event
 
     # ------------------------------------------------------------------
     # Publish 工具
@@ -124,4 +141,43 @@ class PerceptionGateway:
 
         bus.publish(event)
         print(f"[EVENT-PUBLISH] type={event.type}")
-        return True
\ No newline at end of file
+        return True
+
+    def process_many_and_publish(
+        self,
+        key: str,
+        raws: Iterable[Dict[str, Any]],
+        bus: Any,
+        *,
+        soft: bool = True,
+        batch_size: int = 1000,
+    ) -> int:
+        """
+        批次版 process_and_publish：
+        - 每 batch_size 筆呼叫一次 bus.publish_many（bus 不支援時退回逐筆 publish）
+        - 整批只印一次 log
+        回傳：成功 publish 的事件數
+        """
+        publish_many = getattr(bus, "publish_many", None)
+        count = 0
+        batch: list[PBEvent] = []
+
+        def _flush() -> int:
+            if publish_many is not None:
+                publish_many(batch)
+            else:
+                for ev in batch:
+                    bus.publish(ev)
+            return len(batch)
+
+        for event in self.process_many(key, raws, soft=soft):
+            batch.append(event)
+            if len(batch) >= batch_size:
+                count += _flush()
+                batch = []
+
+        if batch:
+            count += _flush()
+
+        print(f"[EVENT-PUBLISH] type={key} batch={count}")
+        return count
@@ -0,0 +1,218 @@
+# shared_core/replay/parallel_decode.py
+"""
+Replay 平行 decode pipeline（reader thread → decode process pool → 依序輸出）
+
+    for items, errors in iter_decoded([path], workers=4):
+        for item in items:          # PBEvent（有 "type"）或原始 dict（要走 PerceptionGateway）
+            ...
+
+- reader thread：把檔案切成 chunk 丟進 pool
+    * 未壓縮 .jsonl（含 event_raw 分段 log 的每個 segment）→ 只送 (path, start, end)，worker 自己讀
+      有時間窗 → 只切 .tsidx 裡與時間窗重疊的範圍 + 索引之後的尾巴
+    * .jsonl.zst / .jsonl.gz → reader thread 解壓，湊滿 chunk_bytes 的行一起送
+- worker：decode + record_to_pbevent（CPU 重的部分；top-level → 可 pickle）
+  有 type_filter / 時間窗時直接在 worker 丟掉不要的事件（少 pickle 回來）
+- 排序：future 依送出順序排在 queue 裡，主 thread 依序取結果 → 與逐行讀取的順序完全相同
+  queue 長度 = window（預設 2 × workers）→ 記憶體不會整檔堆起來
+- 資料量小（< inline_bytes）或 workers <= 1 → 同一份 decode_chunk 在目前 thread 直接做
+- 主 thread 剩下的成本 = 還原 pickle 回來的 PBEvent（約為 orjson decode 的 6 成）；
+  type_filter 越挑、JSON 越大（或用預設的 stdlib json codec）→ 平行化越划算
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, iter_text_lines
+from shared_core.event_raw.segment_log import segment_paths
+from shared_core.event_raw.ts_index import ensure_ts_index, plan_ranges
+from shared_core.replay.replay_engine import event_epoch, record_to_pbevent
+
+# (path, start, end) 或已讀出的多行 bytes
+Chunk = Union[Tuple[str, int, int], bytes]
+
+# (依原順序的 PBEvent / 待 gateway 的 raw dict, 錯誤訊息)
+Decoded = Tuple[List[Any], List[str]]
+
+_DONE = object()
+
+
+def source_files(path: Union[str, Path]) -> List[Path]:
+    """pipeline 能處理的檔案（.jsonl / .log 的所有 segment、壓縮檔）；其他格式回 []"""
+    p = Path(path)
+    if compression_of(p):
+        return [p] if p.exists() else []
+    if p.suffix.lower() in (".jsonl", ".log"):
+        return [seg for seg in segment_paths(p) if seg.exists()]
+    return []
+
+
+def iter_chunks(
+    paths: Iterable[Path],
+    *,
+    chunk_bytes: int = 4 << 20,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+) -> Iterator[Chunk]:
+    """依檔案順序切 chunk（邊界對齊到換行）"""
+    for path in paths:
+        if compression_of(path):
+            buf: List[bytes] = []
+            size = 0
+            for line in iter_text_lines(path, start_ts=start_ts, end_ts=end_ts):
+                raw = line.encode("utf-8")
+                buf.append(raw)
+                size += len(raw)
+                if size >= chunk_bytes:
+                    yield b"".join(buf)
+                    buf, size = [], 0
+            if buf:
+                yield b"".join(buf)
+            continue
+
+        size = path.stat().st_size
+        ranges: List[List[int]] = [[0, size]]
+        if start_ts is not None or end_ts is not None:
+            index = ensure_ts_index(path)
+            if index:
+                ranges, tail = plan_ranges(index, start_ts, end_ts)
+                ranges.append([tail, max(tail, size)])
+
+        with open(path, "rb") as f:
+            for pos, stop in ranges:
+                while pos < stop:
+                    end = pos + chunk_bytes
+                    if end >= stop:
+                        end = stop
+                    else:
+                        f.seek(end)
+                        f.readline()
+                        end = min(f.tell(), stop)
+                    yield (str(path), pos, end)
+                    pos = end
+
+
+def decode_chunk(
+    chunk: Chunk,
+    type_set: Optional[Set[str]] = None,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+) -> Decoded:
+    """在 worker 內：每行 decode → 有 "type" 的轉 PBEvent（不在型別 / 時間窗內的丟掉），其他原樣回傳"""
+    if isinstance(chunk, tuple):
+        path, start, end = chunk
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        where = path
+    else:
+        data = chunk
+        where = "<compressed>"
+
+    loads = get_codec().loads
+    out: List[Any] = []
+    errors: List[str] = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            raw = loads(line)
+        except Exception as e:
+            errors.append(f"JSONL decode error @ {where}: {e}")
+            continue
+        if not isinstance(raw, dict) or "type" not in raw:
+            out.append(raw)
+            continue
+        if type_set is not None and raw["type"] not in type_set:
+            continue
+        try:
+            ev = record_to_pbevent(raw)
+        except Exception as e:
+            errors.append(f"PBEvent 重建失敗: {e}")
+            continue
+        if start_ts is not None or end_ts is not None:
+            ts = event_epoch(ev)
+            if ts is not None and ((start_ts is not None and ts < start_ts) or (end_ts is not None and ts > end_ts)):
+                continue
+        out.append(ev)
+    return out, errors
+
+
+def iter_decoded(
+    paths: Iterable[Union[str, Path]],
+    *,
+    workers: Optional[int] = None,
+    chunk_bytes: int = 4 << 20,
+    window: Optional[int] = None,
+    inline_bytes: int = 8 << 20,
+    type_filter: Optional[Iterable[str]] = None,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+) -> Iterator[Decoded]:
+    """
+    依原順序產生每個 chunk 的 (items, errors)
+    type_filter / start_ts / end_ts：worker 先丟掉不要的事件（沒有 "type" 的 raw 不受影響，交給呼叫端）；
+    時間窗也用來跳過範圍外的 .tsidx chunk / 壓縮檔 block
+    """
+    files = [Path(p) for p in paths]
+    type_set = set(type_filter) if type_filter is not None else None
+    workers = workers or os.cpu_count() or 1
+    chunks = iter_chunks(files, chunk_bytes=chunk_bytes, start_ts=start_ts, end_ts=end_ts)
+
+    total = sum(f.stat().st_size for f in files if f.exists())
+    if workers <= 1 or total < inline_bytes:
+        for chunk in chunks:
+            yield decode_chunk(chunk, type_set, start_ts, end_ts)
+        return
+
+    window = window or workers * 2
+    pending: "queue.Queue[Any]" = queue.Queue(maxsize=window)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read_loop(pool: ProcessPoolExecutor) -> None:
+        try:
+            for chunk in chunks:
+                if not put(pool.submit(decode_chunk, chunk, type_set, start_ts, end_ts)):
+                    return
+        except BaseException as e:      # 讀檔失敗 → 交給主 thread 丟出
+            put(e)
+        put(_DONE)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        reader = threading.Thread(target=read_loop, args=(pool,), name="replay-reader", daemon=True)
+        reader.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item.result()
+        finally:
+            # 提早結束（limit / 例外）→ 停掉 reader、取消還沒開始的 chunk
+            stop.set()
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, Future):
+                    item.cancel()
+            reader.join()
+            chunks.close()
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -1,16 +1,22 @@
 # replay_runtime/reader.py
-import json
 from pathlib import Path
 
+from shared_core.codec import get_codec
+from shared_core.mmap_jsonl import MmapJsonlReader
+
 class RawMarketReader:
     def __init__(self, base_dir):
         self.base = Path(base_dir)
+        self.codec = get_codec()
 
     def iter_records(self, symbol, interval, date):
         file = self.base / symbol / interval / f"{date}.jsonl"
         if not file.exists():
             return
 
-        with file.open("r", encoding="utf-8") as f:
-            for line in f:
-                yield json.loads(line)
+        # 壞行照舊直接 raise（replay 不能默默少資料）；只略過空行
+        loads = self.codec.loads
+        with MmapJsonlReader(file, self.codec) as r:
+            for line in r.iter_lines():
+                if line.strip():
+                    yield loads(line)
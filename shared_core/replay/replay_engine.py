@@ -2,12 +2,43 @@ import json
 import time
 from pathlib import Path
 from typing import Any, Dict, Iterable, Iterator, List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Callable, Any, Literal
 from shared_core.event_schema import PBEvent
 
+from shared_core.codec import get_codec
+from shared_core.compressed_jsonl import compression_of, to_epoch
+from shared_core.event_raw.segment_log import segment_paths
+from shared_core.event_raw.ts_index import iter_range_lines
 ReplayTarget = Literal["bus", "library", "both"]
 
+
+def event_epoch(ev: Any) -> Optional[float]:
+    """事件時間（PBEvent.ts 是 epoch；其他物件退回 timestamp 欄位）"""
+    ts = getattr(ev, "ts", None)
+    if isinstance(ts, (int, float)):
+        return to_epoch(ts)
+    return to_epoch(getattr(ev, "timestamp", None))
+
+
+def record_to_pbevent(raw: Dict[str, Any]) -> PBEvent:
+    """
+    event_raw 紀錄（有 "type"）→ PBEvent
+    top-level：灌庫 worker（library/ingest/bulk_ingest.py）也用同一份轉換
+    """
+    return PBEvent(
+        type=raw["type"],
+        payload=raw.get("payload") or raw.get("content") or {},
+        source=raw.get("source", "replay"),
+        priority=raw.get("priority", 1),
+        tags=raw.get("tags"),
+        event_id=raw.get("event_id"),
+        timestamp=raw.get("timestamp"),
+        ts=raw.get("ts"),
+        compact=True,
+    )
+
+
 class ReplayEngine:
     """
     ReplayEngine v2
@@ -21,7 +52,8 @@ class ReplayEngine:
         * build_sequences() → 將事件組成滑動視窗序列（AI Dataset）
 
     支援檔案格式：
-    - .jsonl  每行一筆 dict
+    - .jsonl  每行一筆 dict（event_raw 分段 log 依序讀全部 segment）
+    - .jsonl.zst / .jsonl.gz  COLD 分塊壓縮檔（見 shared_core/compressed_jsonl.py）
     - .json   list[dict] 或單一 dict
     - .parquet / .feather  (若有 pandas)
     """
@@ -44,20 +76,27 @@ class ReplayEngine:
 
         # ✅ 新增：LibraryIngestor（可不傳，不影響原本）
         self.ingestor = ingestor
+        self.codec = get_codec()
     # ============================================================
     # 內部工具：讀檔 & 解析 raw records
     # ============================================================
-    def _iter_jsonl(self, path: Path) -> Iterator[Dict[str, Any]]:
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    yield json.loads(line)
-                except Exception as e:
-                    print(f"[ReplayEngine] ❌ JSONL decode error @ {path}: {e}")
-                    continue
+    def _iter_jsonl(
+        self,
+        path: Path,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        # .jsonl / .jsonl.zst / .jsonl.gz；有時間窗時只讀相關範圍：
+        # 未壓縮 → .tsidx（沒有就補建，見 ts_index.ensure_ts_index）；壓縮檔 → block index
+        for line in iter_range_lines(path, start_ts=start_ts, end_ts=end_ts, auto_index=True):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield self.codec.loads(line)
+            except Exception as e:
+                print(f"[ReplayEngine] ❌ JSONL decode error @ {path}: {e}")
+                continue
 
     def _iter_json(self, path: Path) -> Iterator[Dict[str, Any]]:
         try:
@@ -98,12 +137,28 @@ class ReplayEngine:
             if isinstance(rec, dict):
                 yield rec
 
-    def _iter_raw_records(self, path: str) -> Iterator[Dict[str, Any]]:
+    def _iter_raw_records(
+        self,
+        path: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        start_time / end_time 用來跳過整段在範圍外的資料（.tsidx chunk / 壓縮檔 block），
+        逐筆時間過濾仍在 iter_events / replay 做
+        """
         p = Path(path)
         suffix = p.suffix.lower()
+        start_ts = to_epoch(start_time)
+        end_ts = to_epoch(end_time)
 
         if suffix in (".jsonl", ".log"):
-            yield from self._iter_jsonl(p)
+            # event_raw 分段 log：logs.jsonl → logs.000001.jsonl, logs.000002.jsonl …
+            for seg in segment_paths(p):
+                yield from self._iter_jsonl(seg, start_ts, end_ts)
+        elif compression_of(p):
+            # COLD 封存（LogRotator.archive_warm_to_cold）
+            yield from self._iter_jsonl(p, start_ts, end_ts)
         elif suffix == ".json":
             yield from self._iter_json(p)
         elif suffix in (".parquet", ".feather", ".ftr"):
@@ -111,7 +166,7 @@ class ReplayEngine:
         else:
             # 預設當 JSONL 試試看
             print(f"[ReplayEngine] ⚠ 不認識的副檔名 {suffix}，以 JSONL 模式嘗試")
-            yield from self._iter_jsonl(p)
+            yield from self._iter_jsonl(p, start_ts, end_ts)
 
     # ============================================================
     # 內部工具：取得事件型別 & 時間
@@ -139,14 +194,15 @@ class ReplayEngine:
         return None
 
     @staticmethod
-    def _in_time_range(ts: Optional[datetime],
-                       start_time: Optional[datetime],
-                       end_time: Optional[datetime]) -> bool:
+    def _in_time_range(ts: Optional[float],
+                       start_ts: Optional[float],
+                       end_ts: Optional[float]) -> bool:
+        """全部是 epoch 秒（to_epoch / event_epoch 正規化過）"""
         if ts is None:
             return True  # 沒時間資訊就不過濾
-        if start_time and ts < start_time:
+        if start_ts is not None and ts < start_ts:
             return False
-        if end_time and ts > end_time:
+        if end_ts is not None and ts > end_ts:
             return False
         return True
 
@@ -168,16 +224,7 @@ class ReplayEngine:
         if isinstance(raw, dict):
             if "type" in raw:
                 try:
-                    return PBEvent(
-                        type=raw["type"],
-                        payload=raw.get("payload") or raw.get("content") or {},
-                        source=raw.get("source", "replay"),
-                        priority=raw.get("priority", 1),
-                        tags=raw.get("tags"),
-                        event_id=raw.get("event_id"),
-                        timestamp=raw.get("timestamp"),
-                        ts=raw.get("ts"),
-                    )
+                    return record_to_pbevent(raw)
                 except Exception as e:
                     print(f"[ReplayEngine] ❌ PBEvent 重建失敗: {e}")
                     return None
@@ -190,6 +237,50 @@ class ReplayEngine:
                 print(f"[ReplayEngine] ⚠ Gateway 處理失敗（soft drop）: {e}")
                 return None
             raise
+
+    def _iter_converted(
+        self,
+        path: str,
+        *,
+        key: str,
+        soft: bool,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+        type_filter: Optional[Iterable[str]] = None,
+        workers: Optional[int] = None,
+    ) -> Iterator[Optional[PBEvent]]:
+        """
+        raw → PBEvent（失敗 = None），順序與檔案相同
+        workers >= 2 且是 .jsonl / .log / 壓縮檔 → 平行 decode pipeline（見 parallel_decode.py）：
+        decode + PBEvent 重建在 process pool，這裡只剩 gateway 轉換（沒有 "type" 的 raw）
+        """
+        if workers is not None and workers >= 2:
+            from shared_core.replay.parallel_decode import iter_decoded, source_files
+
+            files = source_files(path)
+            if files:
+                decoded = iter_decoded(
+                    files,
+                    workers=workers,
+                    type_filter=type_filter,
+                    start_ts=to_epoch(start_time),
+                    end_ts=to_epoch(end_time),
+                )
+                try:
+                    for items, errors in decoded:
+                        for msg in errors:
+                            print(f"[ReplayEngine] ❌ {msg}")
+                        for item in items:
+                            if isinstance(item, PBEvent):
+                                yield item
+                            else:
+                                yield self._raw_to_event(item, key=key, soft=soft)
+                finally:
+                    decoded.close()
+                return
+
+        for raw in self._iter_raw_records(path, start_time, end_time):
+            yield self._raw_to_event(raw, key=key, soft=soft)
     # ============================================================
     # 對外 API：只產生 PBEvent，不 publish
     # ============================================================
@@ -203,29 +294,41 @@ class ReplayEngine:
         end_time: Optional[datetime] = None,
         type_filter: Optional[Iterable[str]] = None,
         limit: Optional[int] = None,
+        workers: Optional[int] = None,
     ) -> Iterator[PBEvent]:
         """
         讀檔 → raw → PBEvent → 依時間 / 型別 / 數量 做過濾。
 
+        start_time / end_time:
+            - datetime（naive 視為 UTC）/ epoch / ISO；以事件的 epoch 時間比較（含端點）
+            - .jsonl 依 .tsidx 直接跳到範圍內的 chunk（沒有索引的大檔第一次會補建），
+              壓縮檔依 block index → 只解析時間窗附近的資料
         type_filter:
             - None     : 不過濾
             - Iterable : 只保留 event_type 在此集合中的事件
         limit:
             - None  : 不限制
             - int   : 只產生前 N 筆
+        workers:
+            - None / 1 : 在目前 thread 逐行 decode
+            - >= 2     : 平行 decode pipeline（順序不變）
         """
 
         key = key or self.default_key
         type_set = set(type_filter) if type_filter is not None else None
+        start_ts, end_ts = to_epoch(start_time), to_epoch(end_time)
 
         count = 0
-        for raw in self._iter_raw_records(path):
-            ev = self._raw_to_event(raw, key=key, soft=soft)
+        events = self._iter_converted(
+            path, key=key, soft=soft, start_time=start_time, end_time=end_time,
+            type_filter=type_set, workers=workers,
+        )
+        for ev in events:
             if ev is None:
                 continue
 
-            ts = getattr(ev, "timestamp", None)
-            if not self._in_time_range(ts, start_time, end_time):
+            ts = event_epoch(ev)
+            if not self._in_time_range(ts, start_ts, end_ts):
                 continue
 
             if type_set is not None:
@@ -256,6 +359,8 @@ class ReplayEngine:
         limit: Optional[int] = None,
         progress_cb: Optional[Any] = None,
         target: ReplayTarget = "bus",
+        batch_size: int = 1000,
+        workers: Optional[int] = None,
     ) -> int:
         """
         真正將事件重播到 bus。
@@ -271,71 +376,105 @@ class ReplayEngine:
         progress_cb:
             - 可選 callback(count: int)，用來打印 / 更新進度列
 
+        batch_size:
+            - 不模擬時間間隔時（speed=0 或 ignore_timestamp），
+              每 batch_size 筆走一次 bus.publish_many（bus 不支援則逐筆）
+
+        workers:
+            - >= 2 → 讀檔 / decode / PBEvent 重建交給 reader thread + process pool，
+              這個 thread 只做 gateway 轉換與 publish；事件順序與逐行讀取完全相同
+
         回傳：成功 publish 的事件數
         """
         key = key or self.default_key
         count = 0
 
-        prev_ts: Optional[datetime] = None
+        # ⚡ 不需要 sleep → 批次 publish
+        batched = (ignore_timestamp or speed == 0) and batch_size > 1
+        publish_many = getattr(self.bus, "publish_many", None) if batched else None
+        pending: List[PBEvent] = []
+
+        prev_ts: Optional[float] = None
         type_set = set(type_filter) if type_filter is not None else None
+        start_ts, end_ts = to_epoch(start_time), to_epoch(end_time)
 
         # ✅ 若要灌庫，必須有 ingestor
         if target in ("library", "both") and self.ingestor is None:
             raise RuntimeError("ReplayEngine target=library/both but ingestor is None")
 
-        for raw in self._iter_raw_records(path):
-            ev = self._raw_to_event(raw, key=key, soft=soft)
-            if ev is None:
-                continue
-
-            ts = getattr(ev, "timestamp", None)
-            if not self._in_time_range(ts, start_time, end_time):
-                continue
-
-            if type_set is not None:
-                etype = self._get_event_type(ev)
-                if etype not in type_set:
+        events = self._iter_converted(
+            path, key=key, soft=soft, start_time=start_time, end_time=end_time,
+            type_filter=type_set, workers=workers,
+        )
+        try:
+            for ev in events:
+                if ev is None:
                     continue
 
-            # ---- 模擬時間間隔 ----
-            if not ignore_timestamp and speed != 0 and ts is not None:
-                if prev_ts is not None:
-                    dt = (ts - prev_ts).total_seconds()
-                    if dt > 0:
-                        time.sleep(dt / speed)
-                prev_ts = ts
-
-            # =====================================================
-            # 🔁 Replay 輸出控制（不砍原本邏輯，只加選項）
-            # =====================================================
+                ts = event_epoch(ev)
+                if not self._in_time_range(ts, start_ts, end_ts):
+                    continue
 
-            # 1️⃣ Replay → Library（不走 EventBus）
+                if type_set is not None:
+                    etype = self._get_event_type(ev)
+                    if etype not in type_set:
+                        continue
+
+                # ---- 模擬時間間隔 ----
+                if not ignore_timestamp and speed != 0 and ts is not None:
+                    if prev_ts is not None:
+                        dt = ts - prev_ts
+                        if dt > 0:
+                            time.sleep(dt / speed)
+                    prev_ts = ts
+
+                # =====================================================
+                # 🔁 Replay 輸出控制（不砍原本邏輯，只加選項）
+                # =====================================================
+
+                # 1️⃣ Replay → Library（不走 EventBus）
+                if target in ("library", "both"):
+                    if self.ingestor is None:
+                        raise RuntimeError(
+                            "ReplayEngine target=library/both but ingestor is None"
+                        )
+                    try:
+                        self.ingestor.ingest_event(ev)
+                    except Exception:
+                        pass
+
+                # 2️⃣ Replay → EventBus（原本行為，完全保留）
+                if target in ("bus", "both"):
+                    if publish_many is not None:
+                        pending.append(ev)
+                        if len(pending) >= batch_size:
+                            publish_many(pending)
+                            pending = []
+                    else:
+                        self.bus.publish(ev)
+
+                count += 1
+
+                # ---- 進度回報（保留）----
+                if progress_cb is not None:
+                    try:
+                        progress_cb(count)
+                    except Exception:
+                        pass
+
+                # ---- 數量限制（保留）----
+                if limit is not None and count >= limit:
+                    break
+
+            if pending:
+                publish_many(pending)
+        finally:
+            events.close()      # 提早結束（limit / 例外）→ 馬上收掉 decode pool
+            # 灌庫：最後不滿一批的事件落盤（中途出錯也一樣，已收下的不丟）
             if target in ("library", "both"):
-                if self.ingestor is None:
-                    raise RuntimeError(
-                        "ReplayEngine target=library/both but ingestor is None"
-                    )
-                try:
-                    self.ingestor.ingest_event(ev)
-                except Exception:
-                    pass
-
-            # 2️⃣ Replay → EventBus（原本行為，完全保留）
-            if target in ("bus", "both"):
-                self.bus.publish(ev)
-
-            count += 1
-
-            # ---- 進度回報（保留）----
-            if progress_cb is not None:
-                try:
-                    progress_cb(count)
-                except Exception:
-                    pass
-
-            # ---- 數量限制（保留）----
-            if limit is not None and count >= limit:
-                break
+                flush = getattr(self.ingestor, "flush", None)
+                if flush is not None:
+                    flush()
 
         print(f"[ReplayEngine] 🔁 完成重播，共 {count} 筆事件")
         return count
@@ -0,0 +1,296 @@
+# shared_core/tail_follow.py
+"""
+Tail-follow — 只讀「新 append 的資料」的游標（JSONL / CSV）
+
+    follower = JsonlFollower("hot/logs.jsonl", cursor_path="cursors/auditor.json")
+    for rec in follower.poll():          # 這次 poll 之後新寫入的紀錄
+        ...
+    follower.follow(callback)            # 阻塞式：有新資料就呼叫 callback(records)
+    async for rec in follower.aiter():   # asyncio 版
+
+- 游標 = (檔名, byte offset)，每次 poll 後寫回 cursor_path（tmp + rename），重啟後接著讀
+- 最後一行還沒寫完（沒有換行）→ 不消費，下次 poll 再讀
+- 分段 log（logs.000001.jsonl …）：讀完目前 segment 自動跳到下一個編號
+- 目前的檔案被 rotate 走（rename 到 WARM）→ 從下一個還在的 segment 開頭繼續
+  （被搬走前沒讀到的尾巴不會追到 WARM 去）
+- 檔案變小（被 truncate）→ 從頭讀
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from shared_core.codec import get_codec
+from shared_core.event_raw.segment_log import SegmentLog
+
+
+class _FileFollower:
+    """共用邏輯：游標、segment rollover、partial line；子類只負責把完整的行解碼"""
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        cursor_path: Path | str | None = None,
+        from_start: bool = True,
+        poll_interval: float = 0.5,
+        max_bytes: int = 8 << 20,
+    ):
+        """
+        from_start   : 沒有已存游標時，True = 從最舊的 segment 開頭讀；False = 從目前結尾開始
+        max_bytes    : 單次 poll 最多讀多少（避免第一次 poll 把整個檔案讀進記憶體）
+        """
+        self.path = Path(path)
+        self.segments = SegmentLog(self.path)
+        self.cursor_path = Path(cursor_path) if cursor_path else None
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+
+        self.file: Optional[str] = None     # 目前 segment 檔名
+        self.offset = 0
+        self.state: dict = {}               # 子類額外狀態（例如 CSV header）
+
+        self.resumed = self._load_cursor()
+        if not self.resumed:
+            self._init_position(from_start)
+
+    # -------------------------------------------------
+    # 游標
+    # -------------------------------------------------
+    def _load_cursor(self) -> bool:
+        if self.cursor_path is None or not self.cursor_path.exists():
+            return False
+        try:
+            with open(self.cursor_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.file = data.get("file")
+            self.offset = int(data.get("offset", 0))
+            self.state = data.get("state") or {}
+            return True
+        except Exception as e:
+            print(f"[Follower] ⚠ cursor unreadable, starting over: {e}")
+            return False
+
+    def save_cursor(self) -> None:
+        if self.cursor_path is None:
+            return
+        self.cursor_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cursor_path.with_name(self.cursor_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"file": self.file, "offset": self.offset, "state": self.state}, f)
+        os.replace(tmp, self.cursor_path)
+
+    def position(self) -> Optional[tuple]:
+        """目前游標 (segment 檔名, offset)；之前的行已讀過 / 略過，之後的由 poll 讀（還沒有檔案 → None）"""
+        if self.file is None:
+            return None
+        return (self.file, self.offset)
+
+    def _init_position(self, from_start: bool) -> None:
+        segs = self.segments.segments()
+        if not segs:
+            return
+        if from_start:
+            self.file, self.offset = segs[0].name, 0
+        else:
+            last = segs[-1]
+            self.file, self.offset = last.name, last.stat().st_size
+            self._on_skip_to_end(last)
+
+    def _on_skip_to_end(self, path: Path) -> None:
+        """from_start=False 時跳過既有內容（CSV 需要先讀 header）"""
+
+    # -------------------------------------------------
+    # 讀取
+    # -------------------------------------------------
+    def _current(self) -> Optional[Path]:
+        """目前該讀的檔案；處理第一次出現、被 rotate 走等情況"""
+        segs = self.segments.segments()
+        if not segs:
+            return None
+
+        if self.file is None:
+            self.file, self.offset = segs[0].name, 0
+            return segs[0]
+
+        for p in segs:
+            if p.name == self.file:
+                return p
+
+        # 目前的檔案不見了（rotate 走）→ 下一個編號較大的 segment
+        cur_seq = self.segments.seq_of(self.segments.dir / self.file)
+        for p in segs:
+            seq = self.segments.seq_of(p)
+            if cur_seq is None or (seq is not None and seq > cur_seq):
+                self._switch(p)
+                return p
+        return None
+
+    def _switch(self, path: Path) -> None:
+        self.file, self.offset = path.name, 0
+        self._on_new_file(path)
+
+    def _on_new_file(self, path: Path) -> None:
+        """換到新檔案時（CSV 要重讀 header）"""
+
+    def _read_new_lines(self) -> List[bytes]:
+        lines: List[bytes] = []
+        budget = self.max_bytes
+
+        while budget > 0:
+            path = self._current()
+            if path is None:
+                break
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue        # 剛好被 rotate 走 → _current 會換檔
+
+            if size < self.offset:
+                print(f"[Follower] ⚠ {path.name} truncated, restart from 0")
+                self._switch(path)
+
+            if size > self.offset:
+                read_all = size - self.offset <= budget
+                with open(path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read(size - self.offset if read_all else budget)
+                    cut = data.rfind(b"\n") + 1
+                    if not cut and not read_all:
+                        # 單行比 max_bytes 還長：這一行整個讀完
+                        data += f.read(size - self.offset - len(data))
+                        cut = data.rfind(b"\n") + 1
+                        read_all = True
+
+                if cut:                                 # 只消費完整的行
+                    lines.extend(data[:cut].splitlines())
+                    self.offset += cut
+                    budget -= cut
+
+                if self.offset < size:
+                    if not read_all:
+                        break   # 這次 poll 的量到了
+                    if self._next_segment(path) is None:
+                        break   # 最後一行還沒寫完 → 等下一次
+                    try:
+                        if path.stat().st_size > size:
+                            continue    # roll 之前剛 flush 完的尾巴 → 再讀一次
+                    except FileNotFoundError:
+                        continue
+                    # 已封存的 segment 結尾殘行（writer 當機）→ 丟棄
+                    print(f"[Follower] ⚠ drop partial line at end of {path.name}")
+
+            # 目前檔案讀完：有更新的 segment 才換過去
+            nxt = self._next_segment(path)
+            if nxt is None:
+                break
+            self._switch(nxt)
+
+        return lines
+
+    def _next_segment(self, path: Path) -> Optional[Path]:
+        segs = self.segments.segments()
+        try:
+            i = segs.index(path)
+        except ValueError:
+            return None
+        return segs[i + 1] if i + 1 < len(segs) else None
+
+    def _decode(self, lines: List[bytes]) -> List[Any]:
+        raise NotImplementedError
+
+    def poll(self) -> List[Any]:
+        """讀出自上次 poll 以來新增的完整紀錄，並保存游標"""
+        lines = self._read_new_lines()
+        records = self._decode(lines) if lines else []
+        if lines:
+            self.save_cursor()
+        return records
+
+    # -------------------------------------------------
+    # 持續追蹤
+    # -------------------------------------------------
+    def follow(
+        self,
+        callback: Callable[[List[Any]], Any],
+        *,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        """阻塞式追蹤：每 poll_interval 秒 poll 一次，有新紀錄就 callback(records)"""
+        while stop_event is None or not stop_event.is_set():
+            records = self.poll()
+            if records:
+                try:
+                    callback(records)
+                except Exception as e:
+                    print(f"[Follower] ❌ callback error: {e}")
+            elif stop_event is not None:
+                stop_event.wait(self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
+
+    async def aiter(self) -> AsyncIterator[Any]:
+        """asyncio 版 follow：逐筆 yield 新紀錄（poll 在 thread 執行，不卡 event loop）"""
+        while True:
+            records = await asyncio.to_thread(self.poll)
+            if not records:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for rec in records:
+                yield rec
+
+
+# ------------------------------------------------------------------
+# JSONL
+# ------------------------------------------------------------------
+class JsonlFollower(_FileFollower):
+    def __init__(self, path: Path | str, *, codec=None, **kwargs):
+        self.codec = codec or get_codec()
+        super().__init__(path, **kwargs)
+
+    def _decode(self, lines: List[bytes]) -> List[Any]:
+        loads = self.codec.loads
+        out = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                out.append(loads(line))
+            except Exception:
+                continue    # 壞行略過（與 reader 一致）
+        return out
+
+
+# ------------------------------------------------------------------
+# CSV（第一行是 header；每個檔案各自的 header）
+# ------------------------------------------------------------------
+class CsvFollower(_FileFollower):
+    """rows → dict（依 header）；header 存在游標裡，重啟後不必重讀"""
+
+    def _on_new_file(self, path: Path) -> None:
+        self.state = {}
+
+    def _on_skip_to_end(self, path: Path) -> None:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), None)
+        self.state = {"header": header} if header else {}
+
+    def _decode(self, lines: List[bytes]) -> List[Any]:
+        rows = csv.reader(line.decode("utf-8") for line in lines)
+        header = self.state.get("header")
+        out = []
+        for parts in rows:
+            if not parts:
+                continue
+            if header is None:
+                header = parts
+                self.state["header"] = header
+                continue
+            out.append(dict(zip(header, parts)))
+        return out
@@ -3,11 +3,15 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime, timedelta
+import os
 import shutil
 from typing import Optional
-import shutil
 import time
 
+from shared_core.compressed_jsonl import COMPRESSION_SUFFIX, compress_file, default_compression
+from shared_core.event_raw.segment_log import SegmentLog
+from shared_core.event_raw.ts_index import ts_index_path
+
 @dataclass
 class RotatePolicy:
     max_mb: int = 256
@@ -17,6 +21,8 @@ class RotatePolicy:
 @dataclass
 class ArchivePolicy:
     keep_warm_days: int = 7
+    compression: str = "auto"          # auto（zstd > gzip）/ zstd / gzip / none（只搬移）
+    block_kb: int = 1024               # 壓縮 block 大小（未壓縮）
 
 
 class LogRotator:
@@ -30,6 +36,13 @@ class LogRotator:
         writer=None,   # ★ 新增：EventLogWriter
         cooldown_sec: int = 10,   # ★ 新增
     ):
+        """
+        hot_file 是 event_raw 的邏輯名稱（logs.jsonl），實際檔案是分段的
+        logs.000001.jsonl …（見 shared_core/event_raw/segment_log.py）
+
+        輪轉 = 把 sealed segment rename 到 WARM，不複製、不 truncate；
+        writer 給了的話，active segment 超過 rotate_policy 時請它 roll
+        """
         self.hot_file = hot_file
         self.warm_dir = warm_dir
         self.cold_dir = cold_dir
@@ -39,54 +52,102 @@ class LogRotator:
 
         self.cooldown_sec = cooldown_sec      # ★ 新增
         self._last_rotate_ts = 0.0             # ★ 新增
+        self._cross_device_warned = False
+
+        self.segments = SegmentLog(hot_file)
 
         self.warm_dir.mkdir(parents=True, exist_ok=True)
         self.cold_dir.mkdir(parents=True, exist_ok=True)
 
-    def should_rotate(self) -> bool:
-        if not self.hot_file.exists():
+    # -------------------------------------------------
+    # Segment 狀態
+    # -------------------------------------------------
+    def _active(self) -> Path | None:
+        """writer 正在寫的 segment（沒有 writer → 編號最大者）"""
+        if self.writer is not None and hasattr(self.writer, "current_path"):
+            return self.writer.current_path
+        return self.segments.active()
+
+    def _active_expired(self, active: Path | None) -> bool:
+        if active is None or not active.exists():
+            return False
+        st = active.stat()
+        if st.st_size == 0:
             return False
 
-        size_mb = self.hot_file.stat().st_size / (1024 * 1024)
+        size_mb = st.st_size / (1024 * 1024)
         if self.rotate_policy.max_mb > 0 and size_mb >= self.rotate_policy.max_mb:
             return True
 
         if self.rotate_policy.max_age_minutes and self.rotate_policy.max_age_minutes > 0:
-            mtime = datetime.fromtimestamp(self.hot_file.stat().st_mtime)
+            mtime = datetime.fromtimestamp(st.st_mtime)
             if datetime.now() - mtime >= timedelta(minutes=self.rotate_policy.max_age_minutes):
                 return True
 
         return False
 
+    def should_rotate(self) -> bool:
+        active = self._active()
+        if self.segments.sealed(active):
+            return True
+        return self.writer is not None and hasattr(self.writer, "roll") and self._active_expired(active)
+
+    # -------------------------------------------------
+    # 輪轉：sealed segment → WARM（rename，不複製）
+    # -------------------------------------------------
+    def _warm_target(self, seg: Path) -> Path:
+        seq = self.segments.seq_of(seg) or 0
+        ts = datetime.fromtimestamp(seg.stat().st_mtime).strftime("%Y%m%d_%H%M%S")
+        name = f"{self.segments.stem}_{ts}_{seq:06d}"
+        target = self.warm_dir / f"{name}{self.segments.suffix}"
+        n = 1
+        while target.exists():      # HOT 清空後重啟，編號會從 1 重來
+            target = self.warm_dir / f"{name}_{n}{self.segments.suffix}"
+            n += 1
+        return target
+
+    def _move(self, src: Path, dst: Path) -> bool:
+        try:
+            os.replace(src, dst)
+            return True
+        except FileNotFoundError:
+            return False
+        except PermissionError:
+            # Windows：reader 還開著 → 下一輪再搬
+            print(f"[LogRotator] ⏸ segment busy, skip: {src.name}")
+            return False
+        except OSError:
+            # HOT / WARM 不在同一個 volume，rename 做不到 → 只能複製
+            if not self._cross_device_warned:
+                print("[LogRotator] ⚠ hot / warm on different volumes, falling back to copy")
+                self._cross_device_warned = True
+            shutil.move(str(src), str(dst))
+            return True
+
     def rotate_now(self) -> Path | None:
         now = time.time()
 
         # ★ 冷卻中，直接跳過
         if now - self._last_rotate_ts < self.cooldown_sec:
             return None
-    
-        if not self.hot_file.exists() or self.hot_file.stat().st_size == 0:
-            return None
-
-        # ★ 新增：Writer 正忙，直接跳過
-        if self.writer and self.writer.is_busy():
-            self._last_rotate_ts = now
-            print("[LogRotator] ⏸ writer busy, skip rotate")
-            return None
-
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        rotated = self.warm_dir / f"logs_{ts}.jsonl"
+        self._last_rotate_ts = now
 
         try:
-            shutil.copy2(self.hot_file, rotated)
-
-            if self.writer:
-                self.writer.truncate()
-            else:
-                with open(self.hot_file, "w", encoding="utf-8"):
-                    pass
-
-            print(f"[LogRotator] 🔁 rotated → {rotated}")
+            active = self._active()
+
+            # active segment 超過 policy → 請 writer roll（開新檔，瞬間完成）
+            if self.writer is not None and hasattr(self.writer, "roll") and self._active_expired(active):
+                self.writer.roll()
+                active = self._active()
+
+            rotated = None
+            for seg in self.segments.sealed(active):
+                target = self._warm_target(seg)
+                if self._move(seg, target):
+                    # 時間索引跟著 segment 走
+                    self._move(ts_index_path(seg), ts_index_path(target))
+                    rotated = target
+                    print(f"[LogRotator] 🔁 rotated → {target}")
             return rotated
 
         except Exception as e:
@@ -101,18 +162,45 @@ class LogRotator:
         cutoff = datetime.now() - timedelta(days=self.archive_policy.keep_warm_days)
         moved = 0
 
-        for p in self.warm_dir.glob("logs_*.jsonl"):
+        for p in self.warm_dir.glob(f"{self.segments.stem}_*{self.segments.suffix}"):
             mtime = datetime.fromtimestamp(p.stat().st_mtime)
             if mtime < cutoff:
-                target = self.cold_dir / p.name
-                shutil.move(str(p), str(target))
-                moved += 1
+                if self._archive_one(p):
+                    moved += 1
 
         return moved
 
+    def _archive_one(self, p: Path) -> bool:
+        """
+        WARM → COLD
+        - compression=none：原樣搬移
+        - 其他：寫成分塊壓縮檔 + block index（shared_core/compressed_jsonl.py），完成後才刪 WARM
+        """
+        compression = (self.archive_policy.compression or "none").lower()
+        tsidx = ts_index_path(p)
+        if compression == "none":
+            shutil.move(str(p), str(self.cold_dir / p.name))
+            if tsidx.exists():
+                shutil.move(str(tsidx), str(ts_index_path(self.cold_dir / p.name)))
+            return True
+
+        if compression == "auto":
+            compression = default_compression()
+        try:
+            target = self.cold_dir / (p.name + COMPRESSION_SUFFIX[compression])
+            compress_file(p, target, compression, block_size=self.archive_policy.block_kb * 1024)
+            ratio = p.stat().st_size / max(target.stat().st_size, 1)
+            p.unlink()
+            tsidx.unlink(missing_ok=True)      # 壓縮檔有自己的 block index
+            print(f"[LogRotator] 🧊 archived → {target.name} (x{ratio:.1f})")
+            return True
+        except Exception as e:
+            print(f"[LogRotator] ❌ archive error @ {p.name}: {e}")
+            return False
+
     def tick(self) -> None:
         if self.should_rotate():
             rotated = self.rotate_now()
             if rotated is None:
-                return  # ★ writer busy，直接跳過本輪
+                return  # ★ 冷卻中 / segment 忙碌，直接跳過本輪
         self.archive_warm_to_cold()
@@ -12,7 +12,7 @@ from trading_core.analysis.indicators.indicator_bundle import (
 
 class IndicatorSnapshotRunner:
     """
-    Assemble indicators from market.kline
+    Assemble indicators from market.kline / market.kline.batch
     Emit indicator.snapshot
     """
 
@@ -22,6 +22,7 @@ class IndicatorSnapshotRunner:
         self.interval = interval
         self.window = window
         self.buffer = deque(maxlen=window)
+        self._columns = None   # rolling window for on_kline_batch (KlineBatch)
 
     def on_kline(self, event):
         payload = event.payload
@@ -39,8 +40,35 @@ class IndicatorSnapshotRunner:
             return  # 資料不足，不發 snapshot
 
         # === 組成 DataFrame ===
+        import pandas as pd
         df = pd.DataFrame(list(self.buffer))
 
+        self._publish_snapshot(df, payload.get("close_time"))
+
+    def on_kline_batch(self, event):
+        payload = event.payload
+
+        if payload.get("symbol") != self.symbol:
+            return
+        if payload.get("interval") != self.interval:
+            return
+
+        from shared_core.pb_lang.kline_batch import KlineBatch
+
+        batch = payload["batch"]
+        if self._columns is not None:
+            batch = KlineBatch.concat([self._columns, batch])
+        self._columns = batch.tail(self.window)
+
+        if len(self._columns) < self.window:
+            return
+
+        # === 整批只算一次（最新視窗）===
+        close_time = self._columns.close_time
+        ts = int(close_time[-1]) if close_time is not None else None
+        self._publish_snapshot(self._columns.to_frame(), ts)
+
+    def _publish_snapshot(self, df, timestamp):
         # === 計算指標（統一出口）===
         indicators = build_indicator_bundle(df)
 
@@ -48,7 +76,7 @@ class IndicatorSnapshotRunner:
         snapshot_event = PBEvent(
             type="indicator.snapshot",
             payload={
-                "timestamp": payload.get("close_time"),
+                "timestamp": timestamp,
                 "symbol": self.symbol,
                 "interval": self.interval,
                 "indicators": indicators,
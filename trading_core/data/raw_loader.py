@@ -1,8 +1,8 @@
 # trading_core/data/raw_loader.py
 
-import json
 from pathlib import Path
 
+from shared_core.mmap_jsonl import read_latest
 RAW_DIR = Path("trading_core/data/raw")
 
 def load_latest_kline():
@@ -10,8 +10,5 @@ def load_latest_kline():
     if not files:
         return None
 
-    latest = files[-1]
-    with open(latest, "r", encoding="utf-8") as f:
-        last_line = f.readlines()[-1]
-
-    return json.loads(last_line)
+    # 只從檔尾反向讀最後一行（不 readlines 整個檔案）
+    return read_latest(files[-1])
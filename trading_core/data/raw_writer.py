@@ -1,14 +1,16 @@
 # trading_core/data/raw_writer.py
-import json
 import time
 from pathlib import Path
 
+from shared_core.codec import get_codec
+
 class RawMarketWriter:
     """
     Raw Market Writer (append-only)
     """
     def __init__(self, base_dir: str):
         self.base = Path(base_dir)
+        self.codec = get_codec()
 
     def write(self, record: dict):
         # 使用 market_ts 作為世界時間
@@ -26,4 +28,4 @@ class RawMarketWriter:
 
         file = path / f"{date}.jsonl"
         with file.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.write(self.codec.dumps(record) + "\n")
@@ -180,7 +180,18 @@ def backfill(
     # =====================================================
     # ✅ Step 8:（可選）emit history
     # =====================================================
-    if provider is not None:
+    if provider is not None and hasattr(provider, "emit_klines"):
+        # ⚡ 批次送出（provider 有 batch_callback 時走 bus.publish_many）
+        try:
+            provider.emit_klines(
+                records,
+                symbol=symbol,
+                interval=interval,
+                source="history",
+            )
+        except Exception as e:
+            print(f"[Backfill] ⚠ emit history failed: {e}")
+    elif provider is not None:
         for r in records:
             try:
                 provider.emit_kline(
@@ -23,6 +23,7 @@ class LiveMarketTickProvider:
     def __init__(self, world_id: str):
         self.world_id = world_id
         self._callback: Optional[Callable[[PBEvent], None]] = None
+        self._batch_callback: Optional[Callable[[list], None]] = None
         self._running = False
         # 🆕 Dedup cache
         self._seen = set()
@@ -32,11 +33,17 @@ class LiveMarketTickProvider:
     # Pandora 接口
     # =========================================================
 
-    def start(self, callback: Callable[[PBEvent], None]):
+    def start(
+        self,
+        callback: Callable[[PBEvent], None],
+        batch_callback: Optional[Callable[[list], None]] = None,
+    ):
         """
         Pandora ExternalTickExecutor 會呼叫這個方法
+        batch_callback：可選，emit_klines() 用（例如 fast_bus.publish_many）
         """
         self._callback = callback
+        self._batch_callback = batch_callback
         self._running = True
 
         print(
@@ -115,6 +122,104 @@ class LiveMarketTickProvider:
         self._seen.add(dedup_key)
         # ======================================================
 
+        self._check_gap(symbol, interval)
+
+        # 更新最後一根 K 線時間
+        self._last_open_ts[(symbol, interval)] = open_time_ms
+
+        # ======================================================
+        # 📈 正常送出 market.kline
+        # ======================================================
+        self._callback(
+            self._make_kline_event(
+                symbol=symbol,
+                interval=interval,
+                open_time_ms=open_time_ms,
+                close_time_ms=close_time_ms,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                volume=volume,
+                source=source,
+            )
+        )
+
+    def emit_klines(
+        self,
+        records: list[dict],
+        *,
+        symbol: str,
+        interval: str,
+        source: str = "history",
+        columnar: bool = False,
+    ) -> int:
+        """
+        批次版 emit_kline（backfill / history 用）
+        records：[{open_time, close_time, open, high, low, close, volume}]（秒）
+
+        - dedup 規則同 emit_kline
+        - gap 檢查整批只做一次（歷史資料逐筆檢查只會產生噪音）
+        - columnar=True → 整批組成一個 market.kline.batch（KlineBatch）送出
+        - 有 batch_callback → 一次送出整批；否則逐筆 callback
+        回傳：送出的 K 線數
+        """
+        if not self._running or self._callback is None:
+            return 0
+
+        self._check_gap(symbol, interval)
+
+        events = []
+        fresh = []
+        seen = self._seen
+        last_open_ms = None
+        for r in records:
+            open_time_ms = int(r["open_time"] * 1000)
+            dedup_key = (symbol, interval, open_time_ms)
+            if dedup_key in seen:
+                continue
+            seen.add(dedup_key)
+            last_open_ms = open_time_ms
+
+            if columnar:
+                fresh.append(r)
+                continue
+
+            events.append(
+                self._make_kline_event(
+                    symbol=symbol,
+                    interval=interval,
+                    open_time_ms=open_time_ms,
+                    close_time_ms=int(r["close_time"] * 1000),
+                    open_price=r["open"],
+                    high_price=r["high"],
+                    low_price=r["low"],
+                    close_price=r["close"],
+                    volume=r["volume"],
+                    source=source,
+                )
+            )
+
+        if last_open_ms is not None:
+            self._last_open_ts[(symbol, interval)] = last_open_ms
+
+        if columnar:
+            if not fresh:
+                return 0
+            from shared_core.pb_lang.kline_batch import KlineBatch
+            batch = KlineBatch.from_records(fresh, symbol=symbol, interval=interval)
+            self._callback(batch.to_event(source=source))
+            return len(fresh)
+
+        if self._batch_callback is not None:
+            self._batch_callback(events)
+        else:
+            for ev in events:
+                self._callback(ev)
+
+        return len(events)
+
+    def _check_gap(self, symbol: str, interval: str) -> None:
         # ======================================================
         # 🟡 Gap Detection（只警告，不補）
         # ======================================================
@@ -142,13 +247,21 @@ class LiveMarketTickProvider:
                 )
                 self._callback(warn_event)
 
-        # 更新最後一根 K 線時間
-        self._last_open_ts[key] = open_time_ms
-
-        # ======================================================
-        # 📈 正常送出 market.kline
-        # ======================================================
-        event = PBEvent(
+    def _make_kline_event(
+        self,
+        *,
+        symbol: str,
+        interval: str,
+        open_time_ms: int,
+        close_time_ms: int,
+        open_price: float,
+        high_price: float,
+        low_price: float,
+        close_price: float,
+        volume: float,
+        source: str,
+    ) -> PBEvent:
+        return PBEvent(
             type="market.kline",
             payload={
                 "symbol": symbol,
@@ -169,9 +282,8 @@ class LiveMarketTickProvider:
             source=source,                      # "startup_probe" / "daemon"
             priority=1,
             tags=["market", "kline", source],   # 可選但推薦
+            compact=True,
         )
-
-        self._callback(event)
     
 
     # =========================================================
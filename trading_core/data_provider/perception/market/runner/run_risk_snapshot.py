@@ -15,6 +15,9 @@ class RiskSnapshotRunner:
     """
     將 market.kline → risk.snapshot
     不做判斷、不做 gating，只做轉換
+
+    - on_kline       ：逐根（market.kline）
+    - on_kline_batch ：欄式批次（market.kline.batch），整批只算一次、只發最新一筆 snapshot
     """
 
     def __init__(self, bus, symbol: str, interval: str, window: int = 100):
@@ -23,6 +26,7 @@ class RiskSnapshotRunner:
         self.interval = interval
         self.window = window
         self.buffer = deque(maxlen=window)
+        self._columns = None   # 批次模式的滾動視窗（KlineBatch）
 
     def on_kline(self, event):
         k = event.payload
@@ -43,6 +47,32 @@ class RiskSnapshotRunner:
         import pandas as pd
         df = pd.DataFrame(list(self.buffer))
 
+        self._publish_snapshot(df, k.get("close_time"))
+
+    def on_kline_batch(self, event):
+        p = event.payload
+
+        if p.get("symbol") != self.symbol:
+            return
+        if p.get("interval") != self.interval:
+            return
+
+        from shared_core.pb_lang.kline_batch import KlineBatch
+
+        batch = p["batch"]
+        if self._columns is not None:
+            batch = KlineBatch.concat([self._columns, batch])
+        self._columns = batch.tail(self.window)
+
+        if len(self._columns) < 20:
+            return
+
+        # === 欄位直接組 DataFrame（無逐筆 dict）===
+        close_time = self._columns.close_time
+        ts = int(close_time[-1]) if close_time is not None else None
+        self._publish_snapshot(self._columns.to_frame(), ts)
+
+    def _publish_snapshot(self, df, timestamp):
         # === Indicator Snapshot ===
         indicators = build_indicator_bundle(df)
         indicator_snapshot = IndicatorSnapshot(values=indicators)
@@ -56,7 +86,7 @@ class RiskSnapshotRunner:
             payload={
                 "symbol": self.symbol,
                 "interval": self.interval,
-                "timestamp": k.get("close_time"),
+                "timestamp": timestamp,
                 "risk": risk_snapshot.__dict__,
             },
             source="risk_snapshot_runner",
@@ -1,4 +1,5 @@
 import csv
+import itertools
 import os
 from pathlib import Path
 from datetime import datetime
@@ -58,3 +59,44 @@ class MarketCSVWriter:
                 # 🔒 缺欄位補 None，避免 writer 崩
                 row = {k: r.get(k) for k in MARKET_CSV_FIELDS}
                 writer.writerow(row)
+
+    def write_batch(self, batch, *, source=None, market=None):
+        """
+        欄式批次版 write（market.kline.batch / KlineBatch）
+        - 欄位 → list 一次轉換，rows 直接 zip，不建逐筆 dict
+        - 沒有的欄位（fetch_ts / human_*）留空，與 write 缺欄位行為一致
+        """
+        n = len(batch)
+        print("[CSV] write_batch called", n)
+        if not n:
+            return
+
+        symbol_safe = batch.symbol.replace("/", "_")
+        path = self.root / f"{symbol_safe}_{batch.interval}.csv"
+        write_header = not path.exists()
+
+        # 常數欄位用無限 repeat，zip 以實際欄位長度為準
+        repeat = itertools.repeat
+        columns = {
+            "source": repeat(source),
+            "market": repeat(market),
+            "symbol": repeat(batch.symbol),
+            "interval": repeat(batch.interval),
+            "kline_open_ts": batch.open_time.tolist(),
+            "kline_close_ts": (
+                batch.close_time.tolist() if batch.close_time is not None else repeat(None)
+            ),
+            "open": batch.open.tolist(),
+            "high": batch.high.tolist(),
+            "low": batch.low.tolist(),
+            "close": batch.close.tolist(),
+            "volume": batch.volume.tolist(),
+        }
+
+        with path.open("a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(MARKET_CSV_FIELDS)
+            writer.writerows(
+                zip(*(columns.get(k) or repeat(None) for k in MARKET_CSV_FIELDS))
+            )
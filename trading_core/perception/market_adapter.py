@@ -204,6 +204,7 @@ class MarketKlineAdapter(PerceptionAdapter):
             },
             source=self.source,
             ts=raw["ts"],
+            compact=True,   # ⚡ hot path：單調 event_id、lazy ISO / meta
         )
 
 
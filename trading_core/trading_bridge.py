@@ -62,9 +62,6 @@ class TradingBridge:
             print("[TradingBridge] ⚠ runtime.fast_bus 缺失，改用 bus（RAW 層不會啟動）")
             fast_bus = self.bus  # 這行只當最終 fallback，用於緊急模式
 
-        publish = fast_bus.publish
-        gateway_process = self.gateway.process
-
         # 2) 預抓欄位 index
         cols = df.columns
         c_open   = cols.get_loc("open")
@@ -77,37 +74,51 @@ class TradingBridge:
         symbol = self.symbol
         interval = self.interval
 
-        count = 0
+        def _iter_raws():
+            for row in df.itertuples(index=False):
+                raw = {
+                    "symbol": symbol,
+                    "open":   row[c_open],
+                    "high":   row[c_high],
+                    "low":    row[c_low],
+                    "close":  row[c_close],
+                    "volume": row[c_volume],
+                    "interval": interval,
+                }
+                if c_ts is not None:
+                    raw["ts"] = float(row[c_ts])
+                yield raw
 
         # ============================================================
-        # ⛓ Ultra Zero-Copy Gateway Pipeline
+        # ⛓ Ultra Zero-Copy Gateway Pipeline（批次 publish）
+        # Gateway（adapter + filter + auto_fix + anti_poison + enrich + validate）
+        # → fast_bus.publish_many（每批只解析一次路由 / 一個 trace）
         # ============================================================
-        for row in df.itertuples(index=False):
-
-            raw = {
-                "symbol": symbol,
-                "open":   row[c_open],
-                "high":   row[c_high],
-                "low":    row[c_low],
-                "close":  row[c_close],
-                "volume": row[c_volume],
-                "interval": interval,
-            }
-
-            if c_ts is not None:
-                raw["ts"] = float(row[c_ts])
-    
-            # Gateway（adapter + filter + auto_fix + anti_poison + enrich + validate）
-            ok = self.gateway.process_and_publish(
-                "market.kline",
-                raw,
-                bus=self.fast_bus,   # 或 self.bus，看你原本 publish 用哪個
-                soft=True,
-            )
-
-            if not ok:
-                continue
-
-            count += 1
-
-        print(f"[TradingBridge] 📡 已發布 {count:,} 筆 K 線事件（Gateway Zero-Copy Path）")
\ No newline at end of file
+        count = self.gateway.process_many_and_publish(
+            "market.kline",
+            _iter_raws(),
+            bus=fast_bus,
+            soft=True,
+        )
+
+        print(f"[TradingBridge] 📡 已發布 {count:,} 筆 K 線事件（Gateway Zero-Copy Path）")
+
+    def emit_kline_batch(self, df, *, time_col: str = "ts", source: str = "trading_bridge"):
+        """
+        欄式批次事件化（bootstrap / replay 用）：
+        整個 DataFrame → 一個 market.kline.batch（KlineBatch 直接拿底層陣列）
+        - 不走逐筆 adapter；由 gateway 的 PBEventValidator 做向量化檢查
+        - 需要逐根 K 線的 handler 請用 per_bar() 訂閱
+        """
+        from shared_core.pb_lang.kline_batch import KlineBatch
+
+        fast_bus = getattr(self.rt, "fast_bus", None) or self.bus
+
+        batch = KlineBatch.from_frame(
+            df, symbol=self.symbol, interval=self.interval, time_col=time_col
+        )
+        event = self.gateway.validator.validate(batch.to_event(source=source))
+        fast_bus.publish(event)
+
+        print(f"[TradingBridge] 📦 已發布 market.kline.batch（{len(batch):,} 根）")
+        return len(batch)